@@ -9,10 +9,11 @@ import json
 from typing import List
 import os
 from pathlib import Path
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List
 
-from app.database import get_db
+from app.database import get_async_db, get_db
 from app.dao import EditDAO, EditDecisionDAO
 from app.schemas import (
     EditCreate,
@@ -172,81 +173,68 @@ async def edl_build(project_id: str, edit_id: str):
 
 
 @router.get("/{edit_id}/edl/status")
-def edl_status(project_id: str, edit_id: str):
+async def edl_status(project_id: str, edit_id: str, db: AsyncSession = Depends(get_async_db)):
     from app.services.edl_stream_service import _compute_edl_hash, _status_path
-    from app.database import SessionLocal
-    db = SessionLocal()
+    edit_obj = await EditDAO.get_with_decisions_async(db, edit_id)
+    if not edit_obj or edit_obj.project_id != project_id:
+        return {"status": "missing"}
+    decisions = [d for d in edit_obj.edit_decisions if d.is_included]
+    decisions.sort(key=lambda d: d.order_index)
+    if not decisions:
+        return {"status": "missing"}
+    ranges = [(float(d.start_time), float(d.end_time)) for d in decisions]
+    edl_hash = _compute_edl_hash(edit_obj.source_video_id, ranges)
+    status_path = _status_path(edl_hash)
+    if not status_path.exists():
+        return {"status": "missing", "edl_hash": edl_hash}
     try:
-        edit = EditDecisionDAO  # placeholder to keep import; real logic below
-        from app.dao import EditDAO
-        edit_obj = EditDAO.get_with_decisions(db, edit_id)
-        if not edit_obj or edit_obj.project_id != project_id:
-            return {"status": "missing"}
-        decisions = [d for d in edit_obj.edit_decisions if d.is_included]
-        decisions.sort(key=lambda d: d.order_index)
-        if not decisions:
-            return {"status": "missing"}
-        ranges = [(float(d.start_time), float(d.end_time)) for d in decisions]
-        edl_hash = _compute_edl_hash(edit_obj.source_video_id, ranges)
-        status_path = _status_path(edl_hash)
-        if not status_path.exists():
-            return {"status": "missing", "edl_hash": edl_hash}
-        try:
-            data = json.loads(status_path.read_text(encoding="utf-8"))
-        except Exception:
-            data = {"status": "missing"}
-        data["edl_hash"] = edl_hash
-        return data
-    finally:
-        db.close()
+        data = json.loads(status_path.read_text(encoding="utf-8"))
+    except Exception:
+        data = {"status": "missing"}
+    data["edl_hash"] = edl_hash
+    return data
 
 
 @router.get("/{edit_id}/edl/manifest.m3u8")
-def edl_manifest(project_id: str, edit_id: str):
+async def edl_manifest(project_id: str, edit_id: str, db: AsyncSession = Depends(get_async_db)):
     from app.services.edl_stream_service import _compute_edl_hash, _manifest_path
-    from app.database import SessionLocal
-    db = SessionLocal()
+    edit_obj = await EditDAO.get_with_decisions_async(db, edit_id)
+    if not edit_obj or edit_obj.project_id != project_id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Edit not found")
+    decisions = [d for d in edit_obj.edit_decisions if d.is_included]
+    decisions.sort(key=lambda d: d.order_index)
+    if not decisions:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No EDL")
+    ranges = [(float(d.start_time), float(d.end_time)) for d in decisions]
+    edl_hash = _compute_edl_hash(edit_obj.source_video_id, ranges)
+    manifest_path = _manifest_path(edl_hash)
+    if not manifest_path.exists():
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Manifest not ready")
+    # Rewrite segment URIs to routed API endpoints
     try:
-        from app.dao import EditDAO
-        edit_obj = EditDAO.get_with_decisions(db, edit_id)
-        if not edit_obj or edit_obj.project_id != project_id:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Edit not found")
-        decisions = [d for d in edit_obj.edit_decisions if d.is_included]
-        decisions.sort(key=lambda d: d.order_index)
-        if not decisions:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No EDL")
-        ranges = [(float(d.start_time), float(d.end_time)) for d in decisions]
-        edl_hash = _compute_edl_hash(edit_obj.source_video_id, ranges)
-        manifest_path = _manifest_path(edl_hash)
-        if not manifest_path.exists():
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Manifest not ready")
-        # Rewrite segment URIs to routed API endpoints
-        try:
-            text = manifest_path.read_text(encoding="utf-8")
-        except Exception:
-            return FileResponse(str(manifest_path), media_type="application/vnd.apple.mpegurl")
-
-        prefix = f"/api/projects/{project_id}/edits/{edit_id}/edl/{edl_hash}/"
-        out_lines = []
-        for raw in text.splitlines():
-            line = raw.strip()
-            if line.startswith('#EXT-X-MAP:') and 'URI=' in line:
-                # Replace init URI
-                out_lines.append(f'#EXT-X-MAP:URI="{prefix}init.mp4"')
-            elif line and not line.startswith('#'):
-                # segment line like seg-00001.m4s
-                out_lines.append(prefix + line)
-            else:
-                out_lines.append(raw)
-
-        out_text = "\n".join(out_lines) + "\n"
-        headers = {
-            "Cache-Control": "public, max-age=60",
-            "Access-Control-Allow-Origin": "*",
-        }
-        return Response(content=out_text, media_type="application/vnd.apple.mpegurl", headers=headers)
-    finally:
-        db.close()
+        text = manifest_path.read_text(encoding="utf-8")
+    except Exception:
+        return FileResponse(str(manifest_path), media_type="application/vnd.apple.mpegurl")
+
+    prefix = f"/api/projects/{project_id}/edits/{edit_id}/edl/{edl_hash}/"
+    out_lines = []
+    for raw in text.splitlines():
+        line = raw.strip()
+        if line.startswith('#EXT-X-MAP:') and 'URI=' in line:
+            # Replace init URI
+            out_lines.append(f'#EXT-X-MAP:URI="{prefix}init.mp4"')
+        elif line and not line.startswith('#'):
+            # segment line like seg-00001.m4s
+            out_lines.append(prefix + line)
+        else:
+            out_lines.append(raw)
+
+    out_text = "\n".join(out_lines) + "\n"
+    headers = {
+        "Cache-Control": "public, max-age=60",
+        "Access-Control-Allow-Origin": "*",
+    }
+    return Response(content=out_text, media_type="application/vnd.apple.mpegurl", headers=headers)
 
 
 @router.get("/{edit_id}/edl/{edl_hash}/{segment_name}")
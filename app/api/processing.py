@@ -4,37 +4,36 @@ API routes for video processing, preview, and finalization.
 
 from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks, Request
 from fastapi.responses import FileResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import Optional
-from pathlib import Path
+from typing import Literal, Optional
+from datetime import datetime
 import json
 import asyncio
-import uuid
 import os
 import logging
 
-from app.database import get_db
-from app.dao import EditDAO, SourceVideoDAO
+from app.database import SessionLocal, async_session_scope, get_async_db, get_db
+from app.dao import EditDAO, SourceVideoDAO, VideoClipDAO
 from app.services import VideoProcessingService
-from app.services.video_processing_service import process_video_for_editing, ProcessingResult
 from app.services.video_segmentation import VideoSegmentationService, SegmentationResult
 from app.schemas import FinalizeRequest, FinalizeResponse, PreviewResponse, ClipPreview, TranscriptSegmentResponse
-from app.ffmpeg_utils import cut_and_concatenate
+from app.ffmpeg_utils import render_segments
+from app.ffmpeg_runner import FFmpegCancelled, clear_cancelled
+from app.progress import open_progress_stream, close_progress_stream, publish_progress, progress_queues
+from app.job_store import JobContext, cancel_job as cancel_stored_job, create_job, get_job, inline_job, job_handler, job_status
 
 logger = logging.getLogger(__name__)
 router = APIRouter(tags=["processing"])
 
-# Store for tracking background jobs
-processing_jobs = {}
 
-# Store for transcript processing jobs
-transcript_jobs = {}
-
-# Store for video segmentation jobs
-segmentation_jobs = {}
-
-# Store for video clips metadata (in production, this would be in the database)
-video_clips_store = {}
+def _in_session(func, *args, **kwargs):
+    """Call a sync DAO method with a session of its own; run it with asyncio.to_thread."""
+    db = SessionLocal()
+    try:
+        return func(db, *args, **kwargs)
+    finally:
+        db.close()
 
 
 @router.post("/api/projects/{project_id}/source-videos/{video_id}/process")
@@ -46,6 +45,9 @@ async def process_video(
     whisper_model: str = "medium",
     language: str = "en",
     audio_track: int = 0,
+    transcription_mode: Literal["per_segment", "concatenated"] = "per_segment",
+    transcription_workers: Optional[int] = None,
+    escalation_model: Optional[str] = None,
     pad_before_seconds: float = 0.5,
     pad_after_seconds: float = 0.5,
     db: Session = Depends(get_db)
@@ -56,55 +58,51 @@ async def process_video(
     """
     
     # Verify source video exists in project
-    source_video = SourceVideoDAO.get_by_id(db, video_id)
+    source_video = await asyncio.to_thread(SourceVideoDAO.get_by_id, db, video_id)
     if not source_video or source_video.project_id != project_id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Source video {video_id} not found in project {project_id}"
         )
     
-    # Create job ID for tracking
-    job_id = str(uuid.uuid4())
-    processing_jobs[job_id] = {
-        'status': 'processing',
-        'progress': 0,
-        'message': 'Starting processing...',
-        'edit_id': None
+    # Prepare editing settings
+    editing_settings = {
+        'whisper_model': whisper_model,
+        'language': language,
+        'audio_track': audio_track,
+        'transcription_mode': transcription_mode,
+        'transcription_workers': transcription_workers,
+        'escalation_model': escalation_model,
+        'pad_before_seconds': pad_before_seconds,
+        'pad_after_seconds': pad_after_seconds
     }
     
-    # Define progress callback
-    def progress_callback(stage: str, message: str, percent: float):
-        processing_jobs[job_id]['progress'] = percent
-        processing_jobs[job_id]['message'] = message
-    
     try:
-        # Create service
-        service = VideoProcessingService(db)
-        
-        # Prepare editing settings
-        editing_settings = {
-            'whisper_model': whisper_model,
-            'language': language,
-            'audio_track': audio_track,
-            'pad_before_seconds': pad_before_seconds,
-            'pad_after_seconds': pad_after_seconds
-        }
-        
-        # Process the video
-        edit_id = await service.process_video_for_edit(
-            project_id=project_id,
-            source_video_id=video_id,
-            edit_name=edit_name,
-            user_prompt=user_prompt,
-            editing_settings=editing_settings,
-            progress_callback=progress_callback
-        )
-        
-        # Update job status
-        processing_jobs[job_id]['status'] = 'completed'
-        processing_jobs[job_id]['edit_id'] = edit_id
-        processing_jobs[job_id]['progress'] = 100
-        processing_jobs[job_id]['message'] = 'Processing complete!'
+        # Runs within the request; the job record makes its progress visible to other workers
+        async with inline_job('process', {'edit_name': edit_name, **editing_settings},
+                              message='Starting processing...', project_id=project_id,
+                              source_video_id=video_id) as job:
+            job_id = job.job_id
+            
+            # Define progress callback
+            def progress_callback(stage: str, message: str, percent: float):
+                job.update(percent, message, stage=stage)
+            
+            # Create service
+            service = VideoProcessingService(db)
+            
+            # Process the video
+            edit_id = await service.process_video_for_edit(
+                project_id=project_id,
+                source_video_id=video_id,
+                edit_name=edit_name,
+                user_prompt=user_prompt,
+                editing_settings=editing_settings,
+                progress_callback=progress_callback
+            )
+            
+            # Update job status
+            job.update(100, 'Processing complete!', force=True, edit_id=edit_id)
         
         return {
             'job_id': job_id,
@@ -114,8 +112,6 @@ async def process_video(
         }
         
     except Exception as e:
-        processing_jobs[job_id]['status'] = 'failed'
-        processing_jobs[job_id]['message'] = str(e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Processing failed: {str(e)}"
@@ -125,20 +121,34 @@ async def process_video(
 @router.get("/api/jobs/{job_id}")
 async def get_job_status(job_id: str):
     """Get the status of a processing job."""
-    if job_id not in processing_jobs:
+    job = await asyncio.to_thread(get_job, job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Job {job_id} not found"
+        )
+    
+    return job_status(job)
+
+
+@router.post("/api/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    """Cancel a queued or running job; a running job's ffmpeg processes are terminated."""
+    job = await asyncio.to_thread(cancel_stored_job, job_id)
+    if not job:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Job {job_id} not found"
         )
     
-    return processing_jobs[job_id]
+    return {"job_id": job_id, "status": job.status}
 
 
 @router.get("/api/projects/{project_id}/edits/{edit_id}/preview", response_model=PreviewResponse)
 async def get_edit_preview(
     project_id: str,
     edit_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get preview data for an edit.
@@ -146,7 +156,7 @@ async def get_edit_preview(
     """
     
     # Verify edit exists in project
-    edit = EditDAO.get_by_id(db, edit_id)
+    edit = await db.run_sync(EditDAO.get_by_id, edit_id)
     if not edit or edit.project_id != project_id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -154,11 +164,12 @@ async def get_edit_preview(
         )
     
     # Get preview data
-    service = VideoProcessingService(db)
-    preview_data = service.get_edit_preview_data(edit_id)
+    preview_data = await db.run_sync(
+        lambda sync_db: VideoProcessingService(sync_db).get_edit_preview_data(edit_id)
+    )
     
     # Get source video for base URL
-    source_video = SourceVideoDAO.get_by_id(db, preview_data['source_video_id'])
+    source_video = await SourceVideoDAO.get_by_id_async(db, preview_data['source_video_id'])
     if not source_video:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -196,7 +207,7 @@ async def finalize_edit(
     edit_id: str,
     finalize_request: FinalizeRequest,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Finalize an edit by actually concatenating the clips into a single video file.
@@ -204,7 +215,7 @@ async def finalize_edit(
     """
     
     # Verify edit exists and is not already finalized
-    edit = EditDAO.get_with_decisions(db, edit_id)
+    edit = await EditDAO.get_with_decisions_async(db, edit_id)
     if not edit or edit.project_id != project_id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -218,36 +229,65 @@ async def finalize_edit(
         )
     
     # Get source video
-    source_video = SourceVideoDAO.get_by_id(db, edit.source_video_id)
+    source_video = await SourceVideoDAO.get_by_id_async(db, edit.source_video_id)
     if not source_video:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Source video not found"
         )
     
-    # Create job ID
-    job_id = str(uuid.uuid4())
-    processing_jobs[job_id] = {
-        'status': 'finalizing',
-        'progress': 0,
-        'message': 'Starting finalization...',
-        'edit_id': edit_id
-    }
+    # Queue the export; a job worker claims and runs it
+    job_id = await asyncio.to_thread(
+        create_job,
+        'finalize',
+        {
+            'edit_id': edit_id,
+            'output_name': finalize_request.output_name,
+            'quality': finalize_request.quality
+        },
+        message='Starting finalization...',
+        project_id=project_id,
+        source_video_id=edit.source_video_id,
+        edit_id=edit_id
+    )
     
-    # Define finalization task
-    async def finalize_task():
-        try:
-            processing_jobs[job_id]['message'] = 'Preparing segments...'
-            processing_jobs[job_id]['progress'] = 10
+    return FinalizeResponse(
+        job_id=job_id,
+        status='finalizing',
+        message='Finalization started. Check job status for progress.'
+    )
+
+
+@job_handler('finalize')
+async def _finalize_job(job: JobContext):
+    """
+    Render (or remux) an edit's included clips into a single MP4.
+    
+    Stages: render, then update_db. A job resumed at update_db reuses the file
+    its earlier attempt finished writing instead of rendering it again.
+    """
+    edit_id = job.params['edit_id']
+    output_path = job.result.get('output_path')
+    try:
+        async with async_session_scope() as db:
+            edit = await EditDAO.get_with_decisions_async(db, edit_id)
+            source_video = await SourceVideoDAO.get_by_id_async(db, edit.source_video_id) if edit else None
+        if not edit:
+            raise ValueError(f"Edit {edit_id} not found")
+        
+        if not (job.stage == 'update_db' and output_path and os.path.exists(output_path)):
+            job.set_stage('render', 10, 'Preparing segments...')
+            output_path = None
+            
+            if not source_video:
+                raise ValueError("Source video not found")
             
             # Get included decisions in order
             included_decisions = [d for d in edit.edit_decisions if d.is_included]
             included_decisions.sort(key=lambda x: x.order_index)
             
             if not included_decisions:
-                processing_jobs[job_id]['status'] = 'failed'
-                processing_jobs[job_id]['message'] = 'No clips to concatenate'
-                return
+                raise ValueError('No clips to concatenate')
             
             # Build segments list for cut_and_concatenate
             segments = [
@@ -255,11 +295,8 @@ async def finalize_edit(
                 for d in included_decisions
             ]
             
-            processing_jobs[job_id]['message'] = f'Concatenating {len(segments)} clips...'
-            processing_jobs[job_id]['progress'] = 30
-            
             # Generate output filename
-            output_name = finalize_request.output_name or f"{edit.name}_final"
+            output_name = job.params.get('output_name') or f"{edit.name}_final"
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             output_filename = f"{output_name}_{timestamp}.mp4"
             output_path = os.path.join("processed", output_filename)
@@ -267,43 +304,64 @@ async def finalize_edit(
             # Ensure processed directory exists
             os.makedirs("processed", exist_ok=True)
             
-            # Run concatenation
-            await asyncio.to_thread(
-                cut_and_concatenate,
-                source_video.file_path,
-                segments,
-                output_path,
-                audio_track=0  # TODO: Get from settings
-            )
-            
-            processing_jobs[job_id]['message'] = 'Updating database...'
-            processing_jobs[job_id]['progress'] = 90
-            
-            # Update edit record
-            EditDAO.update(
-                db=db,
-                edit_id=edit_id,
-                is_finalized=True,
-                final_video_path=output_path
-            )
+            # The unified preview stream has the same content; remuxing it avoids a re-encode
+            export_method = 'render'
+            if (job.params.get('quality') or 'standard') == 'standard':
+                from app.services.edl_stream_service import find_ready_stream, export_stream_to_mp4
+                edl_hash = find_ready_stream(
+                    edit.source_video_id,
+                    [(float(s['start']), float(s['end'])) for s in segments]
+                )
+                if edl_hash:
+                    job.update(30, 'Exporting from the built preview stream...', force=True)
+                    if await export_stream_to_mp4(edl_hash, output_path):
+                        export_method = 'remux'
+                    else:
+                        logger.warning(f"Remux of stream {edl_hash} failed for edit {edit_id}; rendering from source")
             
-            processing_jobs[job_id]['status'] = 'completed'
-            processing_jobs[job_id]['progress'] = 100
-            processing_jobs[job_id]['message'] = 'Finalization complete!'
-            processing_jobs[job_id]['output_path'] = output_path
+            if export_method == 'render':
+                job.update(20, f'Concatenating {len(segments)} clips...', force=True)
+                
+                def render_progress(p):
+                    # Rendering spans 20-90% of the job
+                    message = (
+                        f'Rendering {len(segments)} clips: {p.percent or 0:.0f}%'
+                        + (f' at {p.speed:.1f}x' if p.speed else '')
+                    )
+                    job.update(int(20 + 0.7 * (p.percent or 0)), message, speed=p.speed,
+                               eta_seconds=round(p.eta_seconds, 1) if p.eta_seconds is not None else None)
+                    publish_progress(job.job_id, {"text": message, "type": "progress", "payload": p.to_dict()})
+                
+                # Run concatenation
+                await render_segments(
+                    source_video.file_path,
+                    segments,
+                    output_path,
+                    audio_track=0,  # TODO: Get from settings
+                    on_progress=render_progress,
+                    job_id=job.job_id
+                )
             
-        except Exception as e:
-            processing_jobs[job_id]['status'] = 'failed'
-            processing_jobs[job_id]['message'] = str(e)
-    
-    # Start background task
-    background_tasks.add_task(finalize_task)
+            job.set_stage('update_db', 90, 'Updating database...',
+                          output_path=output_path, export_method=export_method)
+        
+        # Update edit record
+        await asyncio.to_thread(
+            _in_session,
+            EditDAO.update,
+            edit_id=edit_id,
+            is_finalized=True,
+            final_video_path=output_path
+        )
+        
+        job.update(100, 'Finalization complete!', force=True)
     
-    return FinalizeResponse(
-        job_id=job_id,
-        status='finalizing',
-        message='Finalization started. Check job status for progress.'
-    )
+    except (FFmpegCancelled, asyncio.CancelledError):
+        if output_path and os.path.exists(output_path) and job.stage == 'render':
+            os.remove(output_path)
+        raise
+    finally:
+        clear_cancelled(job.job_id)
 
 
 @router.post("/api/projects/{project_id}/source-videos/{video_id}/generate-transcript")
@@ -311,14 +369,14 @@ async def generate_transcript_for_editing(
     project_id: str,
     video_id: str,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Generate transcript and prepare video for text-based editing.
     This creates the foundation for rearrangeable clips.
     """
     # Get video from database
-    video = SourceVideoDAO.get_by_id(db, video_id)
+    video = await SourceVideoDAO.get_by_id_async(db, video_id)
     if not video or video.project_id != project_id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -332,119 +390,152 @@ async def generate_transcript_for_editing(
             detail="Video file not found on disk"
         )
     
-    # Generate job ID
-    job_id = str(uuid.uuid4())
-    
-    # Initialize job status
-    transcript_jobs[job_id] = {
-        "status": "processing",
-        "progress": 0,
-        "message": "Starting transcript generation...",
-        "video_id": video_id,
-        "project_id": project_id,
-    }
-    
-    # Start background processing
-    background_tasks.add_task(
-        _process_video_transcript,
-        job_id,
-        video_id,
-        video.file_path,
-        project_id,
-        db
+    # Queue transcript generation; a job worker claims and runs it
+    job_id = await asyncio.to_thread(
+        create_job,
+        "transcript",
+        {"video_id": video_id, "video_path": video.file_path},
+        message="Starting transcript generation...",
+        project_id=project_id,
+        source_video_id=video_id
     )
+    await open_progress_stream(job_id)
     
     return {
         "job_id": job_id,
         "status": "processing",
-        "message": "Transcript generation started"
+        "message": "Transcript generation started",
+        "progress_url": f"/progress/{job_id}"
     }
 
 
-async def _process_video_transcript(job_id: str, video_id: str, video_path: str, project_id: str, db: Session):
-    """Background task to process video transcript."""
+@job_handler("transcript")
+async def _process_video_transcript(job: JobContext):
+    """
+    Background job to process video transcript.
+
+    Segments are persisted chunk by chunk together with a TranscriptionCheckpoint and
+    pushed to /progress/{job_id} as they finish. If the previous run for this video
+    was interrupted with the same settings (including this job, resumed after a
+    restart), it resumes from the checkpoint instead of starting from zero.
+    """
+    from app.dao import TranscriptSegmentDAO, TranscriptionCheckpointDAO
+
+    job_id = job.job_id
+    video_id = job.params["video_id"]
+    video_path = job.params["video_path"]
+    if job_id not in progress_queues:
+        await open_progress_stream(job_id)
+    checkpoint_id = None
+
+    def start_checkpoint(db, settings_key: str):
+        # Returns (checkpoint id, seconds already transcribed, segments already saved)
+        checkpoint = TranscriptionCheckpointDAO.get_latest_for_video(db, video_id)
+        if checkpoint and checkpoint.status != "completed" and checkpoint.settings_key == settings_key:
+            start_offset = checkpoint.processed_until or 0.0
+            logger.info(f"Resuming transcript for {video_id} from {start_offset:.1f}s "
+                        f"({checkpoint.segment_count} segments already saved)")
+            checkpoint.job_id = job_id
+            checkpoint.status = "running"
+            db.commit()
+        else:
+            # Clear existing segments and start over
+            TranscriptSegmentDAO.delete_by_video(db, video_id)
+            checkpoint = TranscriptionCheckpointDAO.create(db, video_id, settings_key, job_id=job_id)
+            start_offset = 0.0
+        return checkpoint.id, start_offset, checkpoint.segment_count or 0
+
+    def finish_checkpoint(db, *args) -> float:
+        # Returns the transcribed duration
+        checkpoint = TranscriptionCheckpointDAO.set_status(db, checkpoint_id, *args)
+        return (checkpoint.total_duration or 0) if checkpoint else 0
+
     try:
-        def progress_callback(progress: int, message: str):
-            if job_id in transcript_jobs:
-                transcript_jobs[job_id]["progress"] = progress
-                transcript_jobs[job_id]["message"] = message
-        
-        # Process video for editing
-        result: ProcessingResult = await process_video_for_editing(
-            video_id,
-            video_path,
-            progress_callback
+        settings_key = (await asyncio.to_thread(VideoProcessingService.transcript_cache_key, video_path)).digest
+        checkpoint_id, start_offset, segment_count = await asyncio.to_thread(
+            _in_session, start_checkpoint, settings_key
         )
-        
-        if result.success:
-            # Save transcript segments to database
-            from app.dao import TranscriptSegmentDAO
-            
-            # Clear existing segments
-            TranscriptSegmentDAO.delete_by_video(db, video_id)
-            
-            # Save new segments
-            for segment in result.transcript_segments:
-                TranscriptSegmentDAO.create(
-                    db=db,
-                    source_video_id=video_id,
-                    start_time=segment.start,
-                    end_time=segment.end,
-                    text=segment.text,
-                    confidence=segment.confidence,
-                    speaker=segment.speaker,
-                    words=[{
-                        "word": word.word,
-                        "start": word.start,
-                        "end": word.end,
-                        "confidence": word.confidence
-                    } for word in segment.words]
-                )
-            
-            # Update job status
-            transcript_jobs[job_id] = {
-                "status": "completed",
-                "progress": 100,
-                "message": "Transcript generation completed successfully",
-                "video_id": video_id,
-                "project_id": project_id,  # Use the project_id from the endpoint
-                "segment_count": len(result.transcript_segments),
-                "duration": result.video_metadata.get("duration", 0),
-            }
-        else:
-            transcript_jobs[job_id] = {
-                "status": "failed",
-                "progress": 0,
-                "message": f"Transcript generation failed: {result.error_message}",
-                "video_id": video_id,
-                "error": result.error_message,
-            }
-    
+
+        job.set_stage(
+            "transcribe", 5,
+            "Transcribing..." if start_offset <= 0 else f"Resuming transcription at {start_offset:.0f}s...",
+            processed_until=start_offset,
+            segments_persisted=segment_count,
+        )
+
+        def on_segments(segments, processed_until: float, total_duration: float):
+            # Runs in the transcription thread: use a dedicated session
+            nonlocal segment_count
+            batch = [{
+                "start": segment.start,
+                "end": segment.end,
+                "text": segment.text,
+                "confidence": segment.confidence,
+                "speaker": segment.speaker,
+                "words": [{
+                    "word": word.word,
+                    "start": word.start,
+                    "end": word.end,
+                    "confidence": word.confidence
+                } for word in segment.words]
+            } for segment in segments]
+
+            _in_session(TranscriptionCheckpointDAO.append_segments, checkpoint_id, batch, processed_until, total_duration)
+
+            segment_count += len(batch)
+            progress = 5 + int(90 * processed_until / total_duration) if total_duration else 95
+            job.update(
+                min(progress, 95),
+                f"Transcribed {processed_until:.0f}s of {total_duration:.0f}s",
+                processed_until=processed_until,
+                segments_persisted=segment_count,
+            )
+            publish_progress(job_id, {
+                "text": f"Transcribed {processed_until:.0f}s of {total_duration:.0f}s",
+                "type": "segments",
+                "payload": {"segments": batch, "processed_until": processed_until, "duration": total_duration},
+            })
+
+        await VideoProcessingService.transcribe_incrementally(video_path, on_segments, start_offset=start_offset)
+        duration = await asyncio.to_thread(_in_session, finish_checkpoint, "completed")
+
+        # Update job status
+        job.update(
+            100, "Transcript generation completed successfully", force=True,
+            segment_count=segment_count,
+            duration=duration,
+        )
+        publish_progress(job_id, {"text": "done", "type": "done", "payload": {"segment_count": segment_count}})
+
     except Exception as e:
-        transcript_jobs[job_id] = {
-            "status": "failed",
-            "progress": 0,
-            "message": f"Transcript generation failed: {str(e)}",
-            "video_id": video_id,
-            "error": str(e),
-        }
+        logger.exception(f"Transcript generation failed for {video_id}")
+        if checkpoint_id is not None:
+            # Keep the checkpoint resumable; the next run picks up from processed_until
+            await asyncio.to_thread(_in_session, finish_checkpoint, "failed", str(e))
+        publish_progress(job_id, {"text": f"Transcript generation failed: {e}", "type": "error"})
+        publish_progress(job_id, {"text": "done", "type": "done"})
+        raise RuntimeError(f"Transcript generation failed: {e}") from e
+    finally:
+        # Leave the stream open briefly so a late SSE client still gets the final events
+        await asyncio.sleep(1.0)
+        close_progress_stream(job_id)
 
 
 @router.get("/api/projects/{project_id}/source-videos/{video_id}/transcript-status/{job_id}")
 async def get_transcript_status(
     project_id: str,
     video_id: str,
-    job_id: str,
-    db: Session = Depends(get_db)
+    job_id: str
 ):
     """Get the status of transcript generation job."""
-    if job_id not in transcript_jobs:
+    job = await asyncio.to_thread(get_job, job_id)
+    if not job:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Job not found"
         )
     
-    job_data = transcript_jobs[job_id]
+    job_data = job_status(job)
     
     # Verify job belongs to this video
     if job_data.get("video_id") != video_id:
@@ -460,14 +551,14 @@ async def get_transcript_status(
 async def download_finalized_edit(
     project_id: str,
     edit_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Download the finalized video file.
     """
     from fastapi.responses import FileResponse
     
-    edit = EditDAO.get_by_id(db, edit_id)
+    edit = await db.run_sync(EditDAO.get_by_id, edit_id)
     if not edit or edit.project_id != project_id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -498,7 +589,7 @@ async def stream_source_video_segment(
     video_id: str,
     start: Optional[float] = None,
     end: Optional[float] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Stream a segment of a source video.
@@ -506,7 +597,7 @@ async def stream_source_video_segment(
     """
     from fastapi.responses import FileResponse
     
-    video = SourceVideoDAO.get_by_id(db, video_id)
+    video = await SourceVideoDAO.get_by_id_async(db, video_id)
     if not video:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -533,16 +624,16 @@ async def segment_video_for_editing(
     project_id: str,
     video_id: str,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Segment a video into clips based on transcript segments for text-based editing.
     """
     # Get video from database
-    video = SourceVideoDAO.get_by_id(db, video_id)
+    video = await SourceVideoDAO.get_by_id_async(db, video_id)
     if not video:
         # Let's see what videos are actually in the database for this project
-        project_videos = SourceVideoDAO.get_by_project(db, project_id)
+        project_videos = await db.run_sync(SourceVideoDAO.get_by_project, project_id)
         logger.error(f"Video with ID {video_id} not found in database")
         logger.error(f"Available videos in project {project_id}: {[(v.id, v.filename, v.file_path) for v in project_videos]}")
         raise HTTPException(
@@ -567,25 +658,14 @@ async def segment_video_for_editing(
             detail=f"Video file not found on disk: {video.file_path}"
         )
     
-    # Generate job ID
-    job_id = str(uuid.uuid4())
-    
-    # Initialize job status
-    segmentation_jobs[job_id] = {
-        "status": "processing",
-        "progress": 0,
-        "message": "Starting video segmentation...",
-        "video_id": video_id,
-        "project_id": project_id,
-    }
-    
-    # Start background processing
-    background_tasks.add_task(
-        _segment_video_background,
-        job_id,
-        video_id,
-        video.file_path,
-        project_id
+    # Queue segmentation; a job worker claims and runs it
+    job_id = await asyncio.to_thread(
+        create_job,
+        "segmentation",
+        {"video_id": video_id, "video_path": video.file_path},
+        message="Starting video segmentation...",
+        project_id=project_id,
+        source_video_id=video_id
     )
     
     return {
@@ -595,119 +675,105 @@ async def segment_video_for_editing(
     }
 
 
-async def _segment_video_background(job_id: str, video_id: str, video_path: str, project_id: str):
-    """Background task to segment video into clips."""
-    logger.info(f"Starting background segmentation task for job {job_id}, video {video_id}")
+def _clip_summary(clip, project_id: str) -> dict:
+    return {
+        "id": clip.id,
+        "segment_id": clip.segment_id,
+        "start_time": clip.start_time,
+        "end_time": clip.end_time,
+        "duration": clip.duration,
+        "order_index": clip.order_index,
+        "stream_url": f"/api/projects/{project_id}/clips/{clip.id}/play",
+    }
+
+
+@job_handler("segmentation")
+async def _segment_video_background(job: JobContext):
+    """
+    Background job to segment video into clips.
+    
+    Each clip is persisted as it is encoded; the job result only keeps the count.
+    A resumed job segments the video again, replacing clips from the interrupted run.
+    """
+    video_id = job.params["video_id"]
+    video_path = job.params["video_path"]
+    logger.info(f"Starting background segmentation task for job {job.job_id}, video {video_id}")
+    
+    def progress_callback(progress: int, message: str):
+        logger.info(f"Progress callback for {job.job_id}: {progress}% - {message}")
+        job.update(progress, message)
+    
+    ready_clips = []
+    persisting = []
+    
+    def persist_clip(db, clip):
+        try:
+            VideoClipDAO.create(
+                db,
+                clip_id=clip.id,
+                source_video_id=video_id,
+                start_time=clip.start_time,
+                end_time=clip.end_time,
+                order_index=clip.order_index,
+                segment_id=clip.segment_id,
+                file_path=clip.file_path
+            )
+        except Exception as persist_err:
+            db.rollback()
+            logger.warning(f"Failed to persist clip {clip.id}: {persist_err}")
+    
+    def clip_ready_callback(clip):
+        # Make each clip playable (and listed) as soon as it is encoded; the insert runs off the loop
+        persisting.append(asyncio.ensure_future(asyncio.to_thread(_in_session, persist_clip, clip)))
+        ready_clips.append(clip)
+        job.update(clip_count=len(ready_clips))
+    
+    # Segment video for editing
+    from app.services.video_segmentation import video_segmentation_service
     try:
-        def progress_callback(progress: int, message: str):
-            logger.info(f"Progress callback for {job_id}: {progress}% - {message}")
-            if job_id in segmentation_jobs:
-                segmentation_jobs[job_id]["progress"] = progress
-                segmentation_jobs[job_id]["message"] = message
-                logger.info(f"Updated job progress: {segmentation_jobs[job_id]}")
-        
-        # Segment video for editing
-        from app.services.video_segmentation import video_segmentation_service
-        result: SegmentationResult = await video_segmentation_service.segment_video_for_editing(
-            video_id,
-            video_path,
-            progress_callback
-        )
-        
+        job.set_stage("segment", 0, "Segmenting video..." if not job.resumed else "Resuming video segmentation...")
+        # Clips from an earlier segmentation of this video are replaced
+        await asyncio.to_thread(_in_session, VideoClipDAO.delete_by_video, video_id)
+        try:
+            result: SegmentationResult = await video_segmentation_service.segment_video_for_editing(
+                video_id,
+                video_path,
+                progress_callback,
+                clip_ready_callback
+            )
+        finally:
+            await asyncio.gather(*persisting)
         if result.success:
-            logger.info(f"Segmentation completed successfully with {len(result.clips)} clips")
-
-            # Store clip metadata for streaming
-            for clip in result.clips:
-                video_clips_store[clip.id] = {
-                    "source_video_id": video_id,
-                    "project_id": project_id,
-                    "start_time": clip.start_time,
-                    "end_time": clip.end_time,
-                    "duration": clip.duration,
-                    "segment_id": clip.segment_id,
-                    "file_path": clip.file_path,
-                }
-
-            # Persist index to disk for reuse
-            try:
-                clips_dir = Path("clips") / video_id
-                clips_dir.mkdir(parents=True, exist_ok=True)
-                index_path = clips_dir / "index.json"
-                persisted = [
-                    {
-                        "id": clip.id,
-                        "segment_id": clip.segment_id,
-                        "start_time": clip.start_time,
-                        "end_time": clip.end_time,
-                        "duration": clip.duration,
-                        "order_index": clip.order_index,
-                        "file_path": clip.file_path,
-                    }
-                    for clip in result.clips
-                ]
-                with open(index_path, "w", encoding="utf-8") as f:
-                    json.dump({"clips": persisted}, f)
-                logger.info(f"Persisted clip index: {index_path}")
-            except Exception as persist_err:
-                logger.warning(f"Failed to persist clip index: {persist_err}")
-
-            # Update job status with success
-            segmentation_jobs[job_id] = {
-                "status": "completed",
-                "progress": 100,
-                "message": "Video segmentation completed successfully",
-                "video_id": video_id,
-                "project_id": project_id,
-                "clip_count": len(result.clips),
-                "clips": [
-                    {
-                        "id": clip.id,
-                        "segment_id": clip.segment_id,
-                        "start_time": clip.start_time,
-                        "end_time": clip.end_time,
-                        "duration": clip.duration,
-                        "order_index": clip.order_index,
-                        "stream_url": f"/api/projects/{project_id}/clips/{clip.id}/play",
-                    }
-                    for clip in result.clips
-                ],
-            }
-            logger.info(f"Updated job status for {job_id}: {segmentation_jobs[job_id]['status']}")
-        else:
-            logger.error(f"Segmentation failed: {result.error_message}")
-            segmentation_jobs[job_id] = {
-                "status": "failed",
-                "progress": 0,
-                "message": f"Video segmentation failed: {result.error_message}",
-                "video_id": video_id,
-                "error": result.error_message,
-            }
-    
+            await asyncio.to_thread(_in_session, VideoClipDAO.mark_complete, video_id)
     except Exception as e:
-        segmentation_jobs[job_id] = {
-            "status": "failed",
-            "progress": 0,
-            "message": f"Video segmentation failed: {str(e)}",
-            "video_id": video_id,
-            "error": str(e),
-        }
+        raise RuntimeError(f"Video segmentation failed: {str(e)}") from e
+    
+    if not result.success:
+        logger.error(f"Segmentation failed: {result.error_message}")
+        raise RuntimeError(f"Video segmentation failed: {result.error_message}")
+    
+    logger.info(f"Segmentation completed successfully with {len(result.clips)} clips")
+    job.update(100, "Video segmentation completed successfully", force=True, clip_count=len(result.clips))
 
 
 @router.get("/api/projects/{project_id}/source-videos/{video_id}/segmentation-status/{job_id}")
 async def get_segmentation_status(
     project_id: str,
     video_id: str,
-    job_id: str
+    job_id: str,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get the status of video segmentation job."""
-    if job_id not in segmentation_jobs:
+    """Get the status of video segmentation job, with the clips persisted so far."""
+    job = await asyncio.to_thread(get_job, job_id)
+    if not job:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Job not found"
         )
     
-    job_data = segmentation_jobs[job_id]
+    job_data = job_status(job)
+    clips = await db.run_sync(VideoClipDAO.get_by_video, video_id)
+    job_data["clips"] = [_clip_summary(clip, project_id) for clip in clips]
     
     # Verify job belongs to this video
     if job_data.get("video_id") != video_id:
@@ -720,57 +786,50 @@ async def get_segmentation_status(
 
 
 @router.get("/api/projects/{project_id}/clips/{clip_id}/play")
-def stream_clip(project_id: str, clip_id: str, request: Request, db: Session = Depends(get_db)):
-    """Stream a video clip file."""
+async def stream_clip(project_id: str, clip_id: str, request: Request, db: AsyncSession = Depends(get_async_db)):
+    """
+    Stream a video clip file.
+    
+    Virtual clips (no encoded file) are rendered on first request and cached; the
+    next few clips of the same video are then rendered in the background.
+    """
     from app.services.video_streaming import stream_video_file
+    from app.services.clip_rendition_service import CLIP_PREFETCH_COUNT, ensure_rendition, prefetch_renditions
     
     try:
-        # Get clip metadata from store
-        clip_metadata = None
-        if clip_id in video_clips_store:
-            clip_metadata = video_clips_store[clip_id]
-            # Verify project by comparing stored project_id
-            if clip_metadata.get("project_id") != project_id:
-                raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Clip does not belong to this project")
-            source_video = SourceVideoDAO.get_by_id(db, clip_metadata["source_video_id"])
-            if not source_video:
-                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Source video not found")
-            if os.path.exists(clip_metadata["file_path"]):
-                return stream_video_file(clip_metadata["file_path"], f"clip_{clip_id}.mp4", request)
-            else:
-                return stream_video_file(source_video.file_path, source_video.filename, request)
-
-        # Fallback: look up persisted clips on disk (survives restarts)
-        clips_root = Path("clips")
-        if clips_root.exists():
-            for video_dir in clips_root.iterdir():
-                if not video_dir.is_dir():
-                    continue
-                index_path = video_dir / "index.json"
-                if not index_path.exists():
-                    continue
-                try:
-                    with open(index_path, "r", encoding="utf-8") as f:
-                        data = json.load(f)
-                    for c in data.get("clips", []):
-                        if c.get("id") == clip_id:
-                            source_video_id = video_dir.name
-                            source_video = SourceVideoDAO.get_by_id(db, source_video_id)
-                            if not source_video:
-                                continue
-                            # Ensure the video belongs to requested project
-                            if source_video.project_id != project_id:
-                                continue
-                            file_path = c.get("file_path")
-                            if file_path and os.path.exists(file_path):
-                                return stream_video_file(file_path, f"clip_{clip_id}.mp4", request)
-                            # If file is missing, fall back to full source
-                            return stream_video_file(source_video.file_path, source_video.filename, request)
-                except Exception as _e:
-                    continue
-
-        # If still not found
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Clip {clip_id} not found")
+        clip = await db.run_sync(VideoClipDAO.get_by_id, clip_id)
+        if not clip:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Clip {clip_id} not found")
+        
+        source_video = await SourceVideoDAO.get_by_id_async(db, clip.source_video_id)
+        if not source_video:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Source video not found")
+        # Ensure the video belongs to requested project
+        if source_video.project_id != project_id:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Clip does not belong to this project")
+        
+        if clip.file_path and os.path.exists(clip.file_path):
+            return stream_video_file(clip.file_path, f"clip_{clip_id}.mp4", request)
+        
+        # Virtual clip, or its file was removed: render it on demand. Hand the
+        # session's connection back to the pool for the length of the render.
+        await db.close()
+        try:
+            rendition = await ensure_rendition(source_video.id, source_video.file_path, clip.start_time, clip.end_time)
+        except Exception as render_err:
+            logger.warning(f"Could not render clip {clip_id}, streaming the full source instead: {render_err}")
+            return stream_video_file(source_video.file_path, source_video.filename, request)
+        
+        if CLIP_PREFETCH_COUNT > 0:
+            try:
+                following = await db.run_sync(VideoClipDAO.get_following, source_video.id, clip.order_index,
+                                              CLIP_PREFETCH_COUNT)
+                prefetch_renditions(source_video.id, source_video.file_path,
+                                    [(c.start_time, c.end_time) for c in following if not c.file_path])
+            except Exception as prefetch_err:
+                logger.warning(f"Could not schedule clip prefetch after {clip_id}: {prefetch_err}")
+        
+        return stream_video_file(str(rendition), f"clip_{clip_id}.mp4", request)
             
     except HTTPException:
         raise
@@ -783,24 +842,19 @@ def stream_clip(project_id: str, clip_id: str, request: Request, db: Session = D
 
 
 @router.get("/api/projects/{project_id}/source-videos/{video_id}/clips")
-def list_persisted_clips(project_id: str, video_id: str):
+def list_persisted_clips(project_id: str, video_id: str, db: Session = Depends(get_db)):
     """Return persisted clips for a source video if available (no re-segmentation required)."""
     try:
-        index_path = Path("clips") / video_id / "index.json"
-        if not index_path.exists():
-            return {"clips": []}
-        with open(index_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        clips = data.get("clips", [])
+        clips = VideoClipDAO.get_by_video(db, video_id)
         # Attach stream_url for each clip
         enriched = [
             {
-                **clip,
-                "stream_url": f"/api/projects/{project_id}/clips/{clip['id']}/play",
+                **_clip_summary(clip, project_id),
+                "file_path": clip.file_path or "",
             }
             for clip in clips
         ]
-        return {"clips": enriched}
+        return {"clips": enriched, "complete": all(clip.complete for clip in clips)}
     except Exception as e:
         logger.error(f"Error reading persisted clips: {e}")
         return {"clips": []}
@@ -809,69 +863,52 @@ def list_persisted_clips(project_id: str, video_id: str):
 @router.post("/api/projects/{project_id}/source-videos/{video_id}/edl/build")
 async def build_source_video_edl(project_id: str, video_id: str, background_tasks: BackgroundTasks):
     """Build unified HLS for source video from persisted clips."""
-    background_tasks.add_task(_build_source_video_edl_background_sync, project_id, video_id)
+    background_tasks.add_task(_build_source_video_edl_background_async, project_id, video_id)
     return {"status": "building", "message": "Started unified stream build"}
 
 
-def _build_source_video_edl_background_sync(project_id: str, video_id: str):
-    """Synchronous wrapper for background task."""
-    import asyncio
-    asyncio.run(_build_source_video_edl_background_async(project_id, video_id))
-
-
 async def _build_source_video_edl_background_async(project_id: str, video_id: str):
-    """Background task to build unified stream from persisted clips."""
+    """
+    Background task to build unified stream from persisted clips.
+
+    Runs after the response is sent, so it opens its own session for the lookups
+    and closes it before the (long) build.
+    """
     from app.services.edl_stream_service import build_unified_hls_from_ranges
     logger.info(f"[SRC EDL BG] Starting background build for video {video_id}")
     try:
-        index_path = Path("clips") / video_id / "index.json"
-        if not index_path.exists():
-            logger.error(f"[SRC EDL BG] No clips index for video {video_id}")
-            return
-        
-        with open(index_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        clips = data.get("clips", [])
-        if not clips:
-            logger.warning(f"[SRC EDL BG] No clips in index for {video_id}")
-            return
-        
-        logger.info(f"[SRC EDL BG] Found {len(clips)} clips in index")
-        
-        # Get source video path
-        from app.database import SessionLocal
-        db = SessionLocal()
-        try:
-            src = SourceVideoDAO.get_by_id(db, video_id)
+        async with async_session_scope() as db:
+            clips = await db.run_sync(VideoClipDAO.get_by_video, video_id)
+            if not clips:
+                logger.warning(f"[SRC EDL BG] No clips for {video_id}")
+                return
+            
+            logger.info(f"[SRC EDL BG] Found {len(clips)} clips")
+            
+            # Get source video path
+            src = await SourceVideoDAO.get_by_id_async(db, video_id)
             if not src:
                 logger.error(f"[SRC EDL BG] Source video not found: {video_id}")
                 return
-            
-            logger.info(f"[SRC EDL BG] Source video path: {src.file_path}")
-            ranges = [(float(c["start_time"]), float(c["end_time"])) for c in clips]
-            result = await build_unified_hls_from_ranges(video_id, src.file_path, ranges)
-            logger.info(f"[SRC EDL BG] Build result: success={result.success}, message={result.message}")
-        finally:
-            db.close()
+        
+        logger.info(f"[SRC EDL BG] Source video path: {src.file_path}")
+        ranges = [(c.start_time, c.end_time) for c in clips]
+        result = await build_unified_hls_from_ranges(video_id, src.file_path, ranges)
+        logger.info(f"[SRC EDL BG] Build result: success={result.success}, message={result.message}")
     except Exception as e:
         logger.error(f"[SRC EDL BG] Build failed: {e}", exc_info=True)
 
 
 @router.get("/api/projects/{project_id}/source-videos/{video_id}/edl/status")
-def get_source_video_edl_status(project_id: str, video_id: str):
+def get_source_video_edl_status(project_id: str, video_id: str, db: Session = Depends(get_db)):
     """Get unified stream status for source video."""
     from app.services.edl_stream_service import _compute_edl_hash, _status_path
     try:
-        index_path = Path("clips") / video_id / "index.json"
-        if not index_path.exists():
-            return {"status": "missing"}
-        with open(index_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        clips = data.get("clips", [])
+        clips = VideoClipDAO.get_by_video(db, video_id)
         if not clips:
             return {"status": "missing"}
         
-        ranges = [(float(c["start_time"]), float(c["end_time"])) for c in clips]
+        ranges = [(c.start_time, c.end_time) for c in clips]
         edl_hash = _compute_edl_hash(video_id, ranges)
         status_path = _status_path(edl_hash)
         if not status_path.exists():
@@ -889,7 +926,7 @@ def get_source_video_edl_status(project_id: str, video_id: str):
 
 
 @router.get("/api/projects/{project_id}/source-videos/{video_id}/edl/manifest.m3u8")
-def get_source_video_edl_manifest(project_id: str, video_id: str):
+def get_source_video_edl_manifest(project_id: str, video_id: str, db: Session = Depends(get_db)):
     """Serve unified manifest for source video."""
     from app.services.edl_stream_service import _compute_edl_hash, _manifest_path, EDL_ROOT
     import logging
@@ -897,19 +934,12 @@ def get_source_video_edl_manifest(project_id: str, video_id: str):
     
     try:
         logger.info(f"[SRC EDL MANIFEST] Request for video={video_id}")
-        index_path = Path("clips") / video_id / "index.json"
-        if not index_path.exists():
-            logger.error(f"[SRC EDL MANIFEST] No clips index at {index_path}")
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No clips")
-        
-        with open(index_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        clips = data.get("clips", [])
+        clips = VideoClipDAO.get_by_video(db, video_id)
         if not clips:
-            logger.error(f"[SRC EDL MANIFEST] No clips in index")
+            logger.error(f"[SRC EDL MANIFEST] No clips for video {video_id}")
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No clips")
         
-        ranges = [(float(c["start_time"]), float(c["end_time"])) for c in clips]
+        ranges = [(c.start_time, c.end_time) for c in clips]
         edl_hash = _compute_edl_hash(video_id, ranges)
         logger.info(f"[SRC EDL MANIFEST] Hash: {edl_hash}")
         
@@ -3,25 +3,33 @@ API routes for Source Videos.
 Handles operations related to uploaded videos.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Request
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Request, Query
 from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
+import asyncio
 import os
 import shutil
 import uuid
 from pathlib import Path
 
-from app.database import get_db
+from app.database import get_async_db, get_db
 from app.dao import SourceVideoDAO, TranscriptSegmentDAO
 from app.schemas import (
     SourceVideoResponse,
     TranscriptSegmentResponse,
-    SourceVideoUpdate
+    SourceVideoUpdate,
+    SpeechSegmentsResponse
 )
+from app.vad import VadParams, detect_speech_for_source
+from app.audio_cache import invalidate as invalidate_audio_cache
+from app.uploads import UploadTooLarge, save_upload
 
 router = APIRouter(prefix="/api/projects/{project_id}/source-videos", tags=["source-videos"])
 
+MAX_UPLOAD_BYTES = 15 * 1024 * 1024 * 1024  # 15GB
+
 
 @router.get("/", response_model=List[SourceVideoResponse])
 def list_source_videos(project_id: str, db: Session = Depends(get_db)):
@@ -44,16 +52,6 @@ async def upload_source_video(
             detail="File must be a video"
         )
     
-    # Validate file size (max 15GB)
-    file_size = 0
-    content = await file.read()
-    file_size = len(content)
-    if file_size > 15 * 1024 * 1024 * 1024:  # 15GB
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="File size must be less than 15GB"
-        )
-    
     # Create uploads directory if it doesn't exist
     uploads_dir = Path("uploads")
     uploads_dir.mkdir(exist_ok=True)
@@ -63,13 +61,24 @@ async def upload_source_video(
     unique_filename = f"{uuid.uuid4()}{file_extension}"
     file_path = uploads_dir / unique_filename
     
-    # Save file
+    # Save file in chunks off the event loop, enforcing the size limit (max 15GB) as it streams
+    try:
+        file_size = await save_upload(file, str(file_path), max_bytes=MAX_UPLOAD_BYTES)
+    except UploadTooLarge:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="File size must be less than 15GB"
+        )
+    except OSError as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to upload video: {str(e)}"
+        )
+    
     try:
-        with open(file_path, "wb") as buffer:
-            buffer.write(content)
-        
         # Create source video record
-        video = SourceVideoDAO.create(
+        video = await asyncio.to_thread(
+            SourceVideoDAO.create,
             db=db,
             project_id=project_id,
             filename=file.filename or unique_filename,
@@ -90,9 +99,9 @@ async def upload_source_video(
 
 
 @router.get("/{video_id}", response_model=SourceVideoResponse)
-def get_source_video(project_id: str, video_id: str, db: Session = Depends(get_db)):
+async def get_source_video(project_id: str, video_id: str, db: AsyncSession = Depends(get_async_db)):
     """Get a specific source video."""
-    video = SourceVideoDAO.get_by_id(db, video_id)
+    video = await SourceVideoDAO.get_by_id_async(db, video_id)
     if not video or video.project_id != project_id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -102,19 +111,72 @@ def get_source_video(project_id: str, video_id: str, db: Session = Depends(get_d
 
 
 @router.get("/{video_id}/transcript", response_model=List[TranscriptSegmentResponse])
-def get_video_transcript(project_id: str, video_id: str, db: Session = Depends(get_db)):
+async def get_video_transcript(project_id: str, video_id: str, db: AsyncSession = Depends(get_async_db)):
     """Get the transcript segments for a source video."""
-    video = SourceVideoDAO.get_by_id(db, video_id)
+    video = await SourceVideoDAO.get_by_id_async(db, video_id)
     if not video or video.project_id != project_id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Source video with ID {video_id} not found"
         )
     
-    segments = TranscriptSegmentDAO.get_by_video(db, video_id)
+    segments = await TranscriptSegmentDAO.get_by_video_async(db, video_id)
     return segments
 
 
+@router.get("/{video_id}/speech-segments", response_model=SpeechSegmentsResponse)
+def get_speech_segments(
+    project_id: str,
+    video_id: str,
+    audio_track: int = Query(0, ge=0),
+    threshold_db: float = Query(-50.0, le=0.0, description="Frame energy (dBFS) that starts speech"),
+    hysteresis_db: float = Query(6.0, ge=0.0, description="Speech continues until energy drops this far below threshold_db"),
+    min_speech_duration: float = Query(0.1, ge=0.0),
+    min_silence_duration: float = Query(0.2, ge=0.0),
+    padding: float = Query(0.0, ge=0.0),
+    db: Session = Depends(get_db)
+):
+    """
+    Detect speech intervals in a source video's audio track.
+    The audio is only decoded the first time; later calls with different
+    parameters reuse cached frame features and return in milliseconds.
+    """
+    video = SourceVideoDAO.get_by_id(db, video_id)
+    if not video or video.project_id != project_id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Source video with ID {video_id} not found"
+        )
+    if not os.path.exists(video.file_path):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Video file not found on disk"
+        )
+
+    params = VadParams(
+        threshold_db=threshold_db,
+        hysteresis_db=hysteresis_db,
+        min_speech_duration=min_speech_duration,
+        min_silence_duration=min_silence_duration,
+        padding=padding
+    )
+    try:
+        intervals, total_duration = detect_speech_for_source(video.file_path, audio_track, params)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to detect speech: {str(e)}"
+        )
+
+    return SpeechSegmentsResponse(
+        source_video_id=video_id,
+        audio_track=audio_track,
+        segments=[{"start": s, "end": e} for s, e in intervals],
+        speech_duration=round(sum(e - s for s, e in intervals), 3),
+        total_duration=round(total_duration, 3)
+    )
+
+
 @router.get("/{video_id}/play")
 def stream_video(project_id: str, video_id: str, request: Request, db: Session = Depends(get_db)):
     """Stream a source video file using the modular video streaming service."""
@@ -168,11 +230,13 @@ def delete_source_video(project_id: str, video_id: str, db: Session = Depends(ge
             detail=f"Source video with ID {video_id} not found"
         )
     
+    file_path = video.file_path
     success = SourceVideoDAO.delete(db, video_id)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to delete source video"
         )
+    invalidate_audio_cache(file_path)
     return None
 
@@ -0,0 +1,253 @@
+"""
+Persistent decoded-audio store.
+
+Each (source file, audio track, sample rate) is decoded once to raw 16-bit mono
+PCM under tmp/audio/{key}.pcm, with a {key}.json sidecar describing the source.
+Consumers memory-map the file read-only instead of decoding into throwaway
+temp files.
+
+The key includes the source's size and mtime, so a replaced or modified source
+gets a fresh entry and the stale one is dropped. Total size, together with the
+caches derived from it that register through share_budget() (VAD features under
+tmp/vad), is kept under AUDIO_CACHE_MAX_BYTES by evicting least recently used
+entries.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.ffmpeg_scheduler import run_scheduled
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+
+AUDIO_CACHE_ROOT = Path("tmp") / "audio"
+AUDIO_CACHE_ROOT.mkdir(parents=True, exist_ok=True)
+
+# Roughly 115 hours of 16 kHz mono int16 by default.
+AUDIO_CACHE_MAX_BYTES = int(os.getenv("AUDIO_CACHE_MAX_BYTES", str(12 * 1024 ** 3)))
+
+_key_locks: Dict[str, threading.Lock] = {}
+# (directory, glob) of derived cache files counted against the same budget
+_shared_budget: List[Tuple[Path, str]] = []
+_key_locks_guard = threading.Lock()
+
+
+def cache_key(source_path: str, audio_track: int = 0, sample_rate: int = SAMPLE_RATE) -> str:
+    """Key for a decoded track; changes whenever the source file is replaced or modified."""
+    st = os.stat(source_path)
+    h = hashlib.sha1()
+    h.update(os.path.abspath(source_path).encode("utf-8"))
+    h.update(f"|{st.st_size}|{st.st_mtime_ns}|{audio_track}|{sample_rate}".encode("utf-8"))
+    return h.hexdigest()
+
+
+def pcm_path(source_path: str, audio_track: int = 0, sample_rate: int = SAMPLE_RATE) -> Path:
+    """Path of the cached PCM file for a source track (it may not exist yet)."""
+    return AUDIO_CACHE_ROOT / f"{cache_key(source_path, audio_track, sample_rate)}.pcm"
+
+
+def open_pcm(path: Path) -> np.ndarray:
+    """Memory-map a cached raw PCM file read-only as int16 samples."""
+    if path.stat().st_size == 0:
+        return np.zeros(0, dtype=np.int16)
+    return np.memmap(path, dtype=np.int16, mode="r")
+
+
+def to_float(samples: np.ndarray) -> np.ndarray:
+    """Convert int16 PCM to the float32 [-1, 1) range Whisper expects."""
+    return np.asarray(samples, dtype=np.float32) / 32768.0
+
+
+def peek_pcm(source_path: str, audio_track: int = 0, sample_rate: int = SAMPLE_RATE) -> Optional[np.ndarray]:
+    """Return the cached samples for a source track if already decoded, without decoding."""
+    try:
+        key = cache_key(source_path, audio_track, sample_rate)
+    except OSError:
+        return None
+    path = AUDIO_CACHE_ROOT / f"{key}.pcm"
+    if not path.exists():
+        return None
+    _touch(key)
+    return open_pcm(path)
+
+
+def get_pcm(source_path: str, audio_track: int = 0, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """
+    Return read-only int16 mono samples for an audio track of a media file,
+    decoding it into the cache on first use.
+    """
+    key = cache_key(source_path, audio_track, sample_rate)
+    path = AUDIO_CACHE_ROOT / f"{key}.pcm"
+
+    with _lock_for(key):
+        if not path.exists():
+            _decode(source_path, audio_track, sample_rate, key)
+        else:
+            _touch(key)
+    return open_pcm(path)
+
+
+def invalidate(source_path: str) -> int:
+    """Remove every cached track of a source file. Returns the number of entries removed."""
+    source = os.path.abspath(source_path)
+    removed = 0
+    for meta_path in AUDIO_CACHE_ROOT.glob("*.json"):
+        meta = _read_meta(meta_path)
+        if meta and meta.get("source_path") == source:
+            removed += _remove_entry(meta_path.stem)
+    if removed:
+        logger.info(f"[AudioCache] Invalidated {removed} cached track(s) for {source_path}")
+    return removed
+
+
+def share_budget(directory: Path, pattern: str) -> None:
+    """
+    Count files matching pattern in directory against AUDIO_CACHE_MAX_BYTES.
+    They are evicted least recently used (by mtime) together with decoded tracks,
+    so their owner should touch a file when it reads it.
+    """
+    if (directory, pattern) not in _shared_budget:
+        _shared_budget.append((directory, pattern))
+
+
+def enforce_budget(incoming_bytes: int = 0, max_bytes: int = AUDIO_CACHE_MAX_BYTES) -> None:
+    """Evict least recently used entries until the cache plus incoming_bytes fits max_bytes."""
+    entries = []
+    total = 0
+    for pcm in AUDIO_CACHE_ROOT.glob("*.pcm"):
+        try:
+            size = pcm.stat().st_size
+            meta_path = pcm.with_suffix(".json")
+            last_used = meta_path.stat().st_mtime if meta_path.exists() else pcm.stat().st_mtime
+        except OSError:
+            continue
+        entries.append((last_used, pcm.stem, None, size))
+        total += size
+    for directory, pattern in _shared_budget:
+        for path in directory.glob(pattern):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, path.name, path, st.st_size))
+            total += st.st_size
+
+    entries.sort(key=lambda e: e[0])
+    for _, name, path, size in entries:
+        if total + incoming_bytes <= max_bytes:
+            break
+        if path is None:
+            removed = _remove_entry(name)
+        else:
+            try:
+                path.unlink()
+                removed = True
+            except OSError:
+                removed = False
+        if removed:
+            total -= size
+            logger.info(f"[AudioCache] Evicted {name} ({size / 1024 ** 2:.1f} MiB) to stay within disk budget")
+
+
+def _decode(source_path: str, audio_track: int, sample_rate: int, key: str) -> None:
+    source = os.path.abspath(source_path)
+    _drop_stale(source, audio_track, sample_rate, key)
+
+    # Reserve room for the decoded track up front when the duration is known.
+    try:
+        probe = subprocess.run(
+            ['ffprobe', '-v', 'error', '-show_entries', 'format=duration', '-of', 'json', source_path],
+            capture_output=True, text=True, check=True,
+        )
+        duration = float(json.loads(probe.stdout)['format']['duration'])
+        enforce_budget(int(duration * sample_rate * 2))
+    except Exception:
+        enforce_budget()
+
+    tmp_path = AUDIO_CACHE_ROOT / f"{key}.{os.getpid()}.{threading.get_ident()}.tmp"
+    started = time.time()
+    logger.info(f"[AudioCache] Decoding audio track {audio_track} of {source_path} at {sample_rate} Hz")
+    try:
+        run_scheduled(
+            ['ffmpeg', '-nostdin', '-v', 'error', '-i', source_path, '-vn', '-map', f'0:a:{audio_track}',
+             '-f', 's16le', '-acodec', 'pcm_s16le', '-ar', str(sample_rate), '-ac', '1', '-y', str(tmp_path)],
+            check=True, capture_output=True, text=True,
+        )
+        st = os.stat(source_path)
+        meta = {
+            "source_path": source,
+            "source_size": st.st_size,
+            "source_mtime_ns": st.st_mtime_ns,
+            "audio_track": audio_track,
+            "sample_rate": sample_rate,
+            "num_samples": tmp_path.stat().st_size // 2,
+        }
+        (AUDIO_CACHE_ROOT / f"{key}.json").write_text(json.dumps(meta), encoding="utf-8")
+        os.replace(tmp_path, AUDIO_CACHE_ROOT / f"{key}.pcm")
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+    logger.info(f"[AudioCache] Cached {meta['num_samples'] / sample_rate:.1f}s of audio as {key} "
+                f"in {time.time() - started:.2f}s")
+
+
+def _drop_stale(source: str, audio_track: int, sample_rate: int, current_key: str) -> None:
+    """Remove entries for an older version of the same source track."""
+    for meta_path in AUDIO_CACHE_ROOT.glob("*.json"):
+        if meta_path.stem == current_key:
+            continue
+        meta = _read_meta(meta_path)
+        if (meta and meta.get("source_path") == source and meta.get("audio_track") == audio_track
+                and meta.get("sample_rate") == sample_rate):
+            logger.info(f"[AudioCache] Source changed, dropping stale entry {meta_path.stem}")
+            _remove_entry(meta_path.stem)
+
+
+def _read_meta(meta_path: Path) -> Optional[dict]:
+    try:
+        return json.loads(meta_path.read_text(encoding="utf-8"))
+    except Exception:
+        return None
+
+
+def _remove_entry(key: str) -> int:
+    removed = 0
+    for suffix in (".pcm", ".json"):
+        path = AUDIO_CACHE_ROOT / f"{key}{suffix}"
+        try:
+            path.unlink()
+            removed = 1
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            # Still memory-mapped by a reader on platforms that lock mapped files
+            logger.warning(f"[AudioCache] Could not remove {path}: {e}")
+            return 0
+    return removed
+
+
+def _touch(key: str) -> None:
+    """Record an access so LRU eviction keeps recently used tracks."""
+    try:
+        os.utime(AUDIO_CACHE_ROOT / f"{key}.json")
+    except OSError:
+        pass
+
+
+def _lock_for(key: str) -> threading.Lock:
+    with _key_locks_guard:
+        lock = _key_locks.get(key)
+        if lock is None:
+            lock = _key_locks[key] = threading.Lock()
+        return lock
@@ -4,6 +4,7 @@ Defines feature flags, editing styles, and processing settings using Pydantic mo
 """
 
 from pydantic import BaseModel, Field
+from typing import Literal, Optional
 from dotenv import load_dotenv
 import os
 
@@ -35,6 +36,32 @@ class TranscriptionConfig(BaseModel):
     model_name: str = Field(default="medium", description="Whisper model name (e.g., tiny, base, small, medium, large).")
     language: str = Field(default="en", description="Language code for transcription (e.g., en, es, fr).")
     save_speech_audio: bool = Field(default=False, description="Save a separate speech-only audio file during initial transcription.")
+    transcription_mode: Literal["per_segment", "concatenated"] = Field(
+        default="per_segment",
+        description="'per_segment' runs Whisper on each speech segment separately; 'concatenated' runs it once over the silence-stripped audio and remaps timestamps to source time."
+    )
+    num_workers: int = Field(
+        default_factory=lambda: int(os.getenv("TRANSCRIPTION_WORKERS", "1")),
+        ge=1,
+        description="Worker processes for transcription. Above 1, long audio is split at silences and chunks are transcribed in parallel, each worker holding its own model. Loaded from TRANSCRIPTION_WORKERS."
+    )
+    backend: Literal["whisper", "faster_whisper"] = Field(
+        default_factory=lambda: os.getenv("TRANSCRIPTION_BACKEND", "whisper"),
+        description="Transcription engine: 'whisper' (openai-whisper, PyTorch) or 'faster_whisper' (CTranslate2, int8 on CPU; requires faster-whisper). Loaded from TRANSCRIPTION_BACKEND."
+    )
+    streaming: bool = Field(
+        default_factory=lambda: os.getenv("TRANSCRIPTION_STREAMING", "false").lower() in ("1", "true", "yes"),
+        description="Transcribe word-level timestamps from an ffmpeg pipe in overlapping windows, keeping memory constant for multi-hour files instead of decoding the whole track first. Loaded from TRANSCRIPTION_STREAMING."
+    )
+    escalation_model: Optional[str] = Field(
+        default=None,
+        description="Cascade mode: larger model (e.g., medium, large) used to re-transcribe segments the main model was not confident about. None disables the cascade."
+    )
+    escalation_logprob_threshold: float = Field(
+        default=-0.8,
+        le=0.0,
+        description="Segments with an average log-probability below this are escalated in cascade mode."
+    )
 
 class AudioProcessingConfig(BaseModel):
     """Configuration for audio processing, e.g., silence detection."""
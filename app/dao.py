@@ -3,14 +3,20 @@ Data Access Object (DAO) layer for GeminiEditor.
 Provides CRUD operations for all database models.
 """
 
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, selectinload
 from typing import List, Optional, Dict, Any
-from datetime import datetime
+from datetime import datetime, timedelta
 import uuid
 
-from app.models import Project, SourceVideo, TranscriptSegment, Edit, EditDecision
+from app.models import Project, SourceVideo, TranscriptSegment, Edit, EditDecision, TranscriptionCheckpoint, VideoClipRecord, Job
 from app.database import get_db
 
+# The *_async methods take an AsyncSession (app.database.AsyncSessionLocal) and cover
+# the reads async endpoints make on hot paths. Relationships are not lazy-loaded in
+# async sessions: load whatever the caller needs eagerly.
+
 
 # ==================== PROJECT DAO ====================
 
@@ -124,6 +130,12 @@ class SourceVideoDAO:
         """Get a source video by ID."""
         return db.query(SourceVideo).filter(SourceVideo.id == video_id).first()
     
+    @staticmethod
+    async def get_by_id_async(db: AsyncSession, video_id: str) -> Optional[SourceVideo]:
+        """Get a source video by ID."""
+        result = await db.execute(select(SourceVideo).where(SourceVideo.id == video_id))
+        return result.scalars().first()
+    
     @staticmethod
     def get_by_project(db: Session, project_id: str) -> List[SourceVideo]:
         """Get all source videos for a project."""
@@ -243,6 +255,16 @@ class TranscriptSegmentDAO:
             TranscriptSegment.source_video_id == source_video_id
         ).order_by(TranscriptSegment.start_time).all()
     
+    @staticmethod
+    async def get_by_video_async(db: AsyncSession, source_video_id: str) -> List[TranscriptSegment]:
+        """Get all transcript segments for a source video."""
+        result = await db.execute(
+            select(TranscriptSegment)
+            .where(TranscriptSegment.source_video_id == source_video_id)
+            .order_by(TranscriptSegment.start_time)
+        )
+        return list(result.scalars().all())
+    
     @staticmethod
     def get_by_time_range(db: Session, source_video_id: str, 
                           start_time: float, end_time: float) -> List[TranscriptSegment]:
@@ -361,6 +383,14 @@ class EditDAO:
             joinedload(Edit.edit_decisions)
         ).filter(Edit.id == edit_id).first()
     
+    @staticmethod
+    async def get_with_decisions_async(db: AsyncSession, edit_id: str) -> Optional[Edit]:
+        """Get an edit with its edit decisions eagerly loaded."""
+        result = await db.execute(
+            select(Edit).options(selectinload(Edit.edit_decisions)).where(Edit.id == edit_id)
+        )
+        return result.scalars().first()
+    
     @staticmethod
     def duplicate(db: Session, edit_id: str, new_name: Optional[str] = None) -> Optional[Edit]:
         """Duplicate an edit with all its edit decisions."""
@@ -537,3 +567,290 @@ class EditDecisionDAO:
         db.commit()
         return count
 
+
+# ==================== TRANSCRIPTION CHECKPOINT DAO ====================
+
+class TranscriptionCheckpointDAO:
+    """Data access operations for TranscriptionCheckpoint model."""
+
+    @staticmethod
+    def create(db: Session, source_video_id: str, settings_key: str,
+               job_id: Optional[str] = None) -> TranscriptionCheckpoint:
+        """Start a new checkpoint at the beginning of the video."""
+        checkpoint = TranscriptionCheckpoint(
+            id=str(uuid.uuid4()),
+            source_video_id=source_video_id,
+            job_id=job_id,
+            settings_key=settings_key,
+            status="running",
+            processed_until=0.0,
+            segment_count=0
+        )
+
+        db.add(checkpoint)
+        db.commit()
+        db.refresh(checkpoint)
+        return checkpoint
+
+    @staticmethod
+    def get_by_id(db: Session, checkpoint_id: str) -> Optional[TranscriptionCheckpoint]:
+        """Get a checkpoint by ID."""
+        return db.query(TranscriptionCheckpoint).filter(TranscriptionCheckpoint.id == checkpoint_id).first()
+
+    @staticmethod
+    def get_latest_for_video(db: Session, source_video_id: str) -> Optional[TranscriptionCheckpoint]:
+        """Get the most recent checkpoint for a source video."""
+        return db.query(TranscriptionCheckpoint).filter(
+            TranscriptionCheckpoint.source_video_id == source_video_id
+        ).order_by(TranscriptionCheckpoint.created_at.desc()).first()
+
+    @staticmethod
+    def append_segments(db: Session, checkpoint_id: str, segments: List[Dict[str, Any]],
+                        processed_until: float, total_duration: Optional[float] = None) -> Optional[TranscriptionCheckpoint]:
+        """
+        Insert a batch of transcript segments and advance the checkpoint in one commit,
+        so the persisted segments and processed_until never disagree.
+        """
+        checkpoint = TranscriptionCheckpointDAO.get_by_id(db, checkpoint_id)
+        if not checkpoint:
+            return None
+
+        for seg in segments:
+            segment = TranscriptSegment(
+                id=str(uuid.uuid4()),
+                source_video_id=checkpoint.source_video_id,
+                start_time=seg['start'],
+                end_time=seg['end'],
+                text=seg['text'],
+                confidence=seg.get('confidence'),
+                speaker=seg.get('speaker')
+            )
+
+            if 'words' in seg and seg['words']:
+                segment.set_words(seg['words'])
+
+            db.add(segment)
+
+        checkpoint.processed_until = max(checkpoint.processed_until or 0.0, processed_until)
+        checkpoint.segment_count = (checkpoint.segment_count or 0) + len(segments)
+        if total_duration is not None:
+            checkpoint.total_duration = total_duration
+        db.commit()
+        db.refresh(checkpoint)
+        return checkpoint
+
+    @staticmethod
+    def set_status(db: Session, checkpoint_id: str, status: str,
+                   error_message: Optional[str] = None) -> Optional[TranscriptionCheckpoint]:
+        """Mark a checkpoint completed or failed."""
+        checkpoint = TranscriptionCheckpointDAO.get_by_id(db, checkpoint_id)
+        if not checkpoint:
+            return None
+
+        checkpoint.status = status
+        checkpoint.error_message = error_message
+        db.commit()
+        db.refresh(checkpoint)
+        return checkpoint
+
+
+# ==================== VIDEO CLIP DAO ====================
+
+class VideoClipDAO:
+    """Data access operations for VideoClipRecord model."""
+
+    @staticmethod
+    def create(db: Session, clip_id: str, source_video_id: str, start_time: float, end_time: float,
+               order_index: int, segment_id: Optional[str] = None,
+               file_path: Optional[str] = None) -> VideoClipRecord:
+        """Persist a clip as soon as it is ready; it stays incomplete until mark_complete."""
+        clip = VideoClipRecord(
+            id=clip_id,
+            source_video_id=source_video_id,
+            segment_id=segment_id,
+            start_time=start_time,
+            end_time=end_time,
+            duration=end_time - start_time,
+            order_index=order_index,
+            file_path=file_path or None,
+            complete=False
+        )
+
+        db.add(clip)
+        db.commit()
+        db.refresh(clip)
+        return clip
+
+    @staticmethod
+    def get_by_id(db: Session, clip_id: str) -> Optional[VideoClipRecord]:
+        """Get a clip by ID."""
+        return db.query(VideoClipRecord).filter(VideoClipRecord.id == clip_id).first()
+
+    @staticmethod
+    def get_by_video(db: Session, source_video_id: str) -> List[VideoClipRecord]:
+        """Get all clips for a source video in playback order."""
+        return db.query(VideoClipRecord).filter(
+            VideoClipRecord.source_video_id == source_video_id
+        ).order_by(VideoClipRecord.order_index).all()
+
+    @staticmethod
+    def get_following(db: Session, source_video_id: str, order_index: int, limit: int) -> List[VideoClipRecord]:
+        """Get up to limit clips that come after order_index in the same video."""
+        return db.query(VideoClipRecord).filter(
+            VideoClipRecord.source_video_id == source_video_id,
+            VideoClipRecord.order_index > order_index
+        ).order_by(VideoClipRecord.order_index).limit(limit).all()
+
+    @staticmethod
+    def mark_complete(db: Session, source_video_id: str) -> int:
+        """Flag every clip of a source video as belonging to a finished segmentation."""
+        count = db.query(VideoClipRecord).filter(
+            VideoClipRecord.source_video_id == source_video_id
+        ).update({VideoClipRecord.complete: True}, synchronize_session=False)
+        db.commit()
+        return count
+
+    @staticmethod
+    def delete_by_video(db: Session, source_video_id: str) -> int:
+        """Delete all clip records for a source video (before re-segmenting it)."""
+        count = db.query(VideoClipRecord).filter(
+            VideoClipRecord.source_video_id == source_video_id
+        ).delete(synchronize_session=False)
+        db.commit()
+        return count
+
+
+# ==================== JOB DAO ====================
+
+class JobDAO:
+    """Data access operations for Job model."""
+
+    @staticmethod
+    def create(db: Session, kind: str, params: Optional[Dict[str, Any]] = None, status: str = "queued",
+               message: Optional[str] = None, project_id: Optional[str] = None,
+               source_video_id: Optional[str] = None, edit_id: Optional[str] = None,
+               worker_id: Optional[str] = None, job_id: Optional[str] = None) -> Job:
+        """Create a job; queued jobs are picked up by a worker, running ones are run by the caller."""
+        now = datetime.utcnow()
+        job = Job(
+            id=job_id or str(uuid.uuid4()),
+            kind=kind,
+            status=status,
+            progress=0.0,
+            message=message,
+            project_id=project_id,
+            source_video_id=source_video_id,
+            edit_id=edit_id,
+            worker_id=worker_id,
+            attempts=1 if status == "running" else 0,
+            started_at=now if status == "running" else None,
+            heartbeat_at=now if status == "running" else None
+        )
+        job.set_params(params or {})
+
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        return job
+
+    @staticmethod
+    def get_by_id(db: Session, job_id: str) -> Optional[Job]:
+        """Get a job by ID."""
+        return db.query(Job).filter(Job.id == job_id).first()
+
+    @staticmethod
+    def get_by_ids(db: Session, job_ids: List[str]) -> List[Job]:
+        """Get several jobs, in the order of job_ids (missing ones are left out)."""
+        jobs = {job.id: job for job in db.query(Job).filter(Job.id.in_(job_ids)).all()}
+        return [jobs[job_id] for job_id in job_ids if job_id in jobs]
+
+    @staticmethod
+    def update(db: Session, job_id: str, result: Optional[Dict[str, Any]] = None, **kwargs) -> Optional[Job]:
+        """Update job columns; result entries are merged into the stored result."""
+        job = JobDAO.get_by_id(db, job_id)
+        if not job:
+            return None
+
+        for key, value in kwargs.items():
+            if hasattr(job, key):
+                setattr(job, key, value)
+        if result:
+            job.set_result({**job.get_result(), **result})
+        if kwargs.get("status") in ("completed", "failed", "cancelled"):
+            job.finished_at = datetime.utcnow()
+
+        db.commit()
+        db.refresh(job)
+        return job
+
+    @staticmethod
+    def claim_next(db: Session, worker_id: str, kinds: List[str]) -> Optional[Job]:
+        """
+        Atomically claim the oldest queued job of the given kinds for worker_id.
+        The conditional UPDATE only succeeds for one worker, even across processes.
+        """
+        while True:
+            candidate = db.query(Job.id).filter(
+                Job.status == "queued",
+                Job.kind.in_(kinds)
+            ).order_by(Job.created_at).first()
+            if not candidate:
+                return None
+
+            now = datetime.utcnow()
+            claimed = db.query(Job).filter(
+                Job.id == candidate.id,
+                Job.status == "queued"
+            ).update({
+                Job.status: "running",
+                Job.worker_id: worker_id,
+                Job.attempts: Job.attempts + 1,
+                Job.started_at: now,
+                Job.heartbeat_at: now
+            }, synchronize_session=False)
+            db.commit()
+            if claimed:
+                return JobDAO.get_by_id(db, candidate.id)
+
+    @staticmethod
+    def heartbeat(db: Session, job_ids: List[str], worker_id: str) -> int:
+        """Record that worker_id is still running the given jobs."""
+        if not job_ids:
+            return 0
+        count = db.query(Job).filter(
+            Job.id.in_(job_ids),
+            Job.worker_id == worker_id,
+            Job.status == "running"
+        ).update({Job.heartbeat_at: datetime.utcnow()}, synchronize_session=False)
+        db.commit()
+        return count
+
+    @staticmethod
+    def get_orphaned(db: Session, stale_after_seconds: float) -> List[Job]:
+        """Running jobs whose worker has not sent a heartbeat for stale_after_seconds."""
+        cutoff = datetime.utcnow() - timedelta(seconds=stale_after_seconds)
+        return db.query(Job).filter(
+            Job.status == "running",
+            Job.heartbeat_at < cutoff
+        ).all()
+
+    @staticmethod
+    def requeue(db: Session, job_id: str, heartbeat_before: datetime) -> bool:
+        """Put an orphaned job back in the queue, keeping its stage; False if its worker came back."""
+        count = db.query(Job).filter(
+            Job.id == job_id,
+            Job.status == "running",
+            Job.heartbeat_at < heartbeat_before
+        ).update({Job.status: "queued", Job.worker_id: None}, synchronize_session=False)
+        db.commit()
+        return bool(count)
+
+    @staticmethod
+    def delete_finished_before(db: Session, cutoff: datetime) -> int:
+        """Delete completed, failed and cancelled jobs that finished before cutoff."""
+        count = db.query(Job).filter(
+            Job.status.in_(["completed", "failed", "cancelled"]),
+            Job.finished_at < cutoff
+        ).delete(synchronize_session=False)
+        db.commit()
+        return count
@@ -1,44 +1,95 @@
 """
 Database configuration and session management for GeminiEditor.
 Uses SQLAlchemy with SQLite for simplicity and portability.
+
+Sync code (DAOs, job handlers, threads) uses SessionLocal/get_db. Async endpoints use
+AsyncSessionLocal/get_async_db (aiosqlite) with the *_async DAO read methods, so queries
+do not block the event loop. Background work opens its own session with
+SessionLocal() or async_session_scope() instead of keeping a request's session.
 """
 
 from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy.pool import StaticPool
+from contextlib import asynccontextmanager
 import os
-from typing import Generator
+from typing import AsyncGenerator, Generator
 import logging
 
 logger = logging.getLogger(__name__)
 
-# Database file location
-DATABASE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
+# Database file location (DATA_DIR lets render workers on other hosts use a shared mount)
+DATABASE_DIR = os.getenv("DATA_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), "data"))
 os.makedirs(DATABASE_DIR, exist_ok=True)
 DATABASE_PATH = os.path.join(DATABASE_DIR, "gemini_editor.db")
 DATABASE_URL = f"sqlite:///{DATABASE_PATH}"
+ASYNC_DATABASE_URL = f"sqlite+aiosqlite:///{DATABASE_PATH}"
+# How long a write waits for another connection's write lock before failing
+SQLITE_BUSY_TIMEOUT_SECONDS = float(os.getenv("SQLITE_BUSY_TIMEOUT_SECONDS", "30"))
+# WAL needs shared memory, so render workers on other hosts (DATA_DIR on a network mount) need "delete"
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "wal").lower()
+
+# Connections held at once by sessions in worker threads (asyncio.to_thread, job writes)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "32"))
 
 # Create engine
-# For SQLite, we use StaticPool and check_same_thread=False for FastAPI compatibility
+# Every session checks out a connection of its own, so sessions in different threads
+# never share a transaction; check_same_thread=False lets a session close in another thread
 engine = create_engine(
     DATABASE_URL,
-    connect_args={"check_same_thread": False},
-    poolclass=StaticPool,
+    connect_args={"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_SECONDS},
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
     echo=False  # Set to True for SQL debugging
 )
 
 # Enable foreign key constraints for SQLite
 @event.listens_for(engine, "connect")
 def set_sqlite_pragma(dbapi_conn, connection_record):
-    """Enable foreign key constraints in SQLite."""
+    """
+    Enable foreign key constraints in SQLite, and WAL so readers (the aiosqlite
+    engine, other uvicorn workers, render workers) do not block on the job queue's writes.
+    """
     cursor = dbapi_conn.cursor()
     cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA busy_timeout={int(SQLITE_BUSY_TIMEOUT_SECONDS * 1000)}")
     cursor.close()
 
 # Session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+_async_engine = None
+_async_sessionmaker = None
+
+def get_async_engine():
+    """
+    The aiosqlite engine, created on first use.
+
+    Queries run in aiosqlite's connection threads; only turning rows into ORM
+    objects happens on the event loop.
+    """
+    global _async_engine, _async_sessionmaker
+    if _async_engine is None:
+        try:
+            import aiosqlite  # noqa: F401
+        except ImportError as e:
+            raise RuntimeError("Async database sessions need aiosqlite. Install it with: pip install aiosqlite") from e
+
+        _async_engine = create_async_engine(ASYNC_DATABASE_URL, echo=False)
+        event.listen(_async_engine.sync_engine, "connect", set_sqlite_pragma)
+        # Objects stay readable after commit; an expired attribute would need lazy IO
+        _async_sessionmaker = async_sessionmaker(_async_engine, class_=AsyncSession,
+                                                 autoflush=False, expire_on_commit=False)
+    return _async_engine
+
+def AsyncSessionLocal() -> AsyncSession:
+    """New AsyncSession (use as `async with AsyncSessionLocal() as db:`)."""
+    get_async_engine()
+    return _async_sessionmaker()
+
 # Base class for all models
 Base = declarative_base()
 
@@ -58,6 +109,38 @@ def get_db() -> Generator[Session, None, None]:
     finally:
         db.close()
 
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Async counterpart of get_db for `async def` endpoints.
+
+    Example:
+        @app.get("/items/{item_id}")
+        async def read_item(item_id: str, db: AsyncSession = Depends(get_async_db)):
+            return await ItemDAO.get_by_id_async(db, item_id)
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+@asynccontextmanager
+async def async_session_scope() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Session for one background task: committed if the block succeeds, rolled back
+    if it raises, and always closed. Keep it around the queries only, not around
+    long renders or transcriptions.
+    """
+    async with AsyncSessionLocal() as db:
+        try:
+            yield db
+            await db.commit()
+        except BaseException:
+            await db.rollback()
+            raise
+
+async def dispose_async_engine():
+    """Close pooled aiosqlite connections (application shutdown)."""
+    if _async_engine is not None:
+        await _async_engine.dispose()
+
 def init_db():
     """
     Initialize the database by creating all tables.
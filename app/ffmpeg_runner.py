@@ -0,0 +1,296 @@
+"""
+Async ffmpeg runner with live progress and cancellation.
+
+Commands run with `-progress pipe:1`, whose key=value blocks are parsed into
+FFmpegProgress snapshots (percent of the expected output duration, speed as a
+multiple of realtime, fps and ETA) and handed to an on_progress callback as ffmpeg
+reports them, roughly twice a second.
+
+Each ffmpeg runs in its own process group and can be registered under a job id;
+cancel_ffmpeg(job_id) terminates every process of that job, and cancelling the
+awaiting task does the same for its process.
+
+Every run waits for a slot from app.ffmpeg_scheduler first; job_class picks its
+priority and the slot decides the encoder thread count.
+
+On event loops without subprocess support (the selector loop on Windows) the
+process is driven from a worker thread instead, with the same behaviour.
+"""
+
+import asyncio
+import logging
+import os
+import signal
+import subprocess
+import threading
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List, Optional, Set
+
+from app.ffmpeg_scheduler import BATCH, Slot, apply_threads, async_ffmpeg_slot, scheduler
+
+logger = logging.getLogger(__name__)
+
+# Seconds a terminated ffmpeg gets to exit before it is killed.
+TERMINATE_GRACE_SECONDS = 5.0
+
+
+class FFmpegCancelled(Exception):
+    """Raised by run_ffmpeg when the job's processes were cancelled."""
+
+
+@dataclass
+class FFmpegProgress:
+    out_time: float                         # Seconds of output written so far
+    duration: Optional[float] = None        # Expected output duration, if known
+    percent: Optional[float] = None
+    speed: Optional[float] = None           # Multiple of realtime
+    fps: Optional[float] = None
+    eta_seconds: Optional[float] = None
+    done: bool = False
+
+    def to_dict(self) -> Dict[str, object]:
+        return asdict(self)
+
+
+class _ProgressParser:
+    """Accumulates -progress key=value lines and emits one snapshot per block."""
+
+    def __init__(self, duration: Optional[float], on_progress: Optional[Callable[[FFmpegProgress], None]]):
+        self.duration = duration if duration and duration > 0 else None
+        self.on_progress = on_progress
+        self._block: Dict[str, str] = {}
+
+    def feed(self, line: str) -> None:
+        key, sep, value = line.strip().partition("=")
+        if not sep:
+            return
+        self._block[key] = value.strip()
+        if key == "progress":
+            snapshot = self._snapshot(done=value.strip() == "end")
+            self._block = {}
+            if self.on_progress:
+                try:
+                    self.on_progress(snapshot)
+                except Exception as e:
+                    logger.warning(f"ffmpeg progress callback failed: {e}")
+
+    def _number(self, key: str, suffix: str = "") -> Optional[float]:
+        raw = self._block.get(key, "")
+        if suffix and raw.endswith(suffix):
+            raw = raw[:-len(suffix)]
+        try:
+            return float(raw)
+        except ValueError:
+            return None  # "N/A" before the first frame is written
+
+    def _snapshot(self, done: bool) -> FFmpegProgress:
+        out_time_us = self._number("out_time_us")
+        out_time = max(0.0, out_time_us / 1_000_000) if out_time_us is not None else 0.0
+        speed = self._number("speed", "x")
+        progress = FFmpegProgress(out_time=out_time, duration=self.duration, speed=speed,
+                                  fps=self._number("fps"), done=done)
+        if self.duration:
+            progress.percent = 100.0 if done else min(99.9, 100.0 * out_time / self.duration)
+            if speed and speed > 0:
+                progress.eta_seconds = 0.0 if done else max(0.0, (self.duration - out_time) / speed)
+        return progress
+
+
+# job id -> handles of running processes (asyncio.subprocess.Process or subprocess.Popen)
+_running: Dict[str, Set[object]] = {}
+_cancelled: Set[str] = set()
+_lock = threading.Lock()
+
+
+def _register(job_id: Optional[str], proc) -> None:
+    if job_id:
+        with _lock:
+            _running.setdefault(job_id, set()).add(proc)
+
+
+def _unregister(job_id: Optional[str], proc) -> None:
+    if job_id:
+        with _lock:
+            procs = _running.get(job_id)
+            if procs:
+                procs.discard(proc)
+                if not procs:
+                    _running.pop(job_id, None)
+
+
+def _terminate_group(proc, sig=None) -> None:
+    """Signal the process group started for proc (the whole group on POSIX)."""
+    if proc.returncode is not None:
+        return
+    try:
+        if os.name == "posix":
+            os.killpg(proc.pid, sig or signal.SIGTERM)
+            if not sig:
+                # A batch process suspended by the scheduler only acts on SIGTERM once continued
+                os.killpg(proc.pid, signal.SIGCONT)
+        elif sig == getattr(signal, "SIGKILL", None):
+            proc.kill()
+        else:
+            proc.terminate()
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def _stop(proc) -> None:
+    """Ask proc's group to exit, and kill it if it is still running after TERMINATE_GRACE_SECONDS."""
+    _terminate_group(proc)
+    # ffmpeg can take a long time to act on SIGTERM (e.g. while pacing input with -re)
+    killer = threading.Timer(TERMINATE_GRACE_SECONDS, _terminate_group,
+                             args=(proc, getattr(signal, "SIGKILL", None)))
+    killer.daemon = True
+    killer.start()
+
+
+def cancel_ffmpeg(job_id: str) -> int:
+    """
+    Terminate every ffmpeg process running for job_id and refuse later runs of it until
+    clear_cancelled(job_id), which the job's owner calls when it finishes. Only cancel
+    jobs that are still running. Returns how many processes were signalled.
+    """
+    with _lock:
+        procs = list(_running.get(job_id, ()))
+        _cancelled.add(job_id)
+    for proc in procs:
+        logger.info(f"Cancelling ffmpeg (pid {proc.pid}) for job {job_id}")
+        _stop(proc)
+    return len(procs)
+
+
+def is_cancelled(job_id: Optional[str]) -> bool:
+    """Whether cancel_ffmpeg was called for job_id; later ffmpeg runs of that job refuse to start."""
+    if not job_id:
+        return False
+    with _lock:
+        return job_id in _cancelled
+
+
+def clear_cancelled(job_id: str) -> None:
+    """Forget a cancellation, e.g. when a job id is reused for a new run or has finished."""
+    with _lock:
+        _cancelled.discard(job_id)
+
+
+def _process_group_kwargs() -> Dict[str, object]:
+    if os.name == "posix":
+        return {"start_new_session": True}
+    return {"creationflags": getattr(subprocess, "CREATE_NEW_PROCESS_GROUP", 0)}
+
+
+async def run_ffmpeg(args: List[str], duration: Optional[float] = None,
+                     on_progress: Optional[Callable[[FFmpegProgress], None]] = None,
+                     job_id: Optional[str] = None, timeout: Optional[float] = None,
+                     cwd: Optional[str] = None, job_class: str = BATCH) -> subprocess.CompletedProcess:
+    """
+    Run ffmpeg with the given arguments (without the leading "ffmpeg") and report progress.
+
+    Args:
+        args: ffmpeg arguments, inputs and outputs included
+        duration: Expected output duration in seconds, for percent and ETA
+        on_progress: Called on the event loop with each FFmpegProgress snapshot
+        job_id: Register the process so cancel_ffmpeg(job_id) can stop it
+        timeout: Seconds before the process is terminated (returncode 124)
+        cwd: Working directory for ffmpeg (relative input/output paths)
+        job_class: Scheduler class (ffmpeg_scheduler.INTERACTIVE or BATCH)
+
+    Returns:
+        subprocess.CompletedProcess: returncode, stdout (empty) and stderr
+
+    Raises:
+        FFmpegCancelled: If cancel_ffmpeg was called for job_id while it ran
+    """
+    async with async_ffmpeg_slot(job_class) as slot:
+        if is_cancelled(job_id):
+            raise FFmpegCancelled(f"Job {job_id} was cancelled")
+        cmd = ["ffmpeg", "-nostdin", "-hide_banner", "-nostats", "-progress", "pipe:1",
+               *apply_threads(args, slot.threads)]
+        return await _run(cmd, _ProgressParser(duration, on_progress), slot, job_id, timeout, cwd)
+
+
+async def _run(cmd: List[str], parser: _ProgressParser, slot: Slot, job_id: Optional[str],
+               timeout: Optional[float], cwd: Optional[str]) -> subprocess.CompletedProcess:
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE, cwd=cwd, **_process_group_kwargs()
+        )
+    except NotImplementedError:
+        return await _run_in_thread(cmd, parser, slot, job_id, timeout, cwd)
+
+    _register(job_id, proc)
+    scheduler.attach(slot, proc.pid)
+    timed_out = False
+    try:
+        async def read_progress():
+            async for raw in proc.stdout:
+                parser.feed(raw.decode("utf-8", "replace"))
+
+        progress_task = asyncio.ensure_future(read_progress())
+        stderr_task = asyncio.ensure_future(proc.stderr.read())
+        try:
+            await asyncio.wait_for(proc.wait(), timeout)
+        except asyncio.TimeoutError:
+            timed_out = True
+            logger.error(f"ffmpeg timed out after {timeout} seconds")
+            _stop(proc)
+            await proc.wait()
+        await progress_task
+        stderr = (await stderr_task).decode("utf-8", "replace")
+    except asyncio.CancelledError:
+        _stop(proc)
+        raise
+    finally:
+        scheduler.detach(slot, proc.pid)
+        _unregister(job_id, proc)
+
+    if is_cancelled(job_id):
+        raise FFmpegCancelled(f"ffmpeg cancelled for job {job_id}")
+    returncode = 124 if timed_out else proc.returncode
+    return subprocess.CompletedProcess(args=cmd, returncode=returncode, stdout="", stderr=stderr)
+
+
+async def _run_in_thread(cmd: List[str], parser: _ProgressParser, slot: Slot, job_id: Optional[str],
+                         timeout: Optional[float], cwd: Optional[str] = None) -> subprocess.CompletedProcess:
+    """Fallback for loops without subprocess support: drive a Popen from a worker thread."""
+    loop = asyncio.get_running_loop()
+    callback = parser.on_progress
+    if callback:
+        parser.on_progress = lambda p: loop.call_soon_threadsafe(callback, p)
+
+    def run() -> subprocess.CompletedProcess:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+                                encoding="utf-8", errors="replace", cwd=cwd, **_process_group_kwargs())
+        _register(job_id, proc)
+        scheduler.attach(slot, proc.pid)
+        stderr_chunks: List[str] = []
+        stderr_thread = threading.Thread(target=lambda: stderr_chunks.append(proc.stderr.read()), daemon=True)
+        stderr_thread.start()
+        timed_out = threading.Event()
+
+        def on_timeout():
+            timed_out.set()
+            _stop(proc)
+
+        timer = threading.Timer(timeout, on_timeout) if timeout else None
+        if timer:
+            timer.start()
+        try:
+            for line in proc.stdout:
+                parser.feed(line)
+            proc.wait()
+        finally:
+            if timer:
+                timer.cancel()
+            stderr_thread.join()
+            scheduler.detach(slot, proc.pid)
+            _unregister(job_id, proc)
+        return subprocess.CompletedProcess(args=cmd, returncode=124 if timed_out.is_set() else proc.returncode,
+                                           stdout="", stderr="".join(stderr_chunks))
+
+    result = await asyncio.to_thread(run)
+    if is_cancelled(job_id):
+        raise FFmpegCancelled(f"ffmpeg cancelled for job {job_id}")
+    return result
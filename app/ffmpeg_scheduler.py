@@ -0,0 +1,362 @@
+"""
+Process-wide scheduler for ffmpeg.
+
+Every ffmpeg run takes a slot from one scheduler before it starts. A slot carries
+the encoder thread count the process should use, so the total number of ffmpeg
+processes and the threads they use stay close to the machine's core count.
+
+Job classes:
+    interactive  Work an editor is waiting on: preview streams, clip renditions,
+                 track previews. Queued ahead of batch work and always has
+                 FFMPEG_INTERACTIVE_SLOTS slots that batch work cannot take.
+    batch        Exports, segmentation, audio decoding for transcription, vision clips.
+
+Limits come from FFMPEG_MAX_PROCESSES (default: half the cores, at least 2) and
+FFMPEG_INTERACTIVE_SLOTS (default 1). stats() reports running and queued jobs per
+class; it is served at GET /api/ffmpeg/scheduler.
+
+Preemption (FFMPEG_PREEMPTION, POSIX only):
+    suspend  Batch processes run niced, and while interactive work runs they are
+             stopped (SIGSTOP) and no new batch work starts; they continue (SIGCONT)
+             when the last interactive job ends, or after FFMPEG_MAX_SUSPEND_SECONDS
+             so a long preview cannot starve an export or run out its timeouts.
+    nice     Batch processes only run niced.
+    off      Neither.
+"""
+
+import asyncio
+import itertools
+import logging
+import os
+import signal
+import subprocess
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+JOB_CLASSES = (INTERACTIVE, BATCH)  # Highest priority first
+
+CPU_COUNT = os.cpu_count() or 2
+FFMPEG_MAX_PROCESSES = max(2, int(os.getenv("FFMPEG_MAX_PROCESSES", str(max(2, CPU_COUNT // 2)))))
+FFMPEG_INTERACTIVE_SLOTS = min(FFMPEG_MAX_PROCESSES - 1, max(0, int(os.getenv("FFMPEG_INTERACTIVE_SLOTS", "1"))))
+
+PREEMPTION_MODES = ("suspend", "nice", "off")
+FFMPEG_PREEMPTION = os.getenv("FFMPEG_PREEMPTION", "suspend" if os.name == "posix" else "off")
+FFMPEG_MAX_SUSPEND_SECONDS = float(os.getenv("FFMPEG_MAX_SUSPEND_SECONDS", "15"))
+BATCH_NICENESS = 10
+
+
+@dataclass
+class Slot:
+    job_class: str
+    threads: int
+    waited_seconds: float = 0.0
+    id: int = 0
+
+
+@dataclass
+class _Waiter:
+    job_class: str
+    notify: Any                     # Called once the slot is granted
+    enqueued_at: float = field(default_factory=time.monotonic)
+    slot: Optional[Slot] = None
+
+
+class FFmpegScheduler:
+    """Hands out ffmpeg slots by job class; usable from threads and from the event loop."""
+
+    def __init__(self, max_processes: int = FFMPEG_MAX_PROCESSES, cpu_count: int = CPU_COUNT,
+                 interactive_slots: int = FFMPEG_INTERACTIVE_SLOTS, preemption: str = FFMPEG_PREEMPTION,
+                 max_suspend_seconds: float = FFMPEG_MAX_SUSPEND_SECONDS):
+        if preemption not in PREEMPTION_MODES:
+            raise ValueError(f"Unknown preemption mode '{preemption}'. Expected one of {PREEMPTION_MODES}.")
+        self.max_processes = max_processes
+        self.cpu_count = cpu_count
+        self.interactive_slots = interactive_slots
+        self.preemption = preemption if os.name == "posix" else "off"
+        self.max_suspend_seconds = max_suspend_seconds
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._running: Dict[str, int] = {c: 0 for c in JOB_CLASSES}
+        self._threads_in_use = 0
+        self._slot_threads: Dict[int, int] = {}
+        self._queues: Dict[str, Deque[_Waiter]] = {c: deque() for c in JOB_CLASSES}
+        self._started: Dict[str, int] = {c: 0 for c in JOB_CLASSES}
+        self._waited: Dict[str, float] = {c: 0.0 for c in JOB_CLASSES}
+        self._peak_queued: Dict[str, int] = {c: 0 for c in JOB_CLASSES}
+        self._batch_pids: Dict[int, Set[int]] = {}    # batch slot id -> pids
+        self._suspended: Set[int] = set()
+        self._preempting = False
+        self._preempt_expired = False                 # Cap reached; no more suspension until interactive work drains
+        self._preempt_generation = 0
+        self._suspensions = 0
+
+    # ---- policy -------------------------------------------------------------
+
+    def _can_start(self, job_class: str) -> bool:
+        if sum(self._running.values()) >= self.max_processes:
+            return False
+        if job_class == BATCH:
+            return not self._preempting and self._running[BATCH] < self.max_processes - self.interactive_slots
+        return True
+
+    def _threads_for(self, job_class: str) -> int:
+        """Batch jobs get an even share of the cores; interactive ones also take idle cores, up to half."""
+        share = max(1, self.cpu_count // self.max_processes)
+        if job_class == INTERACTIVE:
+            idle = self.cpu_count - self._threads_in_use
+            if self._preempting:
+                # Suspended batch processes leave their cores idle
+                idle += sum(self._slot_threads.get(slot_id, 0) for slot_id in self._batch_pids)
+            return max(share, min(max(1, self.cpu_count // 2), idle))
+        return share
+
+    def _dispatch(self) -> None:
+        """Grant slots to queued waiters, highest class first, FIFO within a class. Caller holds the lock."""
+        for job_class in JOB_CLASSES:
+            queue = self._queues[job_class]
+            while queue and self._can_start(job_class):
+                waiter = queue.popleft()
+                now = time.monotonic()
+                if job_class == INTERACTIVE:
+                    self._start_preemption()
+                threads = self._threads_for(job_class)
+                waiter.slot = Slot(job_class, threads, now - waiter.enqueued_at, next(self._ids))
+                self._running[job_class] += 1
+                self._threads_in_use += threads
+                self._slot_threads[waiter.slot.id] = threads
+                self._started[job_class] += 1
+                self._waited[job_class] += waiter.slot.waited_seconds
+                waiter.notify()
+
+    def _enqueue(self, waiter: _Waiter) -> None:
+        if waiter.job_class not in JOB_CLASSES:
+            raise ValueError(f"Unknown ffmpeg job class '{waiter.job_class}'. Expected one of {JOB_CLASSES}.")
+        with self._lock:
+            queue = self._queues[waiter.job_class]
+            queue.append(waiter)
+            self._dispatch()
+            if waiter.slot is None:
+                self._peak_queued[waiter.job_class] = max(self._peak_queued[waiter.job_class], len(queue))
+                logger.info(f"[FFmpegScheduler] {waiter.job_class} job queued "
+                            f"(running {self._running}, queued {self._queue_depths()})")
+
+    def _queue_depths(self) -> Dict[str, int]:
+        return {c: len(q) for c, q in self._queues.items()}
+
+    # ---- public API ---------------------------------------------------------
+
+    def acquire(self, job_class: str = BATCH) -> Slot:
+        """Block the calling thread until a slot of job_class is free."""
+        granted = threading.Event()
+        waiter = _Waiter(job_class, granted.set)
+        self._enqueue(waiter)
+        granted.wait()
+        return waiter.slot
+
+    async def acquire_async(self, job_class: str = BATCH) -> Slot:
+        """Wait on the event loop until a slot of job_class is free."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def notify():
+            loop.call_soon_threadsafe(lambda: future.done() or future.set_result(None))
+
+        waiter = _Waiter(job_class, notify)
+        self._enqueue(waiter)
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter.slot is None:
+                    self._queues[job_class].remove(waiter)
+            if waiter.slot is not None:
+                self.release(waiter.slot)
+            raise
+        return waiter.slot
+
+    def release(self, slot: Slot) -> None:
+        with self._lock:
+            self._running[slot.job_class] -= 1
+            self._threads_in_use -= slot.threads
+            self._slot_threads.pop(slot.id, None)
+            self._batch_pids.pop(slot.id, None)
+            if slot.job_class == INTERACTIVE and not self._running[INTERACTIVE] and not self._queues[INTERACTIVE]:
+                self._end_preemption()
+                self._preempt_expired = False
+            self._dispatch()
+
+    # ---- preemption ---------------------------------------------------------
+
+    def attach(self, slot: Slot, pid: int) -> None:
+        """Register the process started under a batch slot so it can be niced and suspended."""
+        if slot.job_class != BATCH or self.preemption == "off":
+            return
+        try:
+            os.setpriority(os.PRIO_PROCESS, pid, BATCH_NICENESS)
+        except (OSError, AttributeError):
+            pass
+        with self._lock:
+            self._batch_pids.setdefault(slot.id, set()).add(pid)
+            if self._preempting:
+                self._signal(pid, signal.SIGSTOP)
+
+    def detach(self, slot: Slot, pid: int) -> None:
+        with self._lock:
+            self._batch_pids.get(slot.id, set()).discard(pid)
+            if pid in self._suspended:
+                self._signal(pid, signal.SIGCONT)
+
+    def _signal(self, pid: int, sig) -> None:
+        """Stop or continue one process. Caller holds the lock."""
+        try:
+            os.kill(pid, sig)
+        except (ProcessLookupError, PermissionError):
+            self._suspended.discard(pid)
+            return
+        if sig == signal.SIGSTOP:
+            self._suspended.add(pid)
+        else:
+            self._suspended.discard(pid)
+
+    def _start_preemption(self) -> None:
+        """Suspend batch processes for an interactive job. Caller holds the lock."""
+        if self.preemption != "suspend" or self._preempting or self._preempt_expired:
+            return
+        self._preempting = True
+        self._preempt_generation += 1
+        pids = [pid for pids in self._batch_pids.values() for pid in pids]
+        if pids:
+            self._suspensions += 1
+            logger.info(f"[FFmpegScheduler] Suspending {len(pids)} batch ffmpeg process(es) for interactive work")
+        for pid in pids:
+            self._signal(pid, signal.SIGSTOP)
+        timer = threading.Timer(self.max_suspend_seconds, self._expire_preemption, args=(self._preempt_generation,))
+        timer.daemon = True
+        timer.start()
+
+    def _end_preemption(self) -> None:
+        """Continue suspended batch processes. Caller holds the lock."""
+        if not self._preempting:
+            return
+        self._preempting = False
+        if self._suspended:
+            logger.info(f"[FFmpegScheduler] Resuming {len(self._suspended)} batch ffmpeg process(es)")
+        for pid in list(self._suspended):
+            self._signal(pid, signal.SIGCONT)
+
+    def _expire_preemption(self, generation: int) -> None:
+        with self._lock:
+            if generation != self._preempt_generation or not self._preempting:
+                return
+            logger.info(f"[FFmpegScheduler] Interactive work ran past {self.max_suspend_seconds:.0f}s; "
+                        f"resuming batch work")
+            self._preempt_expired = True
+            self._end_preemption()
+            self._dispatch()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "cpu_count": self.cpu_count,
+                "max_processes": self.max_processes,
+                "interactive_slots": self.interactive_slots,
+                "preemption": self.preemption,
+                "preempting": self._preempting,
+                "suspended_processes": len(self._suspended),
+                "suspensions": self._suspensions,
+                "threads_in_use": self._threads_in_use,
+                "running": dict(self._running),
+                "queued": self._queue_depths(),
+                "peak_queued": dict(self._peak_queued),
+                "started": dict(self._started),
+                "avg_wait_seconds": {
+                    c: round(self._waited[c] / self._started[c], 3) if self._started[c] else None
+                    for c in JOB_CLASSES
+                },
+            }
+
+
+scheduler = FFmpegScheduler()
+
+
+@contextmanager
+def ffmpeg_slot(job_class: str = BATCH):
+    """Hold a scheduler slot for the duration of the block (blocking)."""
+    slot = scheduler.acquire(job_class)
+    try:
+        yield slot
+    finally:
+        scheduler.release(slot)
+
+
+@asynccontextmanager
+async def async_ffmpeg_slot(job_class: str = BATCH):
+    """Hold a scheduler slot for the duration of the block (awaiting)."""
+    slot = await scheduler.acquire_async(job_class)
+    try:
+        yield slot
+    finally:
+        scheduler.release(slot)
+
+
+def apply_threads(cmd: List[str], threads: int) -> List[str]:
+    """
+    Give an ffmpeg command the slot's thread count: "-threads 0" is replaced, and
+    commands without -threads get it before their output. Explicit counts are kept.
+    """
+    cmd = list(cmd)
+    if "-threads" in cmd:
+        for i, arg in enumerate(cmd[:-1]):
+            if arg == "-threads" and cmd[i + 1] == "0":
+                cmd[i + 1] = str(threads)
+        return cmd
+    return cmd[:-1] + ["-threads", str(threads), cmd[-1]]
+
+
+def _run_in_slot(cmd: List[str], slot: Slot, input=None, capture_output: bool = False,
+                 timeout: Optional[float] = None, check: bool = False, **kwargs) -> subprocess.CompletedProcess:
+    """subprocess.run for a command holding slot, with its process attached for preemption."""
+    if capture_output:
+        kwargs["stdout"] = kwargs["stderr"] = subprocess.PIPE
+    if input is not None:
+        kwargs["stdin"] = subprocess.PIPE
+    with subprocess.Popen(apply_threads(cmd, slot.threads), **kwargs) as proc:
+        scheduler.attach(slot, proc.pid)
+        try:
+            stdout, stderr = proc.communicate(input, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.communicate()
+            raise
+        except BaseException:
+            proc.kill()
+            raise
+        finally:
+            scheduler.detach(slot, proc.pid)
+        returncode = proc.poll()
+    if check and returncode:
+        raise subprocess.CalledProcessError(returncode, proc.args, output=stdout, stderr=stderr)
+    return subprocess.CompletedProcess(proc.args, returncode, stdout, stderr)
+
+
+def run_scheduled(cmd: List[str], job_class: str = BATCH, **kwargs) -> subprocess.CompletedProcess:
+    """subprocess.run an ffmpeg command once the scheduler grants it a slot."""
+    with ffmpeg_slot(job_class) as slot:
+        return _run_in_slot(cmd, slot, **kwargs)
+
+
+async def run_scheduled_async(cmd: List[str], job_class: str = BATCH, **kwargs) -> subprocess.CompletedProcess:
+    """
+    Wait for a slot on the event loop, then subprocess.run the command in a thread
+    (which keeps working under the Windows Proactor loop).
+    """
+    async with async_ffmpeg_slot(job_class) as slot:
+        return await asyncio.to_thread(_run_in_slot, cmd, slot, **kwargs)
@@ -1,110 +1,165 @@
-import ffmpeg
 import os
 import tempfile
 import shutil
 import logging
-import sys
 import subprocess # Import subprocess
 
+from app.ffmpeg_scheduler import BATCH, run_scheduled
+
 # Setup logger for this module
 logger = logging.getLogger(__name__)
 
+# Segments closer together than this share one input that is decoded straight through
+# and cut with trim/atrim; a segment further away gets its own input seeked with -ss,
+# so long gaps are skipped instead of decoded.
+RENDER_SEEK_GAP_SECONDS = 10.0
+# Segments per filter graph. Larger EDLs are rendered in chunks of this size (keeping
+# the number of open inputs and the command line bounded) and joined by stream copy.
+RENDER_MAX_GRAPH_SEGMENTS = 48
+
+
+def _normalized_segments(segments):
+    """(start, end) pairs with a positive duration, in EDL order."""
+    ranges = []
+    for i, seg in enumerate(segments):
+        start, end = float(seg['start']), float(seg['end'])
+        if end <= start:
+            logger.warning(f"Segment {i+1} ({start:.2f}s-{end:.2f}s) has non-positive duration. "
+                           f"Using minimal 0.1s duration from start_time.")
+            end = start + 0.1
+        ranges.append((start, end))
+    return ranges
+
+
+def _plan_render_inputs(ranges, seek_gap=RENDER_SEEK_GAP_SECONDS):
+    """
+    Group consecutive EDL ranges into inputs. A range joins the previous input when it
+    starts at or after that input's end and within seek_gap of it; otherwise (a jump
+    back, an overlap or a long gap) it opens a new input seeked to its start.
+
+    Returns:
+        list: [(input_start, input_end, [(start, end), ...]), ...]
+    """
+    groups = []
+    for start, end in ranges:
+        if groups:
+            g_start, g_end, members = groups[-1]
+            if g_end <= start <= g_end + seek_gap:
+                groups[-1] = (g_start, end, members + [(start, end)])
+                continue
+        groups.append((start, end, [(start, end)]))
+    return groups
+
+
+def _concat_graph_args(file_path, ranges, output_path, audio_track=0):
+    """ffmpeg arguments (after the executable) that cut every range and concatenate them with a single encode."""
+    input_args = []
+    filters = []
+    concat_pads = []
+    n = 0
+    for k, (g_start, g_end, members) in enumerate(_plan_render_inputs(ranges)):
+        # Input seeking lands on the keyframe before g_start and decodes from there;
+        # timestamps of the seeked input start at 0.
+        input_args += ['-ss', f'{g_start:.3f}', '-t', f'{g_end - g_start:.3f}', '-i', file_path]
+        m = len(members)
+        if m == 1:
+            v_labels, a_labels = [f'[{k}:v:0]'], [f'[{k}:a:{audio_track}]']
+        else:
+            v_labels = [f'[s{k}v{j}]' for j in range(m)]
+            a_labels = [f'[s{k}a{j}]' for j in range(m)]
+            filters.append(f"[{k}:v:0]split={m}{''.join(v_labels)}")
+            filters.append(f"[{k}:a:{audio_track}]asplit={m}{''.join(a_labels)}")
+        for j, (start, end) in enumerate(members):
+            rel_start, rel_end = start - g_start, end - g_start
+            filters.append(f"{v_labels[j]}trim=start={rel_start:.3f}:end={rel_end:.3f},setpts=PTS-STARTPTS[v{n}]")
+            filters.append(f"{a_labels[j]}atrim=start={rel_start:.3f}:end={rel_end:.3f},asetpts=PTS-STARTPTS[a{n}]")
+            concat_pads.append(f'[v{n}][a{n}]')
+            n += 1
+    filters.append(f"{''.join(concat_pads)}concat=n={n}:v=1:a=1[outv][outa]")
+
+    return [
+        '-y',
+        *input_args,
+        '-filter_complex', ';'.join(filters),
+        '-map', '[outv]',
+        '-map', '[outa]',
+        '-c:v', 'libx264',
+        '-c:a', 'aac',
+        '-movflags', '+faststart',
+        '-loglevel', 'error',
+        output_path
+    ]
+
+
+def _render_steps(file_path, ranges, output_path, audio_track, temp_dir):
+    """
+    Plan the ffmpeg runs that render ranges into output_path.
+
+    Returns:
+        list: [(args, output_duration), ...] to run in order; more than one step only
+              for chunked EDLs, whose parts are written to temp_dir
+    """
+    chunks = [ranges[i:i + RENDER_MAX_GRAPH_SEGMENTS] for i in range(0, len(ranges), RENDER_MAX_GRAPH_SEGMENTS)]
+    if len(chunks) == 1:
+        return [(_concat_graph_args(file_path, ranges, output_path, audio_track), sum(e - s for s, e in ranges))]
+
+    steps = []
+    part_files = []
+    for i, chunk in enumerate(chunks):
+        part_file = os.path.join(temp_dir, f'part_{i:04d}.mp4')
+        steps.append((_concat_graph_args(file_path, chunk, part_file, audio_track), sum(e - s for s, e in chunk)))
+        part_files.append(part_file)
+
+    # Every chunk has identical encoding parameters, so the join is a stream copy
+    concat_list = os.path.join(temp_dir, 'concat_list.txt')
+    with open(concat_list, 'w') as f:
+        for part_file in part_files:
+            safe_path = part_file.replace('\\', '/')
+            f.write(f"file '{safe_path}'\n")
+    steps.append(([
+        '-y',
+        '-f', 'concat', '-safe', '0', '-i', concat_list,
+        '-c', 'copy',
+        '-movflags', '+faststart',
+        '-loglevel', 'error',
+        output_path
+    ], 0.0))
+    return steps
+
+
 def cut_and_concatenate(file_path, segments, output_path, audio_track=0):
-    temp_dir = tempfile.mkdtemp()
-    segment_files = []
-    padding_duration = 0.0  # Disable padding to prevent audio overlap issues
-    # min_gap_between_segments is no longer needed as we don't do inter-segment adjustment here
-
-    total_segments_to_process = len(segments)
-    if total_segments_to_process == 0:
-        logger.info("No segments to process for video cutting.")
-        # Create an empty file or handle as per desired behavior for no segments
-        # For now, let it proceed, which will result in an empty concat_list.txt
-        # and ffmpeg will likely error on an empty concat list. 
-        # A more robust solution would be to touch output_path or return early.
-        pass 
-
-    logger.info(f"Starting video segment extraction for {total_segments_to_process} segments.")
-    progress_message_template = "Extracting video segment {i_plus_1} of {total} (Time: {start_time:.2f}s - {end_time:.2f}s)..."
-    last_progress_message_len = 0
+    """
+    Render the EDL segments of file_path, in order, into output_path.
+
+    Every segment is cut and concatenated inside one filter graph, so each output
+    frame is encoded exactly once. The output has the video and the selected audio
+    track. EDLs longer than RENDER_MAX_GRAPH_SEGMENTS are rendered in chunks that are
+    joined by stream copy.
+
+    Args:
+        file_path: Source video
+        segments: List of {'start', 'end'} dicts in source seconds
+        output_path: Output MP4 path
+        audio_track: Index of the source audio track to keep
+
+    Returns:
+        str: output_path
+
+    Raises:
+        ValueError: If there are no segments
+        subprocess.CalledProcessError: If ffmpeg fails
+    """
+    ranges = _normalized_segments(segments)
+    if not ranges:
+        raise ValueError("No segments to render")
 
+    temp_dir = tempfile.mkdtemp()
     try:
-        # 1. Extract each segment
-        for i, seg in enumerate(segments):
-            # Progress update using sys.stdout.write
-            # Using .get for start/end in case segment dict structure varies unexpectedly
-            current_start = seg.get('start', 0.0)
-            current_end = seg.get('end', 0.0)
-            progress_message = progress_message_template.format(
-                i_plus_1=i + 1, 
-                total=total_segments_to_process, 
-                start_time=current_start, 
-                end_time=current_end
-            )
-            # Clear previous message by padding with spaces
-            sys.stdout.write(f"\r{progress_message}{' ' * max(0, last_progress_message_len - len(progress_message))}")
-            sys.stdout.flush()
-            last_progress_message_len = len(progress_message)
-
-            seg_file = os.path.join(temp_dir, f'segment_{i}.mp4')
-
-            current_segment_start_time = seg['start']
-            # Calculate the target end time for the cut, including padding at the end of this segment's content
-            target_cut_end_time = seg['end'] + padding_duration 
-
-            # Ensure segment duration is positive after considering padding.
-            # This handles cases where seg['end'] might be <= seg['start'] or padding is negative.
-            if target_cut_end_time <= current_segment_start_time:
-                logger.warning(f"Segment {i+1} (Original: {seg['start']:.2f}s-{seg['end']:.2f}s) has non-positive duration after padding ({target_cut_end_time:.2f}s). Attempting to use original end time.")
-                target_cut_end_time = seg['end'] # Try with original end time
-                if target_cut_end_time <= current_segment_start_time:
-                    logger.warning(f"Segment {i+1} still has non-positive duration ({target_cut_end_time:.2f}s). Using minimal 0.1s duration from start_time.")
-                    target_cut_end_time = current_segment_start_time + 0.1 # Default to a minimal positive duration
-            
-            # Use subprocess with FFmpeg commands for proper audio track selection
-            duration = target_cut_end_time - current_segment_start_time
-            
-            cmd = [
-                'ffmpeg', '-nostdin', '-y',
-                '-ss', str(current_segment_start_time),
-                '-i', file_path,
-                '-t', str(duration),
-                '-map', '0:v:0',  # Map video stream
-                '-map', '0:a:0',  # Map all audio tracks
-                '-map', '0:a:1',
-                '-map', '0:a:2',
-                '-c:v', 'libx264',
-                '-c:a', 'aac',
-                '-loglevel', 'error',
-                seg_file
-            ]
-            
-            logger.debug(f"Extracting segment {i+1}: {current_segment_start_time:.2f}s - {target_cut_end_time:.2f}s (track {audio_track})")
-            subprocess.run(cmd, check=True, capture_output=True, text=True)
-            segment_files.append(seg_file)
-
-        # Clear the progress line after the loop
-        if total_segments_to_process > 0:
-            sys.stdout.write(f"\r{' ' * last_progress_message_len}\r")
-            sys.stdout.flush()
-
-        logger.info(f"All {total_segments_to_process} video segments extracted. Starting concatenation.")
-        # 2. Create concat list file
-        concat_list = os.path.join(temp_dir, 'concat_list.txt')
-        with open(concat_list, 'w') as f:
-            for seg_file in segment_files:
-                safe_path = seg_file.replace('\\', '/')
-                f.write(f"file '{safe_path}'\n")
-
-        # 3. Concatenate segments
-        stream = ffmpeg.input(concat_list, format='concat', safe=0)
-        stream = ffmpeg.output(stream, 
-                             output_path,
-                             vcodec='libx264', 
-                             acodec='aac',
-                             loglevel='error')
-        ffmpeg.run(stream, overwrite_output=True)
-        logger.info(f"Video concatenation complete. Output: {output_path}")
+        steps = _render_steps(file_path, ranges, output_path, audio_track, temp_dir)
+        logger.info(f"Rendering {len(ranges)} segments (audio track {audio_track}) in {len(steps)} ffmpeg run(s) -> {output_path}")
+        for args, _ in steps:
+            run_scheduled(['ffmpeg', '-nostdin', *args], check=True, capture_output=True, text=True)
+        logger.info(f"Video render complete. Output: {output_path}")
         return output_path
     finally:
         # Always clean up the temporary directory
@@ -114,6 +169,53 @@ def cut_and_concatenate(file_path, segments, output_path, audio_track=0):
         except Exception as e:
             logger.warning(f"Failed to clean up temporary directory {temp_dir}: {e}")
 
+
+async def render_segments(file_path, segments, output_path, audio_track=0, on_progress=None, job_id=None):
+    """
+    Async cut_and_concatenate through the shared ffmpeg runner: reports live progress
+    over the whole render and can be stopped with ffmpeg_runner.cancel_ffmpeg(job_id).
+
+    Args:
+        on_progress: Optional callable(FFmpegProgress) with percent/ETA across all steps
+
+    Raises:
+        ValueError: If there are no segments
+        subprocess.CalledProcessError: If ffmpeg fails
+        ffmpeg_runner.FFmpegCancelled: If the job was cancelled
+    """
+    from app.ffmpeg_runner import FFmpegProgress, run_ffmpeg
+
+    ranges = _normalized_segments(segments)
+    if not ranges:
+        raise ValueError("No segments to render")
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+        steps = _render_steps(file_path, ranges, output_path, audio_track, temp_dir)
+        total = sum(duration for _, duration in steps)
+        logger.info(f"Rendering {len(ranges)} segments (audio track {audio_track}) in {len(steps)} ffmpeg run(s) -> {output_path}")
+        done = 0.0
+        for args, duration in steps:
+            def step_progress(p, done=done):
+                # Rescale each step's progress onto the whole render
+                if on_progress and total > 0:
+                    out_time = done + min(p.out_time, duration)
+                    eta = (total - out_time) / p.speed if p.speed else None
+                    on_progress(FFmpegProgress(out_time=out_time, duration=total,
+                                               percent=min(99.9, 100.0 * out_time / total), speed=p.speed,
+                                               fps=p.fps, eta_seconds=eta))
+
+            result = await run_ffmpeg(args, duration=duration, on_progress=step_progress, job_id=job_id)
+            if result.returncode != 0:
+                raise subprocess.CalledProcessError(result.returncode, result.args, stderr=result.stderr)
+            done += duration
+        if on_progress:
+            on_progress(FFmpegProgress(out_time=total, duration=total, percent=100.0, eta_seconds=0.0, done=True))
+        logger.info(f"Video render complete. Output: {output_path}")
+        return output_path
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
 def extract_audio_segment(input_video_path: str, start_time: float, end_time: float, output_audio_path: str, audio_track_index: int = 0) -> bool:
     """
     Extracts a specific audio segment from a video file and saves it as a WAV file using a direct FFmpeg command.
@@ -167,7 +269,7 @@ def extract_audio_segment(input_video_path: str, start_time: float, end_time: fl
         # stderr=subprocess.PIPE will capture FFmpeg's error messages
         # text=True decodes stderr as text
         # check=True will raise CalledProcessError if FFmpeg returns a non-zero exit code
-        result = subprocess.run(command, capture_output=True, text=True, check=False) # Set check=False to inspect stderr manually
+        result = run_scheduled(command, capture_output=True, text=True, check=False) # Set check=False to inspect stderr manually
 
         if result.returncode == 0:
             logger.info(f"Audio segment extracted successfully: {output_audio_path}")
@@ -198,7 +300,9 @@ def extract_audio_segment(input_video_path: str, start_time: float, end_time: fl
         return False
 
 
-def cut_video_segment(input_video_path: str, output_video_path: str, start_time: float, end_time: float) -> subprocess.CompletedProcess:
+def cut_video_segment(input_video_path: str, output_video_path: str, start_time: float, end_time: float,
+                      threads: int = 0, timeout: float = 30, fragmented: bool = False,
+                      job_class: str = BATCH) -> subprocess.CompletedProcess:
     """
     Cut a single segment from a video file using ffmpeg.
     
@@ -207,6 +311,11 @@ def cut_video_segment(input_video_path: str, output_video_path: str, start_time:
         output_video_path: Path where the cut segment will be saved
         start_time: Start time in seconds
         end_time: End time in seconds
+        threads: Encoder threads (0 takes the ffmpeg scheduler's share)
+        timeout: Seconds before ffmpeg is killed and a failed result (returncode 124) is returned
+        fragmented: Write a fragmented MP4 (moov up front, one fragment per keyframe) for
+                    on-demand renditions that should start playing before a full download
+        job_class: ffmpeg scheduler class (INTERACTIVE for clips a user is waiting on)
     
     Returns:
         subprocess.CompletedProcess: Result of the ffmpeg command
@@ -219,30 +328,35 @@ def cut_video_segment(input_video_path: str, output_video_path: str, start_time:
     
     try:
         # Use ffmpeg to cut the video segment
-        # Re-encode to ensure each clip starts with a keyframe for smooth playback
+        # Re-encode to ensure each clip starts with a keyframe for smooth playback.
+        # Seeking on the input jumps to the nearest keyframe instead of decoding everything
+        # before start_time; with re-encoding the cut is still frame accurate.
         cmd = [
-            'ffmpeg',
-            '-i', input_video_path,
+            'ffmpeg', '-nostdin',
             '-ss', str(start_time),
+            '-i', input_video_path,
             '-t', str(duration),
             '-c:v', 'libx264',  # Re-encode video to force keyframe at start
             '-g', '30',  # Keyframe every 30 frames
             '-force_key_frames', 'expr:gte(t,0)',  # Force keyframe at start (t=0)
             '-c:a', 'aac',  # Re-encode audio
             '-b:a', '128k',  # Audio bitrate
-            '-movflags', '+faststart',  # Put moov atom at beginning for fast playback
+            # Put moov atom at beginning for fast playback
+            '-movflags', '+frag_keyframe+empty_moov+default_base_moof' if fragmented else '+faststart',
             '-avoid_negative_ts', 'make_zero',
+            '-threads', str(threads),
             '-y',  # Overwrite output file
             output_video_path
         ]
         
         logger.info(f"Running ffmpeg command: {' '.join(cmd)}")
         
-        result = subprocess.run(
+        result = run_scheduled(
             cmd,
+            job_class,
             capture_output=True,
             text=True,
-            timeout=30  # 30 second timeout per clip (much shorter)
+            timeout=timeout
         )
         
         if result.returncode == 0:
@@ -254,13 +368,13 @@ def cut_video_segment(input_video_path: str, output_video_path: str, start_time:
         return result
         
     except subprocess.TimeoutExpired:
-        logger.error(f"FFmpeg timed out after 30 seconds for segment {start_time}s-{end_time}s")
+        logger.error(f"FFmpeg timed out after {timeout} seconds for segment {start_time}s-{end_time}s")
         # Return a failed result
         return subprocess.CompletedProcess(
             args=cmd,
             returncode=124,  # Timeout return code
             stdout="",
-            stderr="FFmpeg timed out after 30 seconds"
+            stderr=f"FFmpeg timed out after {timeout} seconds"
         )
     except Exception as e:
         logger.error(f"Unexpected error during video segment cutting: {str(e)}")
@@ -269,4 +383,124 @@ def cut_video_segment(input_video_path: str, output_video_path: str, start_time:
             returncode=1,
             stdout="",
             stderr=str(e)
-        )
\ No newline at end of file
+        )
+
+def split_video_args(input_video_path: str, output_pattern: str, start_time: float, end_time: float,
+                     cut_times: list, threads: int = 0) -> list:
+    """ffmpeg arguments (without the leading "ffmpeg") for split_video_at_times."""
+    duration = end_time - start_time
+    # Times are relative to the span because the input is seeked to start_time
+    relative_cuts = ",".join(f"{t - start_time:.3f}" for t in cut_times)
+    args = [
+        '-ss', str(start_time),
+        '-i', input_video_path,
+        '-t', str(duration),
+        '-c:v', 'libx264',
+        '-g', '30',
+        # Without B-frames the muxer sees the forced keyframes at their own timestamps;
+        # with them the reordering delay makes it miss the first cut.
+        '-bf', '0',
+        '-force_key_frames', relative_cuts or 'expr:gte(t,0)',
+        '-c:a', 'aac',
+        '-b:a', '128k',
+        '-avoid_negative_ts', 'make_zero',
+        '-threads', str(threads),
+        '-f', 'segment',
+        '-segment_format', 'mp4',
+        '-segment_format_options', 'movflags=+faststart',
+        '-reset_timestamps', '1',
+    ]
+    if relative_cuts:
+        args += ['-segment_times', relative_cuts]
+    else:
+        # Single piece: make sure the muxer does not split on its default interval
+        args += ['-segment_time', str(duration + 1)]
+    args += ['-y', output_pattern]
+    return args
+
+
+def normalize_range_args(input_video_path: str, output_path: str, start_time: float, duration: float) -> list:
+    """
+    ffmpeg arguments (without the leading "ffmpeg") that re-encode one range of a video
+    to the common format of unified streams: H.264 main at a constant 30 fps with a
+    keyframe every 2 s, and 48 kHz stereo AAC, so normalized ranges concatenate by
+    stream copy.
+    """
+    return [
+        "-y",
+        "-i", input_video_path,
+        "-ss", str(start_time), "-t", str(duration),
+        "-c:v", "libx264", "-pix_fmt", "yuv420p",
+        "-profile:v", "main", "-level", "4.1",
+        "-r", "30", "-g", "60", "-keyint_min", "60", "-sc_threshold", "0",
+        "-x264-params", "keyint=60:min-keyint=60:scenecut=0:open-gop=0",
+        "-vsync", "cfr",
+        "-c:a", "aac", "-ar", "48000", "-ac", "2", "-b:a", "128k",
+        "-fflags", "+genpts", "-avoid_negative_ts", "make_zero",
+        output_path
+    ]
+
+
+def cmaf_package_args(concat_list: str = "concat.txt", manifest: str = "manifest.m3u8") -> list:
+    """
+    ffmpeg arguments that concatenate normalized ranges listed in concat_list (stream
+    copy) into an HLS stream of 0.5 s CMAF fragments: init.mp4, seg-NNNNN.m4s and the
+    manifest. Paths are relative; run it with the output directory as working directory.
+    """
+    return [
+        "-y",
+        "-f", "concat", "-safe", "0", "-i", concat_list,
+        "-c", "copy",
+        "-f", "hls",
+        "-hls_time", "0.5",
+        "-hls_playlist_type", "vod",
+        "-hls_segment_type", "fmp4",
+        "-hls_flags", "independent_segments",
+        "-hls_fmp4_init_filename", "init.mp4",
+        "-hls_segment_filename", "seg-%05d.m4s",
+        manifest
+    ]
+
+
+def split_video_at_times(input_video_path: str, output_pattern: str, start_time: float, end_time: float,
+                         cut_times: list, threads: int = 0, timeout: float = None) -> subprocess.CompletedProcess:
+    """
+    Encode start_time..end_time of a video once and split it into pieces with the
+    segment muxer, cutting at every time in cut_times.
+
+    A keyframe is forced at each cut so every piece starts cleanly, which makes the
+    pieces equivalent to cutting them one by one with cut_video_segment.
+
+    Args:
+        input_video_path: Path to the input video file
+        output_pattern: printf-style output path, e.g. "clips/part_%05d.mp4"; piece k is
+                        the span between cut k-1 and cut k
+        start_time: Start of the encoded span in seconds
+        end_time: End of the encoded span in seconds
+        cut_times: Ascending cut points in source seconds, strictly inside the span
+        threads: Encoder threads (0 takes the ffmpeg scheduler's share)
+        timeout: Seconds before ffmpeg is killed (None waits indefinitely)
+
+    Returns:
+        subprocess.CompletedProcess: Result of the ffmpeg command
+    """
+    logger.info(f"Splitting video {start_time}s-{end_time}s into {len(cut_times) + 1} pieces in one pass")
+
+    cmd = ['ffmpeg', '-nostdin', *split_video_args(input_video_path, output_pattern, start_time, end_time,
+                                                  cut_times, threads)]
+
+    logger.info(f"Running ffmpeg command: {' '.join(cmd[:12])} ... {output_pattern}")
+
+    try:
+        result = run_scheduled(cmd, capture_output=True, text=True, timeout=timeout)
+        if result.returncode != 0:
+            logger.error(f"FFmpeg segment split failed with return code {result.returncode}")
+            logger.error(f"FFmpeg stderr: {result.stderr}")
+        return result
+    except subprocess.TimeoutExpired:
+        logger.error(f"FFmpeg segment split timed out after {timeout} seconds")
+        return subprocess.CompletedProcess(args=cmd, returncode=124, stdout="",
+                                           stderr=f"FFmpeg timed out after {timeout} seconds")
+    except Exception as e:
+        logger.error(f"Unexpected error during segment split: {str(e)}")
+        return subprocess.CompletedProcess(args=cmd, returncode=1, stdout="", stderr=str(e))
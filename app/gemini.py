@@ -1,5 +1,5 @@
+import asyncio
 import sys
-import time
 
 # ---- TOP LEVEL GOOGLE DIAGNOSTIC with print ----
 print("--- [DIAG PRINT] Top-Level Google Package Diagnostics (in app/gemini.py) ---", flush=True)
@@ -716,7 +716,7 @@ class MultimodalPass2Response(BaseModel):
     """Pydantic model for the full response from Gemini in Pass 2, now expecting selected text strings."""
     selected_text_segments: list[str] = Field(description="A list of verbatim text strings. Each string is a segment selected from the candidate video. The order in this list defines the final video order.")
 
-def refine_video_with_multimodal_pass2(
+async def refine_video_with_multimodal_pass2(
     candidate_video_path: str,
     user_prompt: str,
     allow_reordering: bool,
@@ -728,6 +728,7 @@ def refine_video_with_multimodal_pass2(
     The candidate video is already a compilation of segments selected by Pass 1.
     This pass watches the candidate video and selects the best sub-segments from it
     to create a final, polished EDL (Edit Decision List).
+    The blocking Gemini SDK calls run in worker threads, so this is awaited on the event loop.
 
     Args:
         candidate_video_path: Path to the candidate video file.
@@ -765,7 +766,9 @@ def refine_video_with_multimodal_pass2(
             logger.error(f"Multimodal Pass 2: Candidate video file not found at path: {candidate_video_path}")
             return []
         
-        video_file_gemini = local_genai.upload_file(path=candidate_video_path, display_name="Candidate Video for Pass 2")
+        video_file_gemini = await asyncio.to_thread(
+            local_genai.upload_file, path=candidate_video_path, display_name="Candidate Video for Pass 2"
+        )
         logger.info(f"Multimodal Pass 2: Uploaded file '{video_file_gemini.display_name}' as URI: {video_file_gemini.uri}. MIME type: {video_file_gemini.mime_type}. Initial state: {video_file_gemini.state}")
 
         wait_time_seconds = 0
@@ -785,9 +788,10 @@ def refine_video_with_multimodal_pass2(
                 # No need to delete here, finally block will handle it.
                 return []
 
-            time.sleep(poll_interval_seconds)
+            # Poll without holding an executor thread for the whole wait
+            await asyncio.sleep(poll_interval_seconds)
             wait_time_seconds += poll_interval_seconds
-            video_file_gemini = local_genai.get_file(name=video_file_gemini.name)
+            video_file_gemini = await asyncio.to_thread(local_genai.get_file, name=video_file_gemini.name)
 
         logger.info(f"Multimodal Pass 2: File {video_file_gemini.name} is now ACTIVE after {wait_time_seconds}s.")
 
@@ -865,7 +869,8 @@ If no segments from the candidate video are suitable, return an empty list for `
             "response_schema": MultimodalPass2Response 
         }
         
-        response = model.generate_content(
+        response = await asyncio.to_thread(
+            model.generate_content,
             contents=contents_for_model, 
             generation_config=generation_config,
             safety_settings=safety_settings 
@@ -969,7 +974,7 @@ If no segments from the candidate video are suitable, return an empty list for `
     finally:
         if video_file_gemini and video_file_gemini.name: # Check if it has a name (was likely uploaded)
             try:
-                local_genai.delete_file(video_file_gemini.name) # name is usually 'files/file_id'
+                await asyncio.to_thread(local_genai.delete_file, video_file_gemini.name) # name is usually 'files/file_id'
                 logger.info(f"Multimodal Pass 2: Successfully deleted uploaded file '{video_file_gemini.name}' from Gemini storage.")
             except Exception as e_delete:
                 logger.warning(f"Multimodal Pass 2: Failed to delete uploaded file '{video_file_gemini.name}' from Gemini storage. Error: {e_delete}")
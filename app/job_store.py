@@ -0,0 +1,416 @@
+"""
+Persistent background jobs.
+
+Job state lives in the jobs table (app.models.Job) rather than in per-process
+dicts, so status survives a restart and every uvicorn worker sees every job.
+
+Background work is queued with create_job() and run by a JobWorker, which claims
+queued jobs with an atomic conditional UPDATE, runs the handler registered for the
+job's kind with @job_handler, and heartbeats the jobs it runs. A running job whose
+heartbeat goes stale (its process died) is put back in the queue with its stage
+intact, and its handler uses JobContext.stage to skip the stages already done.
+Finished jobs are deleted after JOB_TTL_HOURS.
+
+Work that runs inside a request (e.g. /process) uses inline_job() instead, which
+records and heartbeats the job without queueing it.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from app.dao import JobDAO
+from app.database import SessionLocal
+from app.ffmpeg_runner import FFmpegCancelled, cancel_ffmpeg, clear_cancelled
+from app.models import Job
+
+logger = logging.getLogger(__name__)
+
+JOB_HEARTBEAT_SECONDS = 5.0
+# A running job without a heartbeat for this long is considered orphaned.
+JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "60"))
+JOB_TTL_HOURS = float(os.getenv("JOB_TTL_HOURS", "72"))
+JOB_WORKER_CONCURRENCY = int(os.getenv("JOB_WORKER_CONCURRENCY", "2"))
+JOB_MAX_ATTEMPTS = 3
+JOB_CLEANUP_INTERVAL_SECONDS = 3600.0
+# Minimum seconds between progress writes; stage changes are always written.
+JOB_PROGRESS_WRITE_INTERVAL = 0.5
+
+FINISHED_STATUSES = ("completed", "failed", "cancelled")
+
+# Status reported to clients while a job is queued or running, per kind
+ACTIVE_STATUS_LABELS = {"finalize": "finalizing"}
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+_handlers: Dict[str, Callable[["JobContext"], Awaitable[None]]] = {}
+# Ids of jobs run by inline_job() in this process; the worker heartbeats them too
+_inline_jobs = set()
+# Job writes made from the event loop run here, one at a time so they land in order
+_writes = ThreadPoolExecutor(max_workers=1, thread_name_prefix="job-writes")
+
+
+def job_handler(kind: str):
+    """Register the coroutine function that runs queued jobs of kind."""
+    def register(func):
+        _handlers[kind] = func
+        return func
+    return register
+
+
+def _write(job_id: str, **fields) -> Optional[Job]:
+    db = SessionLocal()
+    try:
+        return JobDAO.update(db, job_id, **fields)
+    finally:
+        db.close()
+
+
+def _off_loop(func, *args, **kwargs) -> "asyncio.Future":
+    """Run a job write on the writer thread, after the writes queued before it."""
+    return asyncio.get_running_loop().run_in_executor(_writes, partial(func, *args, **kwargs))
+
+
+def _log_write_error(future: "asyncio.Future") -> None:
+    if not future.cancelled() and future.exception():
+        logger.error(f"[Jobs] Writing job progress failed: {future.exception()}")
+
+
+class JobContext:
+    """
+    A running job as seen by its handler. update() may be called from worker threads;
+    called on the event loop, it queues the write and returns at once.
+    """
+
+    def __init__(self, job: Job):
+        self.job_id = job.id
+        self.kind = job.kind
+        self.params = job.get_params()
+        self.result = job.get_result()
+        self.stage = job.stage
+        self.attempts = job.attempts
+        self._last_write = 0.0
+
+    @property
+    def resumed(self) -> bool:
+        """Whether an earlier attempt of this job was interrupted."""
+        return self.attempts > 1
+
+    def update(self, progress: Optional[float] = None, message: Optional[str] = None,
+               stage: Optional[str] = None, force: bool = False, **result) -> None:
+        """Record progress and result pointers; progress-only writes are throttled."""
+        now = time.monotonic()
+        if stage is not None and stage != self.stage:
+            self.stage = stage
+            force = True
+        if result:
+            self.result.update(result)
+        if not force and now - self._last_write < JOB_PROGRESS_WRITE_INTERVAL:
+            return
+        self._last_write = now
+
+        fields: Dict[str, Any] = {"stage": self.stage}
+        if progress is not None:
+            fields["progress"] = float(progress)
+        if message is not None:
+            fields["message"] = message
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            _write(self.job_id, result=self.result, **fields)
+        else:
+            _off_loop(_write, self.job_id, result=dict(self.result), **fields).add_done_callback(_log_write_error)
+
+    def set_stage(self, stage: str, progress: Optional[float] = None, message: Optional[str] = None, **result) -> None:
+        """Enter a stage; a resumed job starts again from the last stage recorded."""
+        self.update(progress, message, stage=stage, force=True, **result)
+
+
+def create_job(kind: str, params: Optional[Dict[str, Any]] = None, message: Optional[str] = None,
+               **columns) -> str:
+    """Queue a job for the workers and return its id. Blocking; use asyncio.to_thread from async code."""
+    db = SessionLocal()
+    try:
+        job = JobDAO.create(db, kind, params, status="queued", message=message or "Queued", **columns)
+    finally:
+        db.close()
+    if _worker:
+        _worker.wake()
+    return job.id
+
+
+def get_job(job_id: str) -> Optional[Job]:
+    db = SessionLocal()
+    try:
+        return JobDAO.get_by_id(db, job_id)
+    finally:
+        db.close()
+
+
+def job_status(job: Job) -> Dict[str, Any]:
+    """The status payload served for a job: its columns plus its result pointers."""
+    status = job.status
+    if status in ("queued", "running"):
+        status = ACTIVE_STATUS_LABELS.get(job.kind, "processing")
+    return {
+        **job.get_result(),
+        "job_id": job.id,
+        "kind": job.kind,
+        "status": status,
+        "state": job.status,
+        "stage": job.stage,
+        "progress": job.progress,
+        "message": job.message,
+        "error": job.error_message,
+        "project_id": job.project_id,
+        "video_id": job.source_video_id,
+        "edit_id": job.edit_id,
+        "attempts": job.attempts,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+def cancel_job(job_id: str) -> Optional[Job]:
+    """
+    Cancel a job. Queued jobs never start; a running job's worker notices on its next
+    heartbeat (or at once in this process) and stops the handler and its ffmpeg.
+    Blocking; use asyncio.to_thread from async code.
+    """
+    db = SessionLocal()
+    try:
+        job = JobDAO.get_by_id(db, job_id)
+        if job and job.status not in FINISHED_STATUSES:
+            job = JobDAO.update(db, job_id, status="cancelled", message="Cancelled")
+    finally:
+        db.close()
+    if job and _worker:
+        _worker.stop_job(job_id)
+    return job
+
+
+@asynccontextmanager
+async def inline_job(kind: str, params: Optional[Dict[str, Any]] = None, message: Optional[str] = None,
+                     **columns):
+    """
+    Record work done inside a request as a running job, heartbeated while the block
+    runs and marked completed or failed when it exits.
+    """
+    def create() -> Job:
+        db = SessionLocal()
+        try:
+            return JobDAO.create(db, kind, params, status="running", message=message,
+                                 worker_id=WORKER_ID, **columns)
+        finally:
+            db.close()
+
+    job = await asyncio.to_thread(create)
+    ctx = JobContext(job)
+    _inline_jobs.add(job.id)
+    try:
+        yield ctx
+    except Exception as e:
+        await _off_loop(_write, job.id, status="failed", message=str(e), error_message=str(e), result=ctx.result)
+        raise
+    else:
+        await _off_loop(_write, job.id, status="completed", progress=100.0, result=ctx.result)
+    finally:
+        _inline_jobs.discard(job.id)
+
+
+class JobWorker:
+    """Claims queued jobs and runs them, at most concurrency at a time."""
+
+    def __init__(self, worker_id: str = WORKER_ID, concurrency: int = JOB_WORKER_CONCURRENCY,
+                 poll_interval: float = 2.0, kinds: Optional[List[str]] = None, fail_unhandled: bool = True):
+        """
+        kinds limits the job kinds claimed (default: every registered handler).
+        fail_unhandled marks orphaned jobs without a handler in this process as failed;
+        dedicated workers that only load some handlers turn it off.
+        """
+        self.worker_id = worker_id
+        self.concurrency = max(1, concurrency)
+        self.poll_interval = poll_interval
+        self.kinds = kinds
+        self.fail_unhandled = fail_unhandled
+        self._active: Dict[str, asyncio.Task] = {}
+        self._wake = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+        self._last_cleanup = 0.0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stopping = False
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._tasks = [asyncio.create_task(self._claim_loop()), asyncio.create_task(self._maintenance_loop())]
+        logger.info(f"[Jobs] Worker {self.worker_id} started (concurrency {self.concurrency}, "
+                    f"handlers {sorted(self.kinds or _handlers)})")
+
+    async def stop(self) -> None:
+        """Stop claiming; jobs still running go back to the queue at their current stage."""
+        self._stopping = True
+        for task in self._tasks + list(self._active.values()):
+            task.cancel()
+        await asyncio.gather(*self._tasks, *self._active.values(), return_exceptions=True)
+
+    def wake(self) -> None:
+        """Check the queue now instead of at the next poll (thread safe)."""
+        if self._loop and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    def stop_job(self, job_id: str) -> None:
+        """Stop a job this worker is running and its ffmpeg (thread safe)."""
+        if self._loop and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._stop_job, job_id)
+
+    def _stop_job(self, job_id: str) -> None:
+        # On the loop, so the job cannot finish (and clear its cancellation) in between
+        task = self._active.get(job_id)
+        if task:
+            cancel_ffmpeg(job_id)
+            task.cancel()
+
+    async def _claim_loop(self) -> None:
+        kinds = self.kinds or list(_handlers)
+        while True:
+            try:
+                while len(self._active) < self.concurrency:
+                    job = await asyncio.to_thread(self._claim, kinds)
+                    if not job:
+                        break
+                    self._active[job.id] = asyncio.create_task(self._execute(job))
+            except Exception as e:
+                logger.error(f"[Jobs] Claiming jobs failed: {e}")
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def _claim(self, kinds: List[str]) -> Optional[Job]:
+        db = SessionLocal()
+        try:
+            return JobDAO.claim_next(db, self.worker_id, kinds)
+        finally:
+            db.close()
+
+    async def _execute(self, job: Job) -> None:
+        ctx = JobContext(job)
+        handler = _handlers[job.kind]
+        logger.info(f"[Jobs] Running {job.kind} job {job.id} (attempt {job.attempts}, stage {job.stage or 'start'})")
+        try:
+            await handler(ctx)
+            await _off_loop(self._finish, job.id, "completed", None, ctx)
+        except (FFmpegCancelled, asyncio.CancelledError):
+            if self._stopping:
+                self._finish(job.id, "queued", None, ctx)
+                raise
+            await _off_loop(self._finish, job.id, "cancelled", "Cancelled", ctx)
+        except Exception as e:
+            logger.exception(f"[Jobs] {job.kind} job {job.id} failed")
+            await _off_loop(self._finish, job.id, "failed", str(e), ctx)
+        finally:
+            self._active.pop(job.id, None)
+            clear_cancelled(job.id)
+            self._wake.set()
+
+    def _finish(self, job_id: str, status: str, error: Optional[str], ctx: JobContext) -> None:
+        db = SessionLocal()
+        try:
+            job = JobDAO.get_by_id(db, job_id)
+            if not job or job.status != "running":
+                return  # Cancelled meanwhile, or requeued after a stale heartbeat
+            fields: Dict[str, Any] = {"status": status, "stage": ctx.stage}
+            if status == "completed":
+                fields["progress"] = 100.0
+            elif status == "queued":
+                fields["worker_id"] = None
+                fields["message"] = "Interrupted by shutdown; waiting to resume"
+            elif error:
+                fields["error_message"] = error
+                fields["message"] = error
+            JobDAO.update(db, job_id, result=ctx.result, **fields)
+        finally:
+            db.close()
+
+    async def _maintenance_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self._maintain)
+            except Exception as e:
+                logger.error(f"[Jobs] Maintenance failed: {e}")
+            await asyncio.sleep(JOB_HEARTBEAT_SECONDS)
+
+    def _maintain(self) -> None:
+        db = SessionLocal()
+        try:
+            active = list(self._active) + list(_inline_jobs)
+            JobDAO.heartbeat(db, active, self.worker_id)
+
+            # Jobs cancelled from another process stop here
+            for job_id in list(self._active):
+                job = JobDAO.get_by_id(db, job_id)
+                if job and job.status == "cancelled":
+                    if job_id in self._active:
+                        self.stop_job(job_id)
+
+            self._recover_orphans(db)
+
+            if time.monotonic() - self._last_cleanup > JOB_CLEANUP_INTERVAL_SECONDS:
+                self._last_cleanup = time.monotonic()
+                deleted = JobDAO.delete_finished_before(db, datetime.utcnow() - timedelta(hours=JOB_TTL_HOURS))
+                if deleted:
+                    logger.info(f"[Jobs] Deleted {deleted} jobs finished more than {JOB_TTL_HOURS:.0f}h ago")
+        finally:
+            db.close()
+
+    def _recover_orphans(self, db) -> None:
+        cutoff = datetime.utcnow() - timedelta(seconds=JOB_STALE_SECONDS)
+        claimed = self.kinds or list(_handlers)
+        for job in JobDAO.get_orphaned(db, JOB_STALE_SECONDS):
+            if job.kind not in _handlers:
+                if not self.fail_unhandled:
+                    continue
+                JobDAO.update(db, job.id, status="failed", message="Interrupted by a server restart",
+                              error_message="interrupted")
+            elif job.kind not in claimed:
+                continue  # Left to the workers that run this kind
+            elif job.attempts >= JOB_MAX_ATTEMPTS:
+                JobDAO.update(db, job.id, status="failed", message=f"Gave up after {job.attempts} interrupted attempts",
+                              error_message="interrupted")
+            elif JobDAO.requeue(db, job.id, cutoff):
+                logger.info(f"[Jobs] Requeued orphaned {job.kind} job {job.id} at stage {job.stage or 'start'} "
+                            f"(worker {job.worker_id})")
+                self.wake()
+
+
+_worker: Optional[JobWorker] = None
+
+
+def start_job_worker(exclude_kinds: Iterable[str] = ()) -> JobWorker:
+    """
+    Start this process's job worker (call from the running event loop). Jobs of
+    exclude_kinds are left to other workers, e.g. render tasks to python -m app.worker.
+    """
+    global _worker
+    if _worker is None:
+        excluded = set(exclude_kinds)
+        _worker = JobWorker(kinds=[kind for kind in _handlers if kind not in excluded])
+        _worker.start()
+    return _worker
+
+
+async def stop_job_worker() -> None:
+    global _worker
+    if _worker:
+        await _worker.stop()
+        _worker = None
@@ -0,0 +1,125 @@
+"""
+Event-loop lag monitor.
+
+A heartbeat task on the event loop wakes every LOOP_MONITOR_INTERVAL_MS and records
+how late it woke. A watchdog thread notices when the heartbeat is overdue by more
+than LOOP_BLOCK_THRESHOLD_MS, i.e. something is running on the loop without
+yielding, and samples the loop thread's stack every LOOP_STACK_SAMPLE_MS for as long
+as it stays blocked. When the loop comes back the stall is logged with its length
+and the distinct stacks sampled, most frequent first; the innermost frames name the
+blocking call.
+
+stats() reports the stall count, lag percentiles and the most recent stalls; it is
+served at GET /api/debug/event-loop. Set LOOP_MONITOR=false to turn it off.
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from typing import Any, Deque, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+LOOP_MONITOR_ENABLED = os.getenv("LOOP_MONITOR", "true").lower() in ("1", "true", "yes")
+LOOP_BLOCK_THRESHOLD_MS = float(os.getenv("LOOP_BLOCK_THRESHOLD_MS", "100"))
+LOOP_MONITOR_INTERVAL_MS = 50.0
+LOOP_STACK_SAMPLE_MS = 10.0
+# Innermost frames kept per stack sample, and stalls kept for stats()
+LOOP_STACK_DEPTH = 12
+LOOP_RECENT_STALLS = 20
+
+
+class LoopLagMonitor:
+    """Measures event-loop lag and samples the stack of whatever blocks the loop."""
+
+    def __init__(self, threshold_ms: float = LOOP_BLOCK_THRESHOLD_MS, interval_ms: float = LOOP_MONITOR_INTERVAL_MS,
+                 sample_ms: float = LOOP_STACK_SAMPLE_MS):
+        self.threshold = threshold_ms / 1000
+        self.interval = interval_ms / 1000
+        self.sample_interval = sample_ms / 1000
+        self.stalls = 0
+        self.max_lag = 0.0
+        self._lags: Deque[float] = deque(maxlen=2000)
+        self._recent: Deque[Dict[str, Any]] = deque(maxlen=LOOP_RECENT_STALLS)
+        self._samples: Counter = Counter()
+        self._lock = threading.Lock()
+        self._last_beat = 0.0
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+        self._watchdog: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start monitoring the running loop (call from it)."""
+        if self._task:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-monitor", daemon=True)
+        self._watchdog.start()
+        logger.info(f"[LoopMonitor] Logging event-loop stalls over {self.threshold * 1000:.0f} ms")
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _heartbeat(self) -> None:
+        while True:
+            self._last_beat = time.monotonic()
+            await asyncio.sleep(self.interval)
+            self._record(max(0.0, time.monotonic() - self._last_beat - self.interval))
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.sample_interval):
+            if time.monotonic() - self._last_beat - self.interval < self.threshold:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            stack = "".join(traceback.format_stack(frame)[-LOOP_STACK_DEPTH:])
+            with self._lock:
+                self._samples[stack] += 1
+
+    def _record(self, lag: float) -> None:
+        with self._lock:
+            self._lags.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+            samples, self._samples = self._samples, Counter()
+        if lag < self.threshold:
+            return
+
+        self.stalls += 1
+        stacks = [{"samples": count, "stack": stack} for stack, count in samples.most_common(3)]
+        self._recent.append({"at": time.time(), "blocked_ms": round(lag * 1000, 1), "stacks": stacks})
+        if stacks:
+            detail = "\n".join(f"--- {s['samples']} sample(s):\n{s['stack']}" for s in stacks)
+        else:
+            detail = "(stalled between stack samples)"
+        logger.warning(f"[LoopMonitor] Event loop blocked for {lag * 1000:.0f} ms\n{detail}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lags = sorted(self._lags)
+
+        def pct(p: float) -> Optional[float]:
+            return round(lags[min(len(lags) - 1, int(p / 100 * len(lags)))] * 1000, 1) if lags else None
+
+        return {
+            "enabled": self._task is not None,
+            "threshold_ms": self.threshold * 1000,
+            "stalls": self.stalls,
+            "lag_ms": {"p50": pct(50), "p99": pct(99), "max": round(self.max_lag * 1000, 1)},
+            "recent_stalls": list(self._recent),
+        }
+
+
+loop_monitor = LoopLagMonitor()
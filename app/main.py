@@ -13,7 +13,7 @@ import time
 from enum import Enum
 import torch # Import torch for startup check
 import asyncio # Added for running sync Gemini functions in thread pool
-from typing import Optional, List, Tuple, Dict, Any
+from typing import Optional, List, Literal, Tuple, Dict, Any
 import glob # For finding files
 import re # For parsing timestamps from filenames
 import subprocess # Added for running ffmpeg and audiowaveform in a thread on Windows
@@ -29,8 +29,15 @@ from .gemini import (
     refine_video_with_multimodal_pass2,
     # MultimodalPass2InputSegment # REMOVED as it's no longer used/defined in gemini.py for Pass 2 input
 )
-from .whisper_utils import transcribe_video, transcribe_audio_with_word_timestamps
+from .whisper_utils import transcribe_video, transcribe_audio_with_word_timestamps, map_transcript_to_concat_time
 from .ffmpeg_utils import cut_and_concatenate, extract_audio_segment
+from .audio_cache import peek_pcm
+from . import transcript_cache
+from .ffmpeg_scheduler import INTERACTIVE, run_scheduled, run_scheduled_async, scheduler as ffmpeg_scheduler
+from .shared_state import SharedMapping, shared_semaphore
+from .uploads import save_upload
+from .loop_monitor import LOOP_MONITOR_ENABLED, loop_monitor
+from .vad import VadParams, detect_speech_in_samples, source_cache_key
 import tempfile # For managing temporary directories for audio segments
 # from moviepy.editor import VideoFileClip, concatenate_videoclips # REMOVED MoviePy
 
@@ -104,6 +111,10 @@ def register_temp_file(file_path: str):
     """Register a temporary file for cleanup"""
     active_temp_files.add(file_path)
 
+def candidate_edl_path_for(candidate_video_path: str) -> str:
+    """Sidecar JSON holding the source clips a candidate video was cut from."""
+    return os.path.splitext(candidate_video_path)[0] + "_edl.json"
+
 def register_temp_dir(dir_path: str):
     """Register a temporary directory for cleanup"""
     active_temp_dirs.add(dir_path)
@@ -117,16 +128,14 @@ def register_file_handle(file_handle):
         logger.warning(f"Too many active file handles ({len(active_file_handles)}), performing emergency cleanup")
         cleanup_temp_resources()
 
-# Video streaming semaphore to limit concurrent video streams
+# Limit concurrent video streams across all workers (see app.shared_state)
 MAX_CONCURRENT_VIDEO_STREAMS = 5
-video_stream_semaphore = asyncio.Semaphore(MAX_CONCURRENT_VIDEO_STREAMS)
 
 # Clean up any existing temporary resources on startup
 cleanup_temp_resources()
 
 # Limit concurrent video processing to prevent file descriptor exhaustion
-MAX_CONCURRENT_PROCESSING = 2  # Limit to 2 concurrent video processing operations
-processing_semaphore = asyncio.Semaphore(MAX_CONCURRENT_PROCESSING)
+MAX_CONCURRENT_PROCESSING = 2  # Limit to 2 concurrent video processing operations, across all workers
 
 # Configure logging to output to both console and file
 logging.basicConfig(
@@ -168,7 +177,9 @@ logger.info("--- CUDA check complete ---")
 # GEMINI_CHUNK_SIZE = 250 # Define chunk size for Gemini processing (used for Pass 2) # Now from AppConfig
 
 # --- Import Database ---
-from .database import init_db, get_db
+from .database import dispose_async_engine, init_db, get_db
+from .job_store import start_job_worker, stop_job_worker
+from .render_tasks import RENDER_TASK_KINDS
 from .models import Project, SourceVideo, TranscriptSegment, Edit, EditDecision
 from sqlalchemy.orm import Session
 # --- End Database Import ---
@@ -202,9 +213,16 @@ app.include_router(processing_router)
 async def startup_event():
     """Initialize database and perform startup tasks."""
     logger.info("Starting application initialization...")
+    if LOOP_MONITOR_ENABLED:
+        loop_monitor.start()
     init_db()
     logger.info("Database initialized successfully")
     
+    # Start claiming persisted jobs (including ones orphaned by a previous run);
+    # queued render tasks are left to python -m app.worker
+    start_job_worker(exclude_kinds=RENDER_TASK_KINDS)
+    logger.info("Started job worker")
+    
     # Start periodic cleanup task
     asyncio.create_task(periodic_cleanup())
     logger.info("Started periodic cleanup task")
@@ -271,7 +289,7 @@ async def serve_video(filename: str, request: Request):
     Serve video files with optimized range request support for efficient seeking.
     """
     # Limit concurrent video streams to prevent file descriptor exhaustion
-    async with video_stream_semaphore:
+    async with shared_semaphore("video_streams", MAX_CONCURRENT_VIDEO_STREAMS):
         file_path = os.path.join(UPLOAD_DIR, filename)
         
         logger.info(f"=== VIDEO REQUEST DEBUG ===")
@@ -439,7 +457,7 @@ async def check_duplicate(
             "message": "File is new"
         }
 
-# In-memory mapping of file_id → absolute video file path created by /analyze.
+# Mapping of file_id → absolute video file path created by /analyze, shared by all workers.
 # Rebuilt on startup by scanning uploads directory
 
 def rebuild_file_store() -> Dict[str, str]:
@@ -499,7 +517,14 @@ def find_file_by_name_and_size(filename: str, size: int) -> Optional[tuple[str,
         return None
 
 # Load the file store by scanning directory
-file_store: Dict[str, str] = rebuild_file_store()
+file_store: SharedMapping = SharedMapping("file_store")
+_scanned_files = rebuild_file_store()
+# Forget uploads deleted since the store was last built. Entries whose file still exists
+# stay: another worker may have registered them after the scan.
+for _file_id, _file_path in file_store.items():
+    if _file_id not in _scanned_files and not os.path.isfile(_file_path):
+        file_store.pop(_file_id, None)
+file_store.update(_scanned_files)
 
 # Path to audiowaveform binary – prefer project-local tools copy
 _local_audiowf = os.path.join(_project_root, "tools", "audiowaveform.exe")
@@ -522,12 +547,31 @@ def generate_peaks(mp3_path: str, json_path: str):
         logger.warning(f"audiowaveform failed on {mp3_path}: {e}")
 
 # Helper to detect first loud segment (defined before use)
-def detect_first_loud(input_file: str, stream_index: int, max_scan_seconds: int = 900) -> float | None:
+def detect_first_loud(input_file: str, stream_index: int, max_scan_seconds: int = 900,
+                      audio_track: int | None = None) -> float | None:
     """
     Efficiently detect the first loud segment in an audio stream.
     Uses progressive scanning to find audio quickly.
     Filters out brief audio blips to find sustained audio content.
+
+    If the track (audio_track is its audio-relative index) has already been
+    decoded into the shared audio cache, it is analysed from there instead.
     """
+    if audio_track is not None:
+        samples = peek_pcm(input_file, audio_track)
+        if samples is not None:
+            # Same criteria as the silencedetect scan below: -35dB, silences of at least 1.5s;
+            # the default minimum speech duration still drops brief blips
+            params = VadParams(threshold_db=-35.0, hysteresis_db=0.0, zcr_threshold=float("inf"),
+                               min_silence_duration=1.5)
+            intervals = detect_speech_in_samples(samples, params, cache_key=source_cache_key(input_file, audio_track),
+                                                 label=f"{input_file} track {audio_track}")
+            if intervals and intervals[0][0] < max_scan_seconds:
+                logger.info(f"Track {stream_index}: Found audio start at {intervals[0][0]:.3f}s from cached audio")
+                return intervals[0][0]
+            logger.info(f"Track {stream_index}: No audio in first {max_scan_seconds}s of cached audio, assuming silent track")
+            return None
+
     # Start with a small scan window for quick detection
     initial_scan_seconds = 30  # 30 seconds should be enough for most content
     
@@ -551,7 +595,7 @@ def detect_first_loud(input_file: str, stream_index: int, max_scan_seconds: int
         ]
         
         try:
-            res = subprocess.run(sd_cmd, capture_output=True, text=True, check=True)
+            res = run_scheduled(sd_cmd, INTERACTIVE, capture_output=True, text=True, check=True)
             output = res.stderr
         except subprocess.CalledProcessError as e:
             output = e.stderr  # silencedetect returns non-zero when piped to null
@@ -637,14 +681,8 @@ def detect_first_loud(input_file: str, stream_index: int, max_scan_seconds: int
     return None
 
 # --- Progress streaming setup ---
-# In-memory queues: job_id -> asyncio.Queue of event dicts {text: str, type?: str, payload?: Any}
-progress_queues: Dict[str, "asyncio.Queue[dict]"] = {}
-
-# Utility to emit progress events
-async def emit_progress(job_id: str, message: dict):
-    queue = progress_queues.get(job_id)
-    if queue:
-        await queue.put(message)
+# Queues live in app.progress so API routers can stream to /progress/{job_id} too
+from .progress import open_progress_stream, close_progress_stream, emit_progress, subscribe_progress
 
 # Background task that performs audio analysis and sends progress events
 async def analyze_worker(job_id: str, input_path: str, preview_duration: int):
@@ -715,7 +753,8 @@ async def analyze_worker(job_id: str, input_path: str, preview_duration: int):
                 # Fallback to audio-content analysis
                 await emit_progress(job_id, {"text": f"Detecting audio start for track {idx}..."})
                 detection_start = time.time()
-                first_loud = detect_first_loud(input_path, idx)
+                # In a thread: it waits for an ffmpeg slot, which must not block the loop
+                first_loud = await asyncio.to_thread(detect_first_loud, input_path, idx, audio_track=track_idx)
                 detection_time = time.time() - detection_start
                 if first_loud is None:
                     await emit_progress(job_id, {"text": f"Track {idx} is silent – skipping (detection took {detection_time:.2f}s)"})
@@ -774,9 +813,9 @@ async def analyze_worker(job_id: str, input_path: str, preview_duration: int):
             logger.info(f"Running ffmpeg command: {' '.join(ff_cmd)}")
             
             try:
-                result = await asyncio.to_thread(
-                    subprocess.run,
+                result = await run_scheduled_async(
                     ff_cmd,
+                    INTERACTIVE,
                     capture_output=True,
                     text=True,
                 )
@@ -856,7 +895,7 @@ async def analyze_worker(job_id: str, input_path: str, preview_duration: int):
     finally:
         # Cleanup queue after a delay to ensure frontend has time to connect
         await asyncio.sleep(1.0)  # Give frontend more time to connect
-        progress_queues.pop(job_id, None)
+        close_progress_stream(job_id)
         logger.info(f"Cleaned up progress queue for job {job_id}")
 
 
@@ -866,16 +905,14 @@ from fastapi.responses import StreamingResponse
 
 @app.get("/progress/{job_id}")
 async def progress_stream(job_id: str):
-    queue = progress_queues.get(job_id)
-    if queue is None:
+    # The job may be running in another worker; subscribe_progress follows it there
+    events = await subscribe_progress(job_id)
+    if events is None:
         return JSONResponse(status_code=404, content={"message": "Job not found"})
 
     async def event_generator():
-        while True:
-            msg = await queue.get()
+        async for msg in events:
             yield f"data: {json.dumps(msg)}\n\n"
-            if msg.get("type") == "done":
-                break
 
     return StreamingResponse(event_generator(), media_type="text/event-stream")
 
@@ -908,7 +945,7 @@ async def analyze_video(
         logger.info(f"Analyzing existing file via file_id {file_id}: {existing_input_path}")
         
         # Create progress queue for this job
-        progress_queues[file_id] = asyncio.Queue()
+        await open_progress_stream(file_id)
         
         # Start analysis with existing file
         asyncio.create_task(analyze_worker(file_id, existing_input_path, preview_duration))
@@ -939,7 +976,7 @@ async def analyze_video(
         existing_input_path = file_path
         
         # Create progress queue for this job (using existing file_id)
-        progress_queues[existing_file_id] = asyncio.Queue()
+        await open_progress_stream(existing_file_id)
         
         # Start analysis with existing file
         asyncio.create_task(analyze_worker(existing_file_id, existing_input_path, preview_duration))
@@ -954,8 +991,7 @@ async def analyze_video(
     file_id = str(uuid.uuid4())
     input_path = os.path.join(UPLOAD_DIR, f"{file_id}_{file.filename}")
 
-    with open(input_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    await save_upload(file, input_path)
 
     # No need to store metadata - we scan the directory directly for deduplication
 
@@ -963,7 +999,7 @@ async def analyze_video(
     file_store[file_id] = input_path
 
     # Create progress queue for this job
-    progress_queues[file_id] = asyncio.Queue()
+    await open_progress_stream(file_id)
 
     # Start a background task to perform audio analysis and send progress events
     asyncio.create_task(analyze_worker(file_id, input_path, preview_duration))
@@ -998,6 +1034,9 @@ async def process_video(
     whisper_model: str = Form("medium", description="Name of the Whisper model to use (e.g., tiny, base, small, medium, large)."),
     transcription_language: str = Form("en", description="Language code for transcription (e.g., en, es, fr)."),
     save_speech_audio_file: bool = Form(False, description="Whether to save a separate speech-only audio file."),
+    transcription_mode: Literal["per_segment", "concatenated"] = Form("per_segment", description="'per_segment' transcribes each speech segment separately; 'concatenated' transcribes the silence-stripped audio in one pass."),
+    transcription_workers: int | None = Form(None, ge=1, description="Worker processes for chunked parallel transcription (defaults to TRANSCRIPTION_WORKERS)."),
+    escalation_model: str | None = Form(None, description="Cascade mode: larger Whisper model used to re-transcribe low-confidence segments (e.g., medium, large)."),
 
     # Audio processing settings for silence detection
     audio_silence_threshold: float = Form(-50.0, le=0.0, description="Silence threshold in dB (e.g., -50.0). Must be <= 0."),
@@ -1030,7 +1069,7 @@ async def process_video(
     simple_mode: bool = Form(False, description="Simple mode: Skip all complex processing, just concatenate selected clips based on prompt")
 ):
     # Limit concurrent processing to prevent file descriptor exhaustion
-    async with processing_semaphore:
+    async with shared_semaphore("processing", MAX_CONCURRENT_PROCESSING):
         try:
             # --- Construct AppConfig ---
             # print(f"[MAIN DEBUG] Type of editing_style from Form before AppConfig: {type(editing_style)}, value: {editing_style}", flush=True)
@@ -1046,7 +1085,10 @@ async def process_video(
                 transcription_config=TranscriptionConfig(
                     model_name=whisper_model,
                     language=transcription_language,
-                    save_speech_audio=save_speech_audio_file
+                    save_speech_audio=save_speech_audio_file,
+                    transcription_mode=transcription_mode,
+                    escalation_model=escalation_model or None,
+                    **({"num_workers": transcription_workers} if transcription_workers else {})
                 ),
                 audio_config=AudioProcessingConfig(
                     silence_threshold=audio_silence_threshold,
@@ -1073,8 +1115,7 @@ async def process_video(
                 input_path = os.path.join(UPLOAD_DIR, file.filename)
                 if not os.path.exists(input_path):
                     logger.info(f"Saving uploaded file to: {input_path}")
-                    with open(input_path, "wb") as buffer:
-                        shutil.copyfileobj(file.file, buffer)
+                    await save_upload(file, input_path)
                     logger.info("File saved successfully")
                 else:
                     logger.info(f"Using existing file on disk: {input_path}")
@@ -1094,6 +1135,26 @@ async def process_video(
 
             base_name = os.path.splitext(os.path.basename(input_path))[0]
 
+            # Transcript cache key is based on the original file's content plus scope and settings
+            transcript_scope = None
+            if scope_start_seconds is not None and scope_end_seconds is not None:
+                transcript_scope = (scope_start_seconds, scope_end_seconds)
+            transcript_key = await asyncio.to_thread(
+                transcript_cache.build_key,
+                input_path,
+                audio_track=audio_track,
+                model_name=app_config.transcription_config.model_name,
+                language=app_config.transcription_config.language,
+                scope=transcript_scope,
+                silence_threshold=app_config.audio_config.silence_threshold,
+                min_silence_duration=app_config.audio_config.min_silence_duration,
+                transcription_mode=app_config.transcription_config.transcription_mode,
+                backend=app_config.transcription_config.backend,
+                escalation_model=app_config.transcription_config.escalation_model,
+                escalation_logprob_threshold=app_config.transcription_config.escalation_logprob_threshold,
+                num_workers=app_config.transcription_config.num_workers,
+            )
+
             # --- OPTIONAL SCOPE PRE-TRIM -------------------------------------
             if scope_start_seconds is not None and scope_end_seconds is not None:
                 if scope_end_seconds <= scope_start_seconds:
@@ -1133,7 +1194,7 @@ async def process_video(
                     ff_cmd.append(trimmed_path)
                     
                     logger.info(f"FFmpeg command: {' '.join(ff_cmd)}")
-                    subprocess.run(ff_cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+                    await run_scheduled_async(ff_cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
                 else:
                     logger.info(f"Using existing trimmed scope file: {trimmed_path}")
 
@@ -1146,7 +1207,7 @@ async def process_video(
             # --- END SCOPE PRE-TRIM -----------------------------------------
 
             # Set up predictable paths for transcript and speech audio
-            predictable_transcript_path = os.path.join(TRANSCRIPTS_DIR, f"{base_name}_full_transcription.json")
+            predictable_transcript_path = str(transcript_cache.path_for(transcript_key))
             predictable_speech_audio_path = None
             if app_config.transcription_config.save_speech_audio: # Use AppConfig
                 predictable_speech_audio_path = os.path.join(PROCESSED_AUDIO_DIR, f"{base_name}_speech_only.wav")
@@ -1154,23 +1215,15 @@ async def process_video(
             transcript_data = None
             transcript_source_message = ""
 
-            # 1. Transcription (or load existing)
-            if os.path.exists(predictable_transcript_path):
-                logger.info(f"Reusing existing transcript from: {predictable_transcript_path}")
-                try:
-                    with open(predictable_transcript_path, "r", encoding="utf-8") as f:
-                        transcript_data = json.load(f)
-                    transcript_source_message = f"Reused transcript from {predictable_transcript_path}"
-                    if app_config.transcription_config.save_speech_audio and predictable_speech_audio_path and not os.path.exists(predictable_speech_audio_path): # Use AppConfig
-                        logger.warning(f"Transcript reused, but speech-only audio {predictable_speech_audio_path} not found. It was not generated with the reused transcript.")
-                    elif app_config.transcription_config.save_speech_audio and predictable_speech_audio_path and os.path.exists(predictable_speech_audio_path): # Use AppConfig
-                        logger.info(f"Reusing existing speech-only audio: {predictable_speech_audio_path}")
-                except json.JSONDecodeError as e:
-                    logger.error(f"Failed to decode existing transcript {predictable_transcript_path}: {e}. Will attempt re-transcription.")
-                    transcript_data = None
-                except Exception as e:
-                    logger.error(f"Unexpected error loading existing transcript {predictable_transcript_path}: {e}. Will attempt re-transcription.", exc_info=True)
-                    transcript_data = None
+            # 1. Transcription (or load from the content-keyed cache)
+            transcript_data = await asyncio.to_thread(transcript_cache.get, transcript_key)
+            if transcript_data is not None:
+                logger.info(f"Reusing cached transcript: {predictable_transcript_path}")
+                transcript_source_message = f"Reused transcript from {predictable_transcript_path}"
+                if app_config.transcription_config.save_speech_audio and predictable_speech_audio_path and not os.path.exists(predictable_speech_audio_path): # Use AppConfig
+                    logger.warning(f"Transcript reused, but speech-only audio {predictable_speech_audio_path} not found. It was not generated with the reused transcript.")
+                elif app_config.transcription_config.save_speech_audio and predictable_speech_audio_path and os.path.exists(predictable_speech_audio_path): # Use AppConfig
+                    logger.info(f"Reusing existing speech-only audio: {predictable_speech_audio_path}")
             
             if transcript_data is None:
                 logger.info(f"No reusable transcript found or loading failed. Starting fresh transcription for {filename_for_logging}...")
@@ -1185,12 +1238,20 @@ async def process_video(
                         audio_track=audio_track,
                         silence_duration=app_config.audio_config.min_silence_duration, # Use AppConfig
                         silence_threshold=app_config.audio_config.silence_threshold, # Use AppConfig
-                        save_speech_audio_path=predictable_speech_audio_path # Remains conditional
+                        save_speech_audio_path=predictable_speech_audio_path, # Remains conditional
+                        transcription_mode=app_config.transcription_config.transcription_mode,
+                        num_workers=app_config.transcription_config.num_workers,
+                        backend=app_config.transcription_config.backend,
+                        escalation_model=app_config.transcription_config.escalation_model,
+                        escalation_logprob_threshold=app_config.transcription_config.escalation_logprob_threshold
                     )
                     logger.info(f"Transcription complete. Got {len(transcript_data['segments'])} segments.")
                     transcript_source_message = f"Newly generated transcript for {filename_for_logging}"
-                    with open(predictable_transcript_path, "w", encoding="utf-8") as f:
-                        json.dump(transcript_data, f, ensure_ascii=False, indent=2)
+                    escalation = transcript_data.get('escalation')
+                    if escalation:
+                        transcript_source_message += (f" ({escalation['escalated_fraction'] * 100:.1f}% of speech escalated "
+                                                      f"to {escalation['escalation_model']})")
+                    await asyncio.to_thread(transcript_cache.put, transcript_key, transcript_data)
                     logger.info(f"New transcript saved for reuse to: {predictable_transcript_path}")
                     if predictable_speech_audio_path and os.path.exists(predictable_speech_audio_path):
                         logger.info(f"Speech-only audio saved to: {predictable_speech_audio_path}")
@@ -1445,6 +1506,8 @@ async def process_video(
                 # --- Attempt to Reuse Candidate Video (NEW BLOCK) ---
                 candidate_video_path: Optional[str] = None
                 candidate_video_was_reused = False
+                # Source ranges the candidate video was cut from, in order (its EDL)
+                candidate_video_clips: Optional[List[Tuple[float, float]]] = None
 
                 if reuse_latest_candidate_video:
                     logger.info(f"Attempting to reuse latest candidate video for base name: {base_name}")
@@ -1456,6 +1519,16 @@ async def process_video(
                         candidate_video_path = latest_candidate_video_file
                         candidate_video_was_reused = True
 
+                        reused_edl_path = candidate_edl_path_for(latest_candidate_video_file)
+                        if os.path.exists(reused_edl_path):
+                            try:
+                                with open(reused_edl_path, "r", encoding="utf-8") as f_edl:
+                                    candidate_video_clips = [(clip['start'], clip['end']) for clip in json.load(f_edl)]
+                                logger.info(f"Loaded EDL of reused candidate video ({len(candidate_video_clips)} clips): {reused_edl_path}")
+                            except Exception as e_edl:
+                                logger.warning(f"Could not read candidate EDL {reused_edl_path}: {e_edl}. Candidate video will be transcribed instead.")
+                                candidate_video_clips = None
+
                         # Attempt to load the Pass 1 script corresponding to this reused candidate video
                         cand_basename = os.path.basename(latest_candidate_video_file)
                         # Regex for candidate_video_YYYYMMDD_HHMMSS.mp4
@@ -1573,8 +1646,7 @@ async def process_video(
                                     ]
 
                                     # Run ffmpeg synchronously in a thread to stay compatible with Windows' Proactor loop
-                                    proc_result = await asyncio.to_thread(
-                                        subprocess.run,
+                                    proc_result = await run_scheduled_async(
                                         ffmpeg_cmd,
                                         stdout=subprocess.DEVNULL,
                                         stderr=subprocess.DEVNULL,
@@ -1666,6 +1738,11 @@ async def process_video(
                             audio_track
                         )
                         logger.info(f"New candidate video successfully generated and saved to: {candidate_video_path}")
+                        candidate_video_clips = [(seg['start'], seg['end']) for seg in formatted_candidate_edl_for_ffmpeg]
+                        save_json_to_file(
+                            [{'start': start, 'end': end} for start, end in candidate_video_clips],
+                            candidate_edl_path_for(candidate_video_path)
+                        )
                     except Exception as e_candidate_video:
                         logger.error(f"Error generating new candidate video: {e_candidate_video}", exc_info=True)
                         candidate_video_path = None # Ensure path is None on error for the check below
@@ -1684,8 +1761,10 @@ async def process_video(
                     })
                 logger.info(f"Candidate video is available at: {candidate_video_path}")
 
-                # --- Intermediate Step 3: Transcribe Candidate Video (if available) ---
-                logger.info(f"--- Starting Intermediate Step 3: Transcribe Candidate Video ({candidate_video_path}) ---")
+                # --- Intermediate Step 3: Candidate Video Transcript ---
+                # Mapped from the source transcript through the candidate's EDL; only a candidate
+                # without a saved EDL (reused from an older run) is transcribed again.
+                logger.info(f"--- Starting Intermediate Step 3: Candidate Video Transcript ({candidate_video_path}) ---")
                 candidate_video_transcript_segments: List[Dict[str, Any]] = [] # Ensure initialized
                 candidate_video_transcript_path: Optional[str] = None
 
@@ -1697,27 +1776,40 @@ async def process_video(
                     # Path for just the structured segments list (for easier reload or review)
                     candidate_segments_save_path = os.path.join(TRANSCRIPTS_DIR, f"{candidate_video_basename}_structured_segments_{run_timestamp}.json")
 
-                    # For candidate video, we likely always want a fresh transcript unless a very specific reuse is implemented
-                    logger.info(f"Transcribing candidate video: {candidate_video_path}")
                     try:
-                        cand_transcript_result = await asyncio.to_thread(
-                            transcribe_video,
-                            video_path=candidate_video_path,
-                            model_name=app_config.transcription_config.model_name,
-                            language=app_config.transcription_config.language,
-                            audio_track=0,
-                            silence_duration=app_config.audio_config.min_silence_duration,
-                            silence_threshold=app_config.audio_config.silence_threshold,
-                            save_speech_audio_path=None,
-                        )
+                        if candidate_video_clips:
+                            cand_struct_segments = map_transcript_to_concat_time(transcript_data['segments'], candidate_video_clips)
+                            cand_transcript_result = {
+                                'text': ' '.join(seg['text'] for seg in cand_struct_segments),
+                                'segments': cand_struct_segments,
+                                'language': transcript_data.get('language', app_config.transcription_config.language),
+                            }
+                            save_json_to_file(cand_transcript_result, predictable_cand_transcript_json_path)
+                            logger.info(f"Candidate transcript mapped from the source transcript through "
+                                        f"{len(candidate_video_clips)} EDL clips (no second Whisper pass).")
+                        else:
+                            logger.info(f"No EDL for candidate video; transcribing it: {candidate_video_path}")
+                            cand_transcript_result = await asyncio.to_thread(
+                                transcribe_video,
+                                video_path=candidate_video_path,
+                                model_name=app_config.transcription_config.model_name,
+                                language=app_config.transcription_config.language,
+                                audio_track=0,
+                                silence_duration=app_config.audio_config.min_silence_duration,
+                                silence_threshold=app_config.audio_config.silence_threshold,
+                                save_speech_audio_path=None,
+                                transcription_mode=app_config.transcription_config.transcription_mode,
+                                num_workers=app_config.transcription_config.num_workers,
+                                backend=app_config.transcription_config.backend,
+                            )
 
                         cand_transcript_data_dict = cand_transcript_result
                         cand_struct_segments = cand_transcript_result.get('segments', []) if cand_transcript_result else []
 
                         if cand_struct_segments:
                             candidate_video_transcript_segments = cand_struct_segments
-                            candidate_video_transcript_path = predictable_cand_transcript_json_path # Path where transcribe_video saved the full data
-                            logger.info(f"Candidate video transcribed. Segments: {len(candidate_video_transcript_segments)}. Full transcript at: {candidate_video_transcript_path}")
+                            candidate_video_transcript_path = predictable_cand_transcript_json_path
+                            logger.info(f"Candidate video transcript ready. Segments: {len(candidate_video_transcript_segments)}. Full transcript at: {candidate_video_transcript_path}")
                             # Save the clean structured segments separately for easier review/debug if needed
                             save_json_to_file(candidate_video_transcript_segments, candidate_segments_save_path)
                             logger.info(f"Candidate video structured segments saved to: {candidate_segments_save_path}")
@@ -1734,7 +1826,7 @@ async def process_video(
                     # This is a critical issue for the new Pass 2 flow. We might need to return an error if P2 is vital.
                     # For now, Pass 2 will be skipped if this is empty, as per logic in Step 4.
 
-                logger.info("--- Finished Intermediate Step 3: Transcribe Candidate Video ---")
+                logger.info("--- Finished Intermediate Step 3: Candidate Video Transcript ---")
 
                 # --- Simple Mode: Skip all complex processing ---
                 if simple_mode:
@@ -1745,7 +1837,7 @@ async def process_video(
                     
                     try:
                         # Copy the candidate video to the final output location
-                        shutil.copy2(candidate_video_path, final_simple_video_path)
+                        await asyncio.to_thread(shutil.copy2, candidate_video_path, final_simple_video_path)
                         logger.info(f"Simple mode: Final video created at {final_simple_video_path}")
                         
                         # Set the response payload for simple mode
@@ -1777,8 +1869,7 @@ async def process_video(
                     if candidate_video_path and os.path.exists(candidate_video_path):
                         logger.info(f"Calling Multimodal Pass 2 with candidate video: {candidate_video_path}")
                         try:
-                            pass2_selected_text_segments = await asyncio.to_thread(
-                                refine_video_with_multimodal_pass2,
+                            pass2_selected_text_segments = await refine_video_with_multimodal_pass2(
                                 candidate_video_path=candidate_video_path,
                                 user_prompt=gemini_user_prompt_to_use,
                                 allow_reordering=app_config.feature_flags.allow_reordering,
@@ -1920,6 +2011,21 @@ async def periodic_cleanup():
         except Exception as e:
             logger.error(f"Error during periodic cleanup: {e}")
 
+@app.get("/api/cache/transcripts")
+async def transcript_cache_stats():
+    """Transcript cache hit/miss counters and on-disk size"""
+    return await asyncio.to_thread(transcript_cache.stats)
+
+@app.get("/api/ffmpeg/scheduler")
+async def ffmpeg_scheduler_stats():
+    """Running and queued ffmpeg jobs per class, and the scheduler's limits"""
+    return ffmpeg_scheduler.stats()
+
+@app.get("/api/debug/event-loop")
+async def event_loop_stats():
+    """Event-loop lag and recent stalls with the stacks that blocked the loop"""
+    return loop_monitor.stats()
+
 @app.get("/debug/file-store")
 async def debug_file_store():
     """Debug endpoint to check file store status"""
@@ -1943,5 +2049,8 @@ async def debug_file_store():
 @app.on_event("shutdown")
 async def shutdown_event():
     """Shutdown event to clean up resources"""
+    await stop_job_worker()
+    await dispose_async_engine()
+    loop_monitor.stop()
     cleanup_temp_resources()
     logger.info("Cleaned up resources on shutdown")
\ No newline at end of file
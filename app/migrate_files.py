@@ -15,7 +15,7 @@ from datetime import datetime
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from app.database import SessionLocal, init_db
-from app.dao import ProjectDAO, SourceVideoDAO, TranscriptSegmentDAO, EditDAO, EditDecisionDAO
+from app.dao import ProjectDAO, SourceVideoDAO, TranscriptSegmentDAO, EditDAO, EditDecisionDAO, VideoClipDAO
 from app.models import Project, SourceVideo, TranscriptSegment, Edit, EditDecision
 import logging
 
@@ -28,6 +28,7 @@ UPLOAD_DIR = "uploads"
 TRANSCRIPTS_DIR = "transcripts"
 PROCESSED_DIR = "processed"
 PROCESSED_AUDIO_DIR = "processed_audio"
+CLIPS_DIR = "clips"
 
 
 def get_file_info(file_path: str) -> dict:
@@ -206,6 +207,58 @@ def migrate_processed_videos(db, default_project_id: str, video_mapping: dict):
         logger.info(f"    Base: {parsed['base_name']}, Scopes: {parsed['scopes']}")
 
 
+def migrate_clip_indexes(db) -> int:
+    """
+    Import clip indexes written by older versions (clips/{video_id}/index.json) into
+    the video_clips table. Videos that already have clip records are left alone.
+    Returns the number of clips imported.
+    """
+    logger.info("\n" + "="*60)
+    logger.info("Importing Clip Indexes")
+    logger.info("="*60)
+    
+    if not os.path.exists(CLIPS_DIR):
+        logger.warning(f"Clips directory not found: {CLIPS_DIR}")
+        return 0
+    
+    imported = 0
+    for video_dir in Path(CLIPS_DIR).iterdir():
+        index_path = video_dir / "index.json"
+        if not index_path.is_file():
+            continue
+        video_id = video_dir.name
+        if not SourceVideoDAO.get_by_id(db, video_id):
+            logger.info(f"  ⊘ Skipping {video_id}: source video not in database")
+            continue
+        if VideoClipDAO.get_by_video(db, video_id):
+            logger.info(f"  ⊘ Skipping {video_id}: clips already imported")
+            continue
+        
+        try:
+            with open(index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            for clip in data.get("clips", []):
+                VideoClipDAO.create(
+                    db,
+                    clip_id=clip["id"],
+                    source_video_id=video_id,
+                    start_time=float(clip["start_time"]),
+                    end_time=float(clip["end_time"]),
+                    order_index=int(clip.get("order_index", 0)),
+                    segment_id=clip.get("segment_id"),
+                    file_path=clip.get("file_path")
+                )
+                imported += 1
+            if data.get("complete", True):
+                VideoClipDAO.mark_complete(db, video_id)
+            logger.info(f"  ✓ Imported {len(data.get('clips', []))} clips for {video_id}")
+        except Exception as e:
+            db.rollback()
+            logger.error(f"  ✗ Failed to import {index_path}: {e}")
+    
+    return imported
+
+
 def create_default_project(db) -> str:
     """Create a default project for migrated files."""
     # Check if default project already exists
@@ -238,6 +291,7 @@ def main():
     print("  2. Import videos from uploads/ directory")
     print("  3. Import transcripts from transcripts/ directory")
     print("  4. Scan processed/ directory for reference")
+    print("  5. Import clip indexes from clips/ directory")
     print("\n" + "="*60)
     
     response = input("\nProceed with migration? (yes/no): ")
@@ -262,10 +316,13 @@ def main():
         # Scan processed videos
         migrate_processed_videos(db, default_project_id, video_mapping)
         
+        # Import clip indexes
+        clip_count = migrate_clip_indexes(db)
+        
         print("\n" + "="*60)
         print("✅ Migration Complete!")
         print("="*60)
-        print(f"\nImported {len(video_mapping)} source videos into the database.")
+        print(f"\nImported {len(video_mapping)} source videos and {clip_count} clips into the database.")
         print("\nNext steps:")
         print("  1. Start the application: uvicorn app.main:app --reload")
         print("  2. Review the 'Migrated Content' project")
@@ -247,3 +247,107 @@ class EditDecision(Base):
         Index('idx_edit_decisions_edit', 'edit_id', 'order_index'),
     )
 
+
+
+class TranscriptionCheckpoint(Base):
+    """
+    Transcription checkpoint - how far an incremental transcription of a source video
+    has been persisted, so an interrupted job resumes instead of starting over.
+    """
+    __tablename__ = "transcription_checkpoints"
+
+    id = Column(String, primary_key=True)
+    source_video_id = Column(String, ForeignKey("source_videos.id", ondelete="CASCADE"), nullable=False)
+    job_id = Column(String, nullable=True)
+    settings_key = Column(String, nullable=False)  # Transcript cache digest of the settings in use
+    status = Column(String, default="running", nullable=False)  # running, completed, failed
+    processed_until = Column(Float, default=0.0, nullable=False)  # Source seconds fully persisted
+    segment_count = Column(Integer, default=0, nullable=False)
+    total_duration = Column(Float, nullable=True)
+    error_message = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=func.now(), nullable=False)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now(), nullable=False)
+
+    # Index for performance
+    __table_args__ = (
+        Index('idx_transcription_checkpoints_video', 'source_video_id'),
+    )
+
+
+class VideoClipRecord(Base):
+    """
+    Video clip model - a playable clip cut from a source video for text-based editing.
+    file_path is empty for virtual clips, which are rendered when first played.
+    """
+    __tablename__ = "video_clips"
+
+    id = Column(String, primary_key=True)
+    source_video_id = Column(String, ForeignKey("source_videos.id", ondelete="CASCADE"), nullable=False)
+    segment_id = Column(String, nullable=True)  # Transcript segment the clip was cut for
+    start_time = Column(Float, nullable=False)
+    end_time = Column(Float, nullable=False)
+    duration = Column(Float, nullable=False)
+    order_index = Column(Integer, nullable=False)
+    file_path = Column(String, nullable=True)
+    complete = Column(Boolean, default=False, nullable=False)  # Set once segmentation of the video has finished
+    created_at = Column(DateTime, default=func.now(), nullable=False)
+
+    # Index for performance
+    __table_args__ = (
+        Index('idx_video_clips_video', 'source_video_id', 'order_index'),
+    )
+
+
+class Job(Base):
+    """
+    Background job - state of a processing, finalize, transcript or segmentation job.
+    Kept in the database so job status survives restarts and is shared by every worker
+    process; stage lets a job interrupted by a restart resume where it left off.
+    """
+    __tablename__ = "jobs"
+
+    id = Column(String, primary_key=True)
+    kind = Column(String, nullable=False)  # process, finalize, transcript, segmentation
+    status = Column(String, default="queued", nullable=False)  # queued, running, completed, failed, cancelled
+    stage = Column(String, nullable=True)  # Last stage the job reached
+    progress = Column(Float, default=0.0, nullable=False)
+    message = Column(Text, nullable=True)
+    params = Column(Text, nullable=True)  # JSON object of the job's arguments
+    result = Column(Text, nullable=True)  # JSON object of result pointers (edit_id, output_path, ...)
+    error_message = Column(Text, nullable=True)
+    project_id = Column(String, nullable=True)
+    source_video_id = Column(String, nullable=True)
+    edit_id = Column(String, nullable=True)
+    worker_id = Column(String, nullable=True)  # Worker that claimed the job
+    attempts = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime, default=func.now(), nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now(), nullable=False)
+
+    # Index for performance
+    __table_args__ = (
+        Index('idx_jobs_status', 'status', 'created_at'),
+        Index('idx_jobs_video', 'source_video_id'),
+    )
+
+    def get_params(self) -> Dict[str, Any]:
+        """Parse params JSON."""
+        if self.params:
+            return json.loads(self.params)
+        return {}
+
+    def set_params(self, params: Dict[str, Any]):
+        """Set params as JSON."""
+        self.params = json.dumps(params)
+
+    def get_result(self) -> Dict[str, Any]:
+        """Parse result JSON."""
+        if self.result:
+            return json.loads(self.result)
+        return {}
+
+    def set_result(self, result: Dict[str, Any]):
+        """Set result as JSON."""
+        self.result = json.dumps(result)
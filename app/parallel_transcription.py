@@ -0,0 +1,208 @@
+"""
+Parallel chunked transcription.
+
+Long audio is split at VAD silence boundaries into chunks of roughly equal speech
+duration. Chunks are transcribed in a process pool where every worker loads its
+own transcription model once and memory-maps the cached PCM track, so no audio is
+pickled between processes. Results are stitched back in source order; each chunk
+only keeps output whose midpoint falls in the region it owns, which removes
+duplicates produced by padding that overlaps a neighbouring chunk.
+"""
+
+import logging
+import math
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Chunks shorter than this (in speech seconds) are not worth a separate model call.
+MIN_CHUNK_SPEECH_SECONDS = 120.0
+# More chunks than workers keeps the pool busy when chunk run times differ.
+CHUNKS_PER_WORKER = 3
+
+
+@dataclass
+class TranscriptionChunk:
+    index: int
+    start: float                            # Owned region in source time; boundaries sit in silence
+    end: float
+    speech_segments: List[Tuple[float, float]]
+
+
+def plan_chunks(speech_segments: List[Tuple[float, float]], total_duration: float, num_workers: int,
+                min_chunk_speech: float = MIN_CHUNK_SPEECH_SECONDS,
+                chunk_speech_seconds: Optional[float] = None) -> List[TranscriptionChunk]:
+    """
+    Group consecutive speech segments into chunks with balanced speech duration.
+    Chunk boundaries are the midpoints of the silences between segments.
+
+    By default the chunk count is sized for the pool; chunk_speech_seconds instead
+    asks for chunks of about that much speech (e.g. for checkpointing).
+    """
+    segments = [(s, e) for s, e in speech_segments if e > s]
+    if not segments:
+        return []
+    total_speech = sum(e - s for s, e in segments)
+    if chunk_speech_seconds:
+        target_count = max(1, min(len(segments), math.ceil(total_speech / chunk_speech_seconds)))
+    else:
+        target_count = max(1, min(num_workers * CHUNKS_PER_WORKER, len(segments),
+                                  int(total_speech // max(min_chunk_speech, 1e-6))))
+    per_chunk = total_speech / target_count
+
+    groups: List[List[Tuple[float, float]]] = [[]]
+    accumulated = 0.0
+    for seg in segments:
+        if groups[-1] and accumulated >= per_chunk * len(groups) and len(groups) < target_count:
+            groups.append([])
+        groups[-1].append(seg)
+        accumulated += seg[1] - seg[0]
+
+    chunks = []
+    for i, group in enumerate(groups):
+        start = 0.0 if i == 0 else (groups[i - 1][-1][1] + group[0][0]) / 2
+        end = total_duration if i == len(groups) - 1 else (group[-1][1] + groups[i + 1][0][0]) / 2
+        chunks.append(TranscriptionChunk(i, start, end, group))
+    return chunks
+
+
+def plan_span_chunks(speech_segments: List[Tuple[float, float]], total_duration: float,
+                     num_workers: int, chunk_speech_seconds: Optional[float] = None) -> List[TranscriptionChunk]:
+    """
+    Like plan_chunks, but for transcribing contiguous spans of the track (silences
+    included), as the word-timestamp path does. Only the chunk boundaries matter.
+    """
+    chunks = plan_chunks(speech_segments, total_duration, num_workers, chunk_speech_seconds=chunk_speech_seconds)
+    if not chunks:
+        return [TranscriptionChunk(0, 0.0, total_duration, [(0.0, total_duration)])]
+    for chunk in chunks:
+        chunk.speech_segments = [(chunk.start, chunk.end)]
+    return chunks
+
+
+# --- Worker process side ---
+
+_worker_model = None
+_worker_audio = None
+_worker_pcm_path = None
+
+
+def _init_worker(model_name: str, threads: int, backend: str = "whisper") -> None:
+    """Process pool initializer: limit inference threads and load this worker's model once."""
+    global _worker_model
+    from app.transcription_backends import load_backend
+
+    _worker_model = load_backend(backend, model_name, cpu_threads=max(1, threads))
+    logger.info(f"[Transcribe worker {os.getpid()}] Loaded {backend} {model_name} on {_worker_model.device} "
+                f"with {threads} threads")
+
+
+def _worker_samples(pcm_file: str):
+    global _worker_audio, _worker_pcm_path
+    if _worker_pcm_path != pcm_file:
+        from pathlib import Path
+        from app.audio_cache import open_pcm
+        _worker_audio = open_pcm(Path(pcm_file))
+        _worker_pcm_path = pcm_file
+    return _worker_audio
+
+
+def _transcribe_chunk(pcm_file: str, chunk: TranscriptionChunk, language: str, mode: str,
+                      padding_duration: float) -> Tuple[int, List[Dict[str, Any]]]:
+    from app.whisper_utils import (
+        _transcribe_concatenated, _transcribe_per_segment, slice_audio, suppress_output, words_from_result,
+    )
+
+    audio = _worker_samples(pcm_file)
+    if mode == "words":
+        span = slice_audio(audio, chunk.start, chunk.end)
+        with suppress_output(stderr=True, stdout=False):
+            result = _worker_model.transcribe(span, language=language, word_timestamps=True, verbose=False)
+        return chunk.index, words_from_result(result, offset=chunk.start)
+    if mode == "concatenated":
+        return chunk.index, _transcribe_concatenated(_worker_model, audio, chunk.speech_segments, language, padding_duration)
+    return chunk.index, _transcribe_per_segment(_worker_model, audio, chunk.speech_segments, language, padding_duration)
+
+
+# --- Parent process side ---
+
+def transcribe_chunks_in_pool(pcm_file: str, chunks: List[TranscriptionChunk], model_name: str, language: str,
+                              mode: str = "per_segment", padding_duration: float = 0.15, num_workers: int = 2,
+                              progress_callback: Optional[Callable[[int, int, List[Dict[str, Any]]], None]] = None,
+                              on_chunk_done: Optional[Callable[[TranscriptionChunk, List[Dict[str, Any]]], None]] = None,
+                              backend: str = "whisper") -> List[Dict[str, Any]]:
+    """
+    Transcribe chunks of a cached PCM track in worker processes and stitch the results.
+
+    Args:
+        pcm_file: Cached raw PCM file (see app.audio_cache.pcm_path)
+        chunks: Chunks from plan_chunks / plan_span_chunks
+        mode: "per_segment" or "concatenated" for segment output, "words" for word output
+        progress_callback: Optional callable(done, total, new_items) invoked as each chunk finishes
+        on_chunk_done: Optional callable(chunk, items) invoked in source order, once every
+                       earlier chunk has finished too (for checkpointing a contiguous prefix)
+        backend: Transcription engine each worker loads (see app.transcription_backends)
+
+    Returns:
+        list: Segments (or words) ordered by time, in source time
+    """
+    workers = max(1, min(num_workers, len(chunks)))
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    logger.info(f"Transcribing {len(chunks)} chunks with {workers} worker processes "
+                f"({threads} threads each, {backend} model {model_name}, mode {mode})")
+
+    results: Dict[int, List[Dict[str, Any]]] = {}
+    chunk_order = sorted(chunks, key=lambda c: c.index)
+    next_ordered = 0
+    # spawn: torch/CUDA state does not survive fork reliably
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                             initializer=_init_worker, initargs=(model_name, threads, backend)) as pool:
+        futures = {
+            pool.submit(_transcribe_chunk, pcm_file, chunk, language, mode, padding_duration): chunk
+            for chunk in chunks
+        }
+        for future in as_completed(futures):
+            chunk = futures[future]
+            index, items = future.result()
+            # Only concatenated mode feeds padded audio across a chunk boundary twice
+            owned = _owned_items(items, chunk) if mode == "concatenated" else items
+            results[index] = owned
+            logger.info(f"Chunk {len(results)}/{len(chunks)} done "
+                        f"({chunk.start:.1f}s-{chunk.end:.1f}s, {len(owned)} items)")
+            if progress_callback:
+                progress_callback(len(results), len(chunks), owned)
+            while on_chunk_done and next_ordered < len(chunk_order) and chunk_order[next_ordered].index in results:
+                ready = chunk_order[next_ordered]
+                on_chunk_done(ready, results[ready.index])
+                next_ordered += 1
+
+    stitched = [item for index in sorted(results) for item in results[index]]
+    return _dedupe_boundaries(stitched)
+
+
+def _owned_items(items: List[Dict[str, Any]], chunk: TranscriptionChunk) -> List[Dict[str, Any]]:
+    """Keep items whose midpoint lies in the chunk's owned region."""
+    return [item for item in items if chunk.start <= (item['start'] + item['end']) / 2 < chunk.end]
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"[^\w]+", " ", text.lower()).strip()
+
+
+def _dedupe_boundaries(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Drop an item that repeats the previous one's text while overlapping it in time."""
+    text_key = 'word' if items and 'word' in items[0] else 'text'
+    deduped: List[Dict[str, Any]] = []
+    for item in items:
+        if deduped:
+            prev = deduped[-1]
+            if item['start'] < prev['end'] and _normalize(item[text_key]) == _normalize(prev[text_key]):
+                continue
+        deduped.append(item)
+    return deduped
@@ -0,0 +1,123 @@
+"""
+Progress streaming shared by the legacy endpoints in main.py and the API routers.
+
+Each job gets an asyncio.Queue of event dicts {text: str, type?: str, payload?: Any}
+that the /progress/{job_id} SSE endpoint drains. Every event is also appended to a
+shared stream (app.shared_state), so a client whose SSE request lands on another
+worker than the job follows the same events; see subscribe_progress().
+"""
+
+import asyncio
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, Optional
+
+from app.shared_state import get_shared_state
+
+logger = logging.getLogger(__name__)
+
+# Seconds a job's shared stream is kept after its last event
+PROGRESS_STREAM_TTL_SECONDS = 3600.0
+# Seconds between reads of a shared stream followed from another worker
+PROGRESS_POLL_SECONDS = 0.2
+
+# First entry of every shared stream; marks it open and is never sent to clients
+_OPEN_MARKER = {"type": "stream_open"}
+
+# In-memory queues: job_id -> asyncio.Queue of event dicts
+progress_queues: Dict[str, "asyncio.Queue[dict]"] = {}
+
+# Event loop that owns each queue, so worker threads can publish into it
+_queue_loops: Dict[str, asyncio.AbstractEventLoop] = {}
+
+# Shared-stream writes made from the event loop run here, one at a time so events keep their order
+# (a write can wait on a lock held by another worker)
+_shares = ThreadPoolExecutor(max_workers=1, thread_name_prefix="progress-share")
+
+
+async def open_progress_stream(job_id: str) -> "asyncio.Queue[dict]":
+    """Create the queue for a job, and its shared stream so other workers can follow it."""
+    queue: "asyncio.Queue[dict]" = asyncio.Queue()
+    progress_queues[job_id] = queue
+    _queue_loops[job_id] = asyncio.get_running_loop()
+    await _queue_loops[job_id].run_in_executor(_shares, _share, job_id, _OPEN_MARKER)
+    return queue
+
+
+def close_progress_stream(job_id: str) -> None:
+    """Drop the local queue. The shared stream expires on its own, for clients still replaying it."""
+    progress_queues.pop(job_id, None)
+    _queue_loops.pop(job_id, None)
+
+
+def _share(job_id: str, message: dict) -> None:
+    try:
+        get_shared_state().xadd(f"progress:{job_id}", json.dumps(message), ttl=PROGRESS_STREAM_TTL_SECONDS)
+    except Exception as e:
+        logger.warning(f"Failed to share progress event for {job_id}: {e}")
+
+
+# Utility to emit progress events
+async def emit_progress(job_id: str, message: dict):
+    queue = progress_queues.get(job_id)
+    if queue:
+        await asyncio.get_running_loop().run_in_executor(_shares, _share, job_id, message)
+        await queue.put(message)
+
+
+def publish_progress(job_id: str, message: dict) -> None:
+    """
+    Emit without awaiting: from code running outside the event loop (e.g. asyncio.to_thread),
+    or from sync callbacks on the loop, where the shared write is queued instead of made inline.
+    """
+    queue = progress_queues.get(job_id)
+    loop = _queue_loops.get(job_id)
+    if queue is None or loop is None:
+        return
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        _share(job_id, message)
+    else:
+        _shares.submit(_share, job_id, message)
+    try:
+        loop.call_soon_threadsafe(queue.put_nowait, message)
+    except RuntimeError:
+        # Loop already closed (shutdown); nobody is listening any more
+        logger.debug(f"Dropped progress event for {job_id}: event loop closed")
+
+
+async def subscribe_progress(job_id: str) -> Optional[AsyncIterator[dict]]:
+    """
+    Events of a job, ending after its "done" event: from the local queue when the job
+    runs in this worker, else from its shared stream. None if no worker has the job.
+    """
+    queue = progress_queues.get(job_id)
+    if queue is not None:
+        async def from_queue():
+            while True:
+                msg = await queue.get()
+                yield msg
+                if msg.get("type") == "done":
+                    return
+        return from_queue()
+
+    state = get_shared_state()
+    if not await asyncio.to_thread(state.stream_exists, f"progress:{job_id}"):
+        return None
+
+    async def from_stream():
+        after = "0"
+        while True:
+            entries = await asyncio.to_thread(state.xread, f"progress:{job_id}", after)
+            for after, data in entries:
+                msg = json.loads(data)
+                if msg == _OPEN_MARKER:
+                    continue
+                yield msg
+                if msg.get("type") == "done":
+                    return
+            if not entries:
+                await asyncio.sleep(PROGRESS_POLL_SECONDS)
+    return from_stream()
@@ -0,0 +1,216 @@
+"""
+Encode tasks that can run on any machine sharing the data directory.
+
+A render task is one self-contained ffmpeg step with file paths in its params and
+its artifact written next to them:
+
+    encode_range   Normalize one range of a source video for a unified stream
+                   (ffmpeg_utils.normalize_range_args).
+    package_cmaf   Concatenate normalized ranges into CMAF fragments and an HLS manifest.
+    clip_cut       Cut a clip rendition (fragmented MP4) for on-demand playback.
+
+Artifacts are written to a .part file and renamed when complete, so a task that died
+half-way is simply redone.
+
+run_render_tasks() runs a batch of tasks and returns their results. With
+RENDER_TASKS=local (default) they run in this process; with RENDER_TASKS=queue each
+becomes a job in the jobs table, claimed by `python -m app.worker` processes (see
+app.worker), and the caller waits for all of them. The API's own job worker never
+claims render tasks.
+"""
+
+import asyncio
+import logging
+import os
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.dao import JobDAO
+from app.database import SessionLocal
+from app.ffmpeg_runner import FFmpegCancelled, FFmpegProgress, is_cancelled, run_ffmpeg
+from app.ffmpeg_scheduler import BATCH
+from app.ffmpeg_utils import cmaf_package_args, cut_video_segment, normalize_range_args
+from app.job_store import JobContext, cancel_job, create_job, job_handler
+
+logger = logging.getLogger(__name__)
+
+RENDER_TASK_MODES = ("local", "queue")
+RENDER_TASKS_MODE = os.getenv("RENDER_TASKS", "local").lower()
+if RENDER_TASKS_MODE not in RENDER_TASK_MODES:
+    logger.warning(f"Unknown RENDER_TASKS '{RENDER_TASKS_MODE}', using 'local'")
+    RENDER_TASKS_MODE = "local"
+
+# Seconds between checks of queued tasks, by the API waiting on them and by idle workers.
+RENDER_TASK_POLL_SECONDS = 0.25
+PACKAGE_TIMEOUT_SECONDS = 300.0
+
+ProgressCallback = Callable[[FFmpegProgress], None]
+
+
+class RenderTaskError(Exception):
+    """A render task failed; the message carries ffmpeg's error."""
+
+
+def _part_path(output: Path) -> Path:
+    return output.with_name(output.stem + ".part" + output.suffix)
+
+
+async def encode_range(params: Dict[str, Any], on_progress: Optional[ProgressCallback] = None,
+                       job_id: Optional[str] = None) -> Dict[str, Any]:
+    """params: source_path, start, end, output_path, job_class."""
+    output = Path(params["output_path"])
+    if output.exists():
+        return {"output_path": str(output), "reused": True}
+
+    start, end = float(params["start"]), float(params["end"])
+    part = _part_path(output)
+    try:
+        proc = await run_ffmpeg(normalize_range_args(params["source_path"], str(part), start, end - start),
+                                duration=end - start, on_progress=on_progress, job_id=job_id,
+                                job_class=params.get("job_class", BATCH))
+    except (FFmpegCancelled, asyncio.CancelledError):
+        part.unlink(missing_ok=True)
+        raise
+    if proc.returncode != 0:
+        part.unlink(missing_ok=True)
+        raise RenderTaskError(f"Encoding {start:.2f}-{end:.2f}s failed: {proc.stderr[-500:]}")
+    os.replace(part, output)
+    return {"output_path": str(output)}
+
+
+async def package_cmaf(params: Dict[str, Any], on_progress: Optional[ProgressCallback] = None,
+                       job_id: Optional[str] = None) -> Dict[str, Any]:
+    """params: out_dir, clips (file names in out_dir, in order), job_class."""
+    out_dir = Path(params["out_dir"])
+    with open(out_dir / "concat.txt", "w", encoding="utf-8") as f:
+        for name in params["clips"]:
+            f.write(f"file '{name}'\n")
+
+    proc = await run_ffmpeg(cmaf_package_args(), on_progress=on_progress, job_id=job_id,
+                            timeout=PACKAGE_TIMEOUT_SECONDS, cwd=str(out_dir),
+                            job_class=params.get("job_class", BATCH))
+    if proc.returncode != 0:
+        raise RenderTaskError(f"Packaging failed: {proc.stderr[-500:]}")
+    if not (out_dir / "manifest.m3u8").exists() or not (out_dir / "init.mp4").exists():
+        raise RenderTaskError("Packaging did not write manifest.m3u8 and init.mp4")
+    return {"segments": len(list(out_dir.glob("seg-*.m4s")))}
+
+
+async def clip_cut(params: Dict[str, Any], on_progress: Optional[ProgressCallback] = None,
+                   job_id: Optional[str] = None) -> Dict[str, Any]:
+    """params: source_path, start, end, output_path, timeout, fragmented, job_class."""
+    output = Path(params["output_path"])
+    if output.exists():
+        return {"output_path": str(output), "reused": True}
+
+    part = _part_path(output)
+    result = await asyncio.to_thread(
+        cut_video_segment,
+        params["source_path"],
+        str(part),
+        float(params["start"]),
+        float(params["end"]),
+        0,
+        params.get("timeout", 60.0),
+        params.get("fragmented", True),
+        params.get("job_class", BATCH)
+    )
+    if result.returncode != 0:
+        part.unlink(missing_ok=True)
+        raise RenderTaskError(f"Clip cut failed: {result.stderr[-500:]}")
+    os.replace(part, output)
+    return {"output_path": str(output)}
+
+
+RENDER_TASKS: Dict[str, Callable[..., Awaitable[Dict[str, Any]]]] = {
+    "encode_range": encode_range,
+    "package_cmaf": package_cmaf,
+    "clip_cut": clip_cut,
+}
+RENDER_TASK_KINDS = tuple(RENDER_TASKS)
+
+
+def _register_handler(kind: str, task: Callable[..., Awaitable[Dict[str, Any]]]) -> None:
+    @job_handler(kind)
+    async def run(job: JobContext):
+        def on_progress(p: FFmpegProgress):
+            if p.percent is not None:
+                job.update(p.percent)
+
+        result = await task(job.params, on_progress=on_progress, job_id=job.job_id)
+        job.update(100, force=True, **result)
+
+
+for _kind, _task in RENDER_TASKS.items():
+    _register_handler(_kind, _task)
+
+
+async def run_render_tasks(tasks: List[Tuple[str, Dict[str, Any]]],
+                           on_progress: Optional[Callable[[int, float], None]] = None,
+                           cancel_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Run render tasks concurrently and return their results in order.
+
+    Args:
+        tasks: (kind, params) pairs
+        on_progress: Called with (task index, percent) as tasks advance
+        cancel_id: ffmpeg_runner job id; cancel_ffmpeg(cancel_id) stops every task
+
+    Raises:
+        RenderTaskError: If a task failed; the others are cancelled
+        FFmpegCancelled: If cancel_id was cancelled
+    """
+    if RENDER_TASKS_MODE == "queue":
+        return await _run_queued(tasks, on_progress, cancel_id)
+
+    def progress_for(index: int) -> Optional[ProgressCallback]:
+        if not on_progress:
+            return None
+        return lambda p: on_progress(index, p.percent) if p.percent is not None else None
+
+    running = [asyncio.ensure_future(RENDER_TASKS[kind](params, on_progress=progress_for(i), job_id=cancel_id))
+               for i, (kind, params) in enumerate(tasks)]
+    try:
+        return await asyncio.gather(*running)
+    except BaseException:
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+        raise
+
+
+def _load_jobs(job_ids: List[str]):
+    db = SessionLocal()
+    try:
+        return JobDAO.get_by_ids(db, job_ids)
+    finally:
+        db.close()
+
+
+async def _run_queued(tasks: List[Tuple[str, Dict[str, Any]]],
+                      on_progress: Optional[Callable[[int, float], None]],
+                      cancel_id: Optional[str]) -> List[Dict[str, Any]]:
+    job_ids = await asyncio.to_thread(
+        lambda: [create_job(kind, params, message=f"Waiting for a render worker ({kind})") for kind, params in tasks])
+    logger.info(f"[Render] Queued {len(job_ids)} render tasks")
+    reported = [0.0] * len(job_ids)
+    try:
+        while True:
+            if is_cancelled(cancel_id):
+                raise FFmpegCancelled(f"Render tasks of {cancel_id} cancelled")
+            jobs = await asyncio.to_thread(_load_jobs, job_ids)
+            for i, job in enumerate(jobs):
+                if on_progress and (job.progress or 0.0) != reported[i]:
+                    reported[i] = job.progress or 0.0
+                    on_progress(i, reported[i])
+                if job.status in ("failed", "cancelled"):
+                    raise RenderTaskError(job.error_message or f"Render task {job.kind} was {job.status}")
+            if len(jobs) < len(job_ids):
+                raise RenderTaskError("Render task disappeared from the queue")
+            if all(job.status == "completed" for job in jobs):
+                return [job.get_result() for job in jobs]
+            await asyncio.sleep(RENDER_TASK_POLL_SECONDS)
+    except BaseException:
+        # cancel_job leaves finished jobs alone
+        await asyncio.to_thread(lambda: [cancel_job(job_id) for job_id in job_ids])
+        raise
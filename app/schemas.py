@@ -114,6 +114,21 @@ class SourceVideoResponse(BaseModel):
         from_attributes = True
 
 
+class SpeechInterval(BaseModel):
+    """Schema for a detected speech interval in source time."""
+    start: float
+    end: float
+
+
+class SpeechSegmentsResponse(BaseModel):
+    """Schema for voice activity detection results."""
+    source_video_id: str
+    audio_track: int
+    segments: List[SpeechInterval]
+    speech_duration: float
+    total_duration: float
+
+
 # ==================== TRANSCRIPT SEGMENT SCHEMAS ====================
 
 class Word(BaseModel):
@@ -264,6 +279,9 @@ class FinalizeRequest(BaseModel):
     resolution: Optional[str] = "1920x1080"
     codec: Optional[str] = "libx264"
     bitrate: Optional[str] = "5M"
+    # "standard" reuses the built preview stream when it matches the edit (stream copy);
+    # "high" always renders from the source.
+    quality: Optional[str] = "standard"
 
 
 class FinalizeResponse(BaseModel):
@@ -0,0 +1,110 @@
+"""
+Clip Rendition Service - Encodes virtual clips on demand.
+
+A virtual clip is only (source video, start, end); nothing is encoded at
+segmentation time. The first time a clip is played it is cut from the source
+into a small fragmented MP4 under tmp/clips/, which later requests (and later
+sessions) reuse. Playing a clip also prefetches the next few clips in order, so
+stepping through a video rarely waits on ffmpeg.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+from pathlib import Path
+from typing import Dict, List, Set, Tuple
+
+from app.ffmpeg_scheduler import INTERACTIVE
+from app.render_tasks import RenderTaskError, run_render_tasks
+from app.shared_state import shared_semaphore
+
+logger = logging.getLogger(__name__)
+
+RENDITION_ROOT = Path("tmp") / "clips"
+RENDITION_ROOT.mkdir(parents=True, exist_ok=True)
+
+# Clips after the one being played that are encoded ahead of time, and how many
+# of those prefetch encodes may run at once.
+CLIP_PREFETCH_COUNT = int(os.getenv("CLIP_PREFETCH_COUNT", "3"))
+CLIP_PREFETCH_WORKERS = 2
+RENDITION_TIMEOUT_SECONDS = 60.0
+
+_locks: Dict[str, asyncio.Lock] = {}
+_prefetch_semaphore = asyncio.Semaphore(CLIP_PREFETCH_WORKERS)
+_prefetch_tasks: Set[asyncio.Task] = set()
+
+
+def rendition_path(source_video_id: str, start_time: float, end_time: float) -> Path:
+    """Cache path of a clip's rendition; the video id prefix lets a video's renditions be deleted together."""
+    digest = hashlib.sha1(f"{source_video_id}:{start_time:.3f}-{end_time:.3f}".encode("utf-8")).hexdigest()[:16]
+    return RENDITION_ROOT / f"{source_video_id}_{digest}.mp4"
+
+
+async def ensure_rendition(source_video_id: str, source_path: str, start_time: float, end_time: float) -> Path:
+    """
+    Return the rendition of source_path[start_time:end_time], encoding it first if it
+    is not cached. Concurrent requests for the same clip share one encode.
+    """
+    path = rendition_path(source_video_id, start_time, end_time)
+    if path.exists():
+        return path
+
+    lock = _locks.setdefault(path.name, asyncio.Lock())
+    try:
+        # The local lock merges requests in this worker; the shared one keeps other workers
+        # from queueing the same encode
+        async with lock, shared_semaphore(f"rendition:{path.name}", 1):
+            if path.exists():
+                return path
+
+            logger.info(f"[Rendition] Encoding {source_video_id} {start_time:.2f}-{end_time:.2f}s -> {path.name}")
+            try:
+                await run_render_tasks([("clip_cut", {
+                    "source_path": os.path.abspath(source_path),
+                    "start": start_time,
+                    "end": end_time,
+                    "output_path": str(path.resolve()),
+                    "timeout": RENDITION_TIMEOUT_SECONDS,
+                    "fragmented": True,
+                    "job_class": INTERACTIVE,
+                })])
+            except RenderTaskError as e:
+                raise RuntimeError(f"Failed to encode clip rendition: {e}")
+        return path
+    finally:
+        # Also after a failed encode, so failed clips do not accumulate locks
+        if _locks.get(path.name) is lock and not lock.locked():
+            del _locks[path.name]
+
+
+def prefetch_renditions(source_video_id: str, source_path: str, ranges: List[Tuple[float, float]]) -> None:
+    """
+    Encode renditions for the given (start, end) ranges in the background.
+    Must be called from the event loop; failures are only logged.
+    """
+    for start_time, end_time in ranges:
+        if rendition_path(source_video_id, start_time, end_time).exists():
+            continue
+
+        async def prefetch(start_time=start_time, end_time=end_time):
+            async with _prefetch_semaphore:
+                try:
+                    await ensure_rendition(source_video_id, source_path, start_time, end_time)
+                except Exception as e:
+                    logger.warning(f"[Rendition] Prefetch of {source_video_id} "
+                                   f"{start_time:.2f}-{end_time:.2f}s failed: {e}")
+
+        task = asyncio.create_task(prefetch())
+        # Keep a reference so the task is not garbage collected mid-encode
+        _prefetch_tasks.add(task)
+        task.add_done_callback(_prefetch_tasks.discard)
+
+
+def delete_renditions_for_video(source_video_id: str) -> None:
+    """Delete every cached rendition of a source video."""
+    for path in RENDITION_ROOT.glob(f"{source_video_id}_*"):
+        try:
+            path.unlink()
+        except Exception as e:
+            logger.error(f"Failed to delete clip rendition {path}: {e}")
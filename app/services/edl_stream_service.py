@@ -1,19 +1,25 @@
 """
 EDL Stream Service - Builds a single continuous HLS (CMAF fMP4) stream for an Edit's EDL.
 Cache by EDL hash: tmp/edl/{hash}/manifest.m3u8
+
+A build is a set of render tasks (app.render_tasks): one encode_range per EDL range,
+run concurrently (on render workers with RENDER_TASKS=queue), then one package_cmaf
+that concatenates them into fragments and the manifest.
 """
 
-import asyncio
 import hashlib
 import json
 import logging
 import os
-import subprocess
+import time
 from dataclasses import dataclass
 from pathlib import Path
 from typing import List, Tuple, Optional
 
 from app.dao import EditDAO, SourceVideoDAO
+from app.ffmpeg_runner import FFmpegCancelled, clear_cancelled, run_ffmpeg
+from app.ffmpeg_scheduler import INTERACTIVE
+from app.render_tasks import RENDER_TASKS_MODE, RenderTaskError, run_render_tasks
 
 logger = logging.getLogger(__name__)
 
@@ -45,22 +51,188 @@ def _manifest_path(edl_hash: str) -> Path:
     return EDL_ROOT / edl_hash / "manifest.m3u8"
 
 
+def build_job_id(edl_hash: str) -> str:
+    """ffmpeg_runner job id of a build, for cancel_ffmpeg."""
+    return f"edl:{edl_hash}"
+
+
+def _write_status(edl_hash: str, status: str, **extra) -> None:
+    try:
+        _status_path(edl_hash).write_text(json.dumps({"status": status, "edl_hash": edl_hash, **extra}),
+                                          encoding="utf-8")
+    except Exception as e:
+        logger.warning(f"[EDL] Could not write status: {e}")
+
+
+class _BuildProgress:
+    """Writes the progress of a build's encode tasks into its status.json, at most twice a second."""
+
+    MIN_INTERVAL_SECONDS = 0.5
+
+    def __init__(self, edl_hash: str, durations: List[float]):
+        self.edl_hash = edl_hash
+        self.durations = durations
+        self.total = max(sum(durations), 1e-6)
+        self.percents = [0.0] * len(durations)
+        self._started = time.monotonic()
+        self._last_write = 0.0
+
+    def on_task_progress(self, index: int, percent: float) -> None:
+        """run_render_tasks callback: task index reached percent."""
+        self.percents[index] = percent
+        now = time.monotonic()
+        if now - self._last_write < self.MIN_INTERVAL_SECONDS:
+            return
+        self._last_write = now
+        out_time = sum(d * p / 100.0 for d, p in zip(self.durations, self.percents))
+        elapsed = now - self._started
+        # Seconds of output per second across all tasks, as a multiple of realtime
+        speed = out_time / elapsed if elapsed > 0 and out_time > 0 else None
+        _write_status(
+            self.edl_hash, "building",
+            progress=round(min(99.9, 100.0 * out_time / self.total), 1),
+            speed=round(speed, 2) if speed else None,
+            eta_seconds=round((self.total - out_time) / speed, 1) if speed else None,
+        )
+
+
+def find_ready_stream(source_video_id: str, ranges: List[Tuple[float, float]]) -> Optional[str]:
+    """Return the EDL hash if a unified stream for exactly these ranges is fully built, else None."""
+    edl_hash = _compute_edl_hash(source_video_id, ranges)
+    try:
+        status = json.loads(_status_path(edl_hash).read_text(encoding="utf-8")).get("status")
+    except Exception:
+        return None
+    if status == "ready" and _manifest_path(edl_hash).exists() and (EDL_ROOT / edl_hash / "init.mp4").exists():
+        return edl_hash
+    return None
+
+
+async def export_stream_to_mp4(edl_hash: str, output_path: str) -> bool:
+    """
+    Remux a built unified stream (init + fMP4 segments) into a progressive MP4 with
+    the moov atom up front. Stream copy only, so this takes seconds, not a re-encode.
+    """
+    manifest = _manifest_path(edl_hash)
+    cmd = [
+        "-y",
+        "-allowed_extensions", "ALL",
+        "-i", str(manifest),
+        "-map", "0",
+        "-c", "copy",
+        "-movflags", "+faststart",
+        output_path
+    ]
+    logger.info(f"[EDL] Remuxing {manifest} -> {output_path}")
+    proc = await run_ffmpeg(cmd)
+    if proc.returncode != 0:
+        logger.error(f"[EDL] Remux failed: {proc.stderr[-500:]}")
+        try:
+            os.remove(output_path)
+        except OSError:
+            pass
+        return False
+    logger.info(f"[EDL] Remux complete: {output_path}")
+    return True
+
+
+def _cancelled_build(edl_hash: str) -> EdlBuildResult:
+    """Record a cancelled build; render tasks remove their half-written files."""
+    logger.info(f"[EDL] Build {edl_hash} cancelled")
+    _write_status(edl_hash, "cancelled")
+    return EdlBuildResult(False, edl_hash, message="Cancelled")
+
+
+async def _render_stream(edl_hash: str, source_path: str, ranges: List[Tuple[float, float]]) -> EdlBuildResult:
+    """Encode every range and package them into the unified stream under EDL_ROOT/edl_hash."""
+    out_dir = (EDL_ROOT / edl_hash).resolve()
+    manifest = out_dir / "manifest.m3u8"
+    job_id = build_job_id(edl_hash)
+    clear_cancelled(job_id)
+    progress = _BuildProgress(edl_hash, [e - s for s, e in ranges])
+
+    # Step 1: Extract and normalize each range (clips left by an interrupted build are reused)
+    logger.info(f"[EDL] Extracting {len(ranges)} normalized clips ({RENDER_TASKS_MODE} render tasks)")
+    clip_names = [f"temp_{i:05d}.mp4" for i in range(len(ranges))]
+    encodes = [
+        ("encode_range", {
+            "source_path": os.path.abspath(source_path),
+            "start": s,
+            "end": e,
+            "output_path": str(out_dir / name),
+            "job_class": INTERACTIVE,
+        })
+        for (s, e), name in zip(ranges, clip_names)
+    ]
+    try:
+        await run_render_tasks(encodes, progress.on_task_progress, cancel_id=job_id)
+
+        # Step 2: Concat via demuxer and segment to HLS
+        logger.info(f"[EDL] Concat {len(clip_names)} clips via demuxer to HLS")
+        packaged = await run_render_tasks(
+            [("package_cmaf", {"out_dir": str(out_dir), "clips": clip_names, "job_class": INTERACTIVE})],
+            cancel_id=job_id
+        )
+    except FFmpegCancelled:
+        return _cancelled_build(edl_hash)
+    except RenderTaskError as e:
+        logger.error(f"[EDL] Build {edl_hash} failed: {e}")
+        _write_status(edl_hash, "failed", error=str(e))
+        return EdlBuildResult(False, edl_hash, message=str(e)[:200])
+
+    logger.info(f"[EDL] Build successful: {manifest}, {packaged[0]['segments']} segments, "
+                f"init size: {(out_dir / 'init.mp4').stat().st_size}")
+    _write_status(edl_hash, "ready")
+    return EdlBuildResult(True, edl_hash, message="Built")
+
+
+def _existing_build(edl_hash: str) -> Optional[EdlBuildResult]:
+    """The result for an already built stream, or None if it has to be (re)built."""
+    manifest = _manifest_path(edl_hash)
+    if manifest.exists() and (EDL_ROOT / edl_hash / "init.mp4").exists():
+        logger.info(f"[EDL] Already built: {manifest}")
+        _write_status(edl_hash, "ready")
+        return EdlBuildResult(True, edl_hash, message="Already built")
+    if manifest.exists():
+        logger.warning(f"[EDL] Manifest exists but init.mp4 missing, rebuilding: {manifest}")
+    return None
+
+
 async def build_unified_hls_for_edit(project_id: str, edit_id: str) -> EdlBuildResult:
     """
     Build continuous HLS for the edit's included, ordered EDL.
     Returns EdlBuildResult with edl_hash.
     """
     logger.info(f"[EDL] Starting build for project={project_id}, edit={edit_id}")
-    # Resolve EDL and source
-    from app.database import SessionLocal
-    db = SessionLocal()
-    try:
-        edit = EditDAO.get_with_decisions(db, edit_id)
+    resolved = await _resolve_edit_edl(project_id, edit_id)
+    if isinstance(resolved, EdlBuildResult):
+        return resolved
+    source_video_id, source_path, ranges = resolved
+
+    edl_hash = _compute_edl_hash(source_video_id, ranges)
+    logger.info(f"[EDL] Hash: {edl_hash}")
+    (EDL_ROOT / edl_hash).mkdir(parents=True, exist_ok=True)
+
+    # If already built, return
+    existing = _existing_build(edl_hash)
+    if existing:
+        return existing
+
+    # Write building status
+    _write_status(edl_hash, "building")
+    return await _render_stream(edl_hash, source_path, ranges)
+
+
+async def _resolve_edit_edl(project_id: str, edit_id: str):
+    """(source_video_id, source_path, ranges) of an edit's included clips, or a failed EdlBuildResult."""
+    from app.database import AsyncSessionLocal
+    async with AsyncSessionLocal() as db:
+        edit = await EditDAO.get_with_decisions_async(db, edit_id)
         if not edit or edit.project_id != project_id:
             logger.error(f"[EDL] Edit not found: {edit_id} in project {project_id}")
             return EdlBuildResult(False, edl_hash="", message="Edit not found in project")
 
-        src = SourceVideoDAO.get_by_id(db, edit.source_video_id)
+        src = await SourceVideoDAO.get_by_id_async(db, edit.source_video_id)
         if not src or not os.path.exists(src.file_path):
             logger.error(f"[EDL] Source video missing: {edit.source_video_id}")
             return EdlBuildResult(False, edl_hash="", message="Source video missing")
@@ -73,108 +245,7 @@ async def build_unified_hls_for_edit(project_id: str, edit_id: str) -> EdlBuildR
 
         logger.info(f"[EDL] Found {len(decisions)} clips to concat")
         ranges: List[Tuple[float, float]] = [(float(d.start_time), float(d.end_time)) for d in decisions]
-        edl_hash = _compute_edl_hash(edit.source_video_id, ranges)
-        logger.info(f"[EDL] Hash: {edl_hash}")
-        out_dir = EDL_ROOT / edl_hash
-        out_dir.mkdir(parents=True, exist_ok=True)
-        status_path = _status_path(edl_hash)
-        manifest = _manifest_path(edl_hash)
-
-        # If already built, return
-        init_path = out_dir / "init.mp4"
-        if manifest.exists() and init_path.exists():
-            logger.info(f"[EDL] Already built: {manifest}")
-            try:
-                status_path.write_text(json.dumps({"status": "ready", "edl_hash": edl_hash}), encoding="utf-8")
-            except Exception:
-                pass
-            return EdlBuildResult(True, edl_hash, message="Already built")
-        elif manifest.exists():
-            logger.warning(f"[EDL] Manifest exists but init.mp4 missing, rebuilding: {manifest}")
-
-        # Write building status
-        logger.info(f"[EDL] Writing building status to {status_path}")
-        try:
-            status_path.write_text(json.dumps({"status": "building", "edl_hash": edl_hash}), encoding="utf-8")
-        except Exception as e:
-            logger.warning(f"[EDL] Could not write status: {e}")
-
-        # Step 1: Extract and normalize each range to temp files
-        logger.info(f"[EDL] Extracting {len(ranges)} normalized clips")
-        temp_clips: List[Path] = []
-        for i, (s, e) in enumerate(ranges):
-            temp_clip = out_dir / f"temp_{i:05d}.mp4"
-            if temp_clip.exists():
-                temp_clips.append(temp_clip)
-                continue
-            
-            duration = e - s
-            extract_cmd = [
-                "ffmpeg", "-nostdin", "-y",
-                "-i", src.file_path,
-                "-ss", str(s), "-t", str(duration),
-                "-c:v", "libx264", "-pix_fmt", "yuv420p",
-                "-profile:v", "main", "-level", "4.1",
-                "-r", "30", "-g", "60", "-keyint_min", "60", "-sc_threshold", "0",
-                "-x264-params", "keyint=60:min-keyint=60:scenecut=0:open-gop=0",
-                "-vsync", "cfr",
-                "-c:a", "aac", "-ar", "48000", "-ac", "2", "-b:a", "128k",
-                "-fflags", "+genpts", "-avoid_negative_ts", "make_zero",
-                str(temp_clip)
-            ]
-            logger.info(f"[EDL] Extracting clip {i+1}/{len(ranges)}: {s:.2f}-{e:.2f}")
-            proc = await asyncio.to_thread(subprocess.run, extract_cmd, capture_output=True, text=True)
-            if proc.returncode != 0:
-                logger.error(f"[EDL] Clip {i} extraction failed: {proc.stderr}")
-                try:
-                    status_path.write_text(json.dumps({"status": "failed", "edl_hash": edl_hash, "error": proc.stderr}), encoding="utf-8")
-                except Exception:
-                    pass
-                return EdlBuildResult(False, edl_hash, message=f"Clip extraction failed: {proc.stderr}")
-            temp_clips.append(temp_clip)
-
-        # Step 2: Build concat list
-        concat_list = out_dir / "concat.txt"
-        with open(concat_list, "w", encoding="utf-8") as f:
-            for tc in temp_clips:
-                f.write(f"file '{tc.name}'\n")
-
-        logger.info(f"[EDL] Concat {len(temp_clips)} clips via demuxer to HLS")
-        
-        # Step 3: Concat via demuxer and segment to HLS
-        cmd = [
-            "ffmpeg", "-nostdin", "-y",
-            "-f", "concat", "-safe", "0", "-i", str(concat_list),
-            "-c", "copy",
-            # HLS CMAF segmentation
-            "-f", "hls",
-            "-hls_time", "0.5",
-            "-hls_playlist_type", "vod",
-            "-hls_segment_type", "fmp4",
-            "-hls_flags", "independent_segments",
-            "-hls_fmp4_init_filename", "init.mp4",
-            "-hls_segment_filename", str(out_dir / "seg-%05d.m4s"),
-            str(manifest)
-        ]
-
-        proc = await asyncio.to_thread(subprocess.run, cmd, capture_output=True, text=True)
-        if proc.returncode != 0:
-            logger.error(f"[EDL] FFmpeg failed: {proc.stderr}")
-            try:
-                status_path.write_text(json.dumps({"status": "failed", "edl_hash": edl_hash, "error": proc.stderr}), encoding="utf-8")
-            except Exception:
-                pass
-            return EdlBuildResult(False, edl_hash, message=f"FFmpeg failed: {proc.stderr}")
-
-        logger.info(f"[EDL] Build successful: {manifest}")
-        try:
-            status_path.write_text(json.dumps({"status": "ready", "edl_hash": edl_hash}), encoding="utf-8")
-        except Exception:
-            pass
-
-        return EdlBuildResult(True, edl_hash, message="Built")
-    finally:
-        db.close()
+        return edit.source_video_id, src.file_path, ranges
 
 
 async def build_unified_hls_from_ranges(source_video_id: str, source_path: str, ranges: List[Tuple[float, float]]) -> EdlBuildResult:
@@ -182,123 +253,11 @@ async def build_unified_hls_from_ranges(source_video_id: str, source_path: str,
     logger.info(f"[EDL] Building from ranges for video {source_video_id}, {len(ranges)} clips")
     
     edl_hash = _compute_edl_hash(source_video_id, ranges)
-    out_dir = EDL_ROOT / edl_hash
-    out_dir.mkdir(parents=True, exist_ok=True)
-    status_path = _status_path(edl_hash)
-    manifest = _manifest_path(edl_hash)
-    
-    init_path = out_dir / "init.mp4"
-    if manifest.exists() and init_path.exists():
-        logger.info(f"[EDL] Already built: {manifest}")
-        try:
-            status_path.write_text(json.dumps({"status": "ready", "edl_hash": edl_hash}), encoding="utf-8")
-        except Exception:
-            pass
-        return EdlBuildResult(True, edl_hash, message="Already built")
-    elif manifest.exists():
-        logger.warning(f"[EDL] Manifest exists but init.mp4 missing, rebuilding: {manifest}")
-    
-    try:
-        status_path.write_text(json.dumps({"status": "building", "edl_hash": edl_hash}), encoding="utf-8")
-    except Exception as e:
-        logger.warning(f"[EDL] Could not write status: {e}")
-    
-    # Extract and normalize each range
-    logger.info(f"[EDL] Extracting {len(ranges)} normalized clips")
-    temp_clips: List[Path] = []
-    for i, (s, e) in enumerate(ranges):
-        temp_clip = out_dir / f"temp_{i:05d}.mp4"
-        if temp_clip.exists():
-            temp_clips.append(temp_clip)
-            continue
-        
-        duration = e - s
-        extract_cmd = [
-            "ffmpeg", "-nostdin", "-y",
-            "-i", source_path,
-            "-ss", str(s), "-t", str(duration),
-            "-c:v", "libx264", "-pix_fmt", "yuv420p",
-            "-profile:v", "main", "-level", "4.1",
-            "-r", "30", "-g", "60", "-keyint_min", "60", "-sc_threshold", "0",
-            "-x264-params", "keyint=60:min-keyint=60:scenecut=0:open-gop=0",
-            "-vsync", "cfr",
-            "-c:a", "aac", "-ar", "48000", "-ac", "2", "-b:a", "128k",
-            "-fflags", "+genpts", "-avoid_negative_ts", "make_zero",
-            str(temp_clip)
-        ]
-        logger.info(f"[EDL] Extracting clip {i+1}/{len(ranges)}: {s:.2f}-{e:.2f}")
-        proc = await asyncio.to_thread(subprocess.run, extract_cmd, capture_output=True, text=True)
-        if proc.returncode != 0:
-            logger.error(f"[EDL] Clip {i} extraction failed: {proc.stderr}")
-            try:
-                status_path.write_text(json.dumps({"status": "failed", "edl_hash": edl_hash, "error": proc.stderr}), encoding="utf-8")
-            except Exception:
-                pass
-            return EdlBuildResult(False, edl_hash, message=f"Clip extraction failed")
-        temp_clips.append(temp_clip)
-    
-    # Build concat list
-    concat_list = out_dir / "concat.txt"
-    with open(concat_list, "w", encoding="utf-8") as f:
-        for tc in temp_clips:
-            f.write(f"file '{tc.name}'\n")
-    
-    logger.info(f"[EDL] Concat {len(temp_clips)} clips via demuxer to HLS")
-    
-    # Concat and segment to HLS (run from out_dir, so use relative paths)
-    cmd = [
-        "ffmpeg", "-nostdin", "-y",
-        "-f", "concat", "-safe", "0", "-i", "concat.txt",
-        "-c", "copy",
-        "-f", "hls",
-        "-hls_time", "0.5",
-        "-hls_playlist_type", "vod",
-        "-hls_segment_type", "fmp4",
-        "-hls_flags", "independent_segments",
-        "-hls_fmp4_init_filename", "init.mp4",
-        "-hls_segment_filename", "seg-%05d.m4s",
-        "manifest.m3u8"
-    ]
-    
-    logger.info(f"[EDL] Running concat command: {' '.join(cmd)}")
-    logger.info(f"[EDL] Working directory: {os.getcwd()}")
-    logger.info(f"[EDL] Output dir: {out_dir}")
-    logger.info(f"[EDL] Manifest path: {manifest}")
-    proc = await asyncio.to_thread(subprocess.run, cmd, capture_output=True, text=True, timeout=300, cwd=str(out_dir))
-    
-    logger.info(f"[EDL] FFmpeg returncode: {proc.returncode}")
-    if proc.stdout:
-        logger.info(f"[EDL] FFmpeg stdout: {proc.stdout[:500]}")
-    if proc.stderr:
-        logger.info(f"[EDL] FFmpeg stderr: {proc.stderr[:500]}")
-    
-    if proc.returncode != 0:
-        logger.error(f"[EDL] FFmpeg concat failed with code {proc.returncode}")
-        logger.error(f"[EDL] Full stderr: {proc.stderr}")
-        try:
-            status_path.write_text(json.dumps({"status": "failed", "edl_hash": edl_hash, "error": proc.stderr}), encoding="utf-8")
-        except Exception:
-            pass
-        return EdlBuildResult(False, edl_hash, message=f"Concat failed: {proc.stderr[:200]}")
-    
-    # Verify files were created
-    if not manifest.exists():
-        logger.error(f"[EDL] Manifest not created even though FFmpeg returned 0: {manifest}")
-        return EdlBuildResult(False, edl_hash, message="Manifest file not created")
-    
-    init_path = out_dir / "init.mp4"
-    if not init_path.exists():
-        logger.error(f"[EDL] init.mp4 not created: {init_path}")
-        return EdlBuildResult(False, edl_hash, message="Init file not created")
-    
-    seg_count = len(list(out_dir.glob("seg-*.m4s")))
-    logger.info(f"[EDL] Build successful: {manifest}, {seg_count} segments, init size: {init_path.stat().st_size}")
-    
-    try:
-        status_path.write_text(json.dumps({"status": "ready", "edl_hash": edl_hash}), encoding="utf-8")
-    except Exception:
-        pass
-    
-    return EdlBuildResult(True, edl_hash, message="Built")
+    (EDL_ROOT / edl_hash).mkdir(parents=True, exist_ok=True)
 
+    existing = _existing_build(edl_hash)
+    if existing:
+        return existing
 
+    _write_status(edl_hash, "building")
+    return await _render_stream(edl_hash, source_path, ranges)
@@ -6,10 +6,11 @@ Only applies to newly created videos/edits. Segments are cached under tmp/hls/{e
 
 import os
 import math
-import subprocess
 from pathlib import Path
 from typing import Tuple, List
 
+from app.ffmpeg_scheduler import INTERACTIVE, run_scheduled
+
 
 # Encoding parameters for uniform, seamless playback
 VIDEO_CODEC = "libx264"
@@ -110,7 +111,7 @@ def ensure_cmaf_for_decision(
         str(m3u8_path)
     ]
 
-    proc = subprocess.run(cmd, capture_output=True, text=True)
+    proc = run_scheduled(cmd, INTERACTIVE, capture_output=True, text=True)
     if proc.returncode != 0:
         raise RuntimeError(
             f"ffmpeg failed building CMAF for decision {decision_id}: {proc.stderr}"
@@ -12,14 +12,24 @@ from datetime import datetime
 
 from app.dao import ProjectDAO, SourceVideoDAO, TranscriptSegmentDAO, EditDAO, EditDecisionDAO
 from app.whisper_utils import transcribe_video
+from app.config import TranscriptionConfig
+from app import transcript_cache
 from app.gemini import generate_narrative_outline, select_segments_for_narrative
 from app.config import AppConfig
 
 logger = logging.getLogger(__name__)
 
 
+def _segment_rows(segments) -> List[Dict[str, Any]]:
+    """Plain copies of transcript segments, still readable after later commits expire the ORM objects."""
+    return [{'id': seg.id, 'start': seg.start_time, 'end': seg.end_time, 'text': seg.text} for seg in segments]
+
+
 class VideoProcessingService:
-    """Service for processing videos in the new project-based workflow."""
+    """
+    Service for processing videos in the new project-based workflow.
+    process_video_for_edit makes its queries on the sync session with asyncio.to_thread.
+    """
     
     def __init__(self, db):
         self.db = db
@@ -56,26 +66,33 @@ class VideoProcessingService:
         
         try:
             # Get source video
-            source_video = SourceVideoDAO.get_by_id(self.db, source_video_id)
+            source_video = await asyncio.to_thread(SourceVideoDAO.get_by_id, self.db, source_video_id)
             if not source_video or source_video.project_id != project_id:
                 raise ValueError(f"Source video {source_video_id} not found in project {project_id}")
+            source_path = source_video.file_path
             
             update_progress("init", "Starting video processing", 0)
             
             # Create the edit record
-            edit = EditDAO.create(
-                db=self.db,
-                project_id=project_id,
-                source_video_id=source_video_id,
-                name=edit_name,
-                user_prompt=user_prompt,
-                editing_settings=editing_settings or {}
-            )
+            def create_edit():
+                edit = EditDAO.create(
+                    db=self.db,
+                    project_id=project_id,
+                    source_video_id=source_video_id,
+                    name=edit_name,
+                    user_prompt=user_prompt,
+                    editing_settings=editing_settings or {}
+                )
+                return edit.id, edit.name
+            
+            edit_id, created_name = await asyncio.to_thread(create_edit)
             
-            update_progress("edit_created", f"Created edit: {edit.name}", 5)
+            update_progress("edit_created", f"Created edit: {created_name}", 5)
             
             # Check if transcript already exists
-            segments = TranscriptSegmentDAO.get_by_video(self.db, source_video_id)
+            segments = await asyncio.to_thread(
+                lambda: _segment_rows(TranscriptSegmentDAO.get_by_video(self.db, source_video_id))
+            )
             
             if not segments:
                 # Need to transcribe
@@ -86,25 +103,67 @@ class VideoProcessingService:
                 whisper_model = settings.get('whisper_model', 'medium')
                 language = settings.get('language', 'en')
                 audio_track = settings.get('audio_track', 0)
+                transcription_mode = settings.get('transcription_mode', 'per_segment')
+                num_workers = settings.get('transcription_workers') or TranscriptionConfig().num_workers
+                backend = TranscriptionConfig().backend
+                escalation_model = settings.get('escalation_model')
                 
-                # Transcribe the video
-                transcript_result = await asyncio.to_thread(
-                    transcribe_video,
-                    source_video.file_path,
+                # Map per-segment / per-chunk completion onto the 10-40% transcription band
+                last_percent = [10]
+                def on_transcription_progress(done: int, total: int, new_segments: list):
+                    percent = 10 + int(30 * done / max(total, 1))
+                    if percent > last_percent[0]:
+                        last_percent[0] = percent
+                        update_progress("transcription", f"Transcribing video... ({done}/{total})", percent)
+                
+                # Transcribe the video (or reuse a cached transcript of the same content and settings)
+                cache_key = await asyncio.to_thread(
+                    transcript_cache.build_key,
+                    source_path,
+                    audio_track=audio_track,
                     model_name=whisper_model,
                     language=language,
-                    audio_track=audio_track
+                    transcription_mode=transcription_mode,
+                    backend=backend,
+                    escalation_model=escalation_model,
+                    num_workers=num_workers
+                )
+                transcript_result, cache_hit = await asyncio.to_thread(
+                    transcript_cache.get_or_create,
+                    cache_key,
+                    lambda: transcribe_video(
+                        source_path,
+                        model_name=whisper_model,
+                        language=language,
+                        audio_track=audio_track,
+                        transcription_mode=transcription_mode,
+                        num_workers=num_workers,
+                        progress_callback=on_transcription_progress,
+                        backend=backend,
+                        escalation_model=escalation_model
+                    )
                 )
+                if cache_hit:
+                    update_progress("transcription", "Reusing cached transcript", 35)
                 
                 # Save transcript segments to database
                 segments_data = transcript_result.get('segments', [])
-                segments = TranscriptSegmentDAO.create_many(
+                segments = await asyncio.to_thread(lambda: _segment_rows(TranscriptSegmentDAO.create_many(
                     db=self.db,
                     source_video_id=source_video_id,
                     segments=segments_data
-                )
+                )))
                 
-                update_progress("transcription", f"Transcribed {len(segments)} segments", 40)
+                escalation = transcript_result.get('escalation')
+                if escalation:
+                    update_progress(
+                        "transcription",
+                        f"Transcribed {len(segments)} segments "
+                        f"({escalation['escalated_fraction'] * 100:.1f}% of speech re-transcribed with {escalation['escalation_model']})",
+                        40
+                    )
+                else:
+                    update_progress("transcription", f"Transcribed {len(segments)} segments", 40)
             else:
                 update_progress("transcription", f"Using existing transcript with {len(segments)} segments", 40)
             
@@ -115,9 +174,9 @@ class VideoProcessingService:
                 # Prepare segments for Gemini
                 segments_for_ai = [
                     {
-                        'start': seg.start_time,
-                        'end': seg.end_time,
-                        'text': seg.text
+                        'start': seg['start'],
+                        'end': seg['end'],
+                        'text': seg['text']
                     }
                     for seg in segments
                 ]
@@ -130,9 +189,10 @@ class VideoProcessingService:
                 )
                 
                 # Save narrative outline to edit
-                EditDAO.update(
+                await asyncio.to_thread(
+                    EditDAO.update,
                     db=self.db,
-                    edit_id=edit.id,
+                    edit_id=edit_id,
                     narrative_outline=narrative_outline
                 )
                 
@@ -154,7 +214,7 @@ class VideoProcessingService:
             else:
                 # No AI prompt - include all segments
                 selected_segments = [
-                    {'start': seg.start_time}
+                    {'start': seg['start']}
                     for seg in segments
                 ]
                 narrative_outline = []
@@ -164,7 +224,7 @@ class VideoProcessingService:
             update_progress("edl_creation", "Creating Edit Decision List...", 85)
             
             # Build EDL from selected segments
-            segment_map = {seg.start_time: seg for seg in segments}
+            segment_map = {seg['start']: seg for seg in segments}
             
             decisions_data = []
             for idx, selected in enumerate(selected_segments):
@@ -177,32 +237,33 @@ class VideoProcessingService:
                     pad_after = editing_settings.get('pad_after_seconds', 0.0) if editing_settings else 0.0
                     
                     decisions_data.append({
-                        'segment_id': segment.id,
+                        'segment_id': segment['id'],
                         'source_video_id': source_video_id,
                         'order_index': idx,
-                        'start_time': max(0, segment.start_time - pad_before),
-                        'end_time': segment.end_time + pad_after,
-                        'transcript_text': segment.text,
+                        'start_time': max(0, segment['start'] - pad_before),
+                        'end_time': segment['end'] + pad_after,
+                        'transcript_text': segment['text'],
                         'is_ai_selected': bool(user_prompt),
                         'is_included': True
                     })
             
             # Save EDL to database
             if decisions_data:
-                EditDecisionDAO.create_many(self.db, edit.id, decisions_data)
+                await asyncio.to_thread(EditDecisionDAO.create_many, self.db, edit_id, decisions_data)
             
             update_progress("edl_creation", f"Created EDL with {len(decisions_data)} clips", 95)
             
             # Mark AI processing as complete
-            EditDAO.update(
+            await asyncio.to_thread(
+                EditDAO.update,
                 db=self.db,
-                edit_id=edit.id,
+                edit_id=edit_id,
                 ai_processing_complete=True
             )
             
             update_progress("complete", "Processing complete!", 100)
             
-            return edit.id
+            return edit_id
             
         except Exception as e:
             logger.error(f"Error processing video: {e}", exc_info=True)
@@ -7,10 +7,13 @@ import os
 import json
 import logging
 import asyncio
-from typing import List, Dict, Any, Optional, Tuple
+import subprocess
+from typing import List, Dict, Any, Optional, Tuple, Callable
 from dataclasses import dataclass
 from pathlib import Path
 
+from app.ffmpeg_scheduler import run_scheduled
+
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -103,12 +106,24 @@ class VideoProcessingService:
         """Generate transcript using existing Whisper implementation."""
         # Import and use existing whisper utilities
         from app.whisper_utils import transcribe_audio_with_word_timestamps
+        from app.config import TranscriptionConfig
         
         if on_progress:
             on_progress(10, "Extracting audio...")
         
-        # Extract audio for transcription
-        audio_path = await cls._extract_audio(video_path)
+        from app import transcript_cache
+        
+        cache_key = await asyncio.to_thread(cls.transcript_cache_key, video_path)
+        transcript_result = await asyncio.to_thread(transcript_cache.get, cache_key)
+        if transcript_result is not None:
+            if on_progress:
+                on_progress(70, "Reusing cached transcript...")
+            return transcript_result
+        
+        config = TranscriptionConfig()
+        # Streaming reads the track through an ffmpeg pipe window by window; otherwise the
+        # decoded audio comes from the shared cache (decoded once per source and track)
+        audio = None if config.streaming else await cls._extract_audio(video_path)
         
         if on_progress:
             on_progress(30, "Transcribing audio...")
@@ -116,14 +131,15 @@ class VideoProcessingService:
         # Transcribe with word-level timestamps
         transcript_result = await asyncio.to_thread(
             transcribe_audio_with_word_timestamps,
-            audio_path=audio_path,
+            audio_path=video_path,
             language="en",  # Default to English, could be made configurable
-            model_name="base"  # Default to base model, could be made configurable
+            model_name="base",  # Default to base model, could be made configurable
+            audio=audio,
+            num_workers=config.num_workers,
+            backend=config.backend,
+            streaming=config.streaming
         )
-        
-        # Clean up temporary audio file
-        if os.path.exists(audio_path):
-            os.unlink(audio_path)
+        await asyncio.to_thread(transcript_cache.put, cache_key, transcript_result)
         
         if on_progress:
             on_progress(70, "Processing transcript data...")
@@ -131,31 +147,83 @@ class VideoProcessingService:
         return transcript_result
     
     @classmethod
-    async def _extract_audio(cls, video_path: str) -> str:
-        """Extract audio from video for transcription."""
-        import tempfile
-        import subprocess
+    def transcript_cache_key(cls, video_path: str):
+        """Cache key for the word-level transcript this service produces (also identifies checkpoints)."""
+        from app import transcript_cache
         
-        # Create temporary audio file
-        temp_audio = tempfile.NamedTemporaryFile(suffix='.wav', delete=False)
-        temp_audio.close()
+        from app.config import TranscriptionConfig
         
-        # Extract audio using ffmpeg
-        cmd = [
-            'ffmpeg', '-i', video_path,
-            '-vn',  # No video
-            '-acodec', 'pcm_s16le',  # Audio codec
-            '-ar', '16000',  # Sample rate
-            '-ac', '1',  # Mono
-            '-y',  # Overwrite output file
-            temp_audio.name
-        ]
+        config = TranscriptionConfig()
+        return transcript_cache.build_key(video_path, model_name="base", language="en", kind="words",
+                                          backend=config.backend, streaming=config.streaming,
+                                          num_workers=config.num_workers)
+    
+    @classmethod
+    async def transcribe_incrementally(
+        cls,
+        video_path: str,
+        on_segments: Callable[[List[TranscriptSegment], float, float], None],
+        start_offset: float = 0.0
+    ) -> int:
+        """
+        Transcribe a video chunk by chunk, handing each batch of segments to on_segments
+        as soon as it is ready instead of after the whole video.
         
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        if result.returncode != 0:
-            raise Exception(f"Audio extraction failed: {result.stderr}")
+        Args:
+            video_path: Path to the video file
+            on_segments: Callable(segments, processed_until, total_duration), called from a
+                         worker thread once per chunk in source order
+            start_offset: Resume point in seconds; earlier audio is not transcribed again
+            
+        Returns:
+            Number of segments delivered
+        """
+        from app.whisper_utils import transcribe_words_incrementally
+        from app.config import TranscriptionConfig
+        from app import transcript_cache
+        
+        cache_key = await asyncio.to_thread(cls.transcript_cache_key, video_path)
+        cached_words = await asyncio.to_thread(transcript_cache.get, cache_key)
+        if cached_words is not None:
+            words = [w for w in cached_words if w['start'] >= start_offset]
+            segments = cls._convert_to_transcript_segments(words)
+            total = max((w['end'] for w in cached_words), default=start_offset)
+            await asyncio.to_thread(on_segments, segments, total, total)
+            return len(segments)
+        
+        delivered = 0
         
-        return temp_audio.name
+        def on_chunk(words, processed_until, total_duration):
+            nonlocal delivered
+            segments = cls._convert_to_transcript_segments(words)
+            delivered += len(segments)
+            on_segments(segments, processed_until, total_duration)
+        
+        words = await asyncio.to_thread(
+            transcribe_words_incrementally,
+            audio_path=video_path,
+            language="en",
+            model_name="base",
+            start_offset=start_offset,
+            num_workers=TranscriptionConfig().num_workers,
+            on_chunk=on_chunk,
+            backend=TranscriptionConfig().backend,
+            streaming=TranscriptionConfig().streaming
+        )
+        # Only a run that covered the whole video yields a complete transcript to cache
+        if start_offset <= 0:
+            await asyncio.to_thread(transcript_cache.put, cache_key, words)
+        return delivered
+    
+    @classmethod
+    async def _extract_audio(cls, video_path: str):
+        """Get 16 kHz mono samples of the first audio track from the decoded-audio cache."""
+        from app.audio_cache import get_pcm
+        
+        try:
+            return await asyncio.to_thread(get_pcm, video_path, 0)
+        except subprocess.CalledProcessError as e:
+            raise Exception(f"Audio extraction failed: {e.stderr}")
     
     @classmethod
     def _convert_to_transcript_segments(cls, words_data: List[Dict[str, Any]]) -> List[TranscriptSegment]:
@@ -333,7 +401,7 @@ class VideoProcessingService:
             clip_path
         ]
         
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        result = run_scheduled(cmd, capture_output=True, text=True)
         if result.returncode != 0:
             raise Exception(f"Clip extraction failed: {result.stderr}")
         
@@ -6,16 +6,35 @@ import os
 import uuid
 import logging
 import asyncio
+import shutil
 from pathlib import Path
 from typing import List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass
 
-from app.ffmpeg_utils import cut_video_segment
+from app.ffmpeg_utils import split_video_args
+from app.ffmpeg_runner import run_ffmpeg
+from app.render_tasks import RenderTaskError, run_render_tasks
 from app.dao import TranscriptSegmentDAO
 from app.models import TranscriptSegment
 
 logger = logging.getLogger(__name__)
 
+# Concurrent clip encodes; app.ffmpeg_scheduler still caps them and sets their threads.
+CLIP_WORKERS = int(os.getenv("CLIP_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+CLIP_MAX_ATTEMPTS = 3
+CLIP_TIMEOUT_SECONDS = 60.0
+
+# "per_clip" decodes the source once per clip; "single_pass" encodes it once and
+# splits it at every segment boundary with the ffmpeg segment muxer; "virtual"
+# encodes nothing up front and leaves each clip to be rendered when first played
+# (see clip_rendition_service).
+SEGMENTATION_MODES = ("per_clip", "single_pass", "virtual")
+SEGMENTATION_MODE = os.getenv("CLIP_SEGMENTATION_MODE", "per_clip")
+# Shortest segment worth a clip, and the smallest gap the one-pass split will cut
+# out between two segments (closer boundaries could land on the same frame).
+MIN_CLIP_SECONDS = 0.1
+MIN_SPLIT_GAP_SECONDS = 0.05
+
 @dataclass
 class VideoClip:
     """Represents a video clip segment."""
@@ -36,26 +55,73 @@ class SegmentationResult:
     error_message: Optional[str] = None
     processing_time: float = 0.0
 
+def plan_single_pass(
+    pending: List[Tuple[int, TranscriptSegment]]
+) -> Tuple[List[Tuple[int, TranscriptSegment]], List[Tuple[int, TranscriptSegment]]]:
+    """
+    Split (order_index, segment) pairs into those that tile the timeline without
+    overlapping, which one split of the source can produce, and the rest.
+    
+    Segments are taken in start order; one that starts before the previous one ends,
+    or so shortly after it that the cuts could share a frame, goes to the rest.
+    Segments too short for a clip are left to the per-clip encoder, which skips them.
+    """
+    tiling, leftover = [], []
+    last_end = None
+    for item in sorted(pending, key=lambda p: (p[1].start_time, p[1].end_time)):
+        segment = item[1]
+        gap = None if last_end is None else segment.start_time - last_end
+        if (segment.end_time - segment.start_time < MIN_CLIP_SECONDS
+                or (gap is not None and (gap < 0 or 0 < gap < MIN_SPLIT_GAP_SECONDS))):
+            leftover.append(item)
+            continue
+        tiling.append(item)
+        last_end = segment.end_time
+    return tiling, leftover
+
 class VideoSegmentationService:
     """
     Service for segmenting videos into clips based on transcript segments.
     """
     
-    def __init__(self, clips_dir: str = "clips"):
+    def __init__(self, clips_dir: str = "clips", max_workers: int = CLIP_WORKERS, mode: str = SEGMENTATION_MODE):
+        if mode not in SEGMENTATION_MODES:
+            raise ValueError(f"Unknown segmentation mode '{mode}'. Expected one of {SEGMENTATION_MODES}.")
         self.clips_dir = Path(clips_dir)
         self.clips_dir.mkdir(exist_ok=True)
+        self.max_workers = max(1, max_workers)
+        self.mode = mode
     
     async def segment_video_for_editing(
         self,
         source_video_id: str,
         video_path: str,
-        on_progress: Optional[callable] = None
+        on_progress: Optional[callable] = None,
+        on_clip_ready: Optional[callable] = None
     ) -> SegmentationResult:
         """
         Segment a video into clips based on transcript segments.
+        
+        Clips are encoded concurrently, at most max_workers at a time. Progress counts
+        finished clips rather than started ones, and each clip is retried up to
+        CLIP_MAX_ATTEMPTS times before it is skipped. on_clip_ready(clip), if given, is
+        called as soon as each clip is written so it can be played before the rest finish.
+        
+        In "single_pass" mode the segments that tile the timeline are cut from one
+        encode of the source instead; gaps between them are dropped, and overlapping
+        segments are encoded individually in a second pass. In "virtual" mode no clip is
+        encoded at all: clips carry an empty file_path and are rendered when first played.
         """
         logger.info(f"Starting video segmentation for video {source_video_id}")
         
+        if on_progress:
+            # A fallback pass re-encodes clips a failed one-pass split had counted; never report less
+            report, reported = on_progress, [0]
+            
+            def on_progress(percent: int, message: str):
+                reported[0] = max(reported[0], percent)
+                report(reported[0], message)
+        
         try:
             if on_progress:
                 on_progress(10, "Loading transcript segments...")
@@ -89,33 +155,47 @@ class VideoSegmentationService:
                 if on_progress:
                     on_progress(20, f"Processing {len(segments)} segments...")
                 
-                clips = []
-                for i, segment in enumerate(segments):
+                pending = list(enumerate(segments))
+                clips: List[VideoClip] = []
+                
+                def clip_done(clip: VideoClip):
+                    clips.append(clip)
+                    logger.info(f"Created clip {clip.order_index+1}/{len(segments)}: {clip.id}")
+                    if on_clip_ready:
+                        on_clip_ready(clip)
+                
+                if self.mode == "virtual":
+                    for i, segment in pending:
+                        if segment.end_time - segment.start_time < MIN_CLIP_SECONDS:
+                            continue
+                        clip_done(VideoClip(
+                            id=str(uuid.uuid4()),
+                            segment_id=segment.id,
+                            source_video_id=source_video_id,
+                            start_time=segment.start_time,
+                            end_time=segment.end_time,
+                            file_path="",  # Rendered on first play
+                            duration=segment.end_time - segment.start_time,
+                            order_index=i
+                        ))
+                    pending = []
+                
+                if self.mode == "single_pass":
                     if on_progress:
-                        progress = 20 + (i / len(segments)) * 70
-                        on_progress(int(progress), f"Creating clip {i+1}/{len(segments)}...")
-                    
-                    try:
-                        # Create clip with timeout
-                        clip = await asyncio.wait_for(
-                            self._create_clip(
-                                source_video_id=source_video_id,
-                                segment=segment,
-                                video_path=video_path,
-                                order_index=i
-                            ),
-                            timeout=60.0  # 60 second timeout per clip
-                        )
-                        clips.append(clip)
-                        logger.info(f"Successfully created clip {i+1}/{len(segments)}: {clip.id}")
-                    except asyncio.TimeoutError:
-                        logger.error(f"Timeout creating clip {i+1}/{len(segments)} for segment {segment.id}")
-                        # Continue with other clips instead of failing completely
-                        continue
-                    except Exception as e:
-                        logger.error(f"Error creating clip {i+1}/{len(segments)} for segment {segment.id}: {str(e)}")
-                        # Continue with other clips instead of failing completely
-                        continue
+                        on_progress(20, f"Encoding {len(segments)} segments in one pass...")
+                    pending = await self._split_in_one_pass(source_video_id, video_path, pending, len(segments),
+                                                            clip_done, on_progress)
+                    if pending:
+                        logger.info(f"{len(pending)} overlapping or unsplittable segments left for a second pass")
+                
+                if pending:
+                    await self._encode_individually(source_video_id, video_path, pending, len(segments),
+                                                    clip_done, on_progress)
+                
+                clips.sort(key=lambda c: c.order_index)
+                failed = len(segments) - len(clips)
+                if failed:
+                    logger.warning(f"{failed}/{len(segments)} clips could not be created")
                 
                 if on_progress:
                     on_progress(100, "Video segmentation complete!")
@@ -137,6 +217,129 @@ class VideoSegmentationService:
                 error_message=str(e)
             )
     
+    async def _encode_individually(
+        self,
+        source_video_id: str,
+        video_path: str,
+        pending: List[Tuple[int, TranscriptSegment]],
+        total: int,
+        clip_done: callable,
+        on_progress: Optional[callable] = None
+    ) -> None:
+        """Encode one clip per segment, at most max_workers at a time, with retries."""
+        semaphore = asyncio.Semaphore(self.max_workers)
+        
+        async def create_with_retries(i: int, segment: TranscriptSegment) -> Optional[VideoClip]:
+            async with semaphore:
+                for attempt in range(1, CLIP_MAX_ATTEMPTS + 1):
+                    try:
+                        return await self._create_clip(
+                            source_video_id=source_video_id,
+                            segment=segment,
+                            video_path=video_path,
+                            order_index=i
+                        )
+                    except ValueError as e:
+                        # Not retryable (e.g. segment too short)
+                        logger.warning(f"Skipping clip {i+1}/{total} for segment {segment.id}: {e}")
+                        return None
+                    except Exception as e:
+                        logger.warning(f"Attempt {attempt}/{CLIP_MAX_ATTEMPTS} creating clip {i+1}/{total} "
+                                       f"for segment {segment.id} failed: {str(e)}")
+                        if attempt < CLIP_MAX_ATTEMPTS:
+                            await asyncio.sleep(0.5 * attempt)
+                logger.error(f"Giving up on clip {i+1}/{total} for segment {segment.id}")
+                return None
+        
+        logger.info(f"Encoding {len(pending)} clips with up to {self.max_workers} concurrent workers")
+        tasks = [asyncio.create_task(create_with_retries(i, segment)) for i, segment in pending]
+        done = 0
+        try:
+            for finished in asyncio.as_completed(tasks):
+                clip = await finished
+                done += 1
+                if clip:
+                    clip_done(clip)
+                if on_progress:
+                    # Segments before this pass (cut by the one-pass split) already count as done
+                    completed_count = total - len(pending) + done
+                    on_progress(int(20 + (completed_count / total) * 70), f"Created {completed_count}/{total} clips...")
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    async def _split_in_one_pass(
+        self,
+        source_video_id: str,
+        video_path: str,
+        pending: List[Tuple[int, TranscriptSegment]],
+        total: int,
+        clip_done: callable,
+        on_progress: Optional[callable] = None
+    ) -> List[Tuple[int, TranscriptSegment]]:
+        """
+        Cut every segment that tiles the timeline from a single encode of the source.
+        
+        Encoding progress is reported through on_progress within 20-90%, in proportion
+        to this pass's share of the segments, so a second pass continues from it.
+        
+        Returns the segments this pass did not produce (overlaps, or everything when
+        the split fails) for the per-clip encoder.
+        """
+        tiling, leftover = plan_single_pass(pending)
+        if not tiling:
+            return leftover
+        
+        span_start = tiling[0][1].start_time
+        span_end = tiling[-1][1].end_time
+        starts = [span_start]
+        for _, segment in tiling:
+            for t in (segment.start_time, segment.end_time):
+                if t > starts[-1]:
+                    starts.append(t)
+        cut_times = starts[1:-1]  # The last tiling segment ends the span
+        
+        work_dir = self.clips_dir / f".split_{source_video_id}_{uuid.uuid4().hex[:8]}"
+        work_dir.mkdir(parents=True, exist_ok=True)
+        try:
+            def encode_progress(p):
+                if on_progress and p.percent is not None:
+                    on_progress(int(20 + 0.7 * p.percent * len(tiling) / total),
+                                f"Encoding segments in one pass: {p.percent:.0f}%"
+                                + (f" ({p.speed:.1f}x, ~{p.eta_seconds:.0f}s left)" if p.speed and p.eta_seconds is not None else ""))
+            
+            logger.info(f"Splitting {source_video_id} {span_start}s-{span_end}s into {len(cut_times) + 1} pieces in one pass")
+            result = await run_ffmpeg(
+                split_video_args(video_path, str(work_dir / "piece_%05d.mp4"), span_start, span_end, cut_times),
+                duration=span_end - span_start,
+                on_progress=encode_progress
+            )
+            pieces = sorted(work_dir.glob("piece_*.mp4"))
+            if result.returncode != 0 or len(pieces) != len(cut_times) + 1:
+                logger.warning(f"One-pass split produced {len(pieces)} of {len(cut_times) + 1} pieces "
+                               f"(ffmpeg exit {result.returncode}); encoding those clips individually")
+                return pending
+            
+            piece_index = {t: k for k, t in enumerate(starts)}
+            for order_index, segment in tiling:
+                clip_id = str(uuid.uuid4())
+                clip_path = self.clips_dir / f"clip_{source_video_id}_{segment.id}_{clip_id}.mp4"
+                os.replace(pieces[piece_index[segment.start_time]], clip_path)
+                clip_done(VideoClip(
+                    id=clip_id,
+                    segment_id=segment.id,
+                    source_video_id=source_video_id,
+                    start_time=segment.start_time,
+                    end_time=segment.end_time,
+                    file_path=str(clip_path),
+                    duration=segment.end_time - segment.start_time,
+                    order_index=order_index
+                ))
+            return leftover
+        finally:
+            # Whatever is left are the gaps between segments
+            shutil.rmtree(work_dir, ignore_errors=True)
+    
     async def _create_clip(
         self,
         source_video_id: str,
@@ -155,21 +358,22 @@ class VideoSegmentationService:
         
         # Skip very short segments that might cause FFmpeg issues
         duration = segment.end_time - segment.start_time
-        if duration < 0.1:  # Skip segments shorter than 0.1 seconds
+        if duration < MIN_CLIP_SECONDS:  # Skip segments shorter than 0.1 seconds
             logger.warning(f"Skipping very short segment: {duration}s")
-            raise Exception(f"Segment too short: {duration}s")
-        
-        # Use ffmpeg to cut the video segment
-        result = await asyncio.to_thread(
-            cut_video_segment,
-            video_path,
-            str(clip_path),
-            segment.start_time,
-            segment.end_time
-        )
+            raise ValueError(f"Segment too short: {duration}s")
         
-        if result.returncode != 0:
-            raise Exception(f"Failed to create clip: {result.stderr}")
+        # Use ffmpeg to cut the video segment (on a render worker with RENDER_TASKS=queue)
+        try:
+            await run_render_tasks([("clip_cut", {
+                "source_path": os.path.abspath(video_path),
+                "start": segment.start_time,
+                "end": segment.end_time,
+                "output_path": str(clip_path.resolve()),
+                "timeout": CLIP_TIMEOUT_SECONDS,
+                "fragmented": False,
+            })])
+        except RenderTaskError as e:
+            raise Exception(f"Failed to create clip: {e}")
         
         # Calculate clip duration
         duration = segment.end_time - segment.start_time
@@ -190,7 +394,9 @@ class VideoSegmentationService:
         return f"/api/projects/{project_id}/clips/{clip_id}/play"
     
     def delete_clips_for_video(self, source_video_id: str):
-        """Delete all clips for a source video."""
+        """Delete all clips for a source video, including on-demand renditions."""
+        from app.services.clip_rendition_service import delete_renditions_for_video
+        delete_renditions_for_video(source_video_id)
         clip_files = self.clips_dir.glob(f"clip_{source_video_id}_*")
         for clip_file in clip_files:
             try:
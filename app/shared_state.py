@@ -0,0 +1,391 @@
+"""
+State and coordination shared by every worker process.
+
+Anything two uvicorn workers (or two hosts) must agree on goes through the
+SharedState backend picked by SHARED_STATE_URL instead of module-level dicts
+and asyncio primitives:
+
+    hashes     String maps, e.g. the file_id -> upload path store (SharedMapping).
+    streams    Append-only event logs with ids, e.g. progress events, so an SSE
+               client can follow a job running in another worker.
+    leases     Counting semaphores (shared_semaphore) whose slots are leases that
+               expire unless renewed, so a crashed worker cannot hold one forever.
+
+Backends:
+    sqlite:///path/to/state.db  Default (data/shared_state.db). Workers on one host
+                                coordinate through SQLite's file lock in WAL mode.
+    redis://host:6379/0         Any Redis-protocol server, for several hosts; a local
+                                redis-server or Valkey also stands in for one in
+                                development. Optional dependency: pip install redis
+
+The API is synchronous and every call is short; code on the event loop may call it
+directly, except shared_semaphore, which waits for a slot without blocking the loop.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections.abc import MutableMapping
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_DATA_DIR = os.getenv("DATA_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), "data"))
+SHARED_STATE_URL = os.getenv("SHARED_STATE_URL", f"sqlite:///{os.path.join(_DATA_DIR, 'shared_state.db')}")
+
+# Seconds a semaphore slot stays held without renewal; holders renew every third of it.
+LEASE_TTL_SECONDS = 30.0
+# Seconds between attempts to take a full semaphore.
+LEASE_POLL_SECONDS = 0.05
+
+
+class SharedState(ABC):
+    """A store visible to every worker. Keys and values are strings."""
+
+    # --- Hashes ---
+
+    @abstractmethod
+    def hget(self, name: str, key: str) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    def hset(self, name: str, key: str, value: str) -> None:
+        ...
+
+    @abstractmethod
+    def hdel(self, name: str, key: str) -> bool:
+        """Delete a field; returns whether it existed."""
+
+    @abstractmethod
+    def hgetall(self, name: str) -> Dict[str, str]:
+        ...
+
+    # --- Streams ---
+
+    @abstractmethod
+    def xadd(self, name: str, data: str, ttl: Optional[float] = None) -> str:
+        """Append an entry and return its id. ttl (re)sets the stream's expiry in seconds."""
+
+    @abstractmethod
+    def xread(self, name: str, after: str = "0", count: int = 100) -> List[Tuple[str, str]]:
+        """Entries (id, data) appended after the entry with id after, oldest first."""
+
+    @abstractmethod
+    def stream_exists(self, name: str) -> bool:
+        ...
+
+    @abstractmethod
+    def delete_stream(self, name: str) -> None:
+        ...
+
+    # --- Leases ---
+
+    @abstractmethod
+    def acquire_lease(self, name: str, limit: int, holder: str, ttl: float) -> bool:
+        """Take one of limit slots of name for holder, unless all are held by unexpired leases."""
+
+    @abstractmethod
+    def renew_lease(self, name: str, holder: str, ttl: float) -> bool:
+        """Extend holder's lease; False if it already expired and was lost."""
+
+    @abstractmethod
+    def release_lease(self, name: str, holder: str) -> None:
+        ...
+
+    @abstractmethod
+    def lease_count(self, name: str) -> int:
+        """Unexpired leases held on name."""
+
+
+class SQLiteSharedState(SharedState):
+    """Single-host backend: one SQLite file in WAL mode, one connection per thread."""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._local = threading.local()
+        self._conn().executescript("""
+            CREATE TABLE IF NOT EXISTS hashes (
+                name TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,
+                PRIMARY KEY (name, key));
+            CREATE TABLE IF NOT EXISTS streams (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, data TEXT NOT NULL);
+            CREATE INDEX IF NOT EXISTS idx_streams_name ON streams (name, id);
+            CREATE TABLE IF NOT EXISTS stream_expiry (
+                name TEXT PRIMARY KEY, expires_at REAL NOT NULL);
+            CREATE TABLE IF NOT EXISTS leases (
+                name TEXT NOT NULL, holder TEXT NOT NULL, expires_at REAL NOT NULL,
+                PRIMARY KEY (name, holder));
+        """)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    class _Transaction:
+        # BEGIN IMMEDIATE takes the database's write lock up front, so read-then-write
+        # sequences (lease counting) are atomic across processes.
+        def __init__(self, conn: sqlite3.Connection):
+            self.conn = conn
+
+        def __enter__(self) -> sqlite3.Connection:
+            self.conn.execute("BEGIN IMMEDIATE")
+            return self.conn
+
+        def __exit__(self, exc_type, exc, tb) -> None:
+            self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+
+    def _transaction(self) -> "_Transaction":
+        return self._Transaction(self._conn())
+
+    def hget(self, name: str, key: str) -> Optional[str]:
+        row = self._conn().execute("SELECT value FROM hashes WHERE name = ? AND key = ?", (name, key)).fetchone()
+        return row[0] if row else None
+
+    def hset(self, name: str, key: str, value: str) -> None:
+        self._conn().execute("INSERT OR REPLACE INTO hashes (name, key, value) VALUES (?, ?, ?)", (name, key, value))
+
+    def hdel(self, name: str, key: str) -> bool:
+        return self._conn().execute("DELETE FROM hashes WHERE name = ? AND key = ?", (name, key)).rowcount > 0
+
+    def hgetall(self, name: str) -> Dict[str, str]:
+        return dict(self._conn().execute("SELECT key, value FROM hashes WHERE name = ?", (name,)).fetchall())
+
+    def _purge_expired_streams(self, conn: sqlite3.Connection) -> None:
+        expired = [row[0] for row in conn.execute(
+            "SELECT name FROM stream_expiry WHERE expires_at < ?", (time.time(),)).fetchall()]
+        for name in expired:
+            conn.execute("DELETE FROM streams WHERE name = ?", (name,))
+            conn.execute("DELETE FROM stream_expiry WHERE name = ?", (name,))
+
+    def xadd(self, name: str, data: str, ttl: Optional[float] = None) -> str:
+        with self._transaction() as conn:
+            entry_id = conn.execute("INSERT INTO streams (name, data) VALUES (?, ?)", (name, data)).lastrowid
+            if ttl is not None:
+                conn.execute("INSERT OR REPLACE INTO stream_expiry (name, expires_at) VALUES (?, ?)",
+                             (name, time.time() + ttl))
+                self._purge_expired_streams(conn)
+        return str(entry_id)
+
+    def xread(self, name: str, after: str = "0", count: int = 100) -> List[Tuple[str, str]]:
+        rows = self._conn().execute(
+            "SELECT id, data FROM streams WHERE name = ? AND id > ? ORDER BY id LIMIT ?",
+            (name, int(after), count)).fetchall()
+        return [(str(entry_id), data) for entry_id, data in rows]
+
+    def stream_exists(self, name: str) -> bool:
+        row = self._conn().execute(
+            "SELECT 1 FROM streams s LEFT JOIN stream_expiry e ON e.name = s.name "
+            "WHERE s.name = ? AND (e.expires_at IS NULL OR e.expires_at >= ?) LIMIT 1",
+            (name, time.time())).fetchone()
+        return row is not None
+
+    def delete_stream(self, name: str) -> None:
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM streams WHERE name = ?", (name,))
+            conn.execute("DELETE FROM stream_expiry WHERE name = ?", (name,))
+
+    def acquire_lease(self, name: str, limit: int, holder: str, ttl: float) -> bool:
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM leases WHERE name = ? AND expires_at < ?", (name, now))
+            held = conn.execute("SELECT COUNT(*) FROM leases WHERE name = ?", (name,)).fetchone()[0]
+            if held >= limit:
+                return False
+            conn.execute("INSERT OR REPLACE INTO leases (name, holder, expires_at) VALUES (?, ?, ?)",
+                         (name, holder, now + ttl))
+            return True
+
+    def renew_lease(self, name: str, holder: str, ttl: float) -> bool:
+        now = time.time()
+        return self._conn().execute(
+            "UPDATE leases SET expires_at = ? WHERE name = ? AND holder = ? AND expires_at >= ?",
+            (now + ttl, name, holder, now)).rowcount > 0
+
+    def release_lease(self, name: str, holder: str) -> None:
+        self._conn().execute("DELETE FROM leases WHERE name = ? AND holder = ?", (name, holder))
+
+    def lease_count(self, name: str) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM leases WHERE name = ? AND expires_at >= ?",
+                                    (name, time.time())).fetchone()[0]
+
+
+class RedisSharedState(SharedState):
+    """Multi-host backend on any Redis-protocol server. Leases are sorted sets scored by expiry."""
+
+    # Drop expired leases, then take a slot if one is free (atomic on the server)
+    _ACQUIRE_SCRIPT = """
+        redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+        if redis.call('ZSCORE', KEYS[1], ARGV[3]) or redis.call('ZCARD', KEYS[1]) < tonumber(ARGV[2]) then
+            redis.call('ZADD', KEYS[1], ARGV[4], ARGV[3])
+            redis.call('PEXPIRE', KEYS[1], ARGV[5])
+            return 1
+        end
+        return 0
+    """
+
+    def __init__(self, url: str, prefix: str = "gemini_editor:"):
+        try:
+            import redis
+        except ImportError:
+            logger.error("A redis:// SHARED_STATE_URL is set but the redis package is not installed.")
+            raise RuntimeError("redis is not installed; run 'pip install redis' or use a sqlite:/// SHARED_STATE_URL.")
+        self.prefix = prefix
+        self._redis = redis.Redis.from_url(url, decode_responses=True)
+        self._acquire = self._redis.register_script(self._ACQUIRE_SCRIPT)
+
+    def _key(self, kind: str, name: str) -> str:
+        return f"{self.prefix}{kind}:{name}"
+
+    def hget(self, name: str, key: str) -> Optional[str]:
+        return self._redis.hget(self._key("hash", name), key)
+
+    def hset(self, name: str, key: str, value: str) -> None:
+        self._redis.hset(self._key("hash", name), key, value)
+
+    def hdel(self, name: str, key: str) -> bool:
+        return self._redis.hdel(self._key("hash", name), key) > 0
+
+    def hgetall(self, name: str) -> Dict[str, str]:
+        return self._redis.hgetall(self._key("hash", name))
+
+    def xadd(self, name: str, data: str, ttl: Optional[float] = None) -> str:
+        key = self._key("stream", name)
+        pipe = self._redis.pipeline()
+        pipe.xadd(key, {"data": data})
+        if ttl is not None:
+            pipe.pexpire(key, int(ttl * 1000))
+        return pipe.execute()[0]
+
+    def xread(self, name: str, after: str = "0", count: int = 100) -> List[Tuple[str, str]]:
+        entries = self._redis.xrange(self._key("stream", name), min=f"({after}" if after != "0" else "-", count=count)
+        return [(entry_id, fields["data"]) for entry_id, fields in entries]
+
+    def stream_exists(self, name: str) -> bool:
+        return bool(self._redis.exists(self._key("stream", name)))
+
+    def delete_stream(self, name: str) -> None:
+        self._redis.delete(self._key("stream", name))
+
+    def acquire_lease(self, name: str, limit: int, holder: str, ttl: float) -> bool:
+        now = time.time()
+        return bool(self._acquire(keys=[self._key("lease", name)],
+                                  args=[now, limit, holder, now + ttl, int(ttl * 1000)]))
+
+    def renew_lease(self, name: str, holder: str, ttl: float) -> bool:
+        key = self._key("lease", name)
+        now = time.time()
+        score = self._redis.zscore(key, holder)
+        if score is None or score < now:
+            return False
+        self._redis.zadd(key, {holder: now + ttl}, xx=True)
+        self._redis.pexpire(key, int(ttl * 1000))
+        return True
+
+    def release_lease(self, name: str, holder: str) -> None:
+        self._redis.zrem(self._key("lease", name), holder)
+
+    def lease_count(self, name: str) -> int:
+        return self._redis.zcount(self._key("lease", name), time.time(), "+inf")
+
+
+def create_shared_state(url: str) -> SharedState:
+    """Backend for a SHARED_STATE_URL."""
+    if url.startswith("sqlite:///"):
+        return SQLiteSharedState(url[len("sqlite:///"):])
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisSharedState(url)
+    raise ValueError(f"Unsupported SHARED_STATE_URL '{url}'. Use sqlite:///path or redis://host:port/db.")
+
+
+_state: Optional[SharedState] = None
+_state_lock = threading.Lock()
+
+
+def get_shared_state() -> SharedState:
+    """The process-wide backend for SHARED_STATE_URL, created on first use."""
+    global _state
+    if _state is None:
+        with _state_lock:
+            if _state is None:
+                _state = create_shared_state(SHARED_STATE_URL)
+                logger.info(f"Shared state backend: {type(_state).__name__}")
+    return _state
+
+
+class SharedMapping(MutableMapping):
+    """A dict-like view of one shared hash, with JSON-encoded values."""
+
+    def __init__(self, name: str, state: Optional[SharedState] = None):
+        self.name = name
+        self._state = state
+
+    @property
+    def state(self) -> SharedState:
+        return self._state or get_shared_state()
+
+    def __getitem__(self, key: str) -> Any:
+        value = self.state.hget(self.name, key)
+        if value is None:
+            raise KeyError(key)
+        return json.loads(value)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self.state.hset(self.name, key, json.dumps(value))
+
+    def __delitem__(self, key: str) -> None:
+        if not self.state.hdel(self.name, key):
+            raise KeyError(key)
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, str) and self.state.hget(self.name, key) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.state.hgetall(self.name))
+
+    def __len__(self) -> int:
+        return len(self.state.hgetall(self.name))
+
+    def items(self):
+        # One round trip instead of a lookup per key
+        return [(key, json.loads(value)) for key, value in self.state.hgetall(self.name).items()]
+
+
+@asynccontextmanager
+async def shared_semaphore(name: str, limit: int, ttl: float = LEASE_TTL_SECONDS):
+    """
+    Hold one of limit slots of name across every worker for the duration of the block.
+
+    The slot is a lease renewed every ttl/3 while the block runs; if the worker dies,
+    the slot frees itself after ttl.
+    """
+    state = get_shared_state()
+    holder = f"{os.getpid()}:{uuid.uuid4().hex}"
+    while not await asyncio.to_thread(state.acquire_lease, name, limit, holder, ttl):
+        await asyncio.sleep(LEASE_POLL_SECONDS)
+
+    async def renew():
+        while True:
+            await asyncio.sleep(ttl / 3)
+            if not await asyncio.to_thread(state.renew_lease, name, holder, ttl):
+                logger.warning(f"Lost lease on '{name}' (held longer than {ttl:.0f}s without renewal)")
+                return
+
+    renewer = asyncio.create_task(renew())
+    try:
+        yield
+    finally:
+        renewer.cancel()
+        await asyncio.to_thread(state.release_lease, name, holder)
@@ -0,0 +1,167 @@
+"""
+Content-keyed transcript cache.
+
+Transcripts are stored as transcripts/cache/{key}.json, where the key covers
+everything that changes the output: a fingerprint of the source file's content,
+the audio track, the scope, the Whisper model, the language, the VAD parameters,
+the transcription mode, the engine, any cascade model and the kind of output (segments or words). Two files with
+the same name no longer collide, and changing any setting produces a new entry
+instead of silently reusing a stale one.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.transcription_backends import engine_id
+
+logger = logging.getLogger(__name__)
+
+_project_root = Path(__file__).resolve().parent.parent
+TRANSCRIPT_CACHE_DIR = _project_root / "transcripts" / "cache"
+TRANSCRIPT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+
+# Bytes read from the start, middle and end of a file for its fingerprint.
+_FINGERPRINT_SAMPLE_BYTES = 1024 * 1024
+
+_fingerprints: Dict[Tuple[str, int, int], str] = {}
+_metrics = {"hits": 0, "misses": 0, "stores": 0}
+_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class TranscriptKey:
+    fingerprint: str
+    audio_track: int
+    scope: Optional[Tuple[float, float]]
+    model_name: str
+    language: str
+    silence_threshold: float
+    min_silence_duration: float
+    transcription_mode: str
+    kind: str = "segments"  # "segments" (transcribe_video) or "words" (word-level timestamps)
+    backend: str = "whisper"
+    escalation: Optional[Tuple[str, float]] = None  # Cascade model and logprob threshold
+    streaming: bool = False  # Windowed pipe transcription merges overlaps differently
+    num_workers: int = 1     # Parallel chunking splits and stitches the audio differently
+
+    @property
+    def digest(self) -> str:
+        return hashlib.sha1(json.dumps(asdict(self), sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def content_fingerprint(path: str) -> str:
+    """
+    Fingerprint a media file by its size plus sampled blocks from the start, middle
+    and end. Memoized per (path, size, mtime) so repeat lookups do not re-read it.
+    """
+    st = os.stat(path)
+    memo_key = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    with _lock:
+        cached = _fingerprints.get(memo_key)
+    if cached:
+        return cached
+
+    h = hashlib.sha1()
+    h.update(str(st.st_size).encode("utf-8"))
+    with open(path, "rb") as f:
+        for offset in (0, max(0, st.st_size // 2 - _FINGERPRINT_SAMPLE_BYTES // 2),
+                       max(0, st.st_size - _FINGERPRINT_SAMPLE_BYTES)):
+            f.seek(offset)
+            h.update(f.read(_FINGERPRINT_SAMPLE_BYTES))
+    fingerprint = h.hexdigest()
+    with _lock:
+        _fingerprints[memo_key] = fingerprint
+    return fingerprint
+
+
+def build_key(source_path: str, *, audio_track: int = 0, model_name: str, language: str,
+              scope: Optional[Tuple[float, float]] = None, silence_threshold: float = -50.0,
+              min_silence_duration: float = 0.2, transcription_mode: str = "per_segment",
+              kind: str = "segments", backend: str = "whisper", escalation_model: Optional[str] = None,
+              escalation_logprob_threshold: float = -0.8, streaming: bool = False,
+              num_workers: int = 1) -> TranscriptKey:
+    """Build the cache key for transcribing source_path with the given settings."""
+    return TranscriptKey(
+        fingerprint=content_fingerprint(source_path),
+        audio_track=int(audio_track),
+        scope=(round(float(scope[0]), 3), round(float(scope[1]), 3)) if scope else None,
+        model_name=model_name,
+        language=language,
+        silence_threshold=float(silence_threshold),
+        min_silence_duration=float(min_silence_duration),
+        transcription_mode=transcription_mode,
+        kind=kind,
+        backend=engine_id(backend),
+        escalation=(escalation_model, float(escalation_logprob_threshold)) if escalation_model else None,
+        streaming=bool(streaming),
+        # Streaming ignores the worker count
+        num_workers=1 if streaming else max(1, int(num_workers or 1)),
+    )
+
+
+def path_for(key: TranscriptKey) -> Path:
+    return TRANSCRIPT_CACHE_DIR / f"{key.digest}.json"
+
+
+def get(key: TranscriptKey) -> Optional[Any]:
+    """Return the cached transcript for key, or None. Counts a hit or a miss."""
+    path = path_for(key)
+    data = None
+    if path.exists():
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f).get("transcript")
+        except Exception as e:
+            logger.warning(f"[TranscriptCache] Unreadable entry {path.name}, ignoring: {e}")
+            data = None
+
+    with _lock:
+        _metrics["hits" if data is not None else "misses"] += 1
+    logger.info(f"[TranscriptCache] {'Hit' if data is not None else 'Miss'} for {key.digest} "
+                f"(model={key.model_name}, lang={key.language}, track={key.audio_track}, "
+                f"scope={key.scope}, mode={key.transcription_mode}, kind={key.kind}, backend={key.backend}, "
+                f"streaming={key.streaming}, workers={key.num_workers})")
+    return data
+
+
+def put(key: TranscriptKey, transcript: Any) -> Path:
+    """Store a transcript for key atomically and return its path."""
+    path = path_for(key)
+    tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"key": asdict(key), "transcript": transcript}, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    with _lock:
+        _metrics["stores"] += 1
+    logger.info(f"[TranscriptCache] Stored {key.digest} -> {path}")
+    return path
+
+
+def get_or_create(key: TranscriptKey, producer: Callable[[], Any]) -> Tuple[Any, bool]:
+    """Return (transcript, hit), calling producer() and storing its result on a miss."""
+    cached = get(key)
+    if cached is not None:
+        return cached, True
+    transcript = producer()
+    put(key, transcript)
+    return transcript, False
+
+
+def stats() -> Dict[str, Any]:
+    """Hit/miss counters since start-up plus the size of the cache on disk."""
+    with _lock:
+        counters = dict(_metrics)
+    lookups = counters["hits"] + counters["misses"]
+    entries = list(TRANSCRIPT_CACHE_DIR.glob("*.json"))
+    return {
+        **counters,
+        "hit_rate": round(counters["hits"] / lookups, 4) if lookups else None,
+        "entries": len(entries),
+        "bytes": sum(p.stat().st_size for p in entries if p.exists()),
+    }
@@ -0,0 +1,181 @@
+"""
+Pluggable speech-to-text engines.
+
+Every backend exposes the same transcribe() call and returns the result shape of
+openai-whisper's model.transcribe(): {'text', 'language', 'segments'}, where each
+segment has start, end, text, avg_logprob, no_speech_prob and, with
+word_timestamps=True, 'words' entries of {word, start, end, probability}. Code in
+whisper_utils and parallel_transcription only ever sees that shape, so engines
+are interchangeable.
+
+Engines:
+    whisper         openai-whisper (PyTorch), fp32 on CPU, fp16 on CUDA
+    faster_whisper  CTranslate2 via faster-whisper; int8 by default, much faster on CPU.
+                    Optional dependency: pip install faster-whisper
+"""
+
+import logging
+import os
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+TRANSCRIPTION_BACKENDS = ("whisper", "faster_whisper")
+
+# CTranslate2 compute type for faster_whisper (int8, int8_float16, float16, float32).
+FASTER_WHISPER_COMPUTE_TYPE = os.getenv("TRANSCRIPTION_COMPUTE_TYPE", "int8")
+
+# Loaded models kept per process (least recently used are dropped beyond this), so a
+# cascade through several model sizes does not hold all of them for the process lifetime.
+TRANSCRIPTION_MODEL_CACHE_SIZE = max(1, int(os.getenv("TRANSCRIPTION_MODEL_CACHE_SIZE", "2")))
+
+_models: "OrderedDict[tuple[str, str, str, str, int], TranscriptionBackend]" = OrderedDict()
+_models_lock = threading.Lock()
+
+
+class TranscriptionBackend(ABC):
+    """A loaded speech-to-text model."""
+
+    name: str = ""
+
+    def __init__(self, model_name: str, device: str):
+        self.model_name = model_name
+        self.device = device
+
+    @abstractmethod
+    def transcribe(self, audio: Union[str, np.ndarray], language: Optional[str] = None,
+                   word_timestamps: bool = False, verbose: Optional[bool] = False) -> Dict[str, Any]:
+        """
+        Transcribe a media path or 16 kHz mono float32 samples.
+
+        Returns:
+            dict: openai-whisper style result ({'text', 'language', 'segments'})
+        """
+
+
+class WhisperBackend(TranscriptionBackend):
+    name = "whisper"
+
+    def __init__(self, model_name: str, device: str, cpu_threads: int = 0):
+        super().__init__(model_name, device)
+        import torch
+        import whisper
+
+        if cpu_threads:
+            torch.set_num_threads(cpu_threads)
+        self._model = whisper.load_model(model_name, device=device)
+        # Decoding installs kv-cache hooks on the shared decoder, so one model cannot
+        # run two transcriptions at once; concurrent callers take turns.
+        self._lock = threading.Lock()
+
+    def transcribe(self, audio, language=None, word_timestamps=False, verbose=False):
+        with self._lock:
+            return self._model.transcribe(audio, language=language, word_timestamps=word_timestamps, verbose=verbose)
+
+
+class FasterWhisperBackend(TranscriptionBackend):
+    name = "faster_whisper"
+
+    def __init__(self, model_name: str, device: str, compute_type: str = "int8", cpu_threads: int = 0):
+        super().__init__(model_name, device)
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError:
+            logger.error("faster_whisper backend selected but the faster-whisper package is not installed.")
+            raise RuntimeError("faster-whisper is not installed; run 'pip install faster-whisper' "
+                               "or set TRANSCRIPTION_BACKEND=whisper.")
+
+        self.compute_type = compute_type
+        # CTranslate2 models are safe to call from several threads at once
+        self._model = WhisperModel(model_name, device=device, compute_type=compute_type, cpu_threads=cpu_threads)
+
+    def transcribe(self, audio, language=None, word_timestamps=False, verbose=False):
+        # Greedy decoding with temperature fallback, matching openai-whisper's defaults.
+        # Our own VAD already decides what is speech, so the built-in filter stays off.
+        segments_iter, info = self._model.transcribe(
+            audio, language=language, word_timestamps=word_timestamps,
+            beam_size=1, best_of=5, temperature=(0.0, 0.2, 0.4, 0.6, 0.8, 1.0),
+            condition_on_previous_text=True, vad_filter=False,
+        )
+
+        segments = []
+        for seg in segments_iter:
+            segment = {
+                'id': seg.id,
+                'start': seg.start,
+                'end': seg.end,
+                'text': seg.text,
+                'avg_logprob': seg.avg_logprob,
+                'no_speech_prob': seg.no_speech_prob,
+                'compression_ratio': seg.compression_ratio,
+                'temperature': seg.temperature,
+            }
+            if word_timestamps:
+                segment['words'] = [
+                    {'word': w.word, 'start': w.start, 'end': w.end, 'probability': w.probability}
+                    for w in (seg.words or [])
+                ]
+            segments.append(segment)
+
+        return {
+            'text': "".join(seg['text'] for seg in segments),
+            'segments': segments,
+            'language': info.language,
+        }
+
+
+def default_device() -> str:
+    """CUDA when PyTorch sees a GPU, otherwise CPU."""
+    try:
+        import torch
+        return "cuda" if torch.cuda.is_available() else "cpu"
+    except ImportError:
+        return "cpu"
+
+
+def engine_id(backend: str = "whisper", compute_type: Optional[str] = None) -> str:
+    """Identifier of an engine configuration whose output may differ from others, e.g. for cache keys."""
+    if backend == "faster_whisper":
+        return f"faster_whisper-{compute_type or FASTER_WHISPER_COMPUTE_TYPE}"
+    return backend
+
+
+def load_backend(backend: str = "whisper", model_name: str = "base", device: Optional[str] = None,
+                 compute_type: Optional[str] = None, cpu_threads: int = 0) -> TranscriptionBackend:
+    """
+    Return a loaded model for the given engine, reusing one already loaded in this
+    process with the same settings. At most TRANSCRIPTION_MODEL_CACHE_SIZE models
+    stay cached; an evicted model is freed once its current callers finish.
+
+    Args:
+        backend: One of TRANSCRIPTION_BACKENDS
+        compute_type: CTranslate2 compute type for faster_whisper (default FASTER_WHISPER_COMPUTE_TYPE)
+        cpu_threads: Threads for CPU inference; 0 leaves the engine default
+    """
+    if backend not in TRANSCRIPTION_BACKENDS:
+        raise ValueError(f"Unknown transcription backend '{backend}'. Expected one of {TRANSCRIPTION_BACKENDS}.")
+    device = device or default_device()
+    compute_type = compute_type or FASTER_WHISPER_COMPUTE_TYPE
+
+    key = (backend, model_name, device, compute_type if backend == "faster_whisper" else "", cpu_threads)
+    with _models_lock:
+        model = _models.get(key)
+        if model is not None:
+            _models.move_to_end(key)
+        else:
+            logger.info(f"Loading {backend} model {model_name} on {device}"
+                        + (f" ({compute_type})" if backend == "faster_whisper" else ""))
+            if backend == "faster_whisper":
+                model = FasterWhisperBackend(model_name, device, compute_type=compute_type, cpu_threads=cpu_threads)
+            else:
+                model = WhisperBackend(model_name, device, cpu_threads=cpu_threads)
+            _models[key] = model
+            while len(_models) > TRANSCRIPTION_MODEL_CACHE_SIZE:
+                evicted_key, _ = _models.popitem(last=False)
+                logger.info(f"Dropping cached {evicted_key[0]} model {evicted_key[1]} on {evicted_key[2]}")
+    return model
@@ -0,0 +1,54 @@
+"""
+Upload saving shared by the legacy endpoints in main.py and the API routers.
+
+Uploaded videos can be many gigabytes; copying one to disk on the event loop would
+stall every other request until it finished, so save_upload() streams it in a
+worker thread.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Optional
+
+from fastapi import UploadFile
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_CHUNK_BYTES = 8 * 1024 * 1024
+
+
+class UploadTooLarge(Exception):
+    """Raised by save_upload when an upload exceeds max_bytes."""
+
+
+async def save_upload(upload: UploadFile, destination: str, max_bytes: Optional[int] = None) -> int:
+    """
+    Copy an upload to destination in UPLOAD_CHUNK_BYTES chunks, off the event loop.
+
+    Returns:
+        int: Bytes written
+
+    Raises:
+        UploadTooLarge: If the upload is larger than max_bytes (the partial file is removed)
+    """
+    def copy() -> int:
+        written = 0
+        with open(destination, "wb") as out:
+            while True:
+                chunk = upload.file.read(UPLOAD_CHUNK_BYTES)
+                if not chunk:
+                    return written
+                written += len(chunk)
+                if max_bytes is not None and written > max_bytes:
+                    raise UploadTooLarge(f"Upload exceeds {max_bytes} bytes")
+                out.write(chunk)
+
+    try:
+        return await asyncio.to_thread(copy)
+    except BaseException:
+        try:
+            os.remove(destination)
+        except OSError:
+            pass
+        raise
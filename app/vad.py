@@ -0,0 +1,331 @@
+"""
+Voice activity detection over decoded 16 kHz PCM.
+
+Replaces the ffmpeg silencedetect pass: per-frame RMS energy and zero-crossing
+rate are computed once over memory-mapped PCM, and speech intervals are derived
+from those features with hysteresis, minimum durations and padding.
+
+Frame features are cached per (source, audio track, frame size) in memory and
+under tmp/vad/ (within the audio cache's disk budget), and interval results are cached per parameter set, so changing a
+threshold only re-runs the cheap vectorized decision step.
+"""
+
+import hashlib
+import logging
+import os
+import struct
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, astuple
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from app.audio_cache import SAMPLE_RATE, enforce_budget, get_pcm, share_budget
+
+logger = logging.getLogger(__name__)
+
+VAD_ROOT = Path("tmp") / "vad"
+VAD_ROOT.mkdir(parents=True, exist_ok=True)
+share_budget(VAD_ROOT, "*.npz")
+
+# Frames processed per block while computing features, so a multi-hour memmap
+# is never materialised as float32 all at once.
+_FRAMES_PER_BLOCK = 1 << 16
+_MAX_CACHED_FEATURES = 16
+_MAX_CACHED_RESULTS = 256
+
+
+@dataclass(frozen=True)
+class VadParams:
+    """Parameters for speech interval detection."""
+    threshold_db: float = -50.0        # Frame RMS (dBFS) that starts a speech run
+    hysteresis_db: float = 6.0         # A run continues until energy drops this far below threshold_db
+    zcr_threshold: float = 0.35        # Frames with this zero-crossing rate extend a run (unvoiced onsets and endings) but never start one
+    zcr_extension: float = 0.15        # Longest stretch of such frames, down to another hysteresis_db lower, added at either edge of a run
+    min_speech_duration: float = 0.1  # Runs shorter than this (after gap merging) are dropped
+    min_silence_duration: float = 0.2  # Gaps shorter than this are bridged
+    padding: float = 0.0               # Seconds added to both sides of every interval
+    frame_duration: float = 0.02
+
+
+@dataclass
+class FrameFeatures:
+    energy_db: np.ndarray
+    zcr: np.ndarray
+    frame_duration: float
+    total_duration: float
+
+
+_features_cache: "OrderedDict[str, FrameFeatures]" = OrderedDict()
+_results_cache: "OrderedDict[Tuple, List[Tuple[float, float]]]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def open_pcm_memmap(wav_path: str) -> np.ndarray:
+    """
+    Memory-map the sample data of a 16-bit PCM WAV file read-only.
+    Multi-channel files are returned as (frames, channels).
+    """
+    with open(wav_path, "rb") as f:
+        riff, _, wave_id = struct.unpack("<4sI4s", f.read(12))
+        if riff != b"RIFF" or wave_id != b"WAVE":
+            raise ValueError(f"{wav_path} is not a WAV file")
+        channels = 1
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                raise ValueError(f"No data chunk found in {wav_path}")
+            chunk_id, chunk_size = struct.unpack("<4sI", header)
+            if chunk_id == b"fmt ":
+                fmt = f.read(chunk_size)
+                audio_format, channels, _, _, _, bits = struct.unpack("<HHIIHH", fmt[:16])
+                if bits != 16:
+                    raise ValueError(f"{wav_path} is {bits}-bit; only 16-bit PCM is supported")
+                f.seek(chunk_size % 2, os.SEEK_CUR)
+            elif chunk_id == b"data":
+                offset = f.tell()
+                break
+            else:
+                f.seek(chunk_size + chunk_size % 2, os.SEEK_CUR)
+
+    n_bytes = os.path.getsize(wav_path) - offset
+    n_samples = n_bytes // 2 - (n_bytes // 2) % channels
+    if n_samples == 0:
+        return np.zeros((0,) if channels == 1 else (0, channels), dtype=np.int16)
+    samples = np.memmap(wav_path, dtype=np.int16, mode="r", offset=offset, shape=(n_samples,))
+    return samples if channels == 1 else samples.reshape(-1, channels)
+
+
+def compute_frame_features(samples: np.ndarray, sample_rate: int = SAMPLE_RATE,
+                           frame_duration: float = 0.02) -> FrameFeatures:
+    """Compute per-frame RMS energy (dBFS) and zero-crossing rate for int16 PCM."""
+    if samples.ndim > 1:
+        samples = samples.mean(axis=1)
+    frame_len = max(1, int(round(frame_duration * sample_rate)))
+    n_frames = int(np.ceil(len(samples) / frame_len))
+    energy_db = np.empty(n_frames, dtype=np.float32)
+    zcr = np.empty(n_frames, dtype=np.float32)
+
+    block = _FRAMES_PER_BLOCK * frame_len
+    for frame_offset, start in enumerate(range(0, len(samples), block)):
+        chunk = np.asarray(samples[start:start + block], dtype=np.float32) / 32768.0
+        pad = (-len(chunk)) % frame_len
+        if pad:
+            chunk = np.concatenate([chunk, np.zeros(pad, dtype=np.float32)])
+        frames = chunk.reshape(-1, frame_len)
+        rms = np.sqrt(np.mean(frames * frames, axis=1))
+        first = frame_offset * _FRAMES_PER_BLOCK
+        energy_db[first:first + len(frames)] = 20.0 * np.log10(np.maximum(rms, 1e-10))
+        signs = np.signbit(frames)
+        zcr[first:first + len(frames)] = np.mean(signs[:, 1:] != signs[:, :-1], axis=1)
+
+    return FrameFeatures(energy_db, zcr, frame_len / sample_rate, len(samples) / sample_rate)
+
+
+def speech_intervals_from_features(features: FrameFeatures, params: VadParams) -> List[Tuple[float, float]]:
+    """Turn frame features into (start, end) speech intervals in seconds."""
+    energy, zcr = features.energy_db, features.zcr
+    if len(energy) == 0:
+        return []
+    on_db = params.threshold_db
+    off_db = params.threshold_db - params.hysteresis_db
+
+    # Hysteresis: a run is a stretch of frames above the lower threshold that
+    # contains at least one frame above the upper one. Only energy starts a run, so
+    # hiss and fan noise (high zero-crossing rate, low energy) never become speech.
+    sustain = energy >= off_db
+    trigger = energy >= on_db
+    edges = np.diff(np.concatenate(([0], sustain.view(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    trigger_count = np.concatenate(([0], np.cumsum(trigger)))
+    keep = trigger_count[ends] - trigger_count[starts] > 0
+    starts, ends = starts[keep], ends[keep]
+    if len(starts) == 0:
+        return []
+    starts, ends = _extend_unvoiced(starts, ends, zcr, energy, off_db - params.hysteresis_db, params,
+                                    features.frame_duration)
+    starts = starts * features.frame_duration
+    ends = np.minimum(ends * features.frame_duration, features.total_duration)
+
+    starts, ends = _merge_gaps(starts, ends, params.min_silence_duration)
+    keep = (ends - starts) >= params.min_speech_duration
+    starts, ends = starts[keep], ends[keep]
+    if params.padding > 0 and len(starts):
+        starts = np.maximum(starts - params.padding, 0.0)
+        ends = np.minimum(ends + params.padding, features.total_duration)
+        starts, ends = _merge_gaps(starts, ends, 0.0)
+
+    return [(round(float(s), 3), round(float(e), 3)) for s, e in zip(starts, ends)]
+
+
+def _extend_unvoiced(starts: np.ndarray, ends: np.ndarray, zcr: np.ndarray, energy: np.ndarray,
+                     floor_db: float, params: VadParams, frame_duration: float):
+    """Grow runs (frame indices) over adjacent high-ZCR frames, at most zcr_extension at each edge."""
+    max_frames = int(round(params.zcr_extension / frame_duration))
+    unvoiced = (zcr >= params.zcr_threshold) & (energy >= floor_db)
+    if max_frames <= 0 or not unvoiced.any():
+        return starts, ends
+    starts, ends = starts.copy(), ends.copy()
+    for i in range(len(starts)):
+        low = max(ends[i - 1] if i else 0, starts[i] - max_frames)
+        while starts[i] > low and unvoiced[starts[i] - 1]:
+            starts[i] -= 1
+        high = min(starts[i + 1] if i + 1 < len(starts) else len(unvoiced), ends[i] + max_frames)
+        while ends[i] < high and unvoiced[ends[i]]:
+            ends[i] += 1
+    return starts, ends
+
+
+def _merge_gaps(starts: np.ndarray, ends: np.ndarray, min_gap: float):
+    """Merge neighbouring intervals whose gap is shorter than min_gap (or overlapping)."""
+    gaps = starts[1:] - ends[:-1]
+    split = gaps > min_gap if min_gap <= 0 else gaps >= min_gap
+    return starts[np.r_[True, split]], ends[np.r_[split, True]]
+
+
+def source_cache_key(source_path: str, audio_track: int = 0, frame_duration: float = 0.02) -> str:
+    """Key for a source's features; changes whenever the file is replaced or modified."""
+    st = os.stat(source_path)
+    h = hashlib.sha1()
+    h.update(os.path.abspath(source_path).encode("utf-8"))
+    h.update(f"|{st.st_size}|{st.st_mtime_ns}|{audio_track}|{frame_duration:.4f}".encode("utf-8"))
+    return h.hexdigest()
+
+
+def _get_cached_features(key: str) -> Optional[FrameFeatures]:
+    with _cache_lock:
+        features = _features_cache.get(key)
+        if features is not None:
+            _features_cache.move_to_end(key)
+            return features
+    path = VAD_ROOT / f"{key}.npz"
+    if not path.exists():
+        return None
+    try:
+        with np.load(path) as data:
+            features = FrameFeatures(
+                data["energy_db"], data["zcr"],
+                float(data["frame_duration"]), float(data["total_duration"]),
+            )
+    except Exception as e:
+        logger.warning(f"[VAD] Could not read cached features {path}: {e}")
+        return None
+    try:
+        os.utime(path)  # Recently used, for the shared budget's LRU eviction
+    except OSError:
+        pass
+    _remember_features(key, features)
+    return features
+
+
+def _remember_features(key: str, features: FrameFeatures, persist: bool = False) -> None:
+    with _cache_lock:
+        _features_cache[key] = features
+        _features_cache.move_to_end(key)
+        while len(_features_cache) > _MAX_CACHED_FEATURES:
+            _features_cache.popitem(last=False)
+    if persist:
+        try:
+            enforce_budget(features.energy_db.nbytes + features.zcr.nbytes)
+            tmp_path = VAD_ROOT / f"{key}.tmp.npz"
+            np.savez(tmp_path, energy_db=features.energy_db, zcr=features.zcr,
+                     frame_duration=features.frame_duration, total_duration=features.total_duration)
+            os.replace(tmp_path, VAD_ROOT / f"{key}.npz")
+        except Exception as e:
+            logger.warning(f"[VAD] Could not persist features for {key}: {e}")
+
+
+def _intervals_for(key: str, features: FrameFeatures, params: VadParams) -> List[Tuple[float, float]]:
+    result_key = (key, astuple(params))
+    with _cache_lock:
+        cached = _results_cache.get(result_key)
+        if cached is not None:
+            _results_cache.move_to_end(result_key)
+            return list(cached)
+    intervals = speech_intervals_from_features(features, params)
+    with _cache_lock:
+        _results_cache[result_key] = intervals
+        while len(_results_cache) > _MAX_CACHED_RESULTS:
+            _results_cache.popitem(last=False)
+    return list(intervals)
+
+
+def detect_speech(wav_path: str, params: VadParams = VadParams(),
+                  cache_key: Optional[str] = None) -> List[Tuple[float, float]]:
+    """
+    Detect speech intervals in a 16 kHz 16-bit PCM WAV file.
+
+    Args:
+        wav_path: WAV file to analyse (memory-mapped, not loaded)
+        params: Detection parameters
+        cache_key: Optional key (see source_cache_key) under which features and
+                   results are cached for the originating source and track
+
+    Returns:
+        list: (start, end) speech intervals in seconds
+    """
+    features = _get_cached_features(cache_key) if cache_key else None
+    if features is None:
+        samples = open_pcm_memmap(wav_path)
+        features = compute_frame_features(samples, frame_duration=params.frame_duration)
+        del samples
+        if cache_key:
+            _remember_features(cache_key, features, persist=True)
+    intervals = _intervals_for(cache_key or f"file:{wav_path}", features, params)
+    _log_intervals(wav_path, intervals, features.total_duration)
+    return intervals
+
+
+def detect_speech_in_samples(samples: np.ndarray, params: VadParams = VadParams(),
+                             cache_key: Optional[str] = None, label: str = "samples") -> List[Tuple[float, float]]:
+    """Like detect_speech, but over already decoded (typically memory-mapped) 16 kHz int16 samples."""
+    features = _get_cached_features(cache_key) if cache_key else None
+    if features is None:
+        features = compute_frame_features(samples, frame_duration=params.frame_duration)
+        if cache_key:
+            _remember_features(cache_key, features, persist=True)
+    intervals = _intervals_for(cache_key or f"samples:{id(samples)}", features, params)
+    _log_intervals(label, intervals, features.total_duration)
+    return intervals
+
+
+def get_source_features(source_path: str, audio_track: int = 0,
+                        frame_duration: float = 0.02) -> Tuple[str, FrameFeatures]:
+    """
+    Return (cache_key, features) for an audio track of a media file. Samples come
+    from the shared decoded-audio cache; features are only recomputed when nothing
+    is cached for the current version of the file.
+    """
+    key = source_cache_key(source_path, audio_track, frame_duration)
+    features = _get_cached_features(key)
+    if features is not None:
+        return key, features
+
+    samples = get_pcm(source_path, audio_track, SAMPLE_RATE)
+    features = compute_frame_features(samples, frame_duration=frame_duration)
+    del samples
+    _remember_features(key, features, persist=True)
+    return key, features
+
+
+def detect_speech_for_source(source_path: str, audio_track: int = 0,
+                             params: VadParams = VadParams()) -> Tuple[List[Tuple[float, float]], float]:
+    """
+    Detect speech intervals for an audio track of a media file.
+
+    Returns:
+        tuple: (intervals, total_duration)
+    """
+    key, features = get_source_features(source_path, audio_track, params.frame_duration)
+    intervals = _intervals_for(key, features, params)
+    _log_intervals(source_path, intervals, features.total_duration)
+    return intervals, features.total_duration
+
+
+def _log_intervals(path: str, intervals: List[Tuple[float, float]], total_duration: float) -> None:
+    total_speech = sum(e - s for s, e in intervals)
+    logger.info(f"[VAD] {len(intervals)} speech intervals in {path}: "
+                f"{total_speech:.2f}s speech of {total_duration:.2f}s")
@@ -1,4 +1,3 @@
-import whisper
 import os
 import ffmpeg
 import re
@@ -6,15 +5,37 @@ import logging
 import time
 import sys
 import subprocess
-import shutil
 import tempfile
 import contextlib
-import torch
 import json
+import wave
+import numpy as np
+from bisect import bisect_left, bisect_right
 from typing import List, Dict, Any
 
+from app.audio_cache import get_pcm, pcm_path, to_float
+from app.ffmpeg_scheduler import BATCH, apply_threads, ffmpeg_slot, run_scheduled, scheduler as ffmpeg_scheduler
+from app.transcription_backends import load_backend
+from app.vad import VadParams, detect_speech_in_samples, source_cache_key
+
 logger = logging.getLogger(__name__)
 
+# Whisper consumes 16 kHz mono float32 audio; everything we decode for it uses this rate.
+SAMPLE_RATE = 16000
+
+# transcribe_video modes: one Whisper call per speech segment, or one call over
+# the silence-stripped stream with timestamps remapped back to source time.
+TRANSCRIPTION_MODES = ("per_segment", "concatenated")
+
+# Cascade transcription: segments scoring below these are re-transcribed with the
+# escalation model. Whisper itself treats avg_logprob < -1.0 as a failed decode.
+ESCALATION_LOGPROB_THRESHOLD = -0.8
+ESCALATION_NO_SPEECH_THRESHOLD = 0.6
+
+# Streaming transcription: window length and overlap between consecutive windows.
+STREAM_WINDOW_SECONDS = 300.0
+STREAM_OVERLAP_SECONDS = 10.0
+
 # Context manager to temporarily suppress stderr (and stdout if needed)
 @contextlib.contextmanager
 def suppress_output(stdout=False, stderr=True):
@@ -34,6 +55,43 @@ def suppress_output(stdout=False, stderr=True):
             sys.stderr = old_stderr
         devnull.close()
 
+def load_pcm_audio(wav_path):
+    """
+    Load a 16-bit PCM WAV file into a float32 numpy array in [-1.0, 1.0].
+    This is the in-memory format Whisper's transcribe() accepts directly, so
+    slices of the returned array can be passed to the model without any
+    intermediate files or ffmpeg calls.
+    """
+    with wave.open(wav_path, 'rb') as wf:
+        if wf.getsampwidth() != 2:
+            raise ValueError(f"Expected 16-bit PCM audio in {wav_path}, got {wf.getsampwidth() * 8}-bit")
+        channels = wf.getnchannels()
+        frames = wf.readframes(wf.getnframes())
+
+    audio = np.frombuffer(frames, dtype=np.int16)
+    if channels > 1:
+        audio = audio.reshape(-1, channels).mean(axis=1)
+    return audio.astype(np.float32) / 32768.0
+
+def write_pcm_wav(wav_path, audio, sample_rate=SAMPLE_RATE):
+    """Write a float32 mono array (as returned by load_pcm_audio) to a 16-bit PCM WAV file."""
+    pcm = (np.clip(audio, -1.0, 1.0) * 32767.0).astype(np.int16)
+    with wave.open(wav_path, 'wb') as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes(pcm.tobytes())
+
+def slice_audio(audio, start, end, sample_rate=SAMPLE_RATE):
+    """
+    Return the samples of `audio` between `start` and `end` seconds as float32.
+    Float input is returned as a view; int16 input (e.g. a cached memmap) is converted.
+    """
+    start_idx = max(0, int(round(start * sample_rate)))
+    end_idx = min(len(audio), int(round(end * sample_rate)))
+    segment = audio[start_idx:max(start_idx, end_idx)]
+    return to_float(segment) if segment.dtype == np.int16 else segment
+
 def clean_transcript_text(text):
     # Remove extra whitespace
     text = re.sub(r'\s+', ' ', text)
@@ -46,51 +104,34 @@ def clean_transcript_text(text):
     text = re.sub(r'\b(\w+)(\s+\1\b)+', r'\1', text)
     return text.strip()
 
-def detect_silences(audio_path, threshold=-50, min_duration=0.2):
+def detect_silences(audio_path, threshold=-50, min_duration=0.2, audio_track=0):
     """
-    Detect silent regions in audio file.
+    Detect silent regions in an audio or video file.
     Returns list of (start, end) timestamps for each silence.
+
+    Uses the shared decoded-audio cache and the NumPy VAD (without hysteresis or
+    onset detection, to stay close to ffmpeg silencedetect), so repeated calls on
+    the same source do not decode it again.
     """
     logger.info(f"Detecting silences in {audio_path}")
     logger.info(f"Using threshold: {threshold}dB, min duration: {min_duration}s")
-    
-    cmd = [
-        'ffmpeg', '-i', audio_path,
-        '-af', f'silencedetect=noise={threshold}dB:d={min_duration}',
-        '-f', 'null', '-'
-    ]
-    
-    process = subprocess.run(cmd, capture_output=True, text=True)
-    if process.returncode != 0:
-        # Log the full FFmpeg output for debugging
-        logger.error(f"FFmpeg error during silence detection. Command: {' '.join(cmd)}")
-        logger.error(f"FFmpeg stderr: {process.stderr}")
-        raise RuntimeError(f"Failed to detect silences. FFmpeg stderr: {process.stderr}")
-    
+
+    samples = get_pcm(audio_path, audio_track)
+    total_duration = len(samples) / SAMPLE_RATE
+    params = VadParams(threshold_db=threshold, hysteresis_db=0.0, zcr_threshold=np.inf,
+                       min_speech_duration=0.0, min_silence_duration=min_duration)
+    speech = detect_speech_in_samples(samples, params, cache_key=source_cache_key(audio_path, audio_track),
+                                      label=audio_path)
+
+    # Silences are the gaps around and between speech intervals
     silences = []
-    current_start = None
-    
-    for line in process.stderr.split('\n'):
-        if 'silence_start' in line:
-            try:
-                start_str = line.split('silence_start: ')[1].split(' |')[0]
-                current_start = float(start_str)
-            except (IndexError, ValueError) as e:
-                logger.warning(f"Could not parse silence_start from line: '{line}'. Error: {e}")
-                current_start = None # Reset if parsing fails
-        elif 'silence_end' in line and current_start is not None:
-            try:
-                end_str = line.split('silence_end: ')[1].split(' |')[0]
-                silence_end = float(end_str)
-                # Ensure silence_end is after current_start
-                if silence_end > current_start:
-                    silences.append((current_start, silence_end))
-                else:
-                    logger.warning(f"Detected silence_end <= silence_start. Line: '{line}'. Start: {current_start}, End: {silence_end}. Skipping this range.")
-            except (IndexError, ValueError) as e:
-                logger.warning(f"Could not parse silence_end from line: '{line}'. Error: {e}")
-            finally:
-                current_start = None # Reset for the next pair
+    cursor = 0.0
+    for start, end in speech:
+        if start - cursor >= min_duration:
+            silences.append((cursor, start))
+        cursor = end
+    if total_duration - cursor >= min_duration:
+        silences.append((cursor, total_duration))
     
     # Log summary
     logger.info(f"Found {len(silences)} silence regions")
@@ -175,6 +216,117 @@ def get_audio_metadata(input_path):
     
     return metadata
 
+def get_silence_map(input_path, threshold=-50, min_duration=0.2):
+    """
+    Detect silences in an audio file and build a timestamp map for its speech-only version.
+
+    Returns:
+        tuple: (timestamp_map, silence_ranges) - see build_timestamp_map for the map format
+    """
+    silences = detect_silences(input_path, threshold=threshold, min_duration=min_duration)
+    speech_segments = get_speech_segments(input_path, silences)
+    return build_timestamp_map(speech_segments), silences
+
+def build_timestamp_map(speech_segments):
+    """
+    Build a mapping from speech-only (concatenated) time to source time.
+
+    Args:
+        speech_segments: Ordered list of (start, end) source ranges that are concatenated back to back
+
+    Returns:
+        list: One dict per range with 'concat_start', 'concat_end', 'source_start' and 'source_end'
+    """
+    timestamp_map = []
+    concat_pos = 0.0
+    for start, end in speech_segments:
+        duration = end - start
+        if duration <= 0:
+            continue
+        timestamp_map.append({
+            'concat_start': concat_pos,
+            'concat_end': concat_pos + duration,
+            'source_start': start,
+            'source_end': end,
+        })
+        concat_pos += duration
+    return timestamp_map
+
+def map_to_source_time(t, timestamp_map, is_end=False):
+    """
+    Map a timestamp in the concatenated speech stream back to source time.
+
+    A time that falls exactly on a join between two ranges is ambiguous; start times
+    resolve to the beginning of the later range and end times (is_end=True) to the
+    end of the earlier one, so a word never stretches across the removed silence.
+    """
+    if not timestamp_map:
+        return t
+    starts = [entry['concat_start'] for entry in timestamp_map]
+    idx = (bisect_left(starts, t) if is_end else bisect_right(starts, t)) - 1
+    entry = timestamp_map[min(max(idx, 0), len(timestamp_map) - 1)]
+    offset = min(max(t - entry['concat_start'], 0.0), entry['concat_end'] - entry['concat_start'])
+    return entry['source_start'] + offset
+
+def map_transcript_to_concat_time(segments, clips, tolerance=0.05):
+    """
+    Project a source-time transcript onto a video assembled from clips of the source.
+
+    This is the reverse of map_to_source_time: each clip's segments are shifted by the
+    clip's cumulative offset in the assembled video. Segments with word timestamps keep
+    only the words centred inside the clip and get their text and bounds rebuilt from
+    them. Segments without words cannot be split, so they are kept only when they lie
+    inside the clip (give or take tolerance seconds); a partly cut one is dropped rather
+    than keep speech the clip does not contain. A source range used by several clips
+    appears once per clip.
+
+    Args:
+        segments: Source transcript segments ({'start', 'end', 'text', ...}, optionally 'words')
+        clips: Ordered (start, end) source ranges concatenated back to back, i.e. the EDL
+
+    Returns:
+        list: Segments in assembled-video time, ordered by start
+    """
+    ordered = sorted(segments, key=lambda seg: seg['start'])
+    seg_starts = [seg['start'] for seg in ordered]
+    # Latest end among the segments up to each index; non-decreasing even if segments overlap
+    ends_so_far = []
+    for seg in ordered:
+        ends_so_far.append(max(seg['end'], ends_so_far[-1]) if ends_so_far else seg['end'])
+    mapped = []
+
+    for entry in build_timestamp_map(clips):
+        clip_start, clip_end = entry['source_start'], entry['source_end']
+        offset = entry['concat_start'] - clip_start
+
+        def to_concat(t):
+            return round(min(max(t, clip_start), clip_end) + offset, 3)
+
+        # Only segments starting before the clip end, after every segment ending by its start
+        for i in range(bisect_right(ends_so_far, clip_start), bisect_left(seg_starts, clip_end)):
+            seg = ordered[i]
+            if seg['end'] <= clip_start:
+                continue
+            words = seg.get('words')
+            if words:
+                inside = [w for w in words if clip_start <= (w['start'] + w['end']) / 2 < clip_end]
+                if not inside:
+                    continue
+                new_seg = dict(seg)
+                new_seg['words'] = [{**w, 'start': to_concat(w['start']), 'end': to_concat(w['end'])} for w in inside]
+                new_seg['text'] = seg['text'] if len(inside) == len(words) else ' '.join(w['word'].strip() for w in inside)
+                new_seg['start'] = new_seg['words'][0]['start']
+                new_seg['end'] = new_seg['words'][-1]['end']
+            else:
+                if seg['start'] < clip_start - tolerance or seg['end'] > clip_end + tolerance:
+                    continue
+                new_seg = dict(seg)
+                new_seg['start'] = to_concat(seg['start'])
+                new_seg['end'] = to_concat(seg['end'])
+            mapped.append(new_seg)
+
+    return mapped
+
 def preprocess_audio(input_path, output_path, silence_duration=0.2):
     """
     Preprocess audio by detecting silences and creating a mapping for video editing.
@@ -195,7 +347,7 @@ def preprocess_audio(input_path, output_path, silence_duration=0.2):
     audio_metadata = get_audio_metadata(input_path)
     
     # Get silence map first
-    timestamp_map, silence_ranges = get_silence_map(input_path)
+    timestamp_map, silence_ranges = get_silence_map(input_path, min_duration=silence_duration)
     
     try:
         # Instead of removing silences, we'll just apply basic audio enhancement
@@ -212,7 +364,7 @@ def preprocess_audio(input_path, output_path, silence_duration=0.2):
         ]
         
         logger.info("Applying audio preprocessing...")
-        process = subprocess.run(cmd, capture_output=True, text=True)
+        process = run_scheduled(cmd, capture_output=True, text=True)
         if process.returncode != 0:
             logger.error(f"FFmpeg error: {process.stderr}")
             raise RuntimeError("Failed to process audio")
@@ -241,7 +393,9 @@ def preprocess_audio(input_path, output_path, silence_duration=0.2):
 
 def transcribe_video(video_path, model_name="base", language="en", audio_track=0, 
                      silence_duration=0.2, silence_threshold=-50, 
-                     save_speech_audio_path=None):
+                     save_speech_audio_path=None, transcription_mode="per_segment",
+                     num_workers=1, progress_callback=None, backend="whisper", escalation_model=None,
+                     escalation_logprob_threshold=ESCALATION_LOGPROB_THRESHOLD):
     """
     Transcribe video using Whisper model.
     Only transcribes non-silent parts of the video.
@@ -255,19 +409,29 @@ def transcribe_video(video_path, model_name="base", language="en", audio_track=0
         silence_duration: Minimum silence duration for detection (default: 0.2)
         silence_threshold: Silence threshold in dB for detection (default: -50dB)
         save_speech_audio_path: Optional path to save the concatenated speech-only audio. (default: None)
+        transcription_mode: "per_segment" runs Whisper on each speech segment separately;
+                            "concatenated" runs it once over all speech segments joined together
+                            and remaps segment/word timestamps to source time (default: "per_segment")
+        num_workers: Worker processes for long inputs; the audio is split at silence boundaries
+                     into balanced chunks, each transcribed by a worker holding its own model (default: 1)
+        progress_callback: Optional callable(done, total, new_segments) invoked as speech segments
+                           (sequential) or chunks (parallel) finish
+        backend: Transcription engine, see app.transcription_backends (default: "whisper")
+        escalation_model: Optional larger model for cascade mode. Segments whose avg_logprob is below
+                          escalation_logprob_threshold (or that look like non-speech) are re-transcribed
+                          with it and spliced back in (default: None, no cascade)
     
     Returns:
         dict: Transcription result with segments mapped to original video timestamps, 
-              and a list of speech_segments used for video editing.
+              and a list of speech_segments used for video editing. In cascade mode it also
+              has an 'escalation' report (segments and seconds of speech escalated).
     """
-    logger.info(f"Starting transcription of {video_path} using model {model_name}, lang {language}, audio track {audio_track}")
+    if transcription_mode not in TRANSCRIPTION_MODES:
+        raise ValueError(f"Unknown transcription mode '{transcription_mode}'. Expected one of: {', '.join(TRANSCRIPTION_MODES)}")
+    logger.info(f"Starting transcription of {video_path} using {backend} model {model_name}, lang {language}, audio track {audio_track}, mode {transcription_mode}")
     
-    base_name = os.path.splitext(os.path.basename(video_path))[0]
-    main_temp_dir = tempfile.mkdtemp(prefix=f"{base_name}_")
-    temp_audio_path = os.path.join(main_temp_dir, "extracted_audio.wav")
-
     try:
-        # 1. Extract full audio from video
+        # 1. Get the decoded audio track from the shared cache (decoded once per source and track)
         # First, check what audio tracks are available
         probe_cmd = ['ffprobe', '-v', 'error', '-select_streams', 'a', '-show_streams', '-print_format', 'json', video_path]
         try:
@@ -288,71 +452,35 @@ def transcribe_video(video_path, model_name="base", language="en", audio_track=0
             logger.warning(f"Could not probe audio tracks: {e}. Using requested track {audio_track}.")
             num_audio_tracks = 1  # Assume at least one track exists
         
-        logger.info(f"Extracting audio track {audio_track} from {video_path} to {temp_audio_path}")
-        cmd_extract = [
-            'ffmpeg', '-i', video_path,
-            '-vn', '-acodec', 'pcm_s16le', '-ar', '16000', '-ac', '1',
-            '-map', f'0:a:{audio_track}', '-y', temp_audio_path
-        ]
-        subprocess.run(cmd_extract, check=True, capture_output=True, text=True)
-        logger.info("Audio extraction complete.")
+        # Every later step slices this read-only memmap; nothing is re-decoded per segment
+        audio = get_pcm(video_path, audio_track)
+        total_extracted_audio_duration = len(audio) / SAMPLE_RATE
+        logger.info(f"Mapped {total_extracted_audio_duration:.2f}s of cached 16 kHz audio for track {audio_track}.")
 
-        # 2. Detect silences
-        silences = detect_silences(temp_audio_path, threshold=silence_threshold, min_duration=silence_duration)
-        
-        # 3. Get speech segments (these are the unpadded, precise segments)
-        speech_segments_timestamps = get_speech_segments(video_path, silences)
+        # 2-3. Detect speech segments (unpadded, precise) with the NumPy VAD.
+        # Features are cached per source and track, so re-runs with other thresholds skip the analysis.
+        vad_params = VadParams(threshold_db=silence_threshold, min_silence_duration=silence_duration)
+        speech_segments_timestamps = detect_speech_in_samples(
+            audio, vad_params,
+            cache_key=source_cache_key(video_path, audio_track, vad_params.frame_duration),
+            label=video_path,
+        )
 
         # 3b. Save concatenated speech-only audio if path provided
         if save_speech_audio_path and speech_segments_timestamps:
             logger.info(f"Saving concatenated speech-only audio to: {save_speech_audio_path}")
-            speech_segment_files_dir = os.path.join(main_temp_dir, "speech_segments_for_concat")
-            os.makedirs(speech_segment_files_dir, exist_ok=True)
-            segment_file_paths = []
-            concat_list_path = os.path.join(speech_segment_files_dir, "concat_list.txt")
-
             try:
-                for i, (start, end) in enumerate(speech_segments_timestamps):
-                    seg_file_out = os.path.join(speech_segment_files_dir, f"speech_{i}.wav")
-                    cmd_extract_speech_seg = [
-                        'ffmpeg', '-i', temp_audio_path,
-                        '-ss', str(start), '-to', str(end),
-                        '-acodec', 'pcm_s16le', # Keep it as WAV
-                        '-y', seg_file_out
-                    ]
-                    subprocess.run(cmd_extract_speech_seg, check=True, capture_output=True, text=True)
-                    segment_file_paths.append(seg_file_out)
-                
-                with open(concat_list_path, 'w') as f_concat:
-                    for f_path in segment_file_paths:
-                        # FFmpeg concat demuxer needs paths to be escaped/quoted if they contain special chars.
-                        # Simpler to use relative paths if possible, or ensure paths are safe.
-                        # For now, using direct paths; ensure they don't have problematic characters or use `ffmpeg.input(filename=...)`
-                        f_concat.write(f"file '{os.path.relpath(f_path, speech_segment_files_dir).replace(os.sep, '/')}'\n")
-
-                cmd_concat_speech = [
-                    'ffmpeg', '-f', 'concat', '-safe', '0', '-i', concat_list_path,
-                    '-acodec', 'pcm_s16le', # Output as WAV
-                    '-y', save_speech_audio_path
-                ]
-                subprocess.run(cmd_concat_speech, check=True, capture_output=True, text=True)
+                speech_audio = np.concatenate([
+                    slice_audio(audio, start, end) for start, end in speech_segments_timestamps
+                ])
+                write_pcm_wav(save_speech_audio_path, speech_audio)
                 logger.info("Successfully saved speech-only audio.")
             except Exception as e_speech_audio:
                 logger.error(f"Could not save speech-only audio: {e_speech_audio}", exc_info=True)
-            finally:
-                # Clean up the temp dir used for speech segment concatenation
-                if os.path.exists(speech_segment_files_dir):
-                     shutil.rmtree(speech_segment_files_dir)
         elif save_speech_audio_path and not speech_segments_timestamps:
             logger.warning(f"No speech segments found; cannot save speech-only audio to {save_speech_audio_path}")
 
-        # 4. Determine device and Load Whisper model
-        device = "cuda" if torch.cuda.is_available() else "cpu"
-        logger.info(f"Loading Whisper model: {model_name} onto device: {device}")
-        model = whisper.load_model(model_name, device=device)
-        logger.info(f"Whisper model {model_name} loaded successfully on {device}.")
-        
-        # 5. Transcribe each speech segment individually
+        # 4. Nothing to transcribe without speech
         if not speech_segments_timestamps:
             logger.warning(f"No speech segments found in {video_path} after silence detection. Transcription will be empty.")
             return {
@@ -363,95 +491,303 @@ def transcribe_video(video_path, model_name="base", language="en", audio_track=0
             }
 
         num_speech_segments = len(speech_segments_timestamps)
-        logger.info(f"Starting transcription of {num_speech_segments} speech segments...")
-        all_transcribed_segments = []
-        full_text_parts = []
         padding_duration = 0.15
+        all_transcribed_segments = None
 
-        try:
-            probe_extracted_audio = ffmpeg.probe(temp_audio_path)
-            total_extracted_audio_duration = float(probe_extracted_audio['format']['duration'])
-        except ffmpeg.Error as e:
-            logger.error(f"Failed to probe duration for temporary audio {temp_audio_path}. FFmpeg error: {e.stderr.decode('utf8')}")
-            total_extracted_audio_duration = float('inf') 
+        # 5. Long inputs: split at silence boundaries and transcribe chunks in a process pool
+        if num_workers > 1:
+            from app.parallel_transcription import plan_chunks, transcribe_chunks_in_pool
+            chunks = plan_chunks(speech_segments_timestamps, total_extracted_audio_duration, num_workers)
+            if len(chunks) > 1:
+                all_transcribed_segments = transcribe_chunks_in_pool(
+                    str(pcm_path(video_path, audio_track)), chunks,
+                    model_name=model_name, language=language, mode=transcription_mode,
+                    padding_duration=padding_duration, num_workers=num_workers,
+                    progress_callback=progress_callback, backend=backend,
+                )
 
-        for i, (unpadded_seg_start, unpadded_seg_end) in enumerate(speech_segments_timestamps):
+        if all_transcribed_segments is None:
+            # 6. Load the transcription model (reused across calls in this process)
+            model = load_backend(backend, model_name)
+            logger.info(f"{backend} model {model_name} ready on {model.device}.")
+
+            if transcription_mode == "concatenated":
+                all_transcribed_segments = _transcribe_concatenated(
+                    model, audio, speech_segments_timestamps, language, padding_duration
+                )
+                if progress_callback:
+                    progress_callback(1, 1, all_transcribed_segments)
+            else:
+                all_transcribed_segments = _transcribe_per_segment(
+                    model, audio, speech_segments_timestamps, language, padding_duration,
+                    show_progress=True, progress_callback=progress_callback
+                )
+
+        escalation_report = None
+        if escalation_model and escalation_model != model_name:
+            all_transcribed_segments, escalation_report = escalate_low_confidence(
+                all_transcribed_segments, audio, language, escalation_model, backend=backend,
+                padding_duration=padding_duration, logprob_threshold=escalation_logprob_threshold,
+            )
+
+        final_text = ' '.join(seg['text'] for seg in all_transcribed_segments)
+        logger.info(f"Transcription of {num_speech_segments} speech segments complete ({transcription_mode}). Total text length: {len(final_text)} chars.")
+        result = {
+            'text': final_text,
+            'segments': all_transcribed_segments,
+            'language': language,
+            'speech_segments': speech_segments_timestamps
+        }
+        if escalation_report is not None:
+            result['escalation'] = escalation_report
+        return result
+        
+    except Exception as e:
+        logger.error(f"Error during transcription process for {video_path}: {e}", exc_info=True)
+        raise
+
+def _transcribe_per_segment(model, audio, speech_segments, language, padding_duration,
+                            show_progress=False, progress_callback=None):
+    """
+    Run Whisper on each padded speech segment separately, with timestamps in source time.
+
+    progress_callback, if given, is called as progress_callback(done, total, new_segments)
+    after every speech segment.
+    """
+    total_duration = len(audio) / SAMPLE_RATE
+    num_speech_segments = len(speech_segments)
+    if show_progress:
+        logger.info(f"Starting transcription of {num_speech_segments} speech segments...")
+    transcribed_segments = []
+    progress_message = ""
+
+    for i, (unpadded_seg_start, unpadded_seg_end) in enumerate(speech_segments):
+        if show_progress:
             progress_message = f"\rTranscribing speech segments: {i+1}/{num_speech_segments} processed..."
             sys.stdout.write(progress_message)
             sys.stdout.flush()
 
-            segment_duration = unpadded_seg_end - unpadded_seg_start
-            if segment_duration <= 0.1: 
-                logger.debug(f"Skipping speech segment {i+1}/{num_speech_segments} (duration {segment_duration:.2f}s) as it is too short.")
-                continue
-
-            whisper_infer_start = max(0.0, unpadded_seg_start - padding_duration)
-            whisper_infer_end = min(total_extracted_audio_duration, unpadded_seg_end + padding_duration)
-            
-            if whisper_infer_end <= whisper_infer_start:
-                logger.debug(f"Skipping speech segment {i+1}/{num_speech_segments} after padding resulted in zero/negative duration.")
-                continue
+        new_segments = []
+        segment_duration = unpadded_seg_end - unpadded_seg_start
+        whisper_infer_start = max(0.0, unpadded_seg_start - padding_duration)
+        whisper_infer_end = min(total_duration, unpadded_seg_end + padding_duration)
 
+        if segment_duration <= 0.1:
+            logger.debug(f"Skipping speech segment {i+1}/{num_speech_segments} (duration {segment_duration:.2f}s) as it is too short.")
+        elif whisper_infer_end <= whisper_infer_start:
+            logger.debug(f"Skipping speech segment {i+1}/{num_speech_segments} after padding resulted in zero/negative duration.")
+        else:
             logger.debug(f"Processing speech segment {i+1}/{num_speech_segments}: Original ({unpadded_seg_start:.2f}s - {unpadded_seg_end:.2f}s), Padded for Whisper ({whisper_infer_start:.2f}s - {whisper_infer_end:.2f}s)")
-            segment_audio_path = os.path.join(main_temp_dir, f"segment_{i}.wav")
-            
             try:
-                cmd_segment_extract = [
-                    'ffmpeg', '-i', temp_audio_path,
-                    '-ss', str(whisper_infer_start), 
-                    '-to', str(whisper_infer_end),
-                    '-acodec', 'pcm_s16le', 
-                    '-y',
-                    segment_audio_path
-                ]
-                subprocess.run(cmd_segment_extract, check=True, capture_output=True, text=True)
-
+                segment_audio = slice_audio(audio, whisper_infer_start, whisper_infer_end)
                 with suppress_output(stderr=True, stdout=False):
-                    result = model.transcribe(segment_audio_path, language=language, verbose=False)
-                
+                    result = model.transcribe(segment_audio, language=language, verbose=False)
+
                 for whisper_seg in result.get('segments', []):
-                    original_seg_start_time = whisper_infer_start + whisper_seg['start']
-                    original_seg_end_time = whisper_infer_start + whisper_seg['end']
-                    adjusted_segment = {
-                        'start': original_seg_start_time,
-                        'end': original_seg_end_time,
+                    new_segments.append({
+                        'start': whisper_infer_start + whisper_seg['start'],
+                        'end': whisper_infer_start + whisper_seg['end'],
                         'text': whisper_seg['text'].strip(),
                         'avg_logprob': whisper_seg.get('avg_logprob'),
                         'no_speech_prob': whisper_seg.get('no_speech_prob')
-                    }
-                    all_transcribed_segments.append(adjusted_segment)
-                    full_text_parts.append(whisper_seg['text'].strip())
+                    })
                 logger.debug(f"Segment {i+1} transcribed. Text: '{result.get('text', '').strip()[:50]}...'")
 
             except Exception as e_seg:
                 logger.error(f"\nError processing segment {i+1} ({unpadded_seg_start:.2f}-{unpadded_seg_end:.2f}): {e_seg}")
-            finally:
-                if os.path.exists(segment_audio_path):
-                    os.remove(segment_audio_path)
-        
+
+        transcribed_segments.extend(new_segments)
+        if progress_callback:
+            progress_callback(i + 1, num_speech_segments, new_segments)
+
+    if show_progress:
         sys.stdout.write("\r" + " " * len(progress_message) + "\r")
         sys.stdout.flush()
-        logger.info(f"Transcription of {num_speech_segments} speech segments complete. Total text length: {len(' '.join(full_text_parts))} chars.")
+    return transcribed_segments
 
-        final_text = ' '.join(full_text_parts)
-        final_result = {
-            'text': final_text,
-            'segments': all_transcribed_segments,
-            'language': language,
-            'speech_segments': speech_segments_timestamps
-        }
-        
-        return final_result
-        
-    except Exception as e:
-        logger.error(f"Error during transcription process for {video_path}: {e}", exc_info=True)
-        raise
-    finally:
-        if os.path.exists(main_temp_dir):
-            shutil.rmtree(main_temp_dir)
-            logger.info(f"Cleaned up main temporary directory: {main_temp_dir}")
+def _transcribe_concatenated(model, audio, speech_segments, language, padding_duration):
+    """
+    Run Whisper once over the speech-only stream and remap its output to source time.
+
+    Each speech segment is padded the same way as in per-segment mode; overlapping
+    padded windows are merged so no audio is fed twice. Word timestamps are requested
+    so segments that span a join between two windows still map back precisely.
+    """
+    total_duration = len(audio) / SAMPLE_RATE
+    windows = []
+    for start, end in speech_segments:
+        if end - start <= 0.1:
+            continue
+        win_start = max(0.0, start - padding_duration)
+        win_end = min(total_duration, end + padding_duration)
+        if windows and win_start <= windows[-1][1]:
+            windows[-1] = (windows[-1][0], max(windows[-1][1], win_end))
+        elif win_end > win_start:
+            windows.append((win_start, win_end))
+
+    if not windows:
+        return []
+
+    timestamp_map = build_timestamp_map(windows)
+    speech_audio = np.concatenate([slice_audio(audio, start, end) for start, end in windows])
+    logger.info(f"Transcribing {len(speech_audio) / SAMPLE_RATE:.2f}s of concatenated speech "
+                f"({len(windows)} windows, {total_duration:.2f}s source) in a single pass...")
 
-def transcribe_audio_with_word_timestamps(audio_path: str, language: str, model_name: str, device: str = None) -> List[Dict[str, Any]]:
+    with suppress_output(stderr=True, stdout=False):
+        result = model.transcribe(speech_audio, language=language, verbose=False, word_timestamps=True)
+
+    segments = []
+    for whisper_seg in result.get('segments', []):
+        text = whisper_seg['text'].strip()
+        if not text:
+            continue
+        words = [
+            {
+                'word': word['word'].strip(),
+                'start': map_to_source_time(word['start'], timestamp_map),
+                'end': map_to_source_time(word['end'], timestamp_map, is_end=True),
+                'confidence': word.get('probability', 0.0),
+            }
+            for word in whisper_seg.get('words', [])
+        ]
+        segments.append({
+            'start': words[0]['start'] if words else map_to_source_time(whisper_seg['start'], timestamp_map),
+            'end': words[-1]['end'] if words else map_to_source_time(whisper_seg['end'], timestamp_map, is_end=True),
+            'text': text,
+            'avg_logprob': whisper_seg.get('avg_logprob'),
+            'no_speech_prob': whisper_seg.get('no_speech_prob'),
+            'words': words,
+        })
+    return segments
+
+def is_low_confidence(segment, logprob_threshold=ESCALATION_LOGPROB_THRESHOLD,
+                      no_speech_threshold=ESCALATION_NO_SPEECH_THRESHOLD):
+    """Whether Whisper was unsure about a segment's text or about it being speech at all."""
+    avg_logprob = segment.get('avg_logprob')
+    no_speech_prob = segment.get('no_speech_prob')
+    if avg_logprob is None:
+        return False
+    return avg_logprob < logprob_threshold or (no_speech_prob or 0.0) > no_speech_threshold
+
+def escalate_low_confidence(segments, audio, language, escalation_model, backend="whisper",
+                            padding_duration=0.15, logprob_threshold=ESCALATION_LOGPROB_THRESHOLD,
+                            no_speech_threshold=ESCALATION_NO_SPEECH_THRESHOLD, merge_gap=1.0):
+    """
+    Re-transcribe low-confidence segments with a larger model and splice the results back.
+
+    Adjacent low-confidence segments (less than merge_gap apart) are re-transcribed together
+    as one padded window, which gives the larger model some context. A window's new segments
+    only replace the originals when the larger model is more confident on average.
+
+    Returns:
+        tuple: (segments, report) where report describes how much audio was escalated
+    """
+    started = time.time()
+    total_duration = len(audio) / SAMPLE_RATE
+    speech_seconds = sum(seg['end'] - seg['start'] for seg in segments)
+
+    groups = []
+    for i, seg in enumerate(segments):
+        if not is_low_confidence(seg, logprob_threshold, no_speech_threshold):
+            continue
+        if groups and groups[-1][-1] == i - 1 and seg['start'] - segments[i - 1]['end'] < merge_gap:
+            groups[-1].append(i)
+        else:
+            groups.append([i])
+
+    report = {
+        'escalation_model': escalation_model,
+        'logprob_threshold': logprob_threshold,
+        'no_speech_threshold': no_speech_threshold,
+        'segments_total': len(segments),
+        'segments_escalated': sum(len(group) for group in groups),
+        'windows_escalated': len(groups),
+        'windows_replaced': 0,
+        'speech_seconds': round(speech_seconds, 3),
+        'escalated_seconds': round(sum(segments[i]['end'] - segments[i]['start'] for group in groups for i in group), 3),
+    }
+    report['escalated_fraction'] = round(report['escalated_seconds'] / speech_seconds, 4) if speech_seconds else 0.0
+    if not groups:
+        report['elapsed_seconds'] = round(time.time() - started, 3)
+        return segments, report
+
+    logger.info(f"Escalating {report['segments_escalated']}/{len(segments)} low-confidence segments "
+                f"({report['escalated_seconds']:.1f}s of {speech_seconds:.1f}s speech) to {escalation_model}")
+    model = load_backend(backend, escalation_model)
+
+    replacements = {}
+    for group in groups:
+        group_start = segments[group[0]]['start']
+        group_end = segments[group[-1]]['end']
+        with_words = any('words' in segments[i] for i in group)
+        win_start = max(0.0, group_start - padding_duration)
+        win_end = min(total_duration, group_end + padding_duration)
+        if win_end <= win_start:
+            continue
+        try:
+            with suppress_output(stderr=True, stdout=False):
+                result = model.transcribe(slice_audio(audio, win_start, win_end), language=language,
+                                          verbose=False, word_timestamps=with_words)
+        except Exception as e:
+            logger.error(f"Escalation of {group_start:.2f}-{group_end:.2f}s failed, keeping original text: {e}")
+            continue
+
+        new_segments = []
+        for whisper_seg in result.get('segments', []):
+            text = whisper_seg['text'].strip()
+            start = win_start + whisper_seg['start']
+            end = win_start + whisper_seg['end']
+            # Padding can pick up a neighbouring segment's words; keep only what this window owns
+            if not text or not group_start <= (start + end) / 2 <= group_end:
+                continue
+            new_seg = {
+                'start': start,
+                'end': end,
+                'text': text,
+                'avg_logprob': whisper_seg.get('avg_logprob'),
+                'no_speech_prob': whisper_seg.get('no_speech_prob'),
+            }
+            if with_words:
+                new_seg['words'] = [
+                    {
+                        'word': word['word'].strip(),
+                        'start': win_start + word['start'],
+                        'end': win_start + word['end'],
+                        'confidence': word.get('probability', 0.0),
+                    }
+                    for word in whisper_seg.get('words', [])
+                ]
+            new_segments.append(new_seg)
+
+        old_score = np.mean([segments[i]['avg_logprob'] for i in group])
+        new_scores = [seg['avg_logprob'] for seg in new_segments if seg['avg_logprob'] is not None]
+        if new_segments and new_scores and np.mean(new_scores) > old_score:
+            replacements[group[0]] = (group, new_segments)
+            report['windows_replaced'] += 1
+        else:
+            logger.debug(f"Kept original text for {group_start:.2f}-{group_end:.2f}s; {escalation_model} was not more confident")
+
+    spliced = []
+    skip_until = -1
+    for i, seg in enumerate(segments):
+        if i <= skip_until:
+            continue
+        if i in replacements:
+            group, new_segments = replacements[i]
+            spliced.extend(new_segments)
+            skip_until = group[-1]
+        else:
+            spliced.append(seg)
+
+    report['elapsed_seconds'] = round(time.time() - started, 3)
+    logger.info(f"Escalation done: {report['windows_replaced']}/{len(groups)} windows replaced by {escalation_model}, "
+                f"{report['escalated_fraction'] * 100:.1f}% of speech escalated, {report['elapsed_seconds']:.1f}s")
+    return spliced, report
+
+def transcribe_audio_with_word_timestamps(audio_path: str, language: str, model_name: str, device: str = None,
+                                          audio: np.ndarray = None, num_workers: int = 1, audio_track: int = 0,
+                                          progress_callback=None, backend: str = "whisper",
+                                          streaming: bool = False) -> List[Dict[str, Any]]:
     """
     Transcribes the given audio file using Whisper and returns word-level timestamps.
 
@@ -460,56 +796,64 @@ def transcribe_audio_with_word_timestamps(audio_path: str, language: str, model_
         language: Language code for transcription (e.g., "en").
         model_name: Name of the Whisper model to use (e.g., "base", "small").
         device: The device to run the model on ("cuda" or "cpu"). Autodetects if None.
+        audio: Optional pre-decoded 16 kHz samples (e.g. from the audio cache). When given,
+               Whisper transcribes these and audio_path is only used for logging.
+        num_workers: Worker processes for long inputs. The track is taken from the decoded-audio
+                     cache, split at VAD silence boundaries and transcribed chunk by chunk.
+        audio_track: Audio track of audio_path used for chunked transcription.
+        progress_callback: Optional callable(done, total, new_words) invoked per finished chunk.
+        backend: Transcription engine, see app.transcription_backends.
+        streaming: Read audio_path through an ffmpeg pipe in overlapping windows instead of
+                   decoding it whole (see transcribe_audio_streaming); memory stays constant
+                   regardless of duration. audio and num_workers are ignored.
 
     Returns:
         A list of dictionaries, where each dictionary represents a word and contains:
         - "word": The transcribed word (string).
         - "start": The start time of the word in seconds (float).
         - "end": The end time of the word in seconds (float).
-        - "probability": The probability of the word (float, via whisperx compatibility if available).
-                         For standard whisper, this might be less direct or might need to be inferred.
-                         Whisper's standard output gives segment-level probabilities.
-                         If direct word probability isn't available, we might omit or estimate.
     """
     logger.info(f"Starting word-level transcription for: {audio_path} using model {model_name}, lang {language}")
     
-    if device is None:
-        device = "cuda" if torch.cuda.is_available() else "cpu"
-    
     try:
-        logger.debug(f"Loading Whisper model: {model_name} onto device: {device} for word-level transcription.")
-        # Ensure model is loaded on the correct device each time, or manage a global model instance carefully.
-        # For simplicity here, loading it per call.
-        model = whisper.load_model(model_name, device=device)
-        logger.debug(f"Whisper model {model_name} loaded for word-level transcription.")
+        if streaming:
+            return transcribe_audio_streaming(audio_path, language, model_name, audio_track=audio_track,
+                                              backend=backend, progress_callback=progress_callback)
+
+        if num_workers > 1:
+            from app.parallel_transcription import plan_span_chunks, transcribe_chunks_in_pool
+            samples = get_pcm(audio_path, audio_track)
+            total_duration = len(samples) / SAMPLE_RATE
+            speech = detect_speech_in_samples(samples, VadParams(), cache_key=source_cache_key(audio_path, audio_track),
+                                              label=audio_path)
+            chunks = plan_span_chunks(speech, total_duration, num_workers)
+            if len(chunks) > 1:
+                all_words = transcribe_chunks_in_pool(
+                    str(pcm_path(audio_path, audio_track)), chunks,
+                    model_name=model_name, language=language, mode="words",
+                    num_workers=num_workers, progress_callback=progress_callback, backend=backend,
+                )
+                logger.info(f"Word-level transcription complete. Extracted {len(all_words)} words from {audio_path} in {len(chunks)} chunks.")
+                return all_words
+
+        model = load_backend(backend, model_name, device=device)
+        logger.debug(f"{backend} model {model_name} loaded on {model.device} for word-level transcription.")
 
         # Transcribe with word_timestamps=True
         # Note: Standard whisper.transcribe() returns segment-level data even with word_timestamps=True.
         # The word timestamps are nested within each segment. We need to extract and flatten them.
         # Also, verbose=False can hide progress bars that might be undesirable for library use.
-        # However, for debugging, verbose=True might be useful temporarily.
-        result = model.transcribe(audio_path, language=language, word_timestamps=True, verbose=False)
+        if audio is not None and audio.dtype == np.int16:
+            audio = to_float(audio)
+        result = model.transcribe(audio if audio is not None else audio_path, language=language, word_timestamps=True, verbose=False)
         
-        all_words = []
-        if result and 'segments' in result:
-            for segment in result['segments']:
-                if 'words' in segment:
-                    for word_data in segment['words']:
-                        # word_data from whisper is typically: {'word': str, 'start': float, 'end': float, 'probability': float}
-                        # We should ensure the keys match our desired output or adapt if different.
-                        # Standard whisper might not directly give 'probability' per word in this structure,
-                        # it's more common in whisperx or aligned outputs.
-                        # Let's check what standard whisper provides for 'words'.
-                        # Defaulting to what is usually available. Adding a placeholder for probability.
-                        all_words.append({
-                            "word": word_data['word'].strip(), # Clean up any leading/trailing spaces from the word itself
-                            "start": round(word_data['start'], 3),
-                            "end": round(word_data['end'], 3),
-                            # "probability": round(word_data.get('probability', 0.0), 3) # Safely get probability if available
-                        })
+        all_words = words_from_result(result)
+        if all_words:
             logger.info(f"Word-level transcription complete. Extracted {len(all_words)} words from {audio_path}.")
         else:
             logger.warning(f"No segments or words found in transcription result for {audio_path}.")
+        if progress_callback:
+            progress_callback(1, 1, all_words)
             
         return all_words
 
@@ -519,4 +863,238 @@ def transcribe_audio_with_word_timestamps(audio_path: str, language: str, model_
     except Exception as e:
         logger.error(f"Error during word-level transcription for {audio_path}: {e}", exc_info=True)
         # Consider if specific errors should be handled differently or re-raised.
-        raise
\ No newline at end of file
+        raise
+
+def transcribe_words_incrementally(audio_path: str, language: str, model_name: str, start_offset: float = 0.0,
+                                   num_workers: int = 1, audio_track: int = 0, on_chunk=None,
+                                   chunk_speech_seconds: float = 300.0, backend: str = "whisper",
+                                   streaming: bool = False) -> List[Dict[str, Any]]:
+    """
+    Word-level transcription that delivers results chunk by chunk, in source order.
+
+    The track is split at VAD silence boundaries into chunks of about chunk_speech_seconds
+    of speech. Chunks ending at or before start_offset are skipped, so a job resumed from
+    a checkpoint continues where it stopped. The split is deterministic for a given
+    source, so a checkpointed offset always lines up with a chunk boundary.
+
+    With streaming, the track is instead read through an ffmpeg pipe window by window
+    (see transcribe_audio_streaming) and never decoded whole; each window is a chunk,
+    and decoding of a resumed job starts just before start_offset. num_workers is ignored.
+
+    Args:
+        on_chunk: Optional callable(words, processed_until, total_duration) invoked after each
+                  chunk; every word before processed_until has been delivered at that point.
+
+    Returns:
+        list: Words transcribed in this call (from start_offset onwards)
+    """
+    if streaming:
+        total_duration = probe_duration(audio_path) or 0.0
+        all_words = []
+        for words, processed_until in iter_stream_words(audio_path, language, model_name, audio_track=audio_track,
+                                                        start_offset=start_offset, backend=backend):
+            all_words.extend(words)
+            if on_chunk:
+                on_chunk(words, processed_until, max(total_duration, processed_until))
+        return all_words
+
+    samples = get_pcm(audio_path, audio_track)
+    total_duration = len(samples) / SAMPLE_RATE
+    speech = detect_speech_in_samples(samples, VadParams(), cache_key=source_cache_key(audio_path, audio_track),
+                                      label=audio_path)
+
+    from app.parallel_transcription import plan_span_chunks, transcribe_chunks_in_pool
+    chunks = plan_span_chunks(speech, total_duration, num_workers, chunk_speech_seconds=chunk_speech_seconds)
+    pending = [chunk for chunk in chunks if chunk.end > start_offset + 1e-3]
+    if pending and pending[0].start < start_offset:
+        pending[0].start = start_offset
+        pending[0].speech_segments = [(start_offset, pending[0].end)]
+    logger.info(f"Incremental transcription of {audio_path}: {len(pending)}/{len(chunks)} chunks "
+                f"remaining from {start_offset:.2f}s of {total_duration:.2f}s")
+
+    all_words = []
+    if num_workers > 1 and len(pending) > 1:
+        def on_chunk_done(chunk, words):
+            all_words.extend(words)
+            if on_chunk:
+                on_chunk(words, chunk.end, total_duration)
+
+        transcribe_chunks_in_pool(
+            str(pcm_path(audio_path, audio_track)), pending,
+            model_name=model_name, language=language, mode="words",
+            num_workers=num_workers, on_chunk_done=on_chunk_done, backend=backend,
+        )
+        return all_words
+
+    if not pending:
+        return all_words
+    model = load_backend(backend, model_name)
+    for chunk in pending:
+        span = slice_audio(samples, chunk.start, chunk.end)
+        with suppress_output(stderr=True, stdout=False):
+            result = model.transcribe(span, language=language, word_timestamps=True, verbose=False)
+        words = words_from_result(result, offset=chunk.start)
+        all_words.extend(words)
+        if on_chunk:
+            on_chunk(words, chunk.end, total_duration)
+    return all_words
+
+def iter_pcm_windows(source_path: str, audio_track: int = 0, window_seconds: float = STREAM_WINDOW_SECONDS,
+                     overlap_seconds: float = STREAM_OVERLAP_SECONDS, start_offset: float = 0.0):
+    """
+    Decode an audio track through an ffmpeg pipe and yield overlapping windows of it,
+    starting start_offset seconds into the track.
+
+    Only one window of samples is held at a time, so memory does not grow with the
+    length of the input and nothing is written to disk.
+
+    Yields:
+        tuple: (window_start_seconds, float32 samples, is_last)
+    """
+    window = int(window_seconds * SAMPLE_RATE)
+    overlap = int(overlap_seconds * SAMPLE_RATE)
+    if not 0 <= overlap < window:
+        raise ValueError(f"overlap_seconds ({overlap_seconds}) must be smaller than window_seconds ({window_seconds})")
+    step = window - overlap
+
+    seek = ['-ss', f'{start_offset:.3f}'] if start_offset > 0 else []
+    cmd = ['ffmpeg', '-nostdin', '-v', 'error', *seek, '-i', source_path, '-vn', '-map', f'0:a:{audio_track}',
+           '-f', 's16le', '-acodec', 'pcm_s16le', '-ar', str(SAMPLE_RATE), '-ac', '1', '-']
+    with ffmpeg_slot(BATCH) as slot, tempfile.TemporaryFile() as stderr_file:
+        cmd = apply_threads(cmd, slot.threads)
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr_file)
+        ffmpeg_scheduler.attach(slot, proc.pid)
+        try:
+            buffer = np.zeros(0, dtype=np.int16)
+            start_sample = 0
+            while True:
+                data = proc.stdout.read((window - len(buffer)) * 2)
+                if data:
+                    buffer = np.concatenate([buffer, np.frombuffer(data[:len(data) - len(data) % 2], dtype=np.int16)])
+                is_last = len(buffer) < window
+                # The tail of the previous window was already yielded as this one's overlap
+                if len(buffer) > (overlap if start_sample else 0):
+                    yield start_offset + start_sample / SAMPLE_RATE, to_float(buffer), is_last
+                if is_last:
+                    break
+                buffer = buffer[step:].copy()
+                start_sample += step
+        finally:
+            proc.stdout.close()
+            if proc.poll() is None:
+                proc.kill()
+            ffmpeg_scheduler.detach(slot, proc.pid)
+            returncode = proc.wait()
+
+        if returncode not in (0, -9):
+            stderr_file.seek(0)
+            raise subprocess.CalledProcessError(returncode, cmd, stderr=stderr_file.read().decode(errors="replace"))
+
+def probe_duration(path: str):
+    """Container duration of path in seconds, or None if ffprobe cannot tell."""
+    try:
+        probe = subprocess.run(
+            ['ffprobe', '-v', 'error', '-show_entries', 'format=duration', '-of', 'json', path],
+            capture_output=True, text=True, check=True,
+        )
+        return float(json.loads(probe.stdout)['format']['duration'])
+    except Exception:
+        return None
+
+def iter_stream_words(audio_path: str, language: str, model_name: str, audio_track: int = 0,
+                      start_offset: float = 0.0, window_seconds: float = STREAM_WINDOW_SECONDS,
+                      overlap_seconds: float = STREAM_OVERLAP_SECONDS, backend: str = "whisper"):
+    """
+    Transcribe audio_path window by window from an ffmpeg pipe (see transcribe_audio_streaming).
+
+    Decoding starts overlap_seconds before start_offset, so words at start_offset are
+    heard whole; only words centred at or after start_offset are yielded.
+
+    Yields:
+        tuple: (words that became final, processed_until); every word centred before
+               processed_until has been yielded at that point
+    """
+    from app.parallel_transcription import _dedupe_boundaries
+
+    model = load_backend(backend, model_name)
+    logger.info(f"Streaming word-level transcription of {audio_path} with {backend} {model_name} "
+                f"({window_seconds:.0f}s windows, {overlap_seconds:.0f}s overlap, from {start_offset:.1f}s)")
+
+    all_words: List[Dict[str, Any]] = []
+    finalized = 0
+    decode_from = max(0.0, start_offset - overlap_seconds)
+    for index, (window_start, samples, is_last) in enumerate(
+            iter_pcm_windows(audio_path, audio_track, window_seconds, overlap_seconds, start_offset=decode_from)):
+        window_end = window_start + len(samples) / SAMPLE_RATE
+        with suppress_output(stderr=True, stdout=False):
+            result = model.transcribe(samples, language=language, word_timestamps=True, verbose=False)
+        window_words = words_from_result(result, offset=window_start)
+        del samples, result
+
+        if index > 0:
+            cut = window_start + overlap_seconds / 2
+            while len(all_words) > finalized and (all_words[-1]['start'] + all_words[-1]['end']) / 2 >= cut:
+                all_words.pop()
+            window_words = [w for w in window_words if (w['start'] + w['end']) / 2 >= cut]
+        elif start_offset > 0:
+            # Words before start_offset were delivered by the run being resumed
+            window_words = [w for w in window_words if (w['start'] + w['end']) / 2 >= start_offset]
+        merged = _dedupe_boundaries(all_words[-1:] + window_words)
+        all_words.extend(merged[1:] if all_words else merged)
+
+        # Words centred before the next window's cut can no longer change
+        next_cut = window_start + window_seconds - overlap_seconds / 2
+        final_until = len(all_words) if is_last else finalized + sum(
+            1 for w in all_words[finalized:] if (w['start'] + w['end']) / 2 < next_cut
+        )
+        yield all_words[finalized:final_until], (window_end if is_last else next_cut)
+        finalized = final_until
+
+    logger.info(f"Streaming transcription complete. Extracted {len(all_words)} words from {audio_path}.")
+
+def transcribe_audio_streaming(audio_path: str, language: str, model_name: str, audio_track: int = 0,
+                               window_seconds: float = STREAM_WINDOW_SECONDS,
+                               overlap_seconds: float = STREAM_OVERLAP_SECONDS,
+                               backend: str = "whisper", progress_callback=None) -> List[Dict[str, Any]]:
+    """
+    Word-level transcription with memory bounded by one window, for multi-hour inputs.
+
+    PCM is read from an ffmpeg pipe in windows of window_seconds that overlap by
+    overlap_seconds. In each overlap the earlier window keeps the words centred in the
+    first half and the later window the words centred in the second half, so words
+    cut off at a window edge come from the window that heard them whole. A word that
+    both windows place across the cut is kept once.
+
+    Args:
+        progress_callback: Optional callable(done, total, new_words) invoked per window with the
+                           words that became final; total is an estimate (0 if the duration is unknown).
+
+    Returns:
+        list: Words with "word", "start" and "end" in source time
+    """
+    total_windows = 0
+    duration = probe_duration(audio_path)
+    if duration is not None:
+        total_windows = max(1, int(np.ceil(max(duration - overlap_seconds, 0) / (window_seconds - overlap_seconds))))
+
+    all_words: List[Dict[str, Any]] = []
+    for index, (words, _) in enumerate(iter_stream_words(audio_path, language, model_name, audio_track,
+                                                         window_seconds=window_seconds,
+                                                         overlap_seconds=overlap_seconds, backend=backend)):
+        all_words.extend(words)
+        if progress_callback:
+            progress_callback(index + 1, max(total_windows, index + 1), words)
+    return all_words
+
+def words_from_result(result, offset=0.0) -> List[Dict[str, Any]]:
+    """Flatten the per-segment word timestamps of a Whisper result, shifted by offset seconds."""
+    all_words = []
+    for segment in (result or {}).get('segments', []):
+        for word_data in segment.get('words', []):
+            # word_data from whisper is typically: {'word': str, 'start': float, 'end': float, 'probability': float}
+            all_words.append({
+                "word": word_data['word'].strip(), # Clean up any leading/trailing spaces from the word itself
+                "start": round(word_data['start'] + offset, 3),
+                "end": round(word_data['end'] + offset, 3),
+            })
+    return all_words
@@ -0,0 +1,77 @@
+"""
+Standalone render worker: python -m app.worker
+
+Claims render tasks (app.render_tasks) from the jobs table and runs them, so encoding
+moves off the machine serving the API. Start the API with RENDER_TASKS=queue and run
+any number of workers, on this host or others, that see the same data directory
+(database, uploads and tmp/ at the same absolute paths) from the repository root.
+
+Each worker heartbeats its tasks; tasks of a worker that dies are requeued for
+another one after JOB_STALE_SECONDS. SIGINT/SIGTERM stop claiming and put running
+tasks back in the queue.
+
+Usage:
+    python -m app.worker
+    python -m app.worker --concurrency 4 --kinds encode_range package_cmaf
+"""
+
+import argparse
+import asyncio
+import logging
+import signal
+import sys
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app.database import init_db
+from app.ffmpeg_scheduler import scheduler
+from app.job_store import WORKER_ID, JobWorker
+from app.render_tasks import RENDER_TASK_KINDS, RENDER_TASK_POLL_SECONDS
+
+logger = logging.getLogger("app.worker")
+
+
+async def run_worker(concurrency: int, kinds) -> None:
+    init_db()
+    worker = JobWorker(worker_id=f"render:{WORKER_ID}", concurrency=concurrency,
+                       poll_interval=RENDER_TASK_POLL_SECONDS, kinds=list(kinds), fail_unhandled=False)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass  # Windows: Ctrl+C raises KeyboardInterrupt instead
+
+    worker.start()
+    try:
+        await stop.wait()
+    finally:
+        logger.info("Stopping render worker; running tasks go back to the queue")
+        await worker.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=scheduler.max_processes,
+                        help="Tasks run at once (default: FFMPEG_MAX_PROCESSES)")
+    parser.add_argument("--kinds", nargs="+", default=list(RENDER_TASK_KINDS), choices=RENDER_TASK_KINDS,
+                        help="Render task kinds to claim (default: all)")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s %(levelname)s: %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S',
+        handlers=[logging.StreamHandler(sys.stdout)]
+    )
+    try:
+        asyncio.run(run_worker(args.concurrency, args.kinds))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
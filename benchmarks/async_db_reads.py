@@ -0,0 +1,170 @@
+"""
+Benchmark: hot database reads from async code, sync vs aiosqlite sessions.
+
+Seeds a temporary database with a source video, --segments transcript segments
+(with word timings) and an edit with --decisions decisions, then runs the reads
+async endpoints make on hot paths from --concurrency coroutines at once:
+
+    source     SourceVideoDAO.get_by_id
+    edit       EditDAO.get_with_decisions
+    transcript TranscriptSegmentDAO.get_by_video
+
+in three ways:
+
+    sync on loop    sync DAO with SessionLocal, called from the coroutine (what
+                    async handlers used to do; blocks the event loop)
+    sync in thread  sync DAO with a SessionLocal per call, via asyncio.to_thread
+    async           *_async DAO with an AsyncSessionLocal per call
+
+and reports per-read latency percentiles, throughput and the worst event-loop lag
+measured by app.loop_monitor while the load ran.
+
+Usage:
+    python benchmarks/async_db_reads.py --concurrency 1 8 32 --requests 400
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+# Set before any app module reads its configuration
+DATA_DIR = tempfile.mkdtemp(prefix="async_db_reads_")
+os.environ["DATA_DIR"] = DATA_DIR
+
+import app.models  # noqa: F401  (registers the tables)
+from app.dao import EditDAO, EditDecisionDAO, ProjectDAO, SourceVideoDAO, TranscriptSegmentDAO
+from app.database import AsyncSessionLocal, SessionLocal, dispose_async_engine, init_db
+from app.loop_monitor import LoopLagMonitor
+
+READS = ("source", "edit", "transcript")
+
+
+def seed(segments: int, decisions: int) -> dict:
+    db = SessionLocal()
+    try:
+        project = ProjectDAO.create(db, name="async db reads")
+        video = SourceVideoDAO.create(db, project_id=project.id, filename="bench.mp4",
+                                      file_path=os.path.join(DATA_DIR, "bench.mp4"))
+        segs = TranscriptSegmentDAO.create_many(db, video.id, [{
+            "start": i * 3.0,
+            "end": i * 3.0 + 2.5,
+            "text": f"segment {i} " + "word " * 12,
+            "words": [{"word": "word", "start": i * 3.0 + w * 0.2, "end": i * 3.0 + w * 0.2 + 0.15}
+                      for w in range(12)],
+        } for i in range(segments)])
+        edit = EditDAO.create(db, project_id=project.id, source_video_id=video.id, name="bench edit")
+        EditDecisionDAO.create_many(db, edit.id, [{
+            "segment_id": seg.id,
+            "source_video_id": video.id,
+            "start_time": seg.start_time,
+            "end_time": seg.end_time,
+            "transcript_text": seg.text,
+        } for seg in segs[:decisions]])
+        return {"video_id": video.id, "edit_id": edit.id}
+    finally:
+        db.close()
+
+
+def sync_read(kind: str, ids: dict) -> int:
+    db = SessionLocal()
+    try:
+        if kind == "source":
+            return 1 if SourceVideoDAO.get_by_id(db, ids["video_id"]) else 0
+        if kind == "edit":
+            return len(EditDAO.get_with_decisions(db, ids["edit_id"]).edit_decisions)
+        return len(TranscriptSegmentDAO.get_by_video(db, ids["video_id"]))
+    finally:
+        db.close()
+
+
+async def async_read(kind: str, ids: dict) -> int:
+    async with AsyncSessionLocal() as db:
+        if kind == "source":
+            return 1 if await SourceVideoDAO.get_by_id_async(db, ids["video_id"]) else 0
+        if kind == "edit":
+            return len((await EditDAO.get_with_decisions_async(db, ids["edit_id"])).edit_decisions)
+        return len(await TranscriptSegmentDAO.get_by_video_async(db, ids["video_id"]))
+
+
+async def sync_on_loop(kind: str, ids: dict) -> int:
+    return sync_read(kind, ids)
+
+
+async def sync_in_thread(kind: str, ids: dict) -> int:
+    return await asyncio.to_thread(sync_read, kind, ids)
+
+
+MODES = {"sync on loop": sync_on_loop, "sync in thread": sync_in_thread, "async": async_read}
+
+
+def pct(values, p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100 * len(values)))] * 1000
+
+
+async def load(read, kind: str, ids: dict, concurrency: int, requests: int):
+    latencies = []
+    remaining = requests
+
+    async def client():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            t0 = time.perf_counter()
+            await read(kind, ids)
+            latencies.append(time.perf_counter() - t0)
+
+    monitor = LoopLagMonitor(threshold_ms=1000)  # Lag only; stalls are not the point here
+    monitor.start()
+    t0 = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - t0
+    await asyncio.sleep(monitor.interval * 2)  # Let the heartbeat record the last stretch
+    monitor.stop()
+    return latencies, elapsed, monitor.max_lag * 1000
+
+
+async def run(args):
+    init_db()
+    ids = seed(args.segments, args.decisions)
+    print(f"Seeded {args.segments} transcript segments, edit with {args.decisions} decisions; data dir {DATA_DIR}")
+
+    # Warm both engines and the page cache
+    for kind in READS:
+        sync_read(kind, ids)
+        await async_read(kind, ids)
+
+    for kind in READS:
+        print(f"\n{kind} ({args.requests} reads per run)")
+        for concurrency in args.concurrency:
+            for name, read in MODES.items():
+                latencies, elapsed, max_lag = await load(read, kind, ids, concurrency, args.requests)
+                print(f"  c={concurrency:<3} {name:>14}: p50 {pct(latencies, 50):7.2f} ms | "
+                      f"p99 {pct(latencies, 99):7.2f} ms | {len(latencies) / elapsed:7.0f} reads/s | "
+                      f"max loop lag {max_lag:6.1f} ms")
+    await dispose_async_engine()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--segments", type=int, default=1500, help="Transcript segments of the source video")
+    parser.add_argument("--decisions", type=int, default=150, help="Decisions in the edit")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200, help="Reads per run")
+    args = parser.parse_args()
+    try:
+        asyncio.run(run(args))
+    finally:
+        shutil.rmtree(DATA_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
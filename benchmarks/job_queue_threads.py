@@ -0,0 +1,136 @@
+"""
+Check: job queue writes from several threads of one process stay isolated.
+
+Job handlers, the job worker and async routes all reach the jobs table through
+SessionLocal() from worker threads (asyncio.to_thread, the job writer thread).
+This starts --creators threads calling JobDAO.create and --claimers threads calling
+JobDAO.claim_next against a temporary database, and checks that no session raised,
+that every job was created and that each was claimed exactly once.
+
+Exits non-zero if any check failed.
+
+Usage:
+    python benchmarks/job_queue_threads.py --creators 3 --claimers 3 --jobs 200
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+# Set before any app module reads its configuration
+DATA_DIR = tempfile.mkdtemp(prefix="job_queue_threads_")
+os.environ["DATA_DIR"] = DATA_DIR
+
+import app.models  # noqa: F401  (registers the tables)
+from app.dao import JobDAO
+from app.database import SessionLocal, engine, init_db
+from app.models import Job
+
+KIND = "bench"
+
+
+def run(args) -> bool:
+    init_db()
+    errors = []
+    claimed = []
+    created = []
+    creating = threading.Event()
+    creating.set()
+    lock = threading.Lock()
+
+    def creator(n: int):
+        for _ in range(n):
+            db = SessionLocal()
+            try:
+                job = JobDAO.create(db, KIND, {}, status="queued")
+                with lock:
+                    created.append(job.id)
+            except Exception as e:
+                with lock:
+                    errors.append(f"create: {type(e).__name__}: {e}")
+            finally:
+                db.close()
+
+    def claimer(worker_id: str):
+        while True:
+            db = SessionLocal()
+            try:
+                job = JobDAO.claim_next(db, worker_id, [KIND])
+            except Exception as e:
+                job = None
+                with lock:
+                    errors.append(f"claim: {type(e).__name__}: {e}")
+            finally:
+                db.close()
+            if job:
+                with lock:
+                    claimed.append(job.id)
+            elif not creating.is_set():
+                return
+            else:
+                time.sleep(0.001)
+
+    per_creator = args.jobs // args.creators
+    creators = [threading.Thread(target=creator, args=(per_creator,)) for _ in range(args.creators)]
+    claimers = [threading.Thread(target=claimer, args=(f"w{i}",)) for i in range(args.claimers)]
+    t0 = time.perf_counter()
+    for t in creators + claimers:
+        t.start()
+    for t in creators:
+        t.join()
+    creating.clear()
+    for t in claimers:
+        t.join()
+    elapsed = time.perf_counter() - t0
+
+    db = SessionLocal()
+    try:
+        rows = db.query(Job).filter(Job.kind == KIND).all()
+    finally:
+        db.close()
+
+    expected = per_creator * args.creators
+    twice = [job_id for job_id, count in Counter(claimed).items() if count > 1]
+    print(f"{args.creators} creators, {args.claimers} claimers: {len(created)} created, {len(claimed)} claimed "
+          f"in {elapsed:.2f}s ({engine.pool.__class__.__name__})")
+
+    failures = [f"{len(errors)} session errors, first: {errors[0]}"] if errors else []
+    if len(rows) != expected:
+        failures.append(f"{len(rows)} jobs in the table, expected {expected}")
+    if twice:
+        failures.append(f"{len(twice)} jobs claimed more than once")
+    unclaimed = [job.id for job in rows if job.status != "running"]
+    if unclaimed:
+        failures.append(f"{len(unclaimed)} jobs never claimed")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if not failures:
+        print("PASS: every job created and claimed exactly once, no session errors")
+    return not failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--creators", type=int, default=3)
+    parser.add_argument("--claimers", type=int, default=3)
+    parser.add_argument("--jobs", type=int, default=300, help="Jobs created in total")
+    args = parser.parse_args()
+    try:
+        ok = run(args)
+    finally:
+        engine.dispose()
+        shutil.rmtree(DATA_DIR, ignore_errors=True)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
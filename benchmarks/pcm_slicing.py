@@ -0,0 +1,100 @@
+"""
+Benchmark: per-segment audio preparation for Whisper inference.
+
+Compares the old transcribe_video behaviour (one ffmpeg process per speech
+segment writing a temp WAV, which Whisper then decodes again with a second
+ffmpeg process) against slicing an in-memory PCM array decoded once.
+
+Model inference itself is excluded - it is identical in both paths - so this
+isolates the overhead that the in-memory path removes.
+
+Usage:
+    python benchmarks/pcm_slicing.py --hours 2 --limit 300
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.whisper_utils import SAMPLE_RATE, load_pcm_audio, slice_audio, write_pcm_wav
+
+
+def make_synthetic_stream(path: str, hours: float, speech_seconds: float = 4.0, silence_seconds: float = 1.0):
+    """Write a mono 16 kHz WAV of alternating noise bursts ("speech") and silence."""
+    rng = np.random.default_rng(0)
+    period = speech_seconds + silence_seconds
+    n_periods = int(hours * 3600 / period)
+    burst = (rng.standard_normal(int(speech_seconds * SAMPLE_RATE)) * 0.1).astype(np.float32)
+    gap = np.zeros(int(silence_seconds * SAMPLE_RATE), dtype=np.float32)
+    audio = np.tile(np.concatenate([burst, gap]), n_periods)
+    write_pcm_wav(path, audio)
+    segments = [(i * period, i * period + speech_seconds) for i in range(n_periods)]
+    return segments
+
+
+def ffmpeg_per_segment(wav_path: str, segments, work_dir: str):
+    """Old path: extract each padded window with ffmpeg, then decode it again as Whisper's load_audio does."""
+    for i, (start, end) in enumerate(segments):
+        seg_path = os.path.join(work_dir, f"segment_{i}.wav")
+        subprocess.run(
+            ['ffmpeg', '-i', wav_path, '-ss', str(start), '-to', str(end), '-acodec', 'pcm_s16le', '-y', seg_path],
+            check=True, capture_output=True,
+        )
+        out = subprocess.run(
+            ['ffmpeg', '-nostdin', '-threads', '0', '-i', seg_path, '-f', 's16le', '-ac', '1',
+             '-acodec', 'pcm_s16le', '-ar', str(SAMPLE_RATE), '-'],
+            check=True, capture_output=True,
+        ).stdout
+        np.frombuffer(out, np.int16).flatten().astype(np.float32) / 32768.0
+        os.remove(seg_path)
+
+
+def in_memory(wav_path: str, segments):
+    """New path: decode once, then hand array views to the model."""
+    audio = load_pcm_audio(wav_path)
+    for start, end in segments:
+        slice_audio(audio, start, end)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hours", type=float, default=2.0, help="Length of the synthetic stream")
+    parser.add_argument("--limit", type=int, default=0,
+                        help="Only run the ffmpeg path on the first N segments and extrapolate (0 = all)")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="pcm_bench_")
+    try:
+        wav_path = os.path.join(work_dir, "stream.wav")
+        segments = make_synthetic_stream(wav_path, args.hours)
+        padded = [(max(0.0, s - 0.15), e + 0.15) for s, e in segments]
+        print(f"Synthetic stream: {args.hours:.1f}h, {len(padded)} speech segments")
+
+        t0 = time.perf_counter()
+        in_memory(wav_path, padded)
+        mem_time = time.perf_counter() - t0
+        print(f"In-memory slicing (incl. one full decode): {mem_time:.2f}s")
+
+        subset = padded[:args.limit] if args.limit else padded
+        t0 = time.perf_counter()
+        ffmpeg_per_segment(wav_path, subset, work_dir)
+        ff_time = time.perf_counter() - t0
+        ff_total = ff_time * len(padded) / len(subset)
+        label = "" if len(subset) == len(padded) else f" (extrapolated from {len(subset)} segments)"
+        print(f"ffmpeg per segment: {ff_total:.2f}s{label}")
+        print(f"Speedup: {ff_total / mem_time:.1f}x")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Benchmark: interactive preview latency while a batch export is running.
+
+Renders clip previews the way clip_rendition_service does (a short fragmented
+MP4, scheduled as interactive work) one after another and reports latency
+percentiles in three situations: an idle machine, a background export with
+preemption off, and a background export under each requested preemption mode.
+The export re-renders the whole input with render_segments in a loop, as batch
+work, for as long as previews are being measured.
+
+Usage:
+    python benchmarks/preview_latency.py path/to/video.mp4 --previews 20
+    FFMPEG_MAX_PROCESSES=2 python benchmarks/preview_latency.py path/to/video.mp4 --modes off nice suspend
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.ffmpeg_scheduler import INTERACTIVE, PREEMPTION_MODES, scheduler
+from app.ffmpeg_utils import cut_video_segment, render_segments
+
+
+def probe_duration(video: str) -> float:
+    probe = subprocess.run(['ffprobe', '-v', 'error', '-show_entries', 'format=duration', '-of', 'json', video],
+                           capture_output=True, text=True, check=True)
+    return float(json.loads(probe.stdout)['format']['duration'])
+
+
+def percentile(values, p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+async def export_loop(video: str, duration: float, out_dir: Path, stop: asyncio.Event) -> int:
+    """Re-render the whole video as batch work until stop is set; returns completed renders."""
+    renders = 0
+    while not stop.is_set():
+        await render_segments(video, [{'start': 0.0, 'end': duration}], str(out_dir / f"export_{renders}.mp4"))
+        renders += 1
+    return renders
+
+
+async def measure(video: str, duration: float, previews: int, clip_seconds: float, out_dir: Path,
+                  with_export: bool, seed: int):
+    rng = random.Random(seed)
+    stop = asyncio.Event()
+    export = asyncio.create_task(export_loop(video, duration, out_dir, stop)) if with_export else None
+    if export:
+        await asyncio.sleep(2.0)  # Let the export reach full speed
+
+    latencies = []
+    for i in range(previews):
+        start = rng.uniform(0, max(0.0, duration - clip_seconds))
+        t0 = time.perf_counter()
+        result = await asyncio.to_thread(cut_video_segment, video, str(out_dir / f"preview_{i}.mp4"),
+                                         start, start + clip_seconds, 0, 120, True, INTERACTIVE)
+        latencies.append(time.perf_counter() - t0)
+        if result.returncode != 0:
+            print(f"  preview {i} failed: {result.stderr[-300:]}")
+
+    renders = 0
+    if export:
+        stop.set()
+        export.cancel()
+        try:
+            renders = await export
+        except asyncio.CancelledError:
+            pass
+    return latencies, renders
+
+
+async def run(args):
+    duration = args.duration or probe_duration(args.video)
+    print(f"Input: {args.video} ({duration:.1f}s); {args.previews} previews of {args.clip_seconds}s; "
+          f"scheduler: {scheduler.max_processes} processes, {scheduler.cpu_count} cores")
+
+    scenarios = [("idle", None)] + [(f"export, {mode}", mode) for mode in args.modes]
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, mode in scenarios:
+            if mode:
+                scheduler.preemption = mode
+            latencies, _ = await measure(args.video, duration, args.previews, args.clip_seconds,
+                                         Path(tmp), with_export=mode is not None, seed=args.seed)
+            print(f"{name:>18}: p50 {percentile(latencies, 50):6.2f}s | p90 {percentile(latencies, 90):6.2f}s "
+                  f"| p99 {percentile(latencies, 99):6.2f}s | max {max(latencies):6.2f}s")
+    print(f"Scheduler: {scheduler.stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("video", help="Source video; the background export renders all of it")
+    parser.add_argument("--previews", type=int, default=20)
+    parser.add_argument("--clip-seconds", type=float, default=3.0)
+    parser.add_argument("--modes", nargs="+", default=["off", "suspend"], choices=PREEMPTION_MODES)
+    parser.add_argument("--duration", type=float, help="Input duration in seconds (default: ffprobe)")
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Benchmark: one unified EDL stream build fanned out across render worker processes.
+
+Builds the same EDL (--ranges ranges of --range-seconds each, spread over the input)
+with build_unified_hls_from_ranges, first with render tasks run in this process
+(RENDER_TASKS=local), then with RENDER_TASKS=queue and each requested number of
+local `python -m app.worker` processes. Every run uses a fresh temporary data
+directory (database and shared state) and output directory, and checks that the
+manifest was written, that every queued render task completed exactly once, and how
+many workers took part. Exits non-zero if any run failed a check.
+
+Usage:
+    python benchmarks/render_workers.py path/to/video.mp4 --ranges 12 --workers 1 2 4
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+# Set before any app module reads its configuration
+DATA_DIR = tempfile.mkdtemp(prefix="render_workers_")
+os.environ["DATA_DIR"] = DATA_DIR
+os.environ["RENDER_TASKS"] = "queue"
+
+from app import render_tasks
+from app.database import SessionLocal, init_db
+from app.models import Job
+from app.services import edl_stream_service
+from app.services.edl_stream_service import build_unified_hls_from_ranges
+
+
+def probe_duration(video: str) -> float:
+    probe = subprocess.run(['ffprobe', '-v', 'error', '-show_entries', 'format=duration', '-of', 'json', video],
+                           capture_output=True, text=True, check=True)
+    return float(json.loads(probe.stdout)['format']['duration'])
+
+
+def start_workers(count: int, concurrency: int):
+    env = {**os.environ, "DATA_DIR": DATA_DIR}
+    return [subprocess.Popen([sys.executable, "-m", "app.worker", "--concurrency", str(concurrency)],
+                             cwd=str(REPO_ROOT), env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            for _ in range(count)]
+
+
+def stop_workers(workers) -> None:
+    for w in workers:
+        w.send_signal(signal.SIGTERM)
+    for w in workers:
+        try:
+            w.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            w.kill()
+
+
+def task_report(expected: dict) -> tuple:
+    """Workers that ran the queued render tasks, and what went wrong with them (then clears the jobs table)."""
+    db = SessionLocal()
+    try:
+        jobs = db.query(Job).filter(Job.kind.in_(render_tasks.RENDER_TASK_KINDS)).all()
+        problems = []
+        for kind, count in expected.items():
+            queued = sum(1 for job in jobs if job.kind == kind)
+            if queued != count:
+                problems.append(f"{queued} {kind} tasks queued, expected {count}")
+        for job in jobs:
+            if job.status != "completed":
+                problems.append(f"{job.kind} task {job.id} {job.status}")
+            elif job.attempts != 1:
+                problems.append(f"{job.kind} task {job.id} ran {job.attempts} times")
+        return {job.worker_id for job in jobs}, problems
+    finally:
+        db.query(Job).delete()
+        db.commit()
+        db.close()
+
+
+async def build_once(video: str, ranges, out_root: Path):
+    edl_stream_service.EDL_ROOT = out_root
+    t0 = time.perf_counter()
+    result = await build_unified_hls_from_ranges("bench", video, ranges)
+    elapsed = time.perf_counter() - t0
+    out_dir = out_root / result.edl_hash
+    segments = len(list(out_dir.glob("seg-*.m4s")))
+    ok = result.success and (out_dir / "manifest.m3u8").exists()
+    return elapsed, ok, segments, result.message
+
+
+async def run(args) -> bool:
+    init_db()
+    duration = args.duration or probe_duration(args.video)
+    step = max(args.range_seconds, (duration - args.range_seconds) / max(1, args.ranges - 1))
+    ranges = [(round(i * step, 3), round(i * step + args.range_seconds, 3)) for i in range(args.ranges)
+              if i * step + args.range_seconds <= duration]
+    print(f"Input: {args.video} ({duration:.1f}s); {len(ranges)} ranges of {args.range_seconds}s; data dir {DATA_DIR}")
+
+    # One encode per range, then one packaging task
+    expected = {"encode_range": len(ranges), "package_cmaf": 1}
+    scenarios = [("local", 0)] + [("queue", n) for n in args.workers]
+    passed = True
+    for mode, count in scenarios:
+        render_tasks.RENDER_TASKS_MODE = mode
+        workers = start_workers(count, args.concurrency) if mode == "queue" else []
+        out_root = Path(tempfile.mkdtemp(prefix="edl_", dir=DATA_DIR))
+        try:
+            if workers:
+                await asyncio.sleep(args.warmup)  # Let the workers import and start polling
+            elapsed, ok, segments, message = await build_once(args.video, ranges, out_root)
+        finally:
+            stop_workers(workers)
+            shutil.rmtree(out_root, ignore_errors=True)
+        used, problems = task_report(expected) if mode == "queue" else (set(), [])
+        name = "in process" if mode == "local" else f"{count} worker{'s' if count > 1 else ''}"
+        print(f"{name:>12}: {elapsed:6.2f}s | {'ok' if ok else 'FAILED: ' + message} | {segments} segments"
+              + (f" | tasks ran on {len(used)} worker(s)" if mode == "queue" else ""))
+        for problem in problems:
+            print(f"{'':>12}  FAIL: {problem}")
+        passed = passed and ok and not problems
+    print("PASS: every build completed, each render task exactly once" if passed else "FAIL: see above")
+    return passed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("video", help="Source video")
+    parser.add_argument("--ranges", type=int, default=12)
+    parser.add_argument("--range-seconds", type=float, default=2.0)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="Worker process counts to try")
+    parser.add_argument("--concurrency", type=int, default=1, help="Tasks each worker runs at once")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Seconds workers get to start before the build")
+    parser.add_argument("--duration", type=float, help="Input duration in seconds (default: ffprobe)")
+    args = parser.parse_args()
+    try:
+        passed = asyncio.run(run(args))
+    finally:
+        shutil.rmtree(DATA_DIR, ignore_errors=True)
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
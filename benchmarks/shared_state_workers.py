@@ -0,0 +1,151 @@
+"""
+Benchmark: two worker processes coordinating through app.shared_state.
+
+Starts two processes on the same state store (by default a fresh SQLite file in a
+temporary data directory, or --url redis://... for a Redis-protocol server) and has
+them, concurrently:
+
+  - register uploads in the shared file_store and look up the other worker's,
+  - run --tasks short "processing" tasks each under shared_semaphore("processing",
+    --limit), recording how many held it at once,
+  - publish progress for a job in one worker while the other follows it with
+    subscribe_progress(), as an SSE request landing on the wrong worker would.
+
+Reports semaphore wait percentiles, the peak concurrency seen, and how long
+progress events took to reach the other worker. Exits non-zero if the peak exceeded
+--limit, a worker never saw the other's upload, or progress events were lost.
+
+Usage:
+    python benchmarks/shared_state_workers.py --tasks 40 --limit 2
+    python benchmarks/shared_state_workers.py --url redis://localhost:6379/15
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+def percentile(values, p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+async def worker_main(name: str, other: str, args, results) -> None:
+    # Imported here so SHARED_STATE_URL from the parent is already in the environment
+    from app.progress import close_progress_stream, emit_progress, open_progress_stream, subscribe_progress
+    from app.shared_state import SharedMapping, get_shared_state, shared_semaphore
+
+    state = get_shared_state()
+    file_store = SharedMapping("file_store")
+    file_store[f"{name}-upload"] = f"/uploads/{name}.mp4"
+
+    waits = []
+
+    async def task(i: int):
+        t0 = time.perf_counter()
+        async with shared_semaphore("processing", args.limit):
+            waits.append(time.perf_counter() - t0)
+            # Record this holder, then count current holders from the store itself
+            held = state.lease_count("processing")
+            state.xadd("bench:held", json.dumps(held))
+            await asyncio.sleep(args.hold_ms / 1000)
+
+    async def publish():
+        if name != "a":
+            return
+        await open_progress_stream("bench-job")
+        for i in range(args.events):
+            await emit_progress("bench-job", {"text": f"step {i}", "sent": time.time()})
+            await asyncio.sleep(0.02)
+        await emit_progress("bench-job", {"text": "done", "type": "done", "sent": time.time()})
+        close_progress_stream("bench-job")
+
+    async def follow():
+        if name != "b":
+            return []
+        events = None
+        while events is None:  # Worker a may not have opened the stream yet
+            events = await subscribe_progress("bench-job")
+            await asyncio.sleep(0.01)
+        return [time.time() - msg["sent"] async for msg in events]
+
+    _, lags, _ = await asyncio.gather(
+        asyncio.gather(*(task(i) for i in range(args.tasks))), follow(), publish()
+    )
+    deadline = time.monotonic() + args.visibility_timeout
+    while f"{other}-upload" not in file_store and time.monotonic() < deadline:
+        await asyncio.sleep(0.01)
+    results.put({"worker": name, "waits": waits, "lags": lags, "saw_other": file_store.get(f"{other}-upload")})
+
+
+def run_worker(name: str, other: str, url: str, args, results) -> None:
+    os.environ["SHARED_STATE_URL"] = url
+    asyncio.run(worker_main(name, other, args, results))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="SHARED_STATE_URL (default: SQLite in a temporary data directory)")
+    parser.add_argument("--tasks", type=int, default=40, help="Semaphore tasks per worker")
+    parser.add_argument("--limit", type=int, default=2, help="Cluster-wide semaphore size")
+    parser.add_argument("--hold-ms", type=float, default=20.0, help="How long each task holds the semaphore")
+    parser.add_argument("--events", type=int, default=50, help="Progress events published by worker a")
+    parser.add_argument("--visibility-timeout", type=float, default=10.0,
+                        help="Seconds a worker waits for the other's upload to appear")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        url = args.url or f"sqlite:///{os.path.join(data_dir, 'shared_state.db')}"
+        os.environ["SHARED_STATE_URL"] = url
+        from app.shared_state import get_shared_state
+        state = get_shared_state()
+        state.delete_stream("bench:held")
+
+        ctx = multiprocessing.get_context("spawn")
+        results = ctx.Queue()
+        t0 = time.perf_counter()
+        workers = [ctx.Process(target=run_worker, args=(name, other, url, args, results))
+                   for name, other in (("a", "b"), ("b", "a"))]
+        for w in workers:
+            w.start()
+        reports = [results.get(timeout=300) for _ in workers]
+        for w in workers:
+            w.join()
+        elapsed = time.perf_counter() - t0
+
+        held = [json.loads(data) for _, data in state.xread("bench:held", count=1_000_000)]
+        waits = [w for r in reports for w in r["waits"]]
+        lags = [lag for r in reports for lag in r["lags"]]
+        print(f"Backend: {type(state).__name__} ({url})")
+        print(f"Workers saw each other's uploads: {', '.join(str(r['saw_other']) for r in reports)}")
+        print(f"Semaphore: {len(waits)} acquisitions in {elapsed:.2f}s, limit {args.limit}, peak held {max(held)} "
+              f"({'OK' if max(held) <= args.limit else 'LIMIT EXCEEDED'}); "
+              f"wait p50 {percentile(waits, 50) * 1000:.1f}ms, p99 {percentile(waits, 99) * 1000:.1f}ms")
+        if lags:
+            print(f"Progress relayed across workers: {len(lags)} events; "
+                  f"lag p50 {percentile(lags, 50) * 1000:.1f}ms, p99 {percentile(lags, 99) * 1000:.1f}ms")
+        state.delete_stream("bench:held")
+
+    failures = []
+    if max(held) > args.limit:
+        failures.append(f"{max(held)} workers held the semaphore at once (limit {args.limit})")
+    failures += [f"worker {r['worker']} never saw the other worker's upload" for r in reports if not r["saw_other"]]
+    if len(lags) != args.events + 1:  # Including the "done" event
+        failures.append(f"{len(lags)} of {args.events + 1} progress events reached the other worker")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if not failures:
+        print("PASS: workers shared uploads, the semaphore limit and progress")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
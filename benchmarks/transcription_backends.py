@@ -0,0 +1,98 @@
+"""
+Benchmark: transcription engines (openai-whisper vs faster-whisper int8).
+
+Runs each backend over the same media file through transcribe_video and the
+word-timestamp path, and reports wall time, real-time factor against the
+file's audio duration, word error rate, and whether each engine's raw output has
+the result schema the pipeline expects. WER is measured against a plain-text reference when one
+is given, otherwise against the first backend's output.
+
+Both engines must be installed (pip install faster-whisper for the second).
+Model loading is excluded from the timings: each backend is loaded once up front.
+
+Usage:
+    python benchmarks/transcription_backends.py path/to/video.mp4 --model base
+    TRANSCRIPTION_COMPUTE_TYPE=int8 python benchmarks/transcription_backends.py path/to/video.mp4 --reference ref.txt
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.audio_cache import SAMPLE_RATE, get_pcm, to_float
+from app.transcription_backends import TRANSCRIPTION_BACKENDS, engine_id, load_backend
+from app.whisper_utils import transcribe_audio_with_word_timestamps, transcribe_video
+from benchmarks.transcription_modes import word_error_rate
+
+
+# Keys the rest of the pipeline reads from a backend's raw result.
+SEGMENT_KEYS = {'start', 'end', 'text', 'avg_logprob', 'no_speech_prob', 'words'}
+WORD_KEYS = {'word', 'start', 'end', 'probability'}
+
+
+def schema_ok(result) -> bool:
+    """Whether a raw backend result has every segment and word key the pipeline relies on."""
+    return ({'text', 'segments', 'language'} <= set(result)
+            and all(SEGMENT_KEYS <= set(seg) for seg in result['segments'])
+            and all(WORD_KEYS <= set(w) for seg in result['segments'] for w in seg['words']))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("video", help="Media file to transcribe")
+    parser.add_argument("--model", default="base", help="Model name (same for every backend)")
+    parser.add_argument("--language", default="en")
+    parser.add_argument("--audio-track", type=int, default=0)
+    parser.add_argument("--backends", nargs="+", default=list(TRANSCRIPTION_BACKENDS), choices=TRANSCRIPTION_BACKENDS)
+    parser.add_argument("--reference", help="Plain-text reference transcript for WER")
+    args = parser.parse_args()
+
+    reference = Path(args.reference).read_text(encoding="utf-8") if args.reference else None
+    audio = get_pcm(args.video, args.audio_track)
+    duration = len(audio) / SAMPLE_RATE
+    print(f"Fixture: {args.video} ({duration:.1f}s of audio, track {args.audio_track}), model {args.model}")
+
+    results = {}
+    for backend in args.backends:
+        t0 = time.perf_counter()
+        model = load_backend(backend, args.model)
+        load_time = time.perf_counter() - t0
+        raw = model.transcribe(to_float(audio[:30 * SAMPLE_RATE]), language=args.language, word_timestamps=True)
+
+        t0 = time.perf_counter()
+        segments_result = transcribe_video(
+            args.video, model_name=args.model, language=args.language,
+            audio_track=args.audio_track, backend=backend,
+        )
+        segments_time = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        words = transcribe_audio_with_word_timestamps(
+            args.video, language=args.language, model_name=args.model,
+            audio=audio, audio_track=args.audio_track, backend=backend,
+        )
+        words_time = time.perf_counter() - t0
+
+        words_text = " ".join(w['word'] for w in words)
+        results[backend] = (segments_result, words_text)
+        label = engine_id(backend)
+        line = (f"{label:>20}: load {load_time:6.2f}s | segments {segments_time:8.2f}s RTF {segments_time / duration:.3f} "
+                f"| words {words_time:8.2f}s RTF {words_time / duration:.3f} ({len(words)} words) "
+                f"| schema {'ok' if schema_ok(raw) else 'MISMATCH'}")
+        if reference is not None:
+            line += f" | WER {word_error_rate(reference, segments_result['text']):.3f} / {word_error_rate(reference, words_text):.3f}"
+        print(line)
+
+    baseline = args.backends[0]
+    base_segments, base_words = results[baseline]
+    for backend in args.backends[1:]:
+        segments_result, words_text = results[backend]
+        print(f"{backend} vs {baseline}: WER segments {word_error_rate(base_segments['text'], segments_result['text']):.3f}, "
+              f"words {word_error_rate(base_words, words_text):.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark: per-segment vs concatenated transcription in transcribe_video.
+
+Runs both modes over the same media file and reports wall time, real-time
+factor, segment counts and how far the two transcripts diverge. When a
+reference transcript (plain text) is supplied, word error rate against it is
+reported for each mode as well.
+
+Whisper must be installed; this loads the requested model once per mode.
+
+Usage:
+    python benchmarks/transcription_modes.py path/to/video.mp4 --model base
+    python benchmarks/transcription_modes.py path/to/video.mp4 --reference ref.txt
+"""
+
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.whisper_utils import TRANSCRIPTION_MODES, transcribe_video
+
+
+def normalize_words(text: str):
+    """Lower-case, strip punctuation and split into words for WER scoring."""
+    return re.sub(r"[^\w\s']", " ", text.lower()).split()
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """Levenshtein distance over words divided by the reference length."""
+    ref = normalize_words(reference)
+    hyp = normalize_words(hypothesis)
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    prev = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        curr = [i] + [0] * len(hyp)
+        for j, hyp_word in enumerate(hyp, 1):
+            curr[j] = min(
+                prev[j] + 1,
+                curr[j - 1] + 1,
+                prev[j - 1] + (ref_word != hyp_word),
+            )
+        prev = curr
+    return prev[-1] / len(ref)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("video", help="Media file to transcribe")
+    parser.add_argument("--model", default="base", help="Whisper model name")
+    parser.add_argument("--language", default="en")
+    parser.add_argument("--audio-track", type=int, default=0)
+    parser.add_argument("--reference", help="Plain-text reference transcript for WER")
+    args = parser.parse_args()
+
+    reference = Path(args.reference).read_text(encoding="utf-8") if args.reference else None
+    results = {}
+
+    for mode in TRANSCRIPTION_MODES:
+        t0 = time.perf_counter()
+        result = transcribe_video(
+            args.video,
+            model_name=args.model,
+            language=args.language,
+            audio_track=args.audio_track,
+            transcription_mode=mode,
+        )
+        elapsed = time.perf_counter() - t0
+        speech_seconds = sum(end - start for start, end in result['speech_segments'])
+        results[mode] = result
+
+        line = (f"{mode:>13}: {elapsed:8.2f}s  RTF {elapsed / max(speech_seconds, 1e-6):.3f} "
+                f"(vs {speech_seconds:.1f}s speech)  {len(result['segments'])} segments")
+        if reference is not None:
+            line += f"  WER {word_error_rate(reference, result['text']):.3f}"
+        print(line)
+
+    per_segment, concatenated = (results[mode]['text'] for mode in TRANSCRIPTION_MODES)
+    print(f"Divergence between modes (WER of concatenated vs per_segment): "
+          f"{word_error_rate(per_segment, concatenated):.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Check: the event loop stays responsive while a large video is uploaded.
+
+Uploads a --size-mb file through POST /api/projects/{id}/source-videos/upload while
+pinging a trivial endpoint on the same event loop every --ping-ms, with
+app.loop_monitor watching the loop. The same file is then sent to a copy of the
+route as it used to be (whole body read into memory, then written with a blocking
+write) to show what the monitor catches.
+
+Reports ping latency percentiles and the monitor's stalls for each route, and exits
+non-zero if the real upload route blocked the loop for longer than --threshold-ms.
+Runs in a temporary data directory and working directory (uploads/ is relative).
+
+Usage:
+    python benchmarks/upload_responsiveness.py --size-mb 256
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+# Set before any app module reads its configuration
+WORK_DIR = tempfile.mkdtemp(prefix="upload_responsiveness_")
+os.environ["DATA_DIR"] = WORK_DIR
+
+import httpx
+from fastapi import FastAPI, File, UploadFile
+
+from app.api.source_videos import router as source_videos_router
+from app.dao import ProjectDAO
+from app.database import SessionLocal, init_db
+from app.loop_monitor import LoopLagMonitor
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+    app.include_router(source_videos_router)
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    @app.post("/blocking-upload")
+    async def blocking_upload(file: UploadFile = File(...)):
+        # The upload route before it streamed to disk off the loop
+        content = await file.read()
+        with open(Path("uploads") / "blocking.bin", "wb") as out:
+            out.write(content)
+        return {"size": len(content)}
+
+    return app
+
+
+def make_input(size_mb: int) -> Path:
+    path = Path(WORK_DIR) / "input.mp4"
+    chunk = os.urandom(1024 * 1024)
+    with open(path, "wb") as f:
+        for _ in range(size_mb):
+            f.write(chunk)
+    return path
+
+
+async def measure(client: httpx.AsyncClient, url: str, video: Path, args) -> dict:
+    monitor = LoopLagMonitor(threshold_ms=args.threshold_ms)
+    monitor.start()
+    latencies = []
+    done = asyncio.Event()
+
+    async def pinger():
+        while not done.is_set():
+            t0 = time.perf_counter()
+            await client.get("/ping")
+            latencies.append((time.perf_counter() - t0) * 1000)
+            await asyncio.sleep(args.ping_ms / 1000)
+
+    ping_task = asyncio.create_task(pinger())
+    await asyncio.sleep(0.2)  # Baseline pings before the upload starts
+    t0 = time.perf_counter()
+    try:
+        with open(video, "rb") as f:
+            response = await client.post(url, files={"file": ("input.mp4", f, "video/mp4")}, timeout=None)
+    finally:
+        elapsed = time.perf_counter() - t0
+        done.set()
+        await ping_task
+        monitor.stop()
+
+    stats = monitor.stats()
+    latencies.sort()
+    return {
+        "status": response.status_code,
+        "elapsed": elapsed,
+        "pings": len(latencies),
+        "ping_p50": statistics.median(latencies),
+        "ping_max": latencies[-1],
+        "stalls": stats["stalls"],
+        "max_lag": stats["lag_ms"]["max"],
+    }
+
+
+async def run(args) -> bool:
+    init_db()
+    db = SessionLocal()
+    try:
+        project_id = ProjectDAO.create(db, name="upload responsiveness").id
+    finally:
+        db.close()
+
+    video = make_input(args.size_mb)
+    print(f"Uploading {args.size_mb} MB, pinging every {args.ping_ms:.0f} ms, stall threshold {args.threshold_ms:.0f} ms")
+
+    transport = httpx.ASGITransport(app=build_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        routes = [("upload route", f"/api/projects/{project_id}/source-videos/upload")]
+        if not args.skip_blocking:
+            routes.append(("blocking copy", "/blocking-upload"))
+        results = {}
+        for name, url in routes:
+            r = await measure(client, url, video, args)
+            results[name] = r
+            print(f"{name:>14}: HTTP {r['status']} in {r['elapsed']:5.2f}s | {r['pings']} pings, "
+                  f"p50 {r['ping_p50']:.1f} ms, max {r['ping_max']:.1f} ms | "
+                  f"{r['stalls']} stall(s), max loop lag {r['max_lag']:.0f} ms")
+
+    upload = results["upload route"]
+    ok = upload["status"] == 201 and upload["stalls"] == 0
+    print("PASS: loop stayed responsive during the upload" if ok else "FAIL: upload route blocked the event loop")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=256)
+    parser.add_argument("--ping-ms", type=float, default=20.0, help="Pause between pings")
+    parser.add_argument("--threshold-ms", type=float, default=100.0, help="Loop lag counted as a stall")
+    parser.add_argument("--skip-blocking", action="store_true", help="Only measure the real upload route")
+    args = parser.parse_args()
+    cwd = os.getcwd()
+    os.chdir(WORK_DIR)
+    try:
+        ok = asyncio.run(run(args))
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()